@@ -17,7 +17,7 @@
 import os
 import shutil
 import logging
-from typing import List
+from typing import List, Tuple
 from iota2.Common import FileUtils as fu
 
 LOGGER = logging.getLogger(__name__)
@@ -584,10 +584,10 @@ def dempster_shafer_fusion(iota2_dir,
     return sar_opt_fus, confidence_fus, proba_map_fus, ds_choice
 
 
-def fusion(pathClassif: str, N: int, allTiles: List[str], fusionOptions: str,
-           nomenclature_path: str, region_vec: str, ds_sar_opt: bool,
-           pathWd: str) -> List[str]:
-    """generate otb fusion commands by parsing the iota2 classifications
+def fusion_inputs(pathClassif: str, N: int, allTiles: List[str],
+                  region_vec: str, ds_sar_opt: bool) -> List[Tuple[List[str],
+                                                                   str]]:
+    """find classifications to fuse by parsing the iota2 classifications
     directory
 
     Parameters
@@ -599,27 +599,17 @@ def fusion(pathClassif: str, N: int, allTiles: List[str], fusionOptions: str,
         samples
     allTiles: list
         list of tiles to consider
-    fusionOptions: str
-        fusion options of FusionOfClassifications otb application
-    nomenclature_path: str
-        nomenclature file
     region_vec: str
         region shapeFile database
     ds_sar_opt: bool
         flag to inform if the sar optical post classification
         workflow is enable
-    pathWd: str
-        working directory path
 
     Return
     ------
     list
-        list of commands as strings
+        list of tuples (classifications to fuse, output fusion path)
     """
-
-    pathWd = None
-    pix_type = fu.getOutputPixType(nomenclature_path)
-
     classification_suffix_pattern = ""
     if ds_sar_opt:
         classification_suffix_pattern = "_DS"
@@ -637,20 +627,16 @@ def fusion(pathClassif: str, N: int, allTiles: List[str], fusionOptions: str,
                 models.append(mod)
             if tile not in allTiles:
                 allTiles.append(tile)
-    all_cmd = []
+    all_inputs = []
     for seed in range(N):
         for tile in allTiles:
-            directory_out = pathClassif
-            if pathWd != None:
-                directory_out = "$TMPDIR"
             if region_vec is None:
                 classifPath = fu.FileSearch_AND(
                     pathClassif, True, "Classif_" + tile, "seed_" + str(seed) +
                     classification_suffix_pattern + ".tif")
-                allPathFusion = " ".join(classifPath)
-                cmd = "otbcli_FusionOfClassifications -il " + allPathFusion + " " + fusionOptions + " -out " + directory_out + "/" + tile + "_FUSION_seed_" + str(
-                    seed) + ".tif"
-                all_cmd.append(cmd)
+                all_inputs.append(
+                    (classifPath, pathClassif + "/" + tile + "_FUSION_seed_" +
+                     str(seed) + ".tif"))
             else:
                 for mod in models:
                     classifPath = fu.fileSearchRegEx(
@@ -658,10 +644,55 @@ def fusion(pathClassif: str, N: int, allTiles: List[str], fusionOptions: str,
                         "f*_seed_" + str(seed) +
                         classification_suffix_pattern + ".tif")
                     if len(classifPath) != 0:
-                        allPathFusion = " ".join(classifPath)
-                        cmd = "otbcli_FusionOfClassifications -il " + allPathFusion + " " + fusionOptions + " -out " + directory_out + "/" + tile + "_FUSION_model_" + mod + "_seed_" + str(
-                            seed) + ".tif " + pix_type
-                        all_cmd.append(cmd)
+                        all_inputs.append(
+                            (classifPath, pathClassif + "/" + tile +
+                             "_FUSION_model_" + mod + "_seed_" + str(seed) +
+                             ".tif"))
+    return all_inputs
+
+
+def fusion(pathClassif: str, N: int, allTiles: List[str], fusionOptions: str,
+           nomenclature_path: str, region_vec: str, ds_sar_opt: bool,
+           pathWd: str) -> List[str]:
+    """generate otb fusion commands by parsing the iota2 classifications
+    directory
+
+    Parameters
+    ----------
+    pathClassif: str
+        path to the iota2 classification directory
+    N: int
+        number of random seeds to split learnging / validation
+        samples
+    allTiles: list
+        list of tiles to consider
+    fusionOptions: str
+        fusion options of FusionOfClassifications otb application
+    nomenclature_path: str
+        nomenclature file
+    region_vec: str
+        region shapeFile database
+    ds_sar_opt: bool
+        flag to inform if the sar optical post classification
+        workflow is enable
+    pathWd: str
+        working directory path
+
+    Return
+    ------
+    list
+        list of commands as strings
+    """
+    pix_type = fu.getOutputPixType(nomenclature_path)
+
+    all_cmd = []
+    for classifPath, fusion_path in fusion_inputs(pathClassif, N, allTiles,
+                                                  region_vec, ds_sar_opt):
+        allPathFusion = " ".join(classifPath)
+        cmd = "otbcli_FusionOfClassifications -il " + allPathFusion + " " + fusionOptions + " -out " + fusion_path
+        if region_vec:
+            cmd = cmd + " " + pix_type
+        all_cmd.append(cmd)
 
     tmp = pathClassif.split("/")
     if pathClassif[-1] == "/":
@@ -0,0 +1,530 @@
+#!/usr/bin/env python3
+#-*- coding: utf-8 -*-
+
+# =========================================================================
+#   Program:   iota2
+#
+#   Copyright (c) CESBIO. All rights reserved.
+#
+#   See LICENSE for details.
+#
+#   This software is distributed WITHOUT ANY WARRANTY; without even
+#   the implied warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR
+#   PURPOSE.  See the above copyright notices for more information.
+#
+# =========================================================================
+"""
+Windowed fusion of classifications (majority voting / Dempster-Shafer)
+
+Replace the FusionOfClassifications OTB application : the fused label,
+the undecided mask, the number of agreeing votes and the confidence of the
+fusion are computed reading inputs once, by blocks of rows processed
+by several threads.
+"""
+import argparse
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+LOGGER = logging.getLogger(__name__)
+
+# relative tolerance used to detect ties between Dempster-Shafer beliefs
+DS_TIE_TOLERANCE = 1e-12
+
+
+def masses_of_belief(confusion_matrix: str, mob: str) -> Dict[int, float]:
+    """compute the mass of belief of each label from a confusion matrix
+
+    Parameters
+    ----------
+    confusion_matrix : str
+        OTB confusion matrix (csv)
+    mob : str
+        mass of belief measurement (precision/recall/accuracy/kappa)
+
+    Return
+    ------
+    dict
+        mass of belief by label, in [0, 1]
+    """
+    from iota2.Validation import ResultsUtils as ru
+
+    if mob not in ["precision", "recall", "accuracy", "kappa"]:
+        raise ValueError("the dempstershafer MoB must be 'precision' or "
+                         "'recall' or 'accuracy' or 'kappa'")
+    matrix = ru.parse_csv(confusion_matrix)
+    kappa, oacc, p_dic, r_dic, _ = ru.get_coeff(matrix)
+    if mob == "precision":
+        masses = dict(p_dic)
+    elif mob == "recall":
+        masses = dict(r_dic)
+    elif mob == "accuracy":
+        masses = {label: oacc for label in matrix}
+    else:
+        masses = {label: kappa for label in matrix}
+    # get_coeff returns negative values for undefined coefficients
+    return {
+        label: float(min(max(mass, 0.0), 1.0))
+        for label, mass in masses.items()
+    }
+
+
+def masses_to_lut(masses: List[Dict[int, float]]) -> np.ndarray:
+    """convert masses of belief by classifier to a look-up table
+
+    Return
+    ------
+    np.array
+        array of shape (nb classifiers, max label + 1), lut[k, label] is the
+        mass of belief of the classifier k for label (0 if unknown)
+    """
+    max_label = max(max(mass) if mass else 0 for mass in masses)
+    lut = np.zeros((len(masses), max_label + 1), dtype=np.float64)
+    for classifier, mass in enumerate(masses):
+        for label, value in mass.items():
+            lut[classifier, label] = value
+    return lut
+
+
+def fuse_labels(labels: np.ndarray,
+                nodata_label: Optional[int] = 0,
+                undecided_label: Optional[int] = 0,
+                masses: Optional[np.ndarray] = None
+                ) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """fuse labels given by several classifiers
+
+    Parameters
+    ----------
+    labels : np.array
+        labels of shape (nb classifiers, rows, cols)
+    nodata_label : int
+        input pixels with this label are not considered. If every inputs
+        are nodata, the output is nodata_label
+    undecided_label : int
+        label of pixels with a tie between several labels (0, as the
+        FusionOfClassifications OTB application)
+    masses : np.array
+        if None, majority voting is used, else Dempster-Shafer method with
+        masses of belief given by masses_to_lut
+
+    Notes
+    -----
+    Dempster-Shafer : each classifier k giving the label a_k with the
+    mass of belief p_k defines m_k({a_k}) = p_k and
+    m_k(not {a_k}) = 1 - p_k. Combining them, the belief of a label c is
+    proportional to the product of p_k for classifiers voting c and of
+    (1 - p_k) for the others. The chosen label has the highest belief.
+
+    Return
+    ------
+    tuple
+        (fused labels, undecided mask, number of inputs agreeing with the
+         fused label, confidence of the fusion in [0, 1])
+    """
+    labels = labels.astype(np.int64)
+    nb_inputs = labels.shape[0]
+    valid = labels != nodata_label
+    nb_valid = valid.sum(axis=0)
+
+    votes = np.zeros(labels.shape, dtype=np.int64)
+    for candidate in range(nb_inputs):
+        for classifier in range(nb_inputs):
+            votes[candidate] += (valid[classifier] &
+                                 (labels[classifier] == labels[candidate]))
+    votes[~valid] = 0
+
+    if masses is None:
+        scores = votes.astype(np.float64)
+    else:
+        in_lut = valid & (labels < masses.shape[1])
+        mob = np.zeros(labels.shape, dtype=np.float64)
+        for classifier in range(nb_inputs):
+            mob[classifier][in_lut[classifier]] = masses[classifier][
+                labels[classifier][in_lut[classifier]]]
+        scores = np.ones(labels.shape, dtype=np.float64)
+        for candidate in range(nb_inputs):
+            for classifier in range(nb_inputs):
+                agree = labels[classifier] == labels[candidate]
+                scores[candidate] *= np.where(
+                    valid[classifier],
+                    np.where(agree, mob[classifier], 1.0 - mob[classifier]),
+                    1.0)
+    scores[~valid] = -1.0
+
+    winner = np.argmax(scores, axis=0)[np.newaxis]
+    best = np.take_along_axis(scores, winner, axis=0)[0]
+    fused = np.take_along_axis(labels, winner, axis=0)[0]
+    agreeing_votes = np.take_along_axis(votes, winner, axis=0)[0]
+    if masses is None:
+        ties = valid & (scores == best)
+    else:
+        ties = valid & np.isclose(
+            scores, best, rtol=DS_TIE_TOLERANCE, atol=0.0)
+    undecided = np.any(ties & (labels != fused), axis=0)
+
+    # confidence : share of votes / of the beliefs of the fused label
+    with np.errstate(divide="ignore", invalid="ignore"):
+        if masses is None:
+            confidence = agreeing_votes / nb_valid
+        else:
+            # each label appears 'votes' times among candidates
+            beliefs = np.where(valid, scores / np.maximum(votes, 1),
+                               0.0).sum(axis=0)
+            confidence = best / beliefs
+    no_data = nb_valid == 0
+    fused[undecided] = undecided_label
+    fused[no_data] = nodata_label
+    agreeing_votes[no_data] = 0
+    confidence = np.nan_to_num(confidence)
+    confidence[no_data] = 0.0
+    return fused, undecided, agreeing_votes, confidence.astype(np.float32)
+
+
+def fusion_of_classifications(classifications: List[str],
+                              output_path: str,
+                              method: Optional[str] = "majorityvoting",
+                              nodata_label: Optional[int] = 0,
+                              undecided_label: Optional[int] = 0,
+                              mob: Optional[str] = "precision",
+                              confusion_matrices: Optional[List[str]] = None,
+                              pix_type: Optional[str] = "uint8",
+                              undecided_path: Optional[str] = None,
+                              votes_path: Optional[str] = None,
+                              confidence_path: Optional[str] = None,
+                              block_size: Optional[int] = 256,
+                              nb_threads: Optional[int] = 1,
+                              logger: Optional[logging.Logger] = LOGGER
+                              ) -> str:
+    """fuse classifications sharing the same grid
+
+    Parameters
+    ----------
+    classifications : list
+        classification rasters
+    output_path : str
+        output fused classification
+    method : str
+        fusion method (majorityvoting/dempstershafer)
+    nodata_label : int
+        label of the no data class
+    undecided_label : int
+        label of undecided pixels
+    mob : str
+        dempstershafer mass of belief measurement
+        (precision/recall/accuracy/kappa)
+    confusion_matrices : list
+        dempstershafer confusion matrices (csv), one by classification
+    pix_type : str
+        output pixel type ("uint8" or "uint16")
+    undecided_path : str
+        if set, write the undecided mask (1 if undecided)
+    votes_path : str
+        if set, write the number of inputs agreeing with the fused label
+    confidence_path : str
+        if set, write the confidence of the fusion in [0, 1]
+    block_size : int
+        number of rows processed at once by a thread
+    nb_threads : int
+        number of threads
+    logger : logging.Logger
+        logger
+
+    Return
+    ------
+    str
+        output_path
+    """
+    from osgeo import gdal
+    from iota2.Common.RasterProfile import gdal_creation_options
+
+    if method not in ["majorityvoting", "dempstershafer"]:
+        raise ValueError("the fusion method must be 'majorityvoting' "
+                         "or 'dempstershafer'")
+    masses = None
+    if method == "dempstershafer":
+        if (confusion_matrices is None
+                or len(confusion_matrices) != len(classifications)):
+            raise ValueError("dempstershafer fusion needs one confusion "
+                             "matrix by classification")
+        masses = masses_to_lut(
+            [masses_of_belief(csv, mob) for csv in confusion_matrices])
+
+    ref_ds = gdal.Open(classifications[0])
+    x_size = ref_ds.RasterXSize
+    y_size = ref_ds.RasterYSize
+    driver = gdal.GetDriverByName("GTiff")
+    gdal_pix_type = gdal.GDT_Byte if pix_type == "uint8" else gdal.GDT_UInt16
+
+    outputs = {}
+    for name, path, out_type in [("fused", output_path, gdal_pix_type),
+                                 ("undecided", undecided_path, gdal.GDT_Byte),
+                                 ("votes", votes_path, gdal.GDT_Byte),
+                                 ("confidence", confidence_path,
+                                  gdal.GDT_Float32)]:
+        if path is None:
+            continue
+        out_ds = driver.Create(
+            path,
+            x_size,
+            y_size,
+            1,
+            out_type,
+            options=gdal_creation_options(gdal.GetDataTypeName(out_type)))
+        out_ds.SetGeoTransform(ref_ds.GetGeoTransform())
+        out_ds.SetProjection(ref_ds.GetProjection())
+        outputs[name] = out_ds
+    outputs["fused"].GetRasterBand(1).SetNoDataValue(nodata_label)
+    ref_ds = None
+
+    def fuse_block(block_row):
+        """read and fuse a block of rows"""
+        rows = min(block_size, y_size - block_row)
+        # a dataset handle must not be shared between threads
+        labels = np.stack([
+            gdal.Open(classif).GetRasterBand(1).ReadAsArray(
+                0, block_row, x_size, rows) for classif in classifications
+        ])
+        fused, undecided, votes, confidence = fuse_labels(
+            labels, nodata_label, undecided_label, masses)
+        return block_row, {
+            "fused": fused,
+            "undecided": undecided.astype(np.uint8),
+            "votes": votes.astype(np.uint8),
+            "confidence": confidence
+        }
+
+    logger.info(f"fusion of {len(classifications)} classifications "
+                f"({method}) to {output_path}")
+    blocks = list(range(0, y_size, block_size))
+    with ThreadPoolExecutor(max_workers=max(1, nb_threads)) as executor:
+        # bound the number of blocks in memory
+        for start in range(0, len(blocks), 2 * max(1, nb_threads)):
+            chunk = blocks[start:start + 2 * max(1, nb_threads)]
+            for block_row, results in executor.map(fuse_block, chunk):
+                for name, out_ds in outputs.items():
+                    out_ds.GetRasterBand(1).WriteArray(
+                        results[name], 0, block_row)
+    for out_ds in outputs.values():
+        out_ds.FlushCache()
+    outputs = None
+    return output_path
+
+
+def fusion_products(fusion_path: str) -> Dict[str, str]:
+    """paths of the undecided mask, votes and confidence rasters written
+    next to a fused classification
+
+    Names do not contain '_FUSION_', the pattern of fused classifications.
+
+    Example
+    -------
+    >>> fusion_products("/classif/T31TCJ_FUSION_seed_0.tif")["votes"]
+    "/classif/T31TCJ_VOTES_seed_0.tif"
+    """
+    directory, name = os.path.split(fusion_path)
+    return {
+        product: os.path.join(directory,
+                              name.replace("_FUSION_", f"_{product.upper()}_"))
+        for product in ["undecided", "votes", "confidence"]
+    }
+
+
+def resolve_undecided(fusion_path: str,
+                      undecided_path: str,
+                      classifications: List[str],
+                      confidences: List[str],
+                      output_path: str,
+                      pix_type: Optional[str] = "uint8",
+                      block_size: Optional[int] = 256,
+                      nb_threads: Optional[int] = 1,
+                      logger: Optional[logging.Logger] = LOGGER) -> str:
+    """replace undecided pixels of a fusion by the label of the most
+    confident classification
+
+    Classifications and confidences are only read on blocks containing
+    undecided pixels, according to the undecided mask written by
+    fusion_of_classifications.
+
+    Parameters
+    ----------
+    fusion_path : str
+        fused classification
+    undecided_path : str
+        undecided mask of the fusion (1 if undecided)
+    classifications : list
+        fused classifications
+    confidences : list
+        confidence map of each classification, in the same order
+    output_path : str
+        output classification
+    pix_type : str
+        output pixel type ("uint8" or "uint16")
+    block_size : int
+        number of rows processed at once by a thread
+    nb_threads : int
+        number of threads
+    logger : logging.Logger
+        logger
+
+    Notes
+    -----
+    As the maxConfidence BandMath expression, if several classifications
+    share the highest confidence, the label of the first one is chosen.
+
+    Return
+    ------
+    str
+        output_path
+    """
+    from osgeo import gdal
+    from iota2.Common.RasterProfile import gdal_creation_options
+
+    if len(classifications) != len(confidences):
+        raise ValueError("the list of classifications and the list of "
+                         "confidence maps must have the same length")
+    fusion_ds = gdal.Open(fusion_path)
+    x_size = fusion_ds.RasterXSize
+    y_size = fusion_ds.RasterYSize
+    gdal_pix_type = gdal.GDT_Byte if pix_type == "uint8" else gdal.GDT_UInt16
+    out_ds = gdal.GetDriverByName("GTiff").Create(
+        output_path,
+        x_size,
+        y_size,
+        1,
+        gdal_pix_type,
+        options=gdal_creation_options(gdal.GetDataTypeName(gdal_pix_type)))
+    out_ds.SetGeoTransform(fusion_ds.GetGeoTransform())
+    out_ds.SetProjection(fusion_ds.GetProjection())
+    nodata = fusion_ds.GetRasterBand(1).GetNoDataValue()
+    if nodata is not None:
+        out_ds.GetRasterBand(1).SetNoDataValue(nodata)
+    fusion_ds = None
+
+    def resolve_block(block_row):
+        """read a block and replace its undecided pixels"""
+        rows = min(block_size, y_size - block_row)
+        fused = gdal.Open(fusion_path).GetRasterBand(1).ReadAsArray(
+            0, block_row, x_size, rows)
+        undecided = gdal.Open(undecided_path).GetRasterBand(1).ReadAsArray(
+            0, block_row, x_size, rows) == 1
+        if undecided.any():
+            labels = np.stack([
+                gdal.Open(classif).GetRasterBand(1).ReadAsArray(
+                    0, block_row, x_size, rows)
+                for classif in classifications
+            ])
+            scores = np.stack([
+                gdal.Open(confidence).GetRasterBand(1).ReadAsArray(
+                    0, block_row, x_size, rows) for confidence in confidences
+            ])
+            best = scores.max(axis=0)
+            winner = np.argmax(scores, axis=0)
+            winner[(scores == best).sum(axis=0) > 1] = 0
+            most_confident = np.take_along_axis(labels, winner[np.newaxis],
+                                                axis=0)[0]
+            fused[undecided] = most_confident[undecided]
+        return block_row, fused
+
+    logger.info(f"undecided pixels of {fusion_path} resolved by the most "
+                f"confident of {len(classifications)} classifications")
+    blocks = list(range(0, y_size, block_size))
+    with ThreadPoolExecutor(max_workers=max(1, nb_threads)) as executor:
+        for start in range(0, len(blocks), 2 * max(1, nb_threads)):
+            chunk = blocks[start:start + 2 * max(1, nb_threads)]
+            for block_row, fused in executor.map(resolve_block, chunk):
+                out_ds.GetRasterBand(1).WriteArray(fused, 0, block_row)
+    out_ds.FlushCache()
+    out_ds = None
+    return output_path
+
+
+def parse_fusion_options(fusion_options: str) -> Dict[str, object]:
+    """convert FusionOfClassifications command line options to
+    fusion_of_classifications parameters
+
+    Parameters
+    ----------
+    fusion_options : str
+        ex : "-nodatalabel 0 -method majorityvoting"
+    """
+    options = fusion_options.split()
+    parameters = {}
+    current_key = None
+    for option in options:
+        if option.startswith("-") and not option.lstrip("-").isdigit():
+            current_key = option.lstrip("-")
+            parameters[current_key] = []
+        elif current_key is not None:
+            parameters[current_key].append(option)
+    # FusionOfClassifications defaults
+    fusion_parameters = {"undecided_label": 0}
+    if "method" in parameters:
+        fusion_parameters["method"] = parameters["method"][0]
+    if "nodatalabel" in parameters:
+        fusion_parameters["nodata_label"] = int(parameters["nodatalabel"][0])
+    if "undecidedlabel" in parameters:
+        fusion_parameters["undecided_label"] = int(
+            parameters["undecidedlabel"][0])
+    if "method.dempstershafer.mob" in parameters:
+        fusion_parameters["mob"] = parameters["method.dempstershafer.mob"][0]
+    if "method.dempstershafer.cmfl" in parameters:
+        fusion_parameters["confusion_matrices"] = parameters[
+            "method.dempstershafer.cmfl"]
+    return fusion_parameters
+
+
+if __name__ == "__main__":
+    PARSER = argparse.ArgumentParser(
+        description="fusion of classifications")
+    PARSER.add_argument("-il",
+                        dest="classifications",
+                        help="classifications to fuse",
+                        nargs="+",
+                        required=True)
+    PARSER.add_argument("-out",
+                        dest="output_path",
+                        help="output classification",
+                        required=True)
+    PARSER.add_argument("-method",
+                        dest="method",
+                        help="majorityvoting or dempstershafer",
+                        default="majorityvoting",
+                        required=False)
+    PARSER.add_argument("-nodatalabel",
+                        dest="nodata_label",
+                        type=int,
+                        default=0,
+                        required=False)
+    PARSER.add_argument("-undecidedlabel",
+                        dest="undecided_label",
+                        type=int,
+                        default=0,
+                        required=False)
+    PARSER.add_argument("-mob",
+                        dest="mob",
+                        help="dempstershafer mass of belief",
+                        default="precision",
+                        required=False)
+    PARSER.add_argument("-cmfl",
+                        dest="confusion_matrices",
+                        help="dempstershafer confusion matrices",
+                        nargs="+",
+                        default=None,
+                        required=False)
+    PARSER.add_argument("-nb_threads",
+                        dest="nb_threads",
+                        type=int,
+                        default=1,
+                        required=False)
+    ARGS = PARSER.parse_args()
+    fusion_of_classifications(ARGS.classifications,
+                              ARGS.output_path,
+                              method=ARGS.method,
+                              nodata_label=ARGS.nodata_label,
+                              undecided_label=ARGS.undecided_label,
+                              mob=ARGS.mob,
+                              confusion_matrices=ARGS.confusion_matrices,
+                              nb_threads=ARGS.nb_threads)
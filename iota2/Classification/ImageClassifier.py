@@ -278,6 +278,7 @@ class iota2Classification():
         from iota2.Common.OtbAppBank import CreateBandMathApplication
         from iota2.Common.OtbAppBank import CreateBandMathXApplication
         from iota2.Common.FileUtils import ensure_dir
+        from iota2.Common.RasterProfile import otb_extended_filename
 
         if self.working_directory:
             self.classification = os.path.join(
@@ -289,10 +290,10 @@ class iota2Classification():
         classifier_options = {
             "in": self.features_stack,
             "model": self.classifier_model,
-            "confmap": "{}?&writegeom=false".format(self.confidence),
+            "confmap": otb_extended_filename(self.confidence, "float"),
             "ram": str(0.4 * float(self.RAM)),
             "pixType": self.pixType,
-            "out": "{}?&writegeom=false".format(self.classification)
+            "out": otb_extended_filename(self.classification, self.pixType)
         }
 
         if self.auto_context:
@@ -314,11 +315,11 @@ class iota2Classification():
                 "models": self.classifier_model,
                 "lablist":
                 [str(lab) for lab in self.auto_context["labels_list"]],
-                "confmap": "{}?&writegeom=false".format(self.confidence),
+                "confmap": otb_extended_filename(self.confidence, "float"),
                 "ram": str(0.4 * float(self.RAM)),
                 "pixType": self.pixType,
                 "tmpdir": tmp_dir,
-                "out": "{}?&writegeom=false".format(self.classification)
+                "out": otb_extended_filename(self.classification, self.pixType)
             }
         if self.proba_map_path:
             all_class = []
@@ -331,7 +332,7 @@ class iota2Classification():
                 self.proba_map_path = os.path.join(
                     self.working_directory,
                     os.path.split(self.proba_map_path)[-1])
-            classifier_options["probamap"] = "{}?&writegeom=false".format(
+            classifier_options["probamap"] = otb_extended_filename(
                 self.proba_map_path)
             classifier_options["nbclasses"] = str(nb_class_run)
 
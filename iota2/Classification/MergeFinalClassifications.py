@@ -18,6 +18,7 @@ import logging
 import gdal
 
 from Common import FileUtils as fut
+from Common import RasterProfile
 
 logger = logging.getLogger(__name__)
 
@@ -55,7 +56,8 @@ def mergeFinalClassifications(iota2_dir, dataField, nom_path, colorFile,
                               undecidedlabel=255, dempstershafer_mob="precision",
                               keep_runs_results=True, enableCrossValidation=False,
                               validationShape=None,
-                              workingDirectory=None, logger=logger):
+                              workingDirectory=None, native_fusion=False,
+                              nb_threads=1, logger=logger):
     """function use to merge classifications by majorityvoting or dempstershafer's method and evaluate it.
 
     get all classifications Classif_Seed_*.tif in the /final directory and fusion them
@@ -91,6 +93,11 @@ def mergeFinalClassifications(iota2_dir, dataField, nom_path, colorFile,
         path to a shape dedicated to validate fusion of classifications
     workingDirectory : string
         path to a working directory
+    native_fusion : bool
+        use FusionEngine instead of the FusionOfClassifications application,
+        fusion votes and confidence maps are also produced
+    nb_threads : int
+        number of threads used by FusionEngine
 
     See Also
     --------
@@ -134,14 +141,28 @@ def mergeFinalClassifications(iota2_dir, dataField, nom_path, colorFile,
                                             fusion_path)
     logger.debug("fusion options:")
     logger.debug(fusion_options)
-    fusion_app = otbApp.CreateFusionOfClassificationsApplication(fusion_options)
     logger.debug("START fusion of final classifications")
-    fusion_app.ExecuteAndWriteOutput()
+    if native_fusion:
+        from Classification import FusionEngine
+        FusionEngine.fusion_of_classifications(
+            fusion_options["il"], fusion_path,
+            method=fusion_options["method"],
+            nodata_label=int(fusion_options["nodatalabel"]),
+            undecided_label=int(fusion_options["undecidedlabel"]),
+            mob=dempstershafer_mob,
+            confusion_matrices=fusion_options.get("method.dempstershafer.cmfl"),
+            pix_type=pixType,
+            votes_path=fusion_path.replace(".tif", "_votes.tif"),
+            confidence_path=fusion_path.replace(".tif", "_confidence.tif"),
+            nb_threads=nb_threads, logger=logger)
+    else:
+        fusion_app = otbApp.CreateFusionOfClassificationsApplication(fusion_options)
+        fusion_app.ExecuteAndWriteOutput()
     logger.debug("END fusion of final classifications")
+    RasterProfile.build_overviews(fusion_path)
 
     fusion_color_index = color.CreateIndexedColorImage(fusion_path,
                                                        colorFile,
-                                                       co_option=["COMPRESS=LZW"],
                                                        output_pix_type=gdal.GDT_Byte if pixType=="uint8" else gdal.GDT_UInt16)
     
     confusion_matrix = os.path.join(iota2_dir_final, "merge_final_classifications", "confusion_mat_maj_vote.csv")
@@ -182,3 +203,8 @@ def mergeFinalClassifications(iota2_dir, dataField, nom_path, colorFile,
         shutil.copy(fusion_path, iota2_dir_final)
         shutil.copy(fusion_color_index, iota2_dir_final)
         os.remove(fusion_path)
+        if native_fusion:
+            for fusion_map in [fusion_path.replace(".tif", "_votes.tif"),
+                               fusion_path.replace(".tif", "_confidence.tif")]:
+                shutil.copy(fusion_map, iota2_dir_final)
+                os.remove(fusion_map)
@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# =========================================================================
+#   Program:   iota2
+#
+#   Copyright (c) CESBIO. All rights reserved.
+#
+#   See LICENSE for details.
+#
+#   This software is distributed WITHOUT ANY WARRANTY; without even
+#   the implied warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR
+#   PURPOSE.  See the above copyright notices for more information.
+#
+# =========================================================================
+"""
+Per-process cache of pickled models.
+
+A process classifying several tiles (or chunks of a tile) with the same
+model only deserialises it once. Models are identified by their path and
+their modification time, so a re-trained model is re-loaded. The memory
+taken by cached models is estimated by the size of their files and
+bounded, the least recently used models are evicted first.
+"""
+import os
+import pickle
+import logging
+import threading
+from collections import OrderedDict
+from typing import Any, Optional
+
+LOGGER = logging.getLogger(__name__)
+
+# default memory budget (Mo) of the cache
+DEFAULT_CACHE_SIZE = 2048
+
+_CACHE = OrderedDict()
+_LOCK = threading.Lock()
+
+
+def model_key(model_path: str) -> tuple:
+    """key of a model in the cache : (path, modification time, size)"""
+    stat = os.stat(model_path)
+    return (os.path.realpath(model_path), stat.st_mtime_ns, stat.st_size)
+
+
+def cached_models_size() -> int:
+    """memory (bytes) taken by cached models"""
+    with _LOCK:
+        return sum(key[2] for key in _CACHE)
+
+
+def clear_cache() -> None:
+    """remove every models from the cache"""
+    with _LOCK:
+        _CACHE.clear()
+
+
+def load_model(model_path: str,
+               cache_size: Optional[int] = DEFAULT_CACHE_SIZE,
+               logger: Optional[logging.Logger] = LOGGER) -> Any:
+    """load a pickled model, using the cache of the current process
+
+    Parameters
+    ----------
+    model_path : str
+        pickled model path
+    cache_size : int
+        memory budget (Mo) of the cache. Models bigger than this budget
+        are not cached, 0 disables the cache
+    logger : logging.Logger
+        logger
+
+    Return
+    ------
+    object
+        the unpickled object, it is shared by every callers and must not
+        be modified
+    """
+    key = model_key(model_path)
+    with _LOCK:
+        if key in _CACHE:
+            _CACHE.move_to_end(key)
+            logger.debug(f"model {model_path} found in cache")
+            return _CACHE[key]
+
+    with open(model_path, "rb") as model_file:
+        model = pickle.load(model_file)
+
+    budget = cache_size * 1024**2
+    if key[2] > budget:
+        return model
+    with _LOCK:
+        # previous versions of the model are obsolete
+        for cached_key in [k for k in _CACHE if k[0] == key[0]]:
+            del _CACHE[cached_key]
+        _CACHE[key] = model
+        while sum(cached_key[2] for cached_key in _CACHE) > budget:
+            evicted_key, _ = _CACHE.popitem(last=False)
+            logger.debug(f"model {evicted_key[0]} evicted from cache")
+    return model
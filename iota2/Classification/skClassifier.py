@@ -33,6 +33,7 @@ def merge_sk_classifications(
         rasters_to_merge_dic: List[Dict[str, Union[str, List[str]]]],
         epsg_code: int,
         working_dir: str,
+        nb_threads: Optional[int] = 1,
         logger=logger) -> None:
     """mosaic rasters
 
@@ -46,6 +47,8 @@ def merge_sk_classifications(
         epsg code
     working_dir : str
         working direction
+    nb_threads : int
+        number of threads writing mosaics
     logger : logging
         root logger
     """
@@ -54,7 +57,7 @@ def merge_sk_classifications(
     for element in rasters_to_merge_dic:
         logger.info("creating : {}".format(element["merge_path"]))
         merge_rasters(element["rasters_list"], element["merge_path"],
-                      epsg_code, working_dir)
+                      epsg_code, working_dir, nb_threads)
 
 
 def sk_classifications_to_merge(iota2_classif_directory: str
@@ -155,11 +158,21 @@ def sk_classifications_to_merge(iota2_classif_directory: str
     return rasters_to_merge
 
 
+def probabilities_scale(dtype: Union[str, np.dtype]) -> float:
+    """scale of probabilities stored as dtype : probabilities are in
+    [0, 1] as floats and in [0, max value of dtype] as integers
+    """
+    if np.issubdtype(np.dtype(dtype), np.integer):
+        return float(np.iinfo(dtype).max)
+    return 1.0
+
+
 def do_predict(
         array: np.ndarray,
         model: Union[SVC, RandomForestClassifier, ExtraTreesClassifier],
         scaler: Optional[StandardScaler] = None,
-        dtype: Optional[str] = "float",
+        dtype: Optional[str] = "float32",
+        batch_size: Optional[int] = 100000,
 ) -> np.ndarray:
     """perform scikit-learn prediction
 
@@ -172,7 +185,10 @@ def do_predict(
     scaler : StandardScaler
         scaler to standardize features
     dtype : str
-        output array format
+        output array format, probabilities are quantized if dtype is an
+        integer type (see probabilities_scale)
+    batch_size : int
+        number of pixels predicted at once
 
     Return
     ------
@@ -181,14 +197,23 @@ def do_predict(
     """
     array_reshaped = array.reshape((array.shape[0] * array.shape[1]),
                                    array.shape[2])
-    if scaler is not None:
-        predicted_array = model.predict_proba(scaler.transform(array_reshaped))
-    else:
-        predicted_array = model.predict_proba(array_reshaped)
+    scale = probabilities_scale(dtype)
+    predicted_array = np.empty(
+        (array_reshaped.shape[0], len(model.classes_)), dtype=dtype)
+    # scikit-learn gives float64 probabilities, they are converted by
+    # batches to avoid a float64 copy of the whole array
+    for start in range(0, array_reshaped.shape[0], batch_size):
+        features = array_reshaped[start:start + batch_size]
+        if scaler is not None:
+            features = scaler.transform(features)
+        proba = model.predict_proba(features)
+        if scale != 1.0:
+            proba = np.rint(proba * scale)
+        predicted_array[start:start + batch_size] = proba
 
     predicted_array = predicted_array.reshape(array.shape[0], array.shape[1],
                                               predicted_array.shape[-1])
-    return predicted_array.astype(dtype), []
+    return predicted_array, []
 
 
 def get_class(*args, **kwargs):
@@ -228,11 +253,9 @@ def proba_to_label(
     import rasterio
     import numpy as np
     from sklearn.preprocessing import binarize
+    from iota2.Common.RasterProfile import rasterio_profile
 
-    labels_map = np.apply_along_axis(func1d=get_class,
-                                     axis=0,
-                                     arr=proba_map,
-                                     labels=labels)
+    labels_map = np.asarray(labels)[np.argmax(proba_map, axis=0)]
     labels_map = labels_map.astype("int32")
     labels_map = np.expand_dims(labels_map, axis=0)
     if mask_arr is not None:
@@ -249,6 +272,7 @@ def proba_to_label(
             crs="EPSG:{}".format(epsg_code),
             transform=transform,
             dtype=labels_map.dtype,
+            **rasterio_profile(labels_map.dtype),
     ) as dest:
         dest.write(labels_map)
     return labels_map
@@ -279,8 +303,14 @@ def probabilities_to_max_proba(proba_map: np.ndarray,
     """
     import rasterio
     import numpy as np
+    from iota2.Common.RasterProfile import rasterio_profile
 
     max_confidence_arr = np.amax(proba_map, axis=0)
+    scale = probabilities_scale(proba_map.dtype)
+    # confidence in [0, 1] whatever the probabilities quantization
+    max_confidence_arr = max_confidence_arr.astype("float32")
+    if scale != 1.0:
+        max_confidence_arr /= scale
     max_confidence_arr = np.expand_dims(max_confidence_arr, axis=0)
 
     if out_max_confidence:
@@ -294,6 +324,7 @@ def probabilities_to_max_proba(proba_map: np.ndarray,
                 crs="EPSG:{}".format(epsg_code),
                 transform=transform,
                 dtype=max_confidence_arr.dtype,
+                **rasterio_profile(max_confidence_arr.dtype),
         ) as dest:
             dest.write(max_confidence_arr)
     return max_confidence_arr
@@ -314,6 +345,8 @@ def predict(mask: str,
             number_of_chunks: Optional[int] = None,
             targeted_chunk: Optional[int] = None,
             ram: Optional[int] = 128,
+            model_cache_size: Optional[int] = 2048,
+            proba_type: Optional[str] = "float32",
             logger=logger) -> None:
     """perform scikit-learn prediction
 
@@ -354,23 +387,28 @@ def predict(mask: str,
         If this parameter is provided, only the targeted strip will be compute (parallelization).
     ram: int
         ram (in mb) available
+    model_cache_size: int
+        memory (in mb) of the models cache of the current process
+        (see ModelCache)
+    proba_type: str
+        probabilities pixel type ('float32', 'uint8' or 'uint16'), integer
+        types quantize probabilities (see probabilities_scale)
     logger : logging
         root logger
     """
     import os
     import shutil
-    import pickle
     from functools import partial
 
     from iota2.Common import rasterUtils as rasterU
     from iota2.Common import ServiceConfigFile as serviceConf
     from iota2.Common.GenerateFeatures import generate_features
     from iota2.Common.FileUtils import findCurrentTileInString
+    from iota2.Classification.ModelCache import load_model
 
     mode = "usually" if "SAR.txt" not in model else "SAR"
 
-    with open(model, "rb") as model_file:
-        model, scaler = pickle.load(model_file)
+    model, scaler = load_model(model, model_cache_size, logger)
     # if hasattr(model, "n_jobs"):
     # model.n_jobs = -1
 
@@ -379,7 +417,10 @@ def predict(mask: str,
             raise ValueError(
                 "targeted_chunk must be inferior to the number of chunks")
 
-    function_partial = partial(do_predict, model=model, scaler=scaler)
+    function_partial = partial(do_predict,
+                               model=model,
+                               scaler=scaler,
+                               dtype=proba_type)
     classification_dir = os.path.join(output_path, "classif")
     feat_stack, feat_labels, _ = generate_features(
         working_dir,
@@ -432,3 +473,144 @@ def predict(mask: str,
         if out_proba:
             shutil.copy(out_proba, classification_dir)
             os.remove(out_proba)
+
+
+def predict_fan_out(models: List[Dict[str, str]],
+                    working_dir: str,
+                    tile_name: str,
+                    sar_optical_post_fusion: bool,
+                    output_path: str,
+                    sensors_parameters: sensors_params,
+                    pixel_type: str,
+                    number_of_chunks: Optional[int] = None,
+                    targeted_chunk: Optional[int] = None,
+                    ram: Optional[int] = 128,
+                    model_cache_size: Optional[int] = 2048,
+                    proba_type: Optional[str] = "float32",
+                    logger=logger) -> None:
+    """perform scikit-learn predictions of several models over a tile
+
+    Features are computed once by chunk, then every model is applied to
+    the pixels of its own mask. Outputs are the ones of predict.
+
+    Parameters
+    ----------
+    models: list
+        models to apply, every model is described by a dictionary with the
+        keys 'mask', 'model', 'stat', 'out_classif' and 'out_confidence'
+        (see predict). Every models must use the same features
+    working_dir: str
+        path to a working direction to store temporary data
+    tile_name: str
+        tile's name
+    sar_optical_post_fusion: bool
+        flag to use post classification sar optical workflow
+    output_path: str
+        iota2 output path
+    sensors_parameters: sensors_params
+        sensors description
+    pixel_type: str
+        output pixel type
+    number_of_chunks: int
+        The prediction process can be done by strips. This parameter
+        set the number of strips
+    targeted_chunk: int
+        If this parameter is provided, only the targeted strip will be compute (parallelization).
+        Else, every strips are computed and written as sub-regions
+        (see sk_classifications_to_merge)
+    ram: int
+        ram (in mb) available
+    model_cache_size: int
+        memory (in mb) of the models cache of the current process
+        (see ModelCache)
+    proba_type: str
+        probabilities pixel type ('float32', 'uint8' or 'uint16'), integer
+        types quantize probabilities (see probabilities_scale)
+    logger : logging
+        root logger
+    """
+    import os
+    import shutil
+
+    from iota2.Common import rasterUtils as rasterU
+    from iota2.Common.GenerateFeatures import generate_features
+    from osgeo import gdal
+    from iota2.Classification.ModelCache import load_model
+
+    modes = set("usually" if "SAR.txt" not in model["model"] else "SAR"
+                for model in models)
+    if len(modes) != 1:
+        raise ValueError("models must use the same features")
+
+    classification_dir = os.path.join(output_path, "classif")
+    feat_stack, _, _ = generate_features(
+        working_dir,
+        tile_name,
+        sar_optical_post_fusion=sar_optical_post_fusion,
+        output_path=output_path,
+        sensors_parameters=sensors_parameters,
+        mode=modes.pop())
+    roi_rasters, epsg = rasterU.split_raster(
+        otb_pipeline=feat_stack,
+        chunk_size_mode="split_number",
+        chunk_size=(10, 10),
+        number_of_chunks=number_of_chunks,
+        ram_per_chunk=ram,
+        working_dir=working_dir)
+    chunks = list(range(len(roi_rasters)))
+    if targeted_chunk is not None:
+        if targeted_chunk > len(roi_rasters) - 1:
+            raise ValueError(
+                "targeted_chunk must be inferior to the number of chunks")
+        chunks = [targeted_chunk]
+    # only the window of each chunk is read from masks
+    masks = [gdal.Open(model["mask"]) for model in models]
+
+    for chunk in chunks:
+        roi_raster = roi_rasters[chunk]
+        start_x = int(roi_raster.GetParameterString("startx"))
+        size_x = int(roi_raster.GetParameterString("sizex"))
+        start_y = int(roi_raster.GetParameterString("starty"))
+        size_y = int(roi_raster.GetParameterString("sizey"))
+        roi_raster.Execute()
+        features = roi_raster.ExportImage("out")["array"]
+        origin_x, origin_y = roi_raster.GetImageOrigin("out")
+        xres, yres = roi_raster.GetImageSpacing("out")
+        transform = Affine.from_gdal(origin_x - xres / 2.0, xres, 0,
+                                     origin_y - yres / 2.0, 0, yres)
+        logger.info(f"features of {tile_name} computed (start_x : {start_x}"
+                    f" size_x : {size_x} start_y : {start_y} "
+                    f"size_y : {size_y})")
+
+        for model_description, mask in zip(models, masks):
+            model, scaler = load_model(model_description["model"],
+                                       model_cache_size, logger)
+            mask_roi = (mask.GetRasterBand(1).ReadAsArray(
+                start_x, start_y, size_x, size_y) != 0).astype("uint8")
+            valid = mask_roi.astype(bool)
+            predicted_proba = np.zeros(
+                (size_y, size_x, len(model.classes_)), dtype=proba_type)
+            if valid.any():
+                # only pixels of the model's region are predicted
+                predicted_proba[valid] = do_predict(
+                    features[valid][np.newaxis, :, :], model, scaler,
+                    proba_type)[0][0]
+            predicted_proba = np.moveaxis(predicted_proba, -1, 0)
+
+            out_classif = model_description["out_classif"]
+            out_confidence = model_description["out_confidence"]
+            if len(chunks) > 1 or targeted_chunk is not None:
+                out_classif = out_classif.replace(
+                    ".tif", "_SUBREGION_{}.tif".format(chunk))
+                out_confidence = out_confidence.replace(
+                    ".tif", "_SUBREGION_{}.tif".format(chunk))
+            logger.info("producing {}".format(out_classif))
+            proba_to_label(predicted_proba, out_classif, model.classes_,
+                           transform, epsg, mask_roi)
+            probabilities_to_max_proba(predicted_proba, transform, epsg,
+                                       out_confidence)
+            if working_dir:
+                shutil.copy(out_classif, classification_dir)
+                shutil.copy(out_confidence, classification_dir)
+                os.remove(out_classif)
+                os.remove(out_confidence)
@@ -289,7 +289,8 @@ def undecision_management(path_test: str,
                           pix_type: str,
                           region_vec: Optional[str] = None,
                           user_feat_pattern: Optional[str] = None,
-                          ds_sar_opt: Optional[bool] = False) -> None:
+                          ds_sar_opt: Optional[bool] = False,
+                          nb_threads: Optional[int] = 1) -> None:
     """
     manage undecision comming from fusion of classifications
     Parameters
@@ -307,10 +308,20 @@ def undecision_management(path_test: str,
     pix_type: string
     user_feat_pattern: string
     ds_sar_opt: bool
+    nb_threads: int
+        threads used to resolve undecided pixels of a native fusion
     Return
     ------
     None
+
+    Notes
+    -----
+    If the undecided mask of a native fusion exists (see
+    FusionEngine.fusion_products), it gives the pixels to replace instead
+    of the fused label value.
     """
+    from iota2.Classification.FusionEngine import fusion_products
+    from iota2.Classification.FusionEngine import resolve_undecided
 
     stack_ind = fu.get_feat_stack_name(list_indices, user_feat_path,
                                        user_feat_pattern)
@@ -333,6 +344,7 @@ def undecision_management(path_test: str,
         working_dir = path_test + "/classif/MASK"
 
     current_tile = path_fusion.split("/")[-1].split("_")[0]
+    undecided_mask = fusion_products(path_fusion)["undecided"]
 
     shp_rname = path_to_region.split("/")[-1].replace(".shp", "")
     all_model = fu.FileSearch_AND(os.path.join(path_test, "model"), True,
@@ -380,11 +392,22 @@ def undecision_management(path_test: str,
 
         img_confidence.sort()
         img_classif.sort()
-        exp, il_str = build_confidence_exp(path_fusion, img_confidence,
-                                           img_classif)
-        cmd = (f"otbcli_BandMath -il {il_str} -out {img_data} {pix_type} "
-               f"-exp '{exp}' ")
-        run(cmd)
+        if os.path.exists(undecided_mask):
+            # native fusion : classifications are only read where the
+            # fusion is undecided
+            resolve_undecided(path_fusion,
+                              undecided_mask,
+                              img_classif,
+                              img_confidence,
+                              img_data,
+                              pix_type=pix_type,
+                              nb_threads=nb_threads)
+        else:
+            exp, il_str = build_confidence_exp(path_fusion, img_confidence,
+                                               img_classif)
+            cmd = (f"otbcli_BandMath -il {il_str} -out {img_data} {pix_type} "
+                   f"-exp '{exp}' ")
+            run(cmd)
         if path_wd is not None:
             run(f"cp {img_data} {os.path.join(path_test, 'classif')}")
 
@@ -436,6 +459,11 @@ def undecision_management(path_test: str,
                 exp = exp + "im2b" + str(i + 1) + ">=1?im3b" + str(i +
                                                                    1) + ":0"
         exp = "im1b1!=0?im1b1:(" + exp + ")"
+        il_str = f"{im1} {im2} {im3}"
+        if os.path.exists(undecided_mask):
+            # native fusion : only undecided pixels are replaced
+            exp = exp.replace("im1b1!=0?", "im4b1==0?", 1)
+            il_str = f"{il_str} {undecided_mask}"
 
         img_data = (os.path.join(
             path_directory, f"{current_tile}_FUSION_"
@@ -444,7 +472,7 @@ def undecision_management(path_test: str,
             img_data = (f"{path_directory+os.sep}Classif_{current_tile}_model_"
                         f"{model_tile[0].split('f')[0]}_seed_{seed}.tif")
 
-        cmd = (f'otbcli_BandMath -il {im1} {im2} {im3} -out + {img_data} '
+        cmd = (f'otbcli_BandMath -il {il_str} -out + {img_data} '
                f'{pix_type} -exp "{exp}"')
         run(cmd)
 
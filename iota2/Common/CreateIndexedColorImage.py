@@ -51,13 +51,17 @@ def CreateColorTable(fileLUT, logger_=logger):
     filein.close()
     return ct
 
-def CreateIndexedColorImage(pszFilename, fileL, co_option=[], output_pix_type=gdal.GDT_Byte):
+def CreateIndexedColorImage(pszFilename, fileL, co_option=None, output_pix_type=gdal.GDT_Byte):
     """
         from a labeled image (pszFilename), attribute a color described by fileL and save it next to pszFilename with the suffix _ColorIndexed
         IN :
             pszFileName [string] : path to the image of classification
             fileL [string] : path to the file.txt representing a colorTable
+            co_option [list] : creation options, default to the output rasters profile
     """
+    from iota2.Common.RasterProfile import gdal_creation_options
+    if co_option is None:
+        co_option = gdal_creation_options(gdal.GetDataTypeName(output_pix_type))
     indataset = gdal.Open(pszFilename, gdal.GA_ReadOnly)
     if indataset is None:
         print('Could not open '+pszFilename)
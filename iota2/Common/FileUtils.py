@@ -762,13 +762,15 @@ def readRaster(name, data=False, band=1):
 
 
 def arraytoRaster(array, output, model, driver='GTiff'):
+    from iota2.Common.RasterProfile import gdal_creation_options
 
     driver = gdal.GetDriverByName(driver)
 
     modelfile = readRaster(model, False)
     cols = modelfile[0]
     rows = modelfile[1]
-    outRaster = driver.Create(output, cols, rows, 1, gdal.GDT_Byte)
+    outRaster = driver.Create(output, cols, rows, 1, gdal.GDT_Byte,
+                              options=gdal_creation_options("Byte"))
     outRaster.SetGeoTransform((modelfile[3][0], \
                                modelfile[3][1], 0, \
                                modelfile[3][3], 0, \
@@ -809,7 +811,8 @@ def assembleTile_Merge(AllRaster: List[str],
                        spatialResolution: Tuple[float, float],
                        out: str,
                        ot="Int16",
-                       co=None):
+                       co=None,
+                       nb_threads: Optional[int] = 1):
     """
     usage : function use to mosaic rasters
 
@@ -818,30 +821,28 @@ def assembleTile_Merge(AllRaster: List[str],
     spatialResolution [int] :
     out [string] : output path
     ot [string] (not mandatory) : output pixelType (gdal format)
-    co [dictionary] gdal rasters creation options (not mandatory)
+    co [dictionary] gdal rasters creation options (not mandatory), default
+                   to the output rasters profile (see RasterProfile)
+    nb_threads [int] (not mandatory) : number of threads writing the mosaic
 
     OUT:
-    a mosaic of all images in AllRaster.
+    a mosaic of all images in AllRaster (see VirtualMosaic).
     0 values are considered as noData. Usefull for pixel superposition.
     """
+    from iota2.Common.VirtualMosaic import mosaic
 
-    gdal_co = ""
-    if co:
-        gdal_co = " -co " + " -co ".join([
+    creation_options = None
+    if co is not None:
+        creation_options = [
             "{}={}".format(co_name, co_value)
             for co_name, co_value in list(co.items())
-        ])
-
-    AllRaster = " ".join(AllRaster)
-    if os.path.exists(out):
-        os.remove(out)
-
-    spx = float(spatialResolution[0])
-    spy = -abs(float(spatialResolution[1]))
-
-    cmd = "gdal_merge.py {} -ps {} {} -o {} -ot {} -n 0 {}".format(
-        gdal_co, spx, spy, out, ot, AllRaster)
-    run(cmd)
+        ]
+    mosaic(AllRaster,
+           out,
+           spatial_resolution=spatialResolution,
+           data_type=ot,
+           creation_options=creation_options,
+           nb_threads=nb_threads)
 
 
 def getVectorFeatures(ground_truth, region_field, InputShape):
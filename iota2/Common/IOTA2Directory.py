@@ -77,6 +77,9 @@ def generate_directories(root: str,
     if os.path.exists(root + "/formattingVectors"):
         shutil.rmtree(root + "/formattingVectors")
     os.mkdir(root + "/formattingVectors")
+    if os.path.exists(root + "/spatialIndex"):
+        shutil.rmtree(root + "/spatialIndex")
+    os.mkdir(root + "/spatialIndex")
     if os.path.exists(root + "/config_model"):
         shutil.rmtree(root + "/config_model")
     os.mkdir(root + "/config_model")
@@ -0,0 +1,249 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# =========================================================================
+#   Program:   iota2
+#
+#   Copyright (c) CESBIO. All rights reserved.
+#
+#   See LICENSE for details.
+#
+#   This software is distributed WITHOUT ANY WARRANTY; without even
+#   the implied warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR
+#   PURPOSE.  See the above copyright notices for more information.
+#
+# =========================================================================
+"""
+Footprint polygon of a binary mask, traced from its boundary.
+
+Instead of polygonizing every pixel (gdal_polygonize.py), the first and the
+last valid pixel of each row (row spans) are gathered while the mask is
+read, then the left and right boundaries of consecutive overlapping spans
+are traced into polygons. This is exact for masks whose rows contain a
+single run of valid pixels, as tiles footprints. Masks with gaps inside
+rows are polygonized by gdal (see polygonize_footprint).
+"""
+import os
+import logging
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+LOGGER = logging.getLogger(__name__)
+
+
+def row_spans(block: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """first and last (exclusive) valid column of each row of a block
+
+    Parameters
+    ----------
+    block : np.array
+        2D array, valid pixels are different from 0
+
+    Return
+    ------
+    tuple
+        (first, last) arrays, -1 for rows without valid pixels
+    """
+    valid = block != 0
+    has_valid = valid.any(axis=1)
+    first = np.where(has_valid, valid.argmax(axis=1), -1)
+    last = np.where(has_valid,
+                    block.shape[1] - valid[:, ::-1].argmax(axis=1), -1)
+    return first, last
+
+
+def rows_with_gaps(block: np.ndarray, first: np.ndarray,
+                   last: np.ndarray) -> bool:
+    """True if a row of a block contains several runs of valid pixels
+
+    Parameters
+    ----------
+    block : np.array
+        2D array, valid pixels are different from 0
+    first : np.array
+        first valid column of each row of the block, see row_spans
+    last : np.array
+        last valid column (exclusive) of each row of the block
+    """
+    nb_valid = (block != 0).sum(axis=1)
+    return bool(np.any(nb_valid != np.maximum(last - first, 0)))
+
+
+def simplify_ring(ring: List[Tuple[int, int]]) -> List[Tuple[int, int]]:
+    """remove repeated and collinear vertices of an axis-aligned ring"""
+    points = []
+    for point in ring:
+        if points and points[-1] == point:
+            continue
+        if len(points) > 1 and (
+                points[-2][0] == points[-1][0] == point[0]
+                or points[-2][1] == points[-1][1] == point[1]):
+            points[-1] = point
+        else:
+            points.append(point)
+    return points
+
+
+def footprint_rings(first: np.ndarray,
+                    last: np.ndarray) -> List[List[Tuple[int, int]]]:
+    """trace boundaries of row spans
+
+    each group of consecutive rows whose spans overlap gives a ring, in
+    pixel coordinates (column, row) of pixel corners. Rings are simple
+    polygons, spans must not contain gaps (see rows_with_gaps)
+
+    Parameters
+    ----------
+    first : np.array
+        first valid column of each row (-1 if none), see row_spans
+    last : np.array
+        last valid column (exclusive) of each row (-1 if none)
+    """
+    rows = np.flatnonzero(first >= 0)
+    if rows.size == 0:
+        return []
+    # groups of consecutive rows with overlapping spans
+    consecutive = np.diff(rows) == 1
+    overlap = (first[rows[1:]] < last[rows[:-1]]) & (first[rows[:-1]] <
+                                                      last[rows[1:]])
+    breaks = np.flatnonzero(~(consecutive & overlap)) + 1
+    rings = []
+    for group in np.split(rows, breaks):
+        ring = []
+        for row in group:
+            ring += [(int(last[row]), int(row)), (int(last[row]), int(row) + 1)]
+        for row in group[::-1]:
+            ring += [(int(first[row]), int(row) + 1),
+                     (int(first[row]), int(row))]
+        ring = simplify_ring(ring + [ring[0]])
+        if ring[-1] != ring[0]:
+            ring.append(ring[0])
+        rings.append(ring)
+    return rings
+
+
+def create_footprint_layer(output: str, projection: str, field: str):
+    """create the footprint shapefile, return (data source, layer)"""
+    from osgeo import ogr
+    from osgeo import osr
+
+    driver = ogr.GetDriverByName("ESRI Shapefile")
+    if os.path.exists(output):
+        driver.DeleteDataSource(output)
+    data_source = driver.CreateDataSource(output)
+    srs = osr.SpatialReference()
+    srs.ImportFromWkt(projection)
+    layer = data_source.CreateLayer(
+        os.path.splitext(os.path.basename(output))[0], srs, ogr.wkbPolygon)
+    layer.CreateField(ogr.FieldDefn(field, ogr.OFTInteger))
+    return data_source, layer
+
+
+def write_footprint(rings: List[List[Tuple[int, int]]],
+                    geo_transform: Tuple[float, ...],
+                    projection: str,
+                    output: str,
+                    field: Optional[str] = "DN",
+                    value: Optional[int] = 1) -> str:
+    """write rings (pixel coordinates) as polygons of a shapefile
+
+    Parameters
+    ----------
+    rings : list
+        see footprint_rings
+    geo_transform : tuple
+        gdal geotransform of the mask
+    projection : str
+        wkt projection of the mask
+    output : str
+        output shapefile
+    field : str
+        integer field of the output, as gdal_polygonize.py
+    value : int
+        value of the field
+    """
+    from osgeo import ogr
+
+    data_source, layer = create_footprint_layer(output, projection, field)
+    for pixel_ring in rings:
+        ring = ogr.Geometry(ogr.wkbLinearRing)
+        for col, row in pixel_ring:
+            ring.AddPoint_2D(
+                geo_transform[0] + col * geo_transform[1] +
+                row * geo_transform[2], geo_transform[3] +
+                col * geo_transform[4] + row * geo_transform[5])
+        polygon = ogr.Geometry(ogr.wkbPolygon)
+        polygon.AddGeometry(ring)
+        feature = ogr.Feature(layer.GetLayerDefn())
+        feature.SetField(field, value)
+        feature.SetGeometry(polygon)
+        layer.CreateFeature(feature)
+    data_source = None
+    return output
+
+
+def polygonize_footprint(mask: str,
+                         output: str,
+                         band_number: Optional[int] = 1,
+                         field: Optional[str] = "DN") -> str:
+    """footprint of a binary raster mask by polygonizing its valid pixels,
+    as gdal_polygonize.py -mask
+
+    Parameters
+    ----------
+    mask : str
+        input raster, valid pixels are different from 0
+    output : str
+        output shapefile
+    band_number : int
+        band of the mask
+    field : str
+        integer field of the output, set to the value of pixels
+    """
+    from osgeo import gdal
+
+    mask_ds = gdal.Open(mask)
+    band = mask_ds.GetRasterBand(band_number)
+    data_source, layer = create_footprint_layer(output,
+                                                mask_ds.GetProjection(), field)
+    gdal.Polygonize(band, band, layer, 0, [])
+    data_source = mask_ds = None
+    return output
+
+
+def mask_footprint(mask: str,
+                   output: str,
+                   block_size: Optional[int] = 256,
+                   logger: Optional[logging.Logger] = LOGGER) -> str:
+    """footprint of a binary raster mask (first band), read by blocks of
+    rows
+
+    Parameters
+    ----------
+    mask : str
+        input raster, valid pixels are different from 0
+    output : str
+        output shapefile
+    block_size : int
+        number of rows read at once
+    """
+    from osgeo import gdal
+
+    mask_ds = gdal.Open(mask)
+    band = mask_ds.GetRasterBand(1)
+    first = np.full(mask_ds.RasterYSize, -1, dtype=np.int64)
+    last = np.full(mask_ds.RasterYSize, -1, dtype=np.int64)
+    gaps = False
+    for row in range(0, mask_ds.RasterYSize, block_size):
+        rows = min(block_size, mask_ds.RasterYSize - row)
+        block = band.ReadAsArray(0, row, mask_ds.RasterXSize, rows)
+        first[row:row + rows], last[row:row + rows] = row_spans(block)
+        gaps = gaps or rows_with_gaps(block, first[row:row + rows],
+                                      last[row:row + rows])
+    logger.info(f"writing footprint of {mask} in {output}")
+    if gaps:
+        return polygonize_footprint(mask, output)
+    return write_footprint(footprint_rings(first, last),
+                           mask_ds.GetGeoTransform(),
+                           mask_ds.GetProjection(), output)
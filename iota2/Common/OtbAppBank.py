@@ -21,6 +21,7 @@ import numpy as np
 from Common.Utils import Opath
 import otbApplication as otb
 from Common import FileUtils as fut
+from iota2.Common.OtbProfiler import profile_factory
 import logging
 
 logger = logging.getLogger(__name__)
@@ -67,6 +68,27 @@ def getInputParameterOutput(otbObj):
         raise Exception("out parameter not recognize")
 
 
+def profiled_output(OtbParameters, key="out", data_type=None):
+    """
+    IN :
+    OtbParameters [dict] : parameters of an OTB application
+    key [str] : output parameter name
+    data_type [str] : output data type, default to OtbParameters["pixType"]
+
+    OUT :
+    output raster path, with the output profile as extended filename if the
+    output is a GeoTiff raster
+    """
+    from iota2.Common.RasterProfile import otb_extended_filename
+    raster_path = str(OtbParameters[key])
+    path = raster_path.partition("?")[0]
+    if not path.lower().endswith((".tif", ".tiff")):
+        return raster_path
+    if data_type is None:
+        data_type = OtbParameters.get("pixType", None)
+    return otb_extended_filename(raster_path, data_type, writegeom=True)
+
+
 def unPackFirst(someListOfList):
     """
     python generator
@@ -87,6 +109,7 @@ def unPackFirst(someListOfList):
             yield values
 
 
+@profile_factory
 def CreateClassificationMapRegularization(OtbParameters):
     """binding to ClassificationMapRegularization OTB's application
 
@@ -118,7 +141,8 @@ def CreateClassificationMapRegularization(OtbParameters):
             "io.in",
             in_img.GetParameterOutputImage(getInputParameterOutput(in_img)))
     if "io.out" in OtbParameters:
-        map_reg.SetParameterString("io.out", str(OtbParameters["io.out"]))
+        map_reg.SetParameterString("io.out",
+                                   profiled_output(OtbParameters, "io.out"))
     if "ip.radius" in OtbParameters:
         map_reg.SetParameterString("ip.radius",
                                    str(OtbParameters["ip.radius"]))
@@ -145,6 +169,7 @@ def CreateClassificationMapRegularization(OtbParameters):
     return map_reg
 
 
+@profile_factory
 def CreateClassifyAutoContext(OtbParameters):
     """binding to ClassifyAutoContext OTB's application
 
@@ -191,11 +216,12 @@ def CreateClassifyAutoContext(OtbParameters):
     classify_autoContext.SetParameterStringList("lablist",
                                                 OtbParameters["lablist"])
     classify_autoContext.SetParameterString("tmpdir", OtbParameters["tmpdir"])
-    classify_autoContext.SetParameterString("out", OtbParameters["out"])
+    classify_autoContext.SetParameterString("out",
+                                            profiled_output(OtbParameters))
 
     if "confmap" in OtbParameters:
-        classify_autoContext.SetParameterString("confmap",
-                                                str(OtbParameters["confmap"]))
+        classify_autoContext.SetParameterString(
+            "confmap", profiled_output(OtbParameters, "confmap", "float"))
     if "ram" in OtbParameters:
         classify_autoContext.SetParameterString("ram",
                                                 str(OtbParameters["ram"]))
@@ -203,6 +229,7 @@ def CreateClassifyAutoContext(OtbParameters):
     return classify_autoContext
 
 
+@profile_factory
 def CreateTrainAutoContext(OtbParameters):
     """binding to TrainAutoContext OTB's application
 
@@ -255,6 +282,7 @@ def CreateTrainAutoContext(OtbParameters):
     return train_autoContext
 
 
+@profile_factory
 def CreateSLICApplication(OtbParameters):
     """binding to SLIC OTB's application
 
@@ -291,7 +319,7 @@ def CreateSLICApplication(OtbParameters):
 
     #~ add optional parameters
     if "out" in OtbParameters:
-        SLIC.SetParameterString("out", str(OtbParameters["out"]))
+        SLIC.SetParameterString("out", profiled_output(OtbParameters))
     if "spw" in OtbParameters:
         SLIC.SetParameterString("spw", str(OtbParameters["spw"]))
     if "dw" in OtbParameters:
@@ -317,6 +345,7 @@ def CreateSLICApplication(OtbParameters):
     return SLIC
 
 
+@profile_factory
 def CreateImageClassifierApplication(OtbParameters):
     """binding to ImageClassifier OTB's application
 
@@ -366,11 +395,13 @@ def CreateImageClassifierApplication(OtbParameters):
         classifier.SetParameterString("nodatalabel",
                                       OtbParameters["nodatalabel"])
     if "out" in OtbParameters:
-        classifier.SetParameterString("out", OtbParameters["out"])
+        classifier.SetParameterString("out", profiled_output(OtbParameters))
     if "confmap" in OtbParameters:
-        classifier.SetParameterString("confmap", OtbParameters["confmap"])
+        classifier.SetParameterString(
+            "confmap", profiled_output(OtbParameters, "confmap", "float"))
     if "probamap" in OtbParameters:
-        classifier.SetParameterString("probamap", OtbParameters["probamap"])
+        classifier.SetParameterString(
+            "probamap", profiled_output(OtbParameters, "probamap", "uint16"))
     if "ram" in OtbParameters:
         classifier.SetParameterString("ram", str(OtbParameters["ram"]))
     if "nbclasses" in OtbParameters:
@@ -381,6 +412,7 @@ def CreateImageClassifierApplication(OtbParameters):
     return classifier
 
 
+@profile_factory
 def CreateImageTimeSeriesGapFillingApplication(OtbParameters):
     """binding to ImageTimeSeriesGapFilling OTB's application
 
@@ -454,7 +486,8 @@ def CreateImageTimeSeriesGapFillingApplication(OtbParameters):
     if "od" in OtbParameters:
         gapfilling_app.SetParameterString("od", OtbParameters["od"])
     if "out" in OtbParameters:
-        gapfilling_app.SetParameterString("out", OtbParameters["out"])
+        gapfilling_app.SetParameterString("out",
+                                          profiled_output(OtbParameters))
     if "ram" in OtbParameters:
         gapfilling_app.SetParameterString("ram", OtbParameters["ram"])
     if "pixType" in OtbParameters:
@@ -463,6 +496,7 @@ def CreateImageTimeSeriesGapFillingApplication(OtbParameters):
     return gapfilling_app
 
 
+@profile_factory
 def CreateIota2FeatureExtractionApplication(OtbParameters):
     """binding to iota2FeatureExtraction OTB's application
 
@@ -535,7 +569,7 @@ def CreateIota2FeatureExtractionApplication(OtbParameters):
     if "ram" in OtbParameters:
         features_app.SetParameterString("ram", OtbParameters["ram"])
     if "out" in OtbParameters:
-        features_app.SetParameterString("out", OtbParameters["out"])
+        features_app.SetParameterString("out", profiled_output(OtbParameters))
     if "pixType" in OtbParameters:
         features_app.SetParameterOutputImagePixelType(
             "out", fut.commonPixTypeToOTB(OtbParameters["pixType"]))
@@ -555,6 +589,7 @@ def CreateIota2FeatureExtractionApplication(OtbParameters):
     return features_app
 
 
+@profile_factory
 def CreateSampleAugmentationApplication(OtbParameters):
     """binding to SampleAugmentation OTB's application
 
@@ -617,6 +652,7 @@ def CreateSampleAugmentationApplication(OtbParameters):
     return sample_augmentation
 
 
+@profile_factory
 def CreateRigidTransformResampleApplication(OtbParameters):
     """
     IN:
@@ -692,7 +728,7 @@ def CreateRigidTransformResampleApplication(OtbParameters):
         rigid.SetParameterString("interpolator.bco.radius",
                                  str(OtbParameters["interpolator.bco.radius"]))
     if "out" in OtbParameters:
-        rigid.SetParameterString("out", str(OtbParameters["out"]))
+        rigid.SetParameterString("out", profiled_output(OtbParameters))
     if "ram" in OtbParameters:
         rigid.SetParameterString("ram", str(OtbParameters["ram"]))
     if "pixType" in OtbParameters:
@@ -702,6 +738,7 @@ def CreateRigidTransformResampleApplication(OtbParameters):
     return rigid
 
 
+@profile_factory
 def CreateComputeConfusionMatrixApplication(OtbParameters):
     """
     in parameter could be string
@@ -745,6 +782,7 @@ def CreateComputeConfusionMatrixApplication(OtbParameters):
     return confusion
 
 
+@profile_factory
 def CreateFusionOfClassificationsApplication(OtbParameters):
     """
     IN:
@@ -802,7 +840,7 @@ def CreateFusionOfClassificationsApplication(OtbParameters):
         fusion.SetParameterString("undecidedlabel",
                                   str(OtbParameters["undecidedlabel"]))
     if "out" in OtbParameters:
-        fusion.SetParameterString("out", str(OtbParameters["out"]))
+        fusion.SetParameterString("out", profiled_output(OtbParameters))
     if "pixType" in OtbParameters:
         fusion.SetParameterOutputImagePixelType(
             "out", fut.commonPixTypeToOTB(OtbParameters["pixType"]))
@@ -810,6 +848,7 @@ def CreateFusionOfClassificationsApplication(OtbParameters):
     return fusion
 
 
+@profile_factory
 def CreatePolygonClassStatisticsApplication(OtbParameters):
     """
     IN:
@@ -871,6 +910,7 @@ def CreatePolygonClassStatisticsApplication(OtbParameters):
     return pClassStats
 
 
+@profile_factory
 def CreateSampleSelectionApplication(OtbParameters):
     """
     IN:
@@ -958,6 +998,7 @@ def CreateSampleSelectionApplication(OtbParameters):
     return sampleS
 
 
+@profile_factory
 def CreateSampleExtractionApplication(OtbParameters):
     """
     IN:
@@ -1016,6 +1057,7 @@ def CreateSampleExtractionApplication(OtbParameters):
     return sampleE
 
 
+@profile_factory
 def CreateDespeckleApplication(OtbParameters):
     """
     IN:
@@ -1050,7 +1092,7 @@ def CreateDespeckleApplication(OtbParameters):
     else:
         raise Exception("input image not recognize")
 
-    despeckle.SetParameterString("out", OtbParameters["out"])
+    despeckle.SetParameterString("out", profiled_output(OtbParameters))
 
     if "filter" in OtbParameters:
         despeckle.SetParameterString("filter", OtbParameters["filter"])
@@ -1216,6 +1258,7 @@ def monoDateDespeckle(allOrtho, tile):
     return SARfiltered
 
 
+@profile_factory
 def CreateSarCalibration(OtbParameters):
     """
     IN:
@@ -1245,7 +1288,7 @@ def CreateSarCalibration(OtbParameters):
         raise Exception("input image not recognize")
 
     if "out" in OtbParameters:
-        calibration.SetParameterString("out", OtbParameters["out"])
+        calibration.SetParameterString("out", profiled_output(OtbParameters))
     if "lut" in OtbParameters:
         calibration.SetParameterString("lut", OtbParameters["lut"])
     if "ram" in OtbParameters:
@@ -1256,6 +1299,7 @@ def CreateSarCalibration(OtbParameters):
     return calibration
 
 
+@profile_factory
 def CreateOrthoRectification(OtbParameters):
     """
     IN:
@@ -1290,7 +1334,8 @@ def CreateOrthoRectification(OtbParameters):
         raise Exception("input image not recognize")
 
     if "io.out" in OtbParameters:
-        ortho.SetParameterString("io.out", str(OtbParameters["io.out"]))
+        ortho.SetParameterString("io.out",
+                                 profiled_output(OtbParameters, "io.out"))
     if "map" in OtbParameters:
         ortho.SetParameterString("map", str(OtbParameters["map"]))
     if "map.utm.zone" in OtbParameters:
@@ -1365,6 +1410,7 @@ def CreateOrthoRectification(OtbParameters):
     return ortho, inputImage
 
 
+@profile_factory
 def CreateMultitempFilteringFilter(OtbParameters):
     """
     IN:
@@ -1433,6 +1479,7 @@ def CreateMultitempFilteringFilter(OtbParameters):
     return SARfilterF, inImg, outcore
 
 
+@profile_factory
 def CreateMultitempFilteringOutcore(OtbParameters):
     """
     MultitempFilteringOutcore is an External otb module
@@ -1494,6 +1541,7 @@ def CreateMultitempFilteringOutcore(OtbParameters):
     return SARfilter
 
 
+@profile_factory
 def CreateBinaryMorphologicalOperation(OtbParameters):
     """
     IN:
@@ -1530,7 +1578,7 @@ def CreateBinaryMorphologicalOperation(OtbParameters):
         raise Exception("input image not recognize")
 
     if "out" in OtbParameters:
-        morphoMath.SetParameterString("out", OtbParameters["out"])
+        morphoMath.SetParameterString("out", profiled_output(OtbParameters))
     if "channel" in OtbParameters:
         morphoMath.SetParameterString("channel", str(OtbParameters["channel"]))
     if "ram" in OtbParameters:
@@ -1581,6 +1629,7 @@ def CreateBinaryMorphologicalOperation(OtbParameters):
     return morphoMath
 
 
+@profile_factory
 def CreateClumpApplication(OtbParameters):
     """
     IN:
@@ -1632,6 +1681,7 @@ def CreateClumpApplication(OtbParameters):
     return seg
 
 
+@profile_factory
 def CreateConcatenateImagesApplication(OtbParameters):
     """
     IN:
@@ -1675,7 +1725,7 @@ def CreateConcatenateImagesApplication(OtbParameters):
         raise Exception("can't create ConcatenateImagesApplication")
 
     if "out" in OtbParameters:
-        concatenate.SetParameterString("out", OtbParameters["out"])
+        concatenate.SetParameterString("out", profiled_output(OtbParameters))
     if "ram" in OtbParameters:
         concatenate.SetParameterString("ram", OtbParameters["ram"])
     if "pixType" in OtbParameters:
@@ -1685,6 +1735,7 @@ def CreateConcatenateImagesApplication(OtbParameters):
     return concatenate
 
 
+@profile_factory
 def CreateBandMathApplication(OtbParameters):
     """
     IN:
@@ -1737,13 +1788,14 @@ def CreateBandMathApplication(OtbParameters):
     if "ram" in OtbParameters:
         bandMath.SetParameterString("ram", OtbParameters["ram"])
     if "out" in OtbParameters:
-        bandMath.SetParameterString("out", OtbParameters["out"])
+        bandMath.SetParameterString("out", profiled_output(OtbParameters))
     if "pixType" in OtbParameters:
         bandMath.SetParameterOutputImagePixelType(
             "out", fut.commonPixTypeToOTB(OtbParameters["pixType"]))
     return bandMath
 
 
+@profile_factory
 def CreateBandMathXApplication(OtbParameters):
     """
     IN:
@@ -1796,13 +1848,14 @@ def CreateBandMathXApplication(OtbParameters):
     if "ram" in OtbParameters:
         bandMath.SetParameterString("ram", OtbParameters["ram"])
     if "out" in OtbParameters:
-        bandMath.SetParameterString("out", OtbParameters["out"])
+        bandMath.SetParameterString("out", profiled_output(OtbParameters))
     if "pixType" in OtbParameters:
         bandMath.SetParameterOutputImagePixelType(
             "out", fut.commonPixTypeToOTB(OtbParameters["pixType"]))
     return bandMath
 
 
+@profile_factory
 def CreateSuperimposeApplication(OtbParameters):
     """
     IN:
@@ -1872,7 +1925,7 @@ def CreateSuperimposeApplication(OtbParameters):
     if "elev.dem" in OtbParameters:
         siApp.SetParameterString("elev.dem", OtbParameters["elev.dem"])
     if "out" in OtbParameters:
-        siApp.SetParameterString("out", OtbParameters["out"])
+        siApp.SetParameterString("out", profiled_output(OtbParameters))
     if "mode" in OtbParameters:
         siApp.SetParameterString("mode", OtbParameters["mode"])
     if "interpolator" in OtbParameters:
@@ -1889,6 +1942,7 @@ def CreateSuperimposeApplication(OtbParameters):
     return siApp, inImg2
 
 
+@profile_factory
 def CreateExtractROIApplication(OtbParameters):
     """
     IN:
@@ -1927,7 +1981,7 @@ def CreateExtractROIApplication(OtbParameters):
         raise Exception("input image not recognize")
 
     if "out" in OtbParameters:
-        erApp.SetParameterString("out", str(OtbParameters["out"]))
+        erApp.SetParameterString("out", profiled_output(OtbParameters))
     if "ram" in OtbParameters:
         erApp.SetParameterString("ram", str(OtbParameters["ram"]))
     if "mode" in OtbParameters:
@@ -1994,6 +2048,7 @@ def CreateExtractROIApplication(OtbParameters):
     return erApp
 
 
+@profile_factory
 def CreateRasterizationApplication(OtbParameters):
     """
     IN:
@@ -2019,7 +2074,7 @@ def CreateRasterizationApplication(OtbParameters):
     rasterApp.SetParameterString("in", OtbParameters["in"])
 
     if "out" in OtbParameters:
-        rasterApp.SetParameterString("out", OtbParameters["out"])
+        rasterApp.SetParameterString("out", profiled_output(OtbParameters))
     if "im" in OtbParameters:
         rasterApp.SetParameterString("im", OtbParameters["im"])
     if "szx" in OtbParameters:
@@ -2056,6 +2111,7 @@ def CreateRasterizationApplication(OtbParameters):
     return rasterApp
 
 
+@profile_factory
 def CreatePointMatchCoregistrationModel(OtbParameters):
     """
     IN:
@@ -2147,6 +2203,7 @@ def CreatePointMatchCoregistrationModel(OtbParameters):
     return PMCMApp
 
 
+@profile_factory
 def CreatePixelValueApplication(OtbParameters):
     """
     IN:
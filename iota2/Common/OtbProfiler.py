@@ -0,0 +1,269 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# =========================================================================
+#   Program:   iota2
+#
+#   Copyright (c) CESBIO. All rights reserved.
+#
+#   See LICENSE for details.
+#
+#   This software is distributed WITHOUT ANY WARRANTY; without even
+#   the implied warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR
+#   PURPOSE.  See the above copyright notices for more information.
+#
+# =========================================================================
+"""
+Opt-in profiling of OTB applications.
+
+Once enabled, every application built by an OtbAppBank factory is registered
+(name, upstream applications) and every call to ``Execute`` /
+``ExecuteAndWriteOutput`` is timed. The resulting timeline is exported as a
+Chrome trace (chrome://tracing or https://ui.perfetto.dev) JSON file.
+"""
+import os
+import re
+import json
+import time
+import logging
+import resource
+from functools import wraps
+from typing import Dict, List, Optional
+
+LOGGER = logging.getLogger(__name__)
+
+PROFILED_METHODS = ["Execute", "ExecuteAndWriteOutput"]
+
+
+def peak_rss_kb() -> int:
+    """return the peak resident set size of the current process (kB)"""
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+def get_output_image_key(otb_app) -> Optional[str]:
+    """return the first output image parameter key of an OTB application"""
+    import otbApplication as otb
+    for key in otb_app.GetParametersKeys():
+        if otb_app.GetParameterType(key) == otb.ParameterType_OutputImage:
+            return key
+    return None
+
+
+def find_upstream_applications(otb_parameters: Dict) -> List:
+    """find OTB applications used as inputs in a factory's parameters
+
+    Parameters
+    ----------
+    otb_parameters :
+        dictionnary given to an OtbAppBank's Create* function. Values could be
+        string, OtbApplication, tuple or list of them
+    """
+    import otbApplication as otb
+    upstream = []
+    values = list(otb_parameters.values()) if isinstance(otb_parameters,
+                                                         dict) else []
+    while values:
+        value = values.pop(0)
+        if isinstance(value, otb.Application):
+            upstream.append(value)
+        elif isinstance(value, (list, tuple)):
+            values.extend(value)
+    return upstream
+
+
+class OtbProfiler():
+    """
+    Record OTB applications creation and execution
+
+    Only one instance is used per process (see PROFILER), the class methods
+    ``Execute`` and ``ExecuteAndWriteOutput`` of otbApplication.Application
+    are patched between enable() and disable() calls.
+    """
+    def __init__(self):
+        self.enabled = False
+        self.nodes = {}
+        self.events = []
+        self.origin = None
+        self.original_methods = {}
+
+    def enable(self) -> None:
+        """start recording"""
+        import otbApplication as otb
+        if self.enabled:
+            return
+        self.nodes = {}
+        self.events = []
+        self.origin = time.time()
+        for method_name in PROFILED_METHODS:
+            original_method = getattr(otb.Application, method_name)
+            self.original_methods[method_name] = original_method
+            setattr(otb.Application, method_name,
+                    self.profile_method(original_method, method_name))
+        self.enabled = True
+
+    def disable(self) -> None:
+        """stop recording and restore OTB methods"""
+        import otbApplication as otb
+        if not self.enabled:
+            return
+        for method_name, original_method in self.original_methods.items():
+            setattr(otb.Application, method_name, original_method)
+        self.original_methods = {}
+        self.enabled = False
+
+    def register_application(self, otb_app, factory_name: str,
+                             otb_parameters: Dict) -> None:
+        """register an application and its upstream applications"""
+        upstream = [
+            id(upstream_app)
+            for upstream_app in find_upstream_applications(otb_parameters)
+        ]
+        self.nodes[id(otb_app)] = {
+            "uid": len(self.nodes),
+            "application": otb_app.GetName(),
+            "factory": factory_name,
+            "inputs": upstream
+        }
+
+    def node(self, otb_app) -> Dict:
+        """get the node associated to an application, register it if needed"""
+        if id(otb_app) not in self.nodes:
+            self.nodes[id(otb_app)] = {
+                "uid": len(self.nodes),
+                "application": otb_app.GetName(),
+                "factory": None,
+                "inputs": []
+            }
+        return self.nodes[id(otb_app)]
+
+    def profile_method(self, method, method_name: str):
+        """decorate an otbApplication.Application method"""
+        profiler = self
+
+        @wraps(method)
+        def wrapper(otb_app, *args, **kwargs):
+            rss_before = peak_rss_kb()
+            start = time.time()
+            try:
+                return method(otb_app, *args, **kwargs)
+            finally:
+                end = time.time()
+                profiler.add_event(otb_app, method_name, start, end,
+                                   rss_before)
+
+        return wrapper
+
+    def add_event(self, otb_app, method_name: str, start: float, end: float,
+                  rss_before: int) -> None:
+        """add an execution event to the timeline"""
+        node = self.node(otb_app)
+        rss_after = peak_rss_kb()
+        event_args = {
+            "uid": node["uid"],
+            "peak_rss_kb": rss_after,
+            "peak_rss_increase_kb": rss_after - rss_before
+        }
+        try:
+            out_key = get_output_image_key(otb_app)
+            if out_key is not None:
+                region = otb_app.GetImageRequestedRegion(out_key)
+                event_args["requested_region"] = {
+                    "index": list(region["index"]),
+                    "size": list(region["size"])
+                }
+                event_args["estimated_memory_bytes"] = int(
+                    otb_app.PropagateRequestedRegion(key=out_key,
+                                                     region=region))
+        except (RuntimeError, KeyError, TypeError):
+            LOGGER.debug(
+                f"can't estimate memory of application {node['application']}")
+        self.events.append({
+            "name": f"{node['application']}.{method_name}",
+            "cat": "otb",
+            "ph": "X",
+            "ts": int((start - self.origin) * 1e6),
+            "dur": int((end - start) * 1e6),
+            "pid": os.getpid(),
+            "tid": 0,
+            "args": event_args
+        })
+
+    def topology(self) -> List[Dict]:
+        """return the pipelines graph as a list of nodes"""
+        uid_from_id = {
+            app_id: node["uid"]
+            for app_id, node in self.nodes.items()
+        }
+        return [{
+            "uid": node["uid"],
+            "application": node["application"],
+            "factory": node["factory"],
+            "inputs": [
+                uid_from_id[app_id] for app_id in node["inputs"]
+                if app_id in uid_from_id
+            ]
+        } for node in sorted(self.nodes.values(), key=lambda x: x["uid"])]
+
+    def export(self, output_file: str, task_name: Optional[str] = "") -> None:
+        """write the recorded timeline as a chrome trace json file"""
+        trace = {
+            "traceEvents": self.events,
+            "displayTimeUnit": "ms",
+            "otherData": {
+                "task": task_name,
+                "pipeline": self.topology()
+            }
+        }
+        with open(output_file, "w") as trace_file:
+            json.dump(trace, trace_file, indent=1)
+
+
+PROFILER = OtbProfiler()
+
+
+def profile_factory(factory):
+    """decorator dedicated to OtbAppBank's Create* functions
+
+    Register the created application to the profiler if it is enabled
+    """
+    @wraps(factory)
+    def wrapper(otb_parameters, *args, **kwargs):
+        created = factory(otb_parameters, *args, **kwargs)
+        if PROFILER.enabled:
+            otb_app = created[0] if isinstance(created, tuple) else created
+            PROFILER.register_application(otb_app, factory.__name__,
+                                          otb_parameters)
+        return created
+
+    return wrapper
+
+
+def profile_file_name(output_dir: str, task_name: str) -> str:
+    """build the trace file name of a task"""
+    task_name = re.sub(r"[^A-Za-z0-9_.-]+", "_", str(task_name))[:100]
+    return os.path.join(output_dir,
+                        f"otb_profile_{task_name}_{os.getpid()}.json")
+
+
+def run_profiled(function, parameter, output_dir: Optional[str] = None):
+    """run function(parameter), profile OTB applications if output_dir is set
+
+    Parameters
+    ----------
+    function :
+        callable to profile
+    parameter :
+        function's parameter, also used to name the trace file
+    output_dir :
+        directory where the trace is written. If None, no profiling is done
+    """
+    if output_dir is None:
+        return function(parameter)
+    PROFILER.enable()
+    try:
+        return function(parameter)
+    finally:
+        PROFILER.disable()
+        os.makedirs(output_dir, exist_ok=True)
+        PROFILER.export(profile_file_name(output_dir, parameter),
+                        str(parameter))
@@ -0,0 +1,236 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# =========================================================================
+#   Program:   iota2
+#
+#   Copyright (c) CESBIO. All rights reserved.
+#
+#   See LICENSE for details.
+#
+#   This software is distributed WITHOUT ANY WARRANTY; without even
+#   the implied warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR
+#   PURPOSE.  See the above copyright notices for more information.
+#
+# =========================================================================
+"""
+Output rasters profile shared by every raster writers (GDAL, rasterio, OTB).
+
+Rasters are written as tiled GeoTiff, compressed according to the
+configuration file (chain.output_compression, chain.output_predictor) and
+in BigTIFF format when needed. Internal overviews can be added to final
+products (chain.output_overviews).
+
+The profile is stored in the environment variable IOTA2_RASTER_PROFILE
+in order to be shared with sub-processes.
+"""
+import os
+import json
+import logging
+from typing import Dict, List, Optional, Union
+
+LOGGER = logging.getLogger(__name__)
+
+PROFILE_ENV = "IOTA2_RASTER_PROFILE"
+
+COMPRESSIONS = ["NONE", "LZW", "DEFLATE", "ZSTD", "LZMA", "PACKBITS"]
+
+DEFAULT_PROFILE = {
+    "compress": "LZW",
+    "predictor": 1,
+    "block_size": 256,
+    "bigtiff": "IF_SAFER",
+    "overviews": False
+}
+
+OVERVIEWS_LEVELS = [2, 4, 8, 16, 32]
+
+
+def set_output_profile(compress: Optional[str] = None,
+                       predictor: Optional[int] = None,
+                       block_size: Optional[int] = None,
+                       bigtiff: Optional[str] = None,
+                       overviews: Optional[bool] = None) -> Dict:
+    """set the output rasters profile of the current process (and its
+    children)
+
+    Parameters
+    ----------
+    compress : str
+        compression algorithm, see COMPRESSIONS
+    predictor : int
+        1 : no predictor, 2 : horizontal differencing, 3 : floating point
+    block_size : int
+        tiles size (multiple of 16)
+    bigtiff : str
+        BigTIFF creation option (YES, NO, IF_NEEDED, IF_SAFER)
+    overviews : bool
+        add internal overviews to final products
+
+    Return
+    ------
+    dict
+        the new profile
+    """
+    profile = get_output_profile()
+    if compress is not None:
+        if compress.upper() not in COMPRESSIONS:
+            raise ValueError(f"compression must be one of {COMPRESSIONS}")
+        profile["compress"] = compress.upper()
+    if predictor is not None:
+        if predictor not in [1, 2, 3]:
+            raise ValueError("predictor must be 1, 2 or 3")
+        profile["predictor"] = predictor
+    if block_size is not None:
+        if block_size % 16 != 0:
+            raise ValueError("tiles size must be a multiple of 16")
+        profile["block_size"] = block_size
+    if bigtiff is not None:
+        profile["bigtiff"] = bigtiff
+    if overviews is not None:
+        profile["overviews"] = overviews
+    os.environ[PROFILE_ENV] = json.dumps(profile)
+    return profile
+
+
+def get_output_profile() -> Dict:
+    """get the output rasters profile of the current process"""
+    profile = dict(DEFAULT_PROFILE)
+    if PROFILE_ENV in os.environ:
+        profile.update(json.loads(os.environ[PROFILE_ENV]))
+    return profile
+
+
+def is_float(data_type: Union[str, object, None]) -> bool:
+    """check if a data type (GDAL name, numpy dtype or OTB pixel type)
+    is a floating point type
+    """
+    if data_type is None:
+        return False
+    data_type = str(data_type).lower()
+    return "float" in data_type or "double" in data_type
+
+
+def get_predictor(data_type: Union[str, object, None] = None) -> int:
+    """predictor compatible with the data type"""
+    profile = get_output_profile()
+    predictor = profile["predictor"]
+    if profile["compress"] in ["NONE", "PACKBITS"]:
+        return 1
+    if predictor == 3 and not is_float(data_type):
+        predictor = 2
+    return predictor
+
+
+def gdal_creation_dict(data_type: Union[str, object, None] = None
+                       ) -> Dict[str, str]:
+    """GeoTiff creation options as a dictionary
+
+    Parameters
+    ----------
+    data_type : str
+        output data type, used to choose the predictor
+    """
+    profile = get_output_profile()
+    options = {
+        "TILED": "YES",
+        "BLOCKXSIZE": str(profile["block_size"]),
+        "BLOCKYSIZE": str(profile["block_size"]),
+        "BIGTIFF": profile["bigtiff"]
+    }
+    if profile["compress"] != "NONE":
+        options["COMPRESS"] = profile["compress"]
+        predictor = get_predictor(data_type)
+        if predictor != 1:
+            options["PREDICTOR"] = str(predictor)
+    return options
+
+
+def gdal_creation_options(data_type: Union[str, object, None] = None
+                          ) -> List[str]:
+    """GeoTiff creation options as a list (gdal.Driver.Create)"""
+    return [
+        f"{key}={value}"
+        for key, value in gdal_creation_dict(data_type).items()
+    ]
+
+
+def gdal_command_options(data_type: Union[str, object, None] = None) -> str:
+    """GeoTiff creation options as gdal command line options"""
+    return " ".join(f"-co {option}"
+                    for option in gdal_creation_options(data_type))
+
+
+def rasterio_profile(data_type: Union[str, object, None] = None
+                     ) -> Dict[str, Union[str, int, bool]]:
+    """GeoTiff creation options as rasterio.open keywords"""
+    profile = get_output_profile()
+    options = {
+        "tiled": True,
+        "blockxsize": profile["block_size"],
+        "blockysize": profile["block_size"],
+        "BIGTIFF": profile["bigtiff"]
+    }
+    if profile["compress"] != "NONE":
+        options["compress"] = profile["compress"].lower()
+        predictor = get_predictor(data_type)
+        if predictor != 1:
+            options["predictor"] = predictor
+    return options
+
+
+def otb_extended_filename(raster_path: str,
+                          data_type: Union[str, object, None] = None,
+                          writegeom: Optional[bool] = False) -> str:
+    """add the output profile to an OTB output raster path
+
+    Parameters
+    ----------
+    raster_path : str
+        output raster path, could already contains extended filename
+        options
+    data_type : str
+        output data type, used to choose the predictor
+    writegeom : bool
+        write .geom files
+
+    Example
+    -------
+    >>> otb_extended_filename("/out.tif")
+    "/out.tif?&gdal:co:TILED=YES&...&writegeom=false"
+    """
+    path, _, options = raster_path.partition("?")
+    options = [option for option in options.split("&") if option]
+    keys = [option.split("=")[0] for option in options]
+    for key, value in gdal_creation_dict(data_type).items():
+        if f"gdal:co:{key}" not in keys:
+            options.append(f"gdal:co:{key}={value}")
+    if not writegeom and "writegeom" not in keys:
+        options.append("writegeom=false")
+    return "{}?&{}".format(path, "&".join(options))
+
+
+def build_overviews(raster_path: str,
+                    resampling: Optional[str] = "NEAREST",
+                    logger: Optional[logging.Logger] = LOGGER) -> bool:
+    """add internal overviews to a raster if the profile requires it
+
+    Return
+    ------
+    bool
+        True if overviews were built
+    """
+    from osgeo import gdal
+
+    if not get_output_profile()["overviews"]:
+        return False
+    dataset = gdal.Open(raster_path, gdal.GA_Update)
+    if dataset is None:
+        logger.warning(f"can't open {raster_path} to build overviews")
+        return False
+    min_size = min(dataset.RasterXSize, dataset.RasterYSize)
+    levels = [level for level in OVERVIEWS_LEVELS if min_size // level >= 256]
+    if levels:
+        dataset.BuildOverviews(resampling, levels)
+    dataset = None
+    return bool(levels)
@@ -87,6 +87,7 @@ class serviceConfigFile:
                 "regionField": "region",
                 "logConsole": True,
                 "enableConsole": False,
+                "otb_profiling": False,
                 "merge_final_classifications": False,
                 "merge_final_classifications_method": "majorityvoting",
                 "merge_final_classifications_undecidedlabel": 255,
@@ -94,11 +95,15 @@ class serviceConfigFile:
                 "dempstershafer_mob": "precision",
                 "merge_final_classifications_ratio": 0.1,
                 "keep_runs_results": True,
+                "single_pass_confusion": False,
                 "check_inputs": True,
                 "enable_autoContext": False,
                 "autoContext_iterations": 3,
                 "remove_tmp_files": False,
                 "force_standard_labels": False,
+                "output_compression": "LZW",
+                "output_predictor": 1,
+                "output_overviews": False,
                 "spatialResolution": self.init_listSequence([])
             }
             self.init_section("chain", chain_default)
@@ -142,6 +147,7 @@ class serviceConfigFile:
 
             argTrain_default = {
                 "sampleSelection": sampleSel_default,
+                "sample_selection_by_tiles": False,
                 "sampleAugmentation": sampleAugmentationg_default,
                 "sampleManagement": None,
                 "dempster_shafer_SAR_Opt_fusion": False,
@@ -165,7 +171,11 @@ class serviceConfigFile:
             argClassification_default = {
                 "noLabelManagement": "maxConfidence",
                 "enable_probability_map": False,
-                "fusionOptions": "-nodatalabel 0 -method majorityvoting"
+                "fusionOptions": "-nodatalabel 0 -method majorityvoting",
+                "native_fusion": False,
+                "model_cache_size": 2048,
+                "enable_fan_out_inference": False,
+                "probability_type": "float32"
             }
             self.init_section("argClassification", argClassification_default)
             #init GlobChain section
@@ -695,6 +705,11 @@ class serviceConfigFile:
             self.testVarConfigFile('chain', 'ratio', float)
             self.testVarConfigFile('chain', 'splitGroundTruth', bool)
             self.testVarConfigFile('chain', 'outputStatistics', bool)
+            self.testVarConfigFile(
+                'chain', 'output_compression', str,
+                ["NONE", "LZW", "DEFLATE", "ZSTD", "LZMA", "PACKBITS"])
+            self.testVarConfigFile('chain', 'output_predictor', int, [1, 2, 3])
+            self.testVarConfigFile('chain', 'output_overviews', bool)
             self.testVarConfigFile('chain', 'cloud_threshold', int)
             # self.testVarConfigFile('chain', 'spatialResolution', int)
             self.testVarConfigFile('chain', 'colorTable', str)
@@ -717,6 +732,8 @@ class serviceConfigFile:
                     'chain', 'dempstershafer_mob', str,
                     ["precision", "recall", "accuracy", "kappa"])
                 self.testVarConfigFile('chain', 'keep_runs_results', bool)
+                self.testVarConfigFile('chain', 'single_pass_confusion',
+                                       bool)
                 self.testVarConfigFile(
                     'chain', 'fusionOfClassificationAllSamplesValidation',
                     bool)
@@ -731,6 +748,8 @@ class serviceConfigFile:
                                    Sequence)
 
             self.testVarConfigFile('argTrain', 'sampleSelection', Mapping)
+            self.testVarConfigFile('argTrain', 'sample_selection_by_tiles',
+                                   bool)
             self.testVarConfigFile('argTrain', 'samplesClassifMix', bool)
             self.testVarConfigFile('argTrain', 'validityThreshold', int)
 
@@ -743,6 +762,14 @@ class serviceConfigFile:
                                    'enable_probability_map', bool)
             self.testVarConfigFile('argClassification', 'noLabelManagement',
                                    str, ["maxConfidence", "learningPriority"])
+            self.testVarConfigFile('argClassification', 'native_fusion',
+                                   bool)
+            self.testVarConfigFile('argClassification', 'model_cache_size',
+                                   int)
+            self.testVarConfigFile('argClassification',
+                                   'enable_fan_out_inference', bool)
+            self.testVarConfigFile('argClassification', 'probability_type',
+                                   str, ["float32", "uint8", "uint16"])
 
             self.testVarConfigFile('GlobChain', 'proj', str)
             self.testVarConfigFile('GlobChain', 'features', Sequence)
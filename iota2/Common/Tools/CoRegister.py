@@ -22,8 +22,12 @@ import sys
 import shutil
 import logging
 import glob
+import re
+import multiprocessing as mp
+from functools import lru_cache, wraps
 from typing import Optional, List, Dict, Union
 from datetime import date
+import numpy as np
 from osgeo import gdal
 from osgeo import osr
 from iota2.Common import OtbAppBank
@@ -40,6 +44,26 @@ LOGGER.addHandler(STREAMHANDLER)
 sensors_params_type = Dict[str, Union[str, List[str], int]]
 
 
+def cache_on_file(func):
+    """cache the result of a metadata parser
+
+    The cache is keyed by the file path and its modification time : every
+    metadata file of a tile is parsed once, even if scores are requested
+    several times (source date selection, cascade registration).
+    """
+    cached_func = lru_cache(maxsize=None)(
+        lambda ifile, mtime: func(ifile))
+
+    @wraps(func)
+    def wrapper(ifile: str):
+        return cached_func(os.path.abspath(ifile), os.path.getmtime(ifile))
+
+    wrapper.cache_clear = cached_func.cache_clear
+    wrapper.cache_info = cached_func.cache_info
+    return wrapper
+
+
+@cache_on_file
 def get_s2_tile_coverage(ifile: str) -> float:
     """
     Parameters
@@ -49,37 +73,24 @@ def get_s2_tile_coverage(ifile: str) -> float:
     ------
     float: the coverage percent
     """
-    file_contain = ''
     with open(ifile) as open_file:
-        for line in open_file:
-            file_contain += line
+        file_contain = open_file.read()
 
     band_str = file_contain.split(
         '<Band_Viewing_Incidence_Angles_Grids_List band_id="B2">')[-1].split(
             '</Band_Viewing_Incidence_Angles_Grids_List>')[0]
-    detector_list = []
-    for detector in band_str.split('<Values_List>')[1:]:
-        detector = detector.split('</Values_List>')[0]
-        tab = []
-        for line in detector.split('<VALUES>')[1:]:
-            line = line.split('</VALUES>')[0]
-            tab.append(line.split(' '))
-        detector_list.append(tab)
-
-    res_tab = []
-    number_of_entry = len(detector_list[0])
-    number_of_values = len(detector_list[0][0])
-    for i in range(0, number_of_entry):
-        for j in range(0, number_of_values):
-            res = 0
-            for array in detector_list:
-                if res == 0 and array[i][j] != 'NaN':
-                    res = 1
-            res_tab.append(res)
-    coverage_percent = float(sum(res_tab)) / float(len(res_tab))
-    return coverage_percent
-
-
+    detectors = []
+    for detector in re.findall(r"<Values_List>(.*?)</Values_List>", band_str,
+                               re.DOTALL):
+        rows = re.findall(r"<VALUES>(.*?)</VALUES>", detector, re.DOTALL)
+        detectors.append(
+            np.array([row.split() for row in rows], dtype=np.float64))
+    # a grid node is covered if at least one detector sees it
+    covered = np.any(~np.isnan(np.stack(detectors)), axis=0)
+    return float(np.count_nonzero(covered)) / float(covered.size)
+
+
+@cache_on_file
 def get_s2_tile_cloud_cover(ifile: str) -> float:
     """
     Parameters
@@ -97,6 +108,7 @@ def get_s2_tile_cloud_cover(ifile: str) -> float:
     return percent
 
 
+@cache_on_file
 def get_l8_tile_cloud_cover(ifile: str) -> float:
     """
     Parameters
@@ -143,7 +155,7 @@ def fitness_date_score(date_vhr: str, datadir: str, datatype: str) -> str:
                 abs((date(year, month, day) - date_vhr).days) / 500, 1)
             percent = get_l8_tile_cloud_cover(ifile)
             fit_score = delta * percent
-            if max_fit_score < fit_score or max_fit_score is None:
+            if max_fit_score is None or max_fit_score < fit_score:
                 max_fit_score = fit_score
                 fit_date = in_date
 
@@ -189,8 +201,8 @@ def launch_coregister(tile: str,
                       ipath_s2_s2c: Optional[str] = None,
                       corregistration_pattern: Optional[str] = None,
                       launch_mask: Optional[bool] = True,
-                      sensors_parameters: Optional[sensors_params_type] = None
-                      ) -> None:
+                      sensors_parameters: Optional[sensors_params_type] = None,
+                      nb_workers: Optional[int] = 1) -> None:
     """ register an image / a time series on a reference image
 
     Parameters
@@ -221,6 +233,10 @@ def launch_coregister(tile: str,
 
     launch_mask : bool
         boolean to launch common mask
+    sensors_parameters : dict
+        sensors parameters
+    nb_workers : int
+        maximum number of dates registered concurrently (mode 2)
     """
     from iota2.Sensors.ProcessLauncher import commonMasks
 
@@ -276,7 +292,8 @@ def launch_coregister(tile: str,
 
     coregister(insrc, inref, bandsrc,
                bandref, resample, step, minstep, minsiftpoints, iterate, prec,
-               int(mode), datadir, pattern, datatype, False, working_directory)
+               int(mode), datadir, pattern, datatype, False, working_directory,
+               nb_workers)
 
     if launch_mask:
         commonMasks(tile, output_path, sensors_parameters)
@@ -297,7 +314,8 @@ def coregister(in_src,
                pattern='*STACK.tif',
                datatype='S2',
                write_features=False,
-               working_directory=None):
+               working_directory=None,
+               nb_workers=1):
     """ register an image / a time series on a reference image
 
     Parameters
@@ -333,6 +351,10 @@ def coregister(in_src,
         pattern of the STACK files to register
     write_features : boolean
         argument to keep temporary files
+    working_directory : string
+        path to the working directory
+    nb_workers : int
+        maximum number of dates registered concurrently in mode 2
 
     Note
     ------
@@ -964,145 +986,142 @@ def coregister(in_src,
             os.remove(sensor_model)
     # mode 2 : application on the time series
     elif mode == 2:
-        ext = os.path.splitext(in_src)[1]
         file_list = glob.glob(datadir + os.sep + '*' + os.sep + pattern)
-        for insrc in file_list:
-            src_clip = os.path.join(path_wd, 'tempSrcClip.tif')
-            extract_roi_app = OtbAppBank.CreateExtractROIApplication({
-                "in":
-                insrc,
-                "mode":
-                "fit",
-                "mode.fit.im":
-                inref,
-                "out":
-                src_clip,
-                "pixType":
-                "uint16"
-            })
-            extract_roi_app.ExecuteAndWriteOutput()
-            out_src = os.path.join(path_wd, 'temp_file.tif')
-            io_src = str(src_clip + '?&skipcarto=true&geom=' + sensor_model)
-            dataset = gdal.Open(src_clip)
-            prj = dataset.GetProjection()
-            geo_trans = dataset.GetGeoTransform()
-            srs = osr.SpatialReference()
-            srs.ImportFromWkt(prj)
-            code = srs.GetAuthorityCode(None)
-            gsp = str(int(2 *
-                          round(max(abs(geo_trans[1]), abs(geo_trans[5])))))
-            dataset = None
-            ortho_rec_app = OtbAppBank.CreateOrthoRectification({
-                "in":
-                io_src,
-                "io.out":
-                out_src,
-                "map":
-                "epsg",
-                "map.epsg.code":
-                code,
-                "opt.gridspacing":
-                gsp,
-                "pixType":
-                "uint16"
-            })
-
-            if write_features:
-                ortho_rec_app[0].ExecuteAndWriteOutput()
-            else:
-                ortho_rec_app[0].Execute()
-
-            ext = os.path.splitext(insrc)[1]
-            final_ouput = os.path.join(
-                path_wd,
-                os.path.basename(
-                    insrc.replace(ext, ext.replace('.', '_COREG.'))))
-            sup_imp_app = OtbAppBank.CreateSuperimposeApplication({
-                "inr":
-                src_clip,
-                "inm":
-                ortho_rec_app[0],
-                "out":
-                final_ouput,
-                "pixType":
-                "uint16"
-            })
-            sup_imp_app[0].ExecuteAndWriteOutput()
-
-            shutil.move(final_ouput,
-                        insrc.replace(ext, ext.replace('.', '_COREG.')))
-            shutil.move(final_ouput.replace(ext, '.geom'),
-                        insrc.replace(ext, '_COREG.geom'))
-
-            # Mask registration if exists
-            masks = glob.glob(
-                os.path.dirname(insrc) + os.sep + 'MASKS' + os.sep +
-                '*BINARY_MASK*' + ext)
-            if len(masks) != 0:
-                for mask in masks:
-                    src_clip = os.path.join(path_wd, 'tempSrcClip.tif')
-                    extract_roi_app = OtbAppBank.CreateExtractROIApplication({
-                        "in":
-                        mask,
-                        "mode":
-                        "fit",
-                        "mode.fit.im":
-                        inref,
-                        "out":
-                        src_clip,
-                        "pixType":
-                        "uint16"
-                    })
-                    extract_roi_app.ExecuteAndWriteOutput()
-                    out_src = os.path.join(path_wd, 'temp_file.tif')
-                    io_src = str(src_clip + '?&skipcarto=true&geom=' +
-                                 sensor_model)
-                    ortho_rec_app = OtbAppBank.CreateOrthoRectification({
-                        "in":
-                        io_src,
-                        "io.out":
-                        out_src,
-                        "map":
-                        "epsg",
-                        "map.epsg.code":
-                        code,
-                        "opt.gridspacing":
-                        gsp,
-                        "pixType":
-                        "uint16"
-                    })
-                    if write_features:
-                        ortho_rec_app[0].ExecuteAndWriteOutput()
-                    else:
-                        ortho_rec_app[0].Execute()
-
-                    ext = os.path.splitext(insrc)[1]
-                    final_mask = os.path.join(
-                        path_wd,
-                        os.path.basename(
-                            mask.replace(ext, ext.replace('.', '_COREG.'))))
-                    sup_imp_app = OtbAppBank.CreateSuperimposeApplication({
-                        "inr":
-                        src_clip,
-                        "inm":
-                        ortho_rec_app[0],
-                        "out":
-                        final_mask,
-                        "pixType":
-                        "uint16"
-                    })
-                    sup_imp_app[0].ExecuteAndWriteOutput()
-
-                    shutil.move(final_mask,
-                                mask.replace(ext, ext.replace('.', '_COREG.')))
-                    shutil.move(final_mask.replace(ext, '.geom'),
-                                mask.replace(ext, '_COREG.geom'))
+        dates_params = [(insrc, inref, sensor_model,
+                         os.path.join(path_wd, f"date_{ind}"), write_features)
+                        for ind, insrc in enumerate(file_list)]
+        nb_workers = max(1, min(int(nb_workers), len(dates_params)))
+        if nb_workers == 1:
+            for date_params in dates_params:
+                coregister_date(*date_params)
+        else:
+            with mp.Pool(processes=nb_workers) as pool:
+                pool.starmap(coregister_date, dates_params)
 
-        os.remove(src_clip)
         if not write_features and os.path.exists(sensor_model):
             os.remove(sensor_model)
 
 
+def coregister_date(insrc: str,
+                    inref: str,
+                    sensor_model: str,
+                    path_wd: str,
+                    write_features: Optional[bool] = False) -> None:
+    """apply a sensor model to one date of a time series (and its masks)
+
+    Parameters
+    ----------
+    insrc : string
+        source raster of the date
+    inref : string
+        reference raster
+    sensor_model : string
+        sensor model (.geom) to apply
+    path_wd : string
+        working directory dedicated to the date, temporary files are
+        written in it so several dates can be processed concurrently
+    write_features : boolean
+        argument to keep temporary files
+    """
+    from iota2.Common.FileUtils import ensure_dir
+    ensure_dir(path_wd)
+
+    src_clip = os.path.join(path_wd, 'tempSrcClip.tif')
+    extract_roi_app = OtbAppBank.CreateExtractROIApplication({
+        "in": insrc,
+        "mode": "fit",
+        "mode.fit.im": inref,
+        "out": src_clip,
+        "pixType": "uint16"
+    })
+    extract_roi_app.ExecuteAndWriteOutput()
+    out_src = os.path.join(path_wd, 'temp_file.tif')
+    io_src = str(src_clip + '?&skipcarto=true&geom=' + sensor_model)
+    dataset = gdal.Open(src_clip)
+    prj = dataset.GetProjection()
+    geo_trans = dataset.GetGeoTransform()
+    srs = osr.SpatialReference()
+    srs.ImportFromWkt(prj)
+    code = srs.GetAuthorityCode(None)
+    gsp = str(int(2 * round(max(abs(geo_trans[1]), abs(geo_trans[5])))))
+    dataset = None
+    ortho_rec_app = OtbAppBank.CreateOrthoRectification({
+        "in": io_src,
+        "io.out": out_src,
+        "map": "epsg",
+        "map.epsg.code": code,
+        "opt.gridspacing": gsp,
+        "pixType": "uint16"
+    })
+
+    if write_features:
+        ortho_rec_app[0].ExecuteAndWriteOutput()
+    else:
+        ortho_rec_app[0].Execute()
+
+    ext = os.path.splitext(insrc)[1]
+    final_ouput = os.path.join(
+        path_wd,
+        os.path.basename(insrc.replace(ext, ext.replace('.', '_COREG.'))))
+    sup_imp_app = OtbAppBank.CreateSuperimposeApplication({
+        "inr": src_clip,
+        "inm": ortho_rec_app[0],
+        "out": final_ouput,
+        "pixType": "uint16"
+    })
+    sup_imp_app[0].ExecuteAndWriteOutput()
+
+    shutil.move(final_ouput, insrc.replace(ext, ext.replace('.', '_COREG.')))
+    shutil.move(final_ouput.replace(ext, '.geom'),
+                insrc.replace(ext, '_COREG.geom'))
+
+    # Mask registration if exists
+    masks = glob.glob(
+        os.path.dirname(insrc) + os.sep + 'MASKS' + os.sep + '*BINARY_MASK*' +
+        ext)
+    for mask in masks:
+        extract_roi_app = OtbAppBank.CreateExtractROIApplication({
+            "in": mask,
+            "mode": "fit",
+            "mode.fit.im": inref,
+            "out": src_clip,
+            "pixType": "uint16"
+        })
+        extract_roi_app.ExecuteAndWriteOutput()
+        io_src = str(src_clip + '?&skipcarto=true&geom=' + sensor_model)
+        ortho_rec_app = OtbAppBank.CreateOrthoRectification({
+            "in": io_src,
+            "io.out": out_src,
+            "map": "epsg",
+            "map.epsg.code": code,
+            "opt.gridspacing": gsp,
+            "pixType": "uint16"
+        })
+        if write_features:
+            ortho_rec_app[0].ExecuteAndWriteOutput()
+        else:
+            ortho_rec_app[0].Execute()
+
+        final_mask = os.path.join(
+            path_wd,
+            os.path.basename(mask.replace(ext, ext.replace('.', '_COREG.'))))
+        sup_imp_app = OtbAppBank.CreateSuperimposeApplication({
+            "inr": src_clip,
+            "inm": ortho_rec_app[0],
+            "out": final_mask,
+            "pixType": "uint16"
+        })
+        sup_imp_app[0].ExecuteAndWriteOutput()
+
+        shutil.move(final_mask, mask.replace(ext, ext.replace('.',
+                                                              '_COREG.')))
+        shutil.move(final_mask.replace(ext, '.geom'),
+                    mask.replace(ext, '_COREG.geom'))
+
+    if not write_features:
+        shutil.rmtree(path_wd, ignore_errors=True)
+
+
 if __name__ == "__main__":
 
     PARSER = argparse.ArgumentParser(
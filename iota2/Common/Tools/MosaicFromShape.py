@@ -20,6 +20,7 @@ import gdal
 import ogr
 import osr
 from Common import FileUtils as fut
+from Common import RasterProfile
 import random
 from Common.Utils import run
 import shutil
@@ -171,7 +172,7 @@ def mosaicFromShape(rasters, shape, rasterOut, workingDir=None):
 
     #mosaic using gdal_merge.py, the last image will be copied over earlier ones
     rasters_clip = " ".join(tmp_files_raster[::-1])
-    cmd = "gdal_merge.py -o " + rasterOut + " -n 0 " + rasters_clip
+    cmd = "gdal_merge.py " + RasterProfile.gdal_command_options() + " -o " + rasterOut + " -n 0 " + rasters_clip
     run(cmd)
 
     #clean tmp files
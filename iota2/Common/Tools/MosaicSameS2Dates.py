@@ -24,6 +24,7 @@ import osr
 import gdal
 from osgeo.gdalconst import *
 from Common import FileUtils as fu
+from Common import RasterProfile
 from Common.Utils import run
 
 def converCoord(inCoord, inEPSG, OutEPSG):
@@ -169,8 +170,8 @@ def launchFit(noDataM, noDataR, tileFolder, currentTile, sensorName, S2Folder, S
                 workingFolder = outFolder
                 if workingDirectory:
                     workingFolder = workingDirectory
-                cmd = "gdal_merge.py -init "+str(initVal)+" -n "+str(initVal)+" -o "+workingFolder+"/"+outName+" "+priorityPaths
-                cmd2 = "gdal_merge.py -init "+str(initVal)+" -n "+str(initVal)+" -o "+workingFolder+"/"+outName+" "+priorityPaths+" | "+outFolder+"/"+outName
+                cmd = "gdal_merge.py "+RasterProfile.gdal_command_options()+" -init "+str(initVal)+" -n "+str(initVal)+" -o "+workingFolder+"/"+outName+" "+priorityPaths
+                cmd2 = "gdal_merge.py "+RasterProfile.gdal_command_options()+" -init "+str(initVal)+" -n "+str(initVal)+" -o "+workingFolder+"/"+outName+" "+priorityPaths+" | "+outFolder+"/"+outName
                 AllCmd.append(cmd)
                 addLineToFile(cmdPath, cmd2)
 
@@ -153,7 +153,10 @@ def check_region_shape(input_vector,
                                        shape_no_duplicates_name)
 
     shape_no_duplicates, duplicated_features = deleteDuplicateGeometriesSqlite(
-        shape_no_empty, do_corrections, shape_no_duplicates, quiet_mode=True)
+        shape_no_empty,
+        do_corrections=do_corrections,
+        output_file=shape_no_duplicates,
+        quiet_mode=True)
     if duplicated_features != 0:
         error_msg = "'{}' contains {} duplicated features".format(
             input_vector, duplicated_features)
@@ -264,7 +267,10 @@ def check_ground_truth(input_vector,
                                        shape_no_duplicates_name)
 
     shape_no_duplicates, duplicated_features = deleteDuplicateGeometriesSqlite(
-        shape_no_empty, do_corrections, shape_no_duplicates, quiet_mode=True)
+        shape_no_empty,
+        do_corrections=do_corrections,
+        output_file=shape_no_duplicates,
+        quiet_mode=True)
     if duplicated_features != 0:
         error_msg = "'{}' contains {} duplicated features".format(
             input_vector, duplicated_features)
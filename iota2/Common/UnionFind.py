@@ -0,0 +1,40 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# =========================================================================
+#   Program:   iota2
+#
+#   Copyright (c) CESBIO. All rights reserved.
+#
+#   See LICENSE for details.
+#
+#   This software is distributed WITHOUT ANY WARRANTY; without even
+#   the implied warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR
+#   PURPOSE.  See the above copyright notices for more information.
+#
+# =========================================================================
+"""
+Union-find forest stored in a dictionary {member: parent}, members which
+are not keys of the dictionary are their own root.
+
+Used to merge pieces of objects (superpixels, polygons) cut by the seams
+of a processing by strips or by cells.
+"""
+from typing import Any, Dict
+
+
+def find(parent: Dict[Any, Any], label: Any) -> Any:
+    """root of a label in a union-find forest"""
+    root = label
+    while parent.get(root, root) != root:
+        root = parent[root]
+    while parent.get(label, label) != root:
+        parent[label], label = root, parent[label]
+    return root
+
+
+def union(parent: Dict[Any, Any], label_1: Any, label_2: Any) -> None:
+    """merge two labels in a union-find forest, the smallest root is kept"""
+    root_1, root_2 = find(parent, label_1), find(parent, label_2)
+    if root_1 != root_2:
+        parent[max(root_1, root_2)] = min(root_1, root_2)
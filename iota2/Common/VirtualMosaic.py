@@ -0,0 +1,190 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# =========================================================================
+#   Program:   iota2
+#
+#   Copyright (c) CESBIO. All rights reserved.
+#
+#   See LICENSE for details.
+#
+#   This software is distributed WITHOUT ANY WARRANTY; without even
+#   the implied warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR
+#   PURPOSE.  See the above copyright notices for more information.
+#
+# =========================================================================
+"""
+Mosaic rasters through a virtual raster (VRT).
+
+The virtual mosaic follows gdal_merge.py semantics used until now by iota2 :
+input pixels equal to the nodata value (0) are transparent and, where
+inputs overlap, the last raster of the list wins. Windows of the mosaic
+can be read directly from the VRT, a physical raster is only written
+(block by block, in parallel) when needed.
+"""
+import os
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional, Tuple
+
+LOGGER = logging.getLogger(__name__)
+
+
+def build_vrt_mosaic(rasters: List[str],
+                     vrt_path: str,
+                     spatial_resolution: Optional[Tuple[float, float]] = None,
+                     nodata: Optional[int] = 0) -> str:
+    """build a virtual mosaic
+
+    Parameters
+    ----------
+    rasters : list
+        rasters to mosaic, the last one has the highest priority
+    vrt_path : str
+        output VRT path
+    spatial_resolution : tuple
+        (x, y) output spatial resolution. If None, the highest resolution
+        of inputs is used
+    nodata : int
+        inputs nodata value (not reported by the mosaic, as gdal_merge -n)
+
+    Return
+    ------
+    str
+        vrt_path
+    """
+    from osgeo import gdal
+
+    if not rasters:
+        raise ValueError("no rasters to mosaic")
+    options = {
+        "srcNodata": nodata,
+        "hideNodata": True,
+        "resampleAlg": "nearest"
+    }
+    if spatial_resolution:
+        options["resolution"] = "user"
+        options["xRes"] = abs(float(spatial_resolution[0]))
+        options["yRes"] = abs(float(spatial_resolution[1]))
+    else:
+        options["resolution"] = "highest"
+    if os.path.exists(vrt_path):
+        os.remove(vrt_path)
+    vrt_ds = gdal.BuildVRT(vrt_path,
+                           rasters,
+                           options=gdal.BuildVRTOptions(**options))
+    if vrt_ds is None:
+        raise Exception(f"can't build the virtual mosaic {vrt_path}")
+    vrt_ds = None
+    return vrt_path
+
+
+def materialize_mosaic(vrt_path: str,
+                       output_path: str,
+                       data_type: Optional[str] = "Int16",
+                       creation_options: Optional[List[str]] = None,
+                       nb_threads: Optional[int] = 1,
+                       block_size: Optional[int] = None,
+                       logger: Optional[logging.Logger] = LOGGER) -> str:
+    """write a virtual mosaic as a GeoTiff, block by block
+
+    Parameters
+    ----------
+    vrt_path : str
+        virtual mosaic (see build_vrt_mosaic)
+    output_path : str
+        output raster path
+    data_type : str
+        output pixel type (gdal name)
+    creation_options : list
+        GeoTiff creation options, default to the output rasters profile
+        (see RasterProfile)
+    nb_threads : int
+        number of threads reading the mosaic
+    block_size : int
+        number of rows read at once, default to the profile tiles size
+
+    Return
+    ------
+    str
+        output_path
+    """
+    from osgeo import gdal
+    from iota2.Common.RasterProfile import gdal_creation_options
+    from iota2.Common.RasterProfile import get_output_profile
+
+    if creation_options is None:
+        creation_options = gdal_creation_options(data_type)
+    if block_size is None:
+        block_size = get_output_profile()["block_size"]
+    gdal_type = gdal.GetDataTypeByName(data_type)
+    if gdal_type == gdal.GDT_Unknown:
+        raise ValueError(f"unknown pixel type {data_type}")
+
+    vrt_ds = gdal.Open(vrt_path)
+    x_size = vrt_ds.RasterXSize
+    y_size = vrt_ds.RasterYSize
+    nb_bands = vrt_ds.RasterCount
+    if os.path.exists(output_path):
+        os.remove(output_path)
+    out_ds = gdal.GetDriverByName("GTiff").Create(output_path,
+                                                  x_size,
+                                                  y_size,
+                                                  nb_bands,
+                                                  gdal_type,
+                                                  options=creation_options)
+    out_ds.SetGeoTransform(vrt_ds.GetGeoTransform())
+    out_ds.SetProjection(vrt_ds.GetProjection())
+    vrt_ds = None
+
+    def read_block(block_row):
+        """read a block of rows of the mosaic, converted to gdal_type"""
+        rows = min(block_size, y_size - block_row)
+        # a dataset handle must not be shared between threads
+        return block_row, rows, gdal.Open(vrt_path).ReadRaster(
+            0, block_row, x_size, rows, buf_type=gdal_type)
+
+    logger.info(f"writing mosaic {output_path}")
+    blocks = list(range(0, y_size, block_size))
+    nb_threads = max(1, nb_threads)
+    with ThreadPoolExecutor(max_workers=nb_threads) as executor:
+        # bound the number of blocks in memory
+        for start in range(0, len(blocks), 2 * nb_threads):
+            chunk = blocks[start:start + 2 * nb_threads]
+            for block_row, rows, buff in executor.map(read_block, chunk):
+                out_ds.WriteRaster(0,
+                                   block_row,
+                                   x_size,
+                                   rows,
+                                   buff,
+                                   buf_type=gdal_type)
+    out_ds.FlushCache()
+    out_ds = None
+    return output_path
+
+
+def mosaic(rasters: List[str],
+           output_path: str,
+           spatial_resolution: Optional[Tuple[float, float]] = None,
+           data_type: Optional[str] = "Int16",
+           creation_options: Optional[List[str]] = None,
+           nb_threads: Optional[int] = 1,
+           nodata: Optional[int] = 0,
+           logger: Optional[logging.Logger] = LOGGER) -> str:
+    """mosaic rasters to a physical raster, through a temporary virtual
+    mosaic written next to output_path
+
+    see build_vrt_mosaic and materialize_mosaic
+    """
+    vrt_path = "{}_mosaic.vrt".format(os.path.splitext(output_path)[0])
+    build_vrt_mosaic(rasters, vrt_path, spatial_resolution, nodata)
+    try:
+        materialize_mosaic(vrt_path,
+                           output_path,
+                           data_type,
+                           creation_options,
+                           nb_threads,
+                           logger=logger)
+    finally:
+        os.remove(vrt_path)
+    return output_path
@@ -26,6 +26,7 @@ from rasterio.io import MemoryFile
 from rasterio.transform import Affine
 from iota2.Common.FileUtils import memory_usage_psutil
 from iota2.Common.Utils import run
+from iota2.Common import RasterProfile
 # Only for typing
 import otbApplication
 
@@ -34,13 +35,23 @@ LOGGER = logging.getLogger(__name__)
 
 def compress_raster(raster_in: str,
                     raster_out: str,
-                    compress_mode: Optional[str] = "LZW") -> bool:
+                    compress_mode: Optional[str] = None) -> bool:
     """ compress a raster thanks to gdal_translate
+
+    the output rasters profile is used (see RasterProfile), compress_mode
+    overwrites its compression. Overviews are added if required by the
+    profile.
     """
     success = True
-    command = f"gdal_translate -co 'COMPRESS={compress_mode}' {raster_in} {raster_out}"
+    creation_options = RasterProfile.gdal_creation_dict()
+    if compress_mode:
+        creation_options["COMPRESS"] = compress_mode
+    options = " ".join(f"-co '{key}={value}'"
+                       for key, value in creation_options.items())
+    command = f"gdal_translate {options} {raster_in} {raster_out}"
     try:
         run(command)
+        RasterProfile.build_overviews(raster_out)
     except Exception:
         success = False
     return success
@@ -172,6 +183,7 @@ def insert_external_function_to_pipeline(
                 crs="EPSG:{}".format(epsg_code),
                 transform=out_trans,
                 dtype=mosaic.dtype,
+                **RasterProfile.rasterio_profile(mosaic.dtype),
         ) as dest:
             dest.write(mosaic)
     # the returned otbimage is a dictionary
@@ -495,8 +507,10 @@ def merge_rasters(
         output_path: str,
         epsg_code: int,
         working_dir: Optional[str] = None,
+        nb_threads: Optional[int] = 1,
 ) -> Tuple[np.ndarray, Affine]:
-    """merge geo-referenced rasters thanks to rasterio.merge
+    """merge geo-referenced rasters through a virtual mosaic
+    (see VirtualMosaic)
 
     Parameters
     ----------
@@ -508,6 +522,8 @@ def merge_rasters(
         output epsg code projection
     working_dir : str
         working directory
+    nb_threads : int
+        number of threads writing the mosaic
 
     Return
     ------
@@ -520,7 +536,8 @@ def merge_rasters(
     assembleTile_Merge(rasters, (res_x, -res_y),
                        output_path,
                        ot="Int16",
-                       co=None)
+                       co=None,
+                       nb_threads=nb_threads)
     # ~ rasters_datasets = [rasterio.open(raster) for raster in rasters]
     # ~ out_arr, out_trans = merge(rasters_datasets)
     # ~ if output_path:
@@ -26,9 +26,14 @@ import time
 import numpy as np
 from mpi4py import MPI
 from iota2.Common import ServiceLogger as sLog
+from iota2.Common import OtbProfiler
+from iota2.Common import RasterProfile
+from iota2.MPI import tasks_telemetry
 from iota2.Common.FileUtils import ensure_dir
 import os
 import shutil
+import itertools
+import uuid
 
 # This is needed in order to be able to send python objects throug MPI send
 import mpi4py
@@ -39,6 +44,13 @@ if MPI_VERSION == 200:
 elif MPI_VERSION >= 300:
     MPI.pickle.__init__(dill.dumps, dill.loads)
 
+# maximum number of parameters sent at once to a worker
+MAX_BATCH_SIZE = 50
+# minimum number of batches per worker
+BATCHES_PER_WORKER = 4
+# identify the job currently cached by workers
+JOB_IDS = itertools.count()
+
 
 class MPIService():
     """
@@ -84,10 +96,20 @@ def stop_workers(mpi_service):
         mpi_service.comm.send(None, dest=i, tag=1)
 
 
-def launchTask(function, parameter, logger, mpi_services=None):
+def launchTask(function,
+               parameter,
+               logger,
+               mpi_services=None,
+               profiling_dir=None,
+               task_info=None):
     """
     usage :
     IN
+    profiling_dir [string] : if set, OTB applications executed by the task
+                             are profiled and the trace is written in it
+    task_info [tuple] : (step name, resource block name, nb_cpu, step
+                        execution id) use to record the task's resources
+                        consumption
     OUT
     """
     import sys
@@ -97,11 +119,18 @@ def launchTask(function, parameter, logger, mpi_services=None):
 
     logger.root.log(51, "-----------> TRACE <-----------")
 
+    monitor = None
+    if task_info:
+        step_name, resource_block, nb_cpu, execution_id = task_info
+        monitor = tasks_telemetry.TaskMonitor(step_name, resource_block,
+                                              nb_cpu, parameter, execution_id)
+        monitor.start()
     start_job = time.time()
     start_date = datetime.datetime.now()
     returned_data = None
     try:
-        returned_data = function(parameter)
+        returned_data = OtbProfiler.run_profiled(function, parameter,
+                                                 profiling_dir)
         parameter_success = True
         logger.root.log(51, "parameter : '" + str(parameter) + "' : ended")
     except KeyboardInterrupt:
@@ -113,15 +142,129 @@ def launchTask(function, parameter, logger, mpi_services=None):
 
     end_job = time.time()
     end_date = datetime.datetime.now()
+    task_record = monitor.stop(parameter_success) if monitor else None
 
     logger.root.log(51, "---------> END TRACE <---------")
     logger.root.log(51, "Execution time [sec] : " + str(end_job - start_job))
+    if task_record:
+        logger.root.log(
+            51, "Peak RSS [MB] : {:.1f}, CPU time [sec] : {:.1f}".format(
+                task_record["peak_rss_kb"] / 1024.0,
+                task_record["cpu_time_s"]))
     logger.root.log(51, "****************************************\n")
 
     worker_complete_log = logger.root.handlers[0].stream.getvalue()
     logger.root.handlers[0].stream.close()
 
-    return worker_complete_log, start_date, end_date, returned_data, parameter_success
+    return worker_complete_log, start_date, end_date, returned_data, parameter_success, task_record
+
+
+def worker_file(file_path, rank):
+    """
+    per worker file, workers write their own logs / records in it
+    and the master merges them at the end of the step
+    """
+    base_name, extension = os.path.splitext(file_path)
+    return "{}_worker_{}{}".format(base_name, rank, extension)
+
+
+def merge_worker_files(file_path, worker_ranks):
+    """
+    append workers files to file_path, then remove them
+    """
+    for rank in sorted(worker_ranks):
+        rank_file = worker_file(file_path, rank)
+        if not os.path.exists(rank_file):
+            continue
+        with open(file_path, "a+") as merged_file, open(rank_file) as r_file:
+            shutil.copyfileobj(r_file, merged_file)
+        os.remove(rank_file)
+
+
+def tasks_batch_size(nb_tasks, nb_workers, max_batch_size=MAX_BATCH_SIZE):
+    """
+    number of parameters sent at once to a worker. Every worker gets at
+    least BATCHES_PER_WORKER batches to keep the load balanced
+    """
+    return int(
+        max(1,
+            min(max_batch_size,
+                nb_tasks // (BATCHES_PER_WORKER * max(1, nb_workers)))))
+
+
+def affinity_batches(param_array, batch_size, affinity):
+    """
+    usage : split parameters in batches, a batch only contains parameters
+            with the same affinity (see IOTA2Step.Step.task_affinity)
+    IN
+    param_array [list] : job's parameters
+    batch_size [int] : maximum number of parameters by batch
+    affinity [callable] : parameter -> hashable key
+    OUT
+    batches [list] : [(key, [parameters]), ...], ordered by first appearance
+                     of keys
+    """
+    groups = {}
+    for param in param_array:
+        groups.setdefault(affinity(param), []).append(param)
+    return [(key, params[index:index + batch_size])
+            for key, params in groups.items()
+            for index in range(0, len(params), batch_size)]
+
+
+def select_batch(batches, worker_key, workers_keys):
+    """
+    usage : choose the next batch of a worker. A batch with the same key as
+            the previous one of the worker is chosen first, then a batch of a
+            key no worker is processing, then the first batch.
+    IN
+    batches [list] : [(key, [parameters]), ...]
+    worker_key : key of the previous batch of the worker
+    workers_keys [iterable] : keys of batches being processed
+    OUT
+    index [int] : index of the chosen batch
+    """
+    if worker_key is not None:
+        for index, (key, _) in enumerate(batches):
+            if key == worker_key:
+                return index
+    for index, (key, _) in enumerate(batches):
+        if key is not None and key not in workers_keys:
+            return index
+    return 0
+
+
+def launch_batch(function, parameters, step_context, mpi_services=None):
+    """
+    usage : launch tasks one after the other, logs and telemetry records
+            are written in step_context["log_file"] and
+            step_context["telemetry_file"]
+    IN
+    function [callable] : job
+    parameters [list] : job's parameters
+    step_context [dict] : step's settings, see mpi_schedule
+    OUT
+    results [list] : [(returned_data, success), ...]
+    """
+    results = []
+    tasks_log = []
+    tasks_records = []
+    for parameter in parameters:
+        worker_log = sLog.Log_task(step_context["logger_lvl"],
+                                   step_context["enable_console"])
+        worker_complete_log, _, _, returned_data, success, task_record = launchTask(
+            function, parameter, worker_log, mpi_services,
+            step_context["profiling_dir"], step_context["task_info"])
+        tasks_log.append(worker_complete_log)
+        if task_record:
+            tasks_records.append(task_record)
+        results.append((returned_data, success))
+    fut.ensure_dir(os.path.split(step_context["log_file"])[0])
+    with open(step_context["log_file"], "a+") as log_f:
+        log_f.write("".join(tasks_log))
+    tasks_telemetry.append_records(step_context["telemetry_file"],
+                                   tasks_records)
+    return results
 
 
 def mpi_schedule(iota2_step,
@@ -129,14 +272,41 @@ def mpi_schedule(iota2_step,
                  mpi_service=MPIService(),
                  logPath=None,
                  logger_lvl="INFO",
-                 enable_console=False):
+                 enable_console=False,
+                 otb_profiling=False,
+                 batch_size=None):
     """
     A simple MPI scheduler to execute jobs in parallel.
+
+    The job and the step's settings are sent once to each worker, which
+    caches them. Parameters are sent by batches (see tasks_batch_size) and
+    workers write logs by themselves, they only send back
+    [rank, [(returned_data, success), ...]]
     """
     if mpi_service.rank != 0:
         return None
 
-    job = iota2_step.step_execute()
+    job_id = next(JOB_IDS)
+    step_context = {
+        "job":
+        iota2_step.step_execute(),
+        "logger_lvl":
+        logger_lvl,
+        "enable_console":
+        enable_console,
+        "profiling_dir":
+        iota2_step.log_step_dir if otb_profiling else None,
+        "task_info": (iota2_step.step_name,
+                      iota2_step.resources["resource_block_name"],
+                      iota2_step.resources["cpu"],
+                      uuid.uuid4().hex),
+        "log_file":
+        logPath,
+        "telemetry_file":
+        os.path.join(iota2_step.log_dir, tasks_telemetry.TELEMETRY_FILE_NAME),
+        "output_profile":
+        RasterProfile.get_output_profile()
+    }
 
     returned_data_list = []
     parameters_success = []
@@ -148,6 +318,7 @@ def mpi_schedule(iota2_step,
                 "JobArray must contain a list of parameter as argument.\n")
             log_f.write("An earlier stage probably behaved erratically.")
         return [], False
+    workers_with_job = set()
     try:
         if os.path.exists(logPath):
             os.remove(logPath)
@@ -159,44 +330,56 @@ def mpi_schedule(iota2_step,
 
         if mpi_service.size > 1:
             # master
-            nb_completed_tasks = 0
-            nb_tasks = len(param_array)
-            for i in range(1, mpi_service.size):
-                if len(param_array) > 0:
-                    task_param = param_array.pop(0)
-                    mpi_service.comm.send(
-                        [job, task_param, logger_lvl, enable_console],
-                        dest=i,
-                        tag=0)
-            while nb_completed_tasks < nb_tasks:
-                [
-                    worker_rank,
-                    [start, end, worker_complete_log, returned_data, success]
-                ] = mpi_service.comm.recv(source=MPI.ANY_SOURCE, tag=0)
-                returned_data_list.append(returned_data)
-                parameters_success.append(success)
-                #Write worker log
-                fut.ensure_dir(os.path.split(logPath)[0])
-                with open(logPath, "a+") as log_f:
-                    log_f.write(worker_complete_log)
-                nb_completed_tasks += 1
-                if len(param_array) > 0:
-                    task_param = param_array.pop(0)
-                    mpi_service.comm.send(
-                        [job, task_param, logger_lvl, enable_console],
-                        dest=worker_rank,
-                        tag=0)
+            worker_ranks = list(range(1, mpi_service.size))
+            for rank in worker_ranks:
+                for file_name in [logPath, step_context["telemetry_file"]]:
+                    if os.path.exists(worker_file(file_name, rank)):
+                        os.remove(worker_file(file_name, rank))
+            if batch_size is None:
+                batch_size = tasks_batch_size(len(param_array),
+                                              len(worker_ranks))
+            # tasks using the same model (for instance) are preferably
+            # sent to the same worker, which caches it
+            batches = affinity_batches(param_array, batch_size,
+                                       iota2_step.task_affinity)
+            nb_batches = len(batches)
+            nb_completed_batches = 0
+            workers_keys = {}
+
+            def send_batch(worker_rank):
+                # the job is only sent with the first batch of the step
+                context = None
+                if worker_rank not in workers_with_job:
+                    context = step_context
+                    workers_with_job.add(worker_rank)
+                key, batch = batches.pop(
+                    select_batch(batches, workers_keys.get(worker_rank),
+                                 workers_keys.values()))
+                workers_keys[worker_rank] = key
+                mpi_service.comm.send([job_id, context, batch],
+                                      dest=worker_rank,
+                                      tag=0)
+
+            for rank in worker_ranks:
+                if batches:
+                    send_batch(rank)
+            while nb_completed_batches < nb_batches:
+                [worker_rank,
+                 results] = mpi_service.comm.recv(source=MPI.ANY_SOURCE,
+                                                  tag=0)
+                for returned_data, success in results:
+                    returned_data_list.append(returned_data)
+                    parameters_success.append(success)
+                nb_completed_batches += 1
+                if batches:
+                    send_batch(worker_rank)
         else:
             #if not lanch thanks to mpirun, launch each parameters one by one
             for param in param_array:
-                worker_log = sLog.Log_task(logger_lvl, enable_console)
-                worker_complete_log, start_date, end_date, returned_data, success = launchTask(
-                    job, param, worker_log)
-                fut.ensure_dir(os.path.split(logPath)[0])
-                with open(logPath, "a+") as log_f:
-                    log_f.write(worker_complete_log)
-                returned_data_list.append(returned_data)
-                parameters_success.append(success)
+                for returned_data, success in launch_batch(
+                        step_context["job"], [param], step_context):
+                    returned_data_list.append(returned_data)
+                    parameters_success.append(success)
     except KeyboardInterrupt:
         raise
     except Exception as e:
@@ -207,6 +390,14 @@ def mpi_schedule(iota2_step,
             traceback.print_exc()
             stop_workers(mpi_service)
             sys.exit(1)
+    finally:
+        # logs and telemetry of workers are also merged when the step
+        # failed, they are needed to diagnose it
+        if workers_with_job:
+            fut.ensure_dir(os.path.split(logPath)[0])
+            merge_worker_files(logPath, workers_with_job)
+            merge_worker_files(step_context["telemetry_file"],
+                               workers_with_job)
 
     step_completed = all(parameters_success)
     if step_completed:
@@ -220,6 +411,9 @@ def start_workers(mpi_service):
         # Sending started signal
         mpi_service.comm.send(mpi_service.rank, dest=0, tag=0)
         mpi_status = MPI.Status()
+        # job and settings of the current step
+        cached_job_id = None
+        cached_context = None
         while 1:
             # waiting sending works by master
             task = mpi_service.comm.recv(source=0,
@@ -228,21 +422,22 @@ def start_workers(mpi_service):
             if task is None:
                 sys.exit(0)
             # unpack task
-
-            [task_job, task_param, logger_lvl, enable_console] = task
-
-            worker_log = sLog.Log_task(logger_lvl, enable_console)
-            worker_complete_log, start_date, end_date, returned_data, success = launchTask(
-                task_job, task_param, worker_log, mpi_service)
-            mpi_service.comm.send([
-                mpi_service.rank,
-                [
-                    start_date, end_date, worker_complete_log, returned_data,
-                    success
-                ]
-            ],
-                                  dest=0,
-                                  tag=0)
+            [job_id, step_context, task_params] = task
+            if step_context is not None:
+                cached_job_id = job_id
+                cached_context = dict(step_context)
+                RasterProfile.set_output_profile(
+                    **step_context["output_profile"])
+                for file_name in ["log_file", "telemetry_file"]:
+                    cached_context[file_name] = worker_file(
+                        step_context[file_name], mpi_service.rank)
+            elif job_id != cached_job_id:
+                raise ValueError(
+                    "worker {} received a task of an unknown job".format(
+                        mpi_service.rank))
+            results = launch_batch(cached_context["job"], task_params,
+                                   cached_context, mpi_service)
+            mpi_service.comm.send([mpi_service.rank, results], dest=0, tag=0)
     else:
         nb_started_workers = 0
         while nb_started_workers < mpi_service.size - 1:
@@ -326,12 +521,17 @@ if __name__ == "__main__":
     args = parser.parse_args()
     cfg = SCF.serviceConfigFile(args.configPath)
     cfg.checkConfigParameters()
+    RasterProfile.set_output_profile(
+        compress=cfg.getParam('chain', 'output_compression'),
+        predictor=cfg.getParam('chain', 'output_predictor'),
+        overviews=cfg.getParam('chain', 'output_overviews'))
     chain_to_process = chain.iota2(cfg.pathConf, args.config_ressources)
     if os.path.exists(chain_to_process.iota2_pickle):
         chain_to_process = chain_to_process.load_chain()
 
     logger_lvl = cfg.getParam('chain', 'logFileLevel')
     enable_console = cfg.getParam('chain', 'enableConsole')
+    otb_profiling = cfg.getParam('chain', 'otb_profiling')
     param_index = args.param_index
     try:
         rm_tmp = cfg.getParam('chain', 'remove_tmp_files')
@@ -422,7 +622,8 @@ if __name__ == "__main__":
             logFile = (steps[step - 1].logFile).replace(
                 ".log", "_{}.log".format(param_index))
         _, step_completed = mpi_schedule(steps[step - 1], params, mpi_service,
-                                         logFile, logger_lvl)
+                                         logFile, logger_lvl,
+                                         otb_profiling=otb_profiling)
         if not step_completed:
             steps[step - 1].step_status = "fail"
             states = chain_to_process.print_step_summarize(key_init,
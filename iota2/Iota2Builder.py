@@ -147,7 +147,7 @@ class iota2():
             'classif', 'config_model', 'dataRegion', 'envelope',
             'formattingVectors', 'metaData', 'samplesSelection', 'stats',
             'cmd', 'dataAppVal', 'dimRed', 'final', 'learningSamples', 'model',
-            'shapeRegion', "features"
+            'shapeRegion', "features", "spatialIndex"
         ]
 
         iota2_outputs_dir = SCF.serviceConfigFile(self.cfg).getParam(
@@ -185,7 +185,8 @@ class iota2():
             genSyntheticSamples, samplesDimReduction, learnModel, classiCmd,
             classification, confusionSAROpt, confusionSAROptMerge,
             SAROptFusion, classificationsFusion, fusionsIndecisions, mosaic,
-            confusionCmd, confusionGeneration, confusionsMerge,
+            confusionCmd, compRefGeneration, confusionGeneration,
+            confusionsMerge, confusionSinglePass,
             reportGeneration, mergeSeedClassifications, additionalStatistics,
             additionalStatisticsMerge, sensorsPreprocess, Coregistration,
             Regularization, mergeRegularization, Clump, Grid, crownSearch,
@@ -212,6 +213,8 @@ class iota2():
             'argTrain', 'dempster_shafer_SAR_Opt_fusion')
         keep_runs_results = SCF.serviceConfigFile(cfg).getParam(
             'chain', 'keep_runs_results')
+        single_pass_confusion = SCF.serviceConfigFile(cfg).getParam(
+            'chain', 'single_pass_confusion')
         merge_final_classifications = SCF.serviceConfigFile(cfg).getParam(
             'chain', 'merge_final_classifications')
         ground_truth = SCF.serviceConfigFile(cfg).getParam(
@@ -300,10 +303,14 @@ class iota2():
 
         step_confusions_cmd = confusionCmd.confusionCmd(
             cfg, config_ressources, self.workingDirectory)
+        step_comp_ref = compRefGeneration.compRefGeneration(
+            cfg, config_ressources, self.workingDirectory)
         step_confusions = confusionGeneration.confusionGeneration(
             cfg, config_ressources, self.workingDirectory)
         step_confusions_merge = confusionsMerge.confusionsMerge(
             cfg, config_ressources, self.workingDirectory)
+        step_confusions_single_pass = confusionSinglePass.confusionSinglePass(
+            cfg, config_ressources, self.workingDirectory)
         step_report = reportGeneration.reportGeneration(
             cfg, config_ressources, self.workingDirectory)
         step_merge_iota_classif = mergeSeedClassifications.mergeSeedClassifications(
@@ -402,10 +409,16 @@ class iota2():
         s_container.append(step_mosaic, "mosaic")
 
         # validation steps
-        s_container.append(step_confusions_cmd, "validation")
+        if single_pass_confusion:
+            s_container.append(step_comp_ref, "validation")
+        else:
+            s_container.append(step_confusions_cmd, "validation")
         if keep_runs_results:
-            s_container.append(step_confusions, "validation")
-            s_container.append(step_confusions_merge, "validation")
+            if single_pass_confusion:
+                s_container.append(step_confusions_single_pass, "validation")
+            else:
+                s_container.append(step_confusions, "validation")
+                s_container.append(step_confusions_merge, "validation")
             s_container.append(step_report, "validation")
         if merge_final_classifications and runs > 1:
             s_container.append(step_merge_iota_classif, "validation")
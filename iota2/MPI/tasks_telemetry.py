@@ -0,0 +1,346 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# =========================================================================
+#   Program:   iota2
+#
+#   Copyright (c) CESBIO. All rights reserved.
+#
+#   See LICENSE for details.
+#
+#   This software is distributed WITHOUT ANY WARRANTY; without even
+#   the implied warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR
+#   PURPOSE.  See the above copyright notices for more information.
+#
+# =========================================================================
+"""
+Per-task resources telemetry and HPC resources file tuning.
+
+Every iota2 task is monitored (peak RSS, CPU time, I/O bytes, threads
+utilisation), records are appended to a JSON lines file shared by runs,
+each record holding the id of the step execution it belongs to. The
+command line of this module proposes a tuned resources file
+(see iota2_HPC_ressources_request.cfg) from the observed percentiles.
+"""
+import os
+import json
+import math
+import time
+import argparse
+import resource
+from collections import defaultdict
+from typing import Dict, List, Optional
+
+import numpy as np
+
+TELEMETRY_FILE_NAME = "tasks_telemetry.jsonl"
+
+
+def read_proc_io() -> Dict[str, int]:
+    """read bytes really fetched from / sent to the storage layer
+
+    Return an empty dictionnary if /proc/self/io is not available
+    """
+    io_counters = {}
+    try:
+        with open("/proc/self/io") as proc_io:
+            for line in proc_io:
+                key, value = line.split(":")
+                io_counters[key.strip()] = int(value)
+    except (OSError, ValueError):
+        pass
+    return io_counters
+
+
+def reset_peak_rss() -> bool:
+    """reset the peak RSS (VmHWM) of the current process (linux >= 4.0)
+
+    Workers are long-lived processes, without reset the peak RSS of a task
+    would be the peak RSS of every previous task.
+    """
+    try:
+        with open("/proc/self/clear_refs", "w") as clear_refs:
+            clear_refs.write("5")
+        return True
+    except OSError:
+        return False
+
+
+def current_peak_rss_kb() -> int:
+    """return the peak RSS (VmHWM) of the current process in kB"""
+    try:
+        with open("/proc/self/status") as proc_status:
+            for line in proc_status:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1])
+    except (OSError, ValueError, IndexError):
+        pass
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+class TaskMonitor():
+    """
+    Monitor resources consumed by a task run in the current process
+    (and its children processes)
+    """
+    def __init__(self,
+                 step_name: str,
+                 resource_block: str,
+                 nb_cpu: int,
+                 parameter,
+                 execution_id: Optional[str] = None):
+        self.step_name = step_name
+        self.execution_id = execution_id
+        self.resource_block = resource_block
+        self.parameter = str(parameter)
+        self.nb_cpu = int(nb_cpu)
+        self.start_wall = None
+        self.start_self = None
+        self.start_children = None
+        self.start_io = None
+
+    def start(self) -> None:
+        """start monitoring"""
+        reset_peak_rss()
+        self.start_io = read_proc_io()
+        self.start_self = resource.getrusage(resource.RUSAGE_SELF)
+        self.start_children = resource.getrusage(resource.RUSAGE_CHILDREN)
+        self.start_wall = time.time()
+
+    def stop(self, success: Optional[bool] = True) -> Dict:
+        """stop monitoring and return the task's record"""
+        wall_time = time.time() - self.start_wall
+        end_self = resource.getrusage(resource.RUSAGE_SELF)
+        end_children = resource.getrusage(resource.RUSAGE_CHILDREN)
+        end_io = read_proc_io()
+
+        cpu_time = sum(
+            getattr(end, field) - getattr(start, field)
+            for start, end in [(self.start_self, end_self),
+                               (self.start_children, end_children)]
+            for field in ["ru_utime", "ru_stime"])
+        if end_io and self.start_io:
+            read_bytes = end_io["read_bytes"] - self.start_io["read_bytes"]
+            write_bytes = end_io["write_bytes"] - self.start_io["write_bytes"]
+        else:
+            # block counters are expressed in 512 bytes units
+            read_bytes = 512 * (end_self.ru_inblock -
+                                self.start_self.ru_inblock)
+            write_bytes = 512 * (end_self.ru_oublock -
+                                 self.start_self.ru_oublock)
+        # children peak RSS can't be reset, only trust it if it grew
+        children_peak_kb = (end_children.ru_maxrss
+                            if end_children.ru_maxrss >
+                            self.start_children.ru_maxrss else 0)
+        thread_utilisation = cpu_time / (wall_time * self.nb_cpu
+                                         ) if wall_time > 0 else 0.0
+        return {
+            "step": self.step_name,
+            "execution_id": self.execution_id,
+            "resource_block": self.resource_block,
+            "parameter": self.parameter,
+            "success": success,
+            "host": os.uname()[1],
+            "pid": os.getpid(),
+            "start": self.start_wall,
+            "wall_time_s": wall_time,
+            "cpu_time_s": cpu_time,
+            "peak_rss_kb": max(current_peak_rss_kb(), children_peak_kb),
+            "read_bytes": read_bytes,
+            "write_bytes": write_bytes,
+            "nb_cpu_requested": self.nb_cpu,
+            "thread_utilisation": thread_utilisation
+        }
+
+
+def append_records(telemetry_file: str, records: List[Dict]) -> None:
+    """append task's records to the run-wide metrics store"""
+    if not records:
+        return
+    os.makedirs(os.path.dirname(os.path.abspath(telemetry_file)),
+                exist_ok=True)
+    with open(telemetry_file, "a") as store:
+        for record in records:
+            store.write(json.dumps(record) + "\n")
+
+
+def load_records(telemetry_files: List[str]) -> List[Dict]:
+    """load records from one or more metrics stores"""
+    records = []
+    for telemetry_file in telemetry_files:
+        with open(telemetry_file) as store:
+            for line in store:
+                line = line.strip()
+                if line:
+                    records.append(json.loads(line))
+    return records
+
+
+def format_walltime(seconds: float) -> str:
+    """seconds to HH:MM:SS"""
+    seconds = int(math.ceil(seconds))
+    return "{:02d}:{:02d}:{:02d}".format(seconds // 3600,
+                                         (seconds % 3600) // 60, seconds % 60)
+
+
+def propose_resources(records: List[Dict],
+                      percentile: Optional[float] = 95.0,
+                      ram_margin: Optional[float] = 1.2,
+                      walltime_margin: Optional[float] = 1.5,
+                      min_ram_gb: Optional[float] = 1.0,
+                      min_walltime_s: Optional[int] = 600
+                      ) -> Dict[str, Dict[str, str]]:
+    """compute resources request by resource block from tasks records
+
+    Parameters
+    ----------
+    records :
+        tasks records (see TaskMonitor.stop)
+    percentile :
+        percentile of the observed values used as reference
+    ram_margin :
+        multiplicative safety margin applied to the peak RSS percentile
+    walltime_margin :
+        multiplicative safety margin applied to the observed step duration
+    min_ram_gb :
+        minimum ram request (gb)
+    min_walltime_s :
+        minimum walltime request (seconds)
+    Return
+    ------
+    dict
+        {resource_block : {"nb_cpu":..., "ram":..., "walltime":...}}
+    """
+    by_block = defaultdict(list)
+    for record in records:
+        if record.get("success", True):
+            by_block[record["resource_block"]].append(record)
+
+    proposal = {}
+    for block, block_records in by_block.items():
+        peak_rss_gb = np.percentile(
+            [rec["peak_rss_kb"] for rec in block_records], percentile) / (
+                1024.0 * 1024.0)
+        # walltime is requested for the whole step, not for a single task.
+        # The store gathers every runs : the duration of each execution of
+        # the step is computed separately
+        by_execution = defaultdict(list)
+        for rec in block_records:
+            by_execution[rec.get("execution_id")].append(rec)
+        step_duration = max(
+            max(rec["start"] + rec["wall_time_s"]
+                for rec in execution_records) -
+            min(rec["start"] for rec in execution_records)
+            for execution_records in by_execution.values())
+        # mean number of busy cores during tasks
+        busy_cores = np.percentile([
+            rec["cpu_time_s"] / rec["wall_time_s"]
+            for rec in block_records if rec["wall_time_s"] > 0
+        ] or [1.0], percentile)
+        nb_cpu_requested = max(rec["nb_cpu_requested"]
+                               for rec in block_records)
+        nb_cpu = int(min(max(1, math.ceil(busy_cores)), nb_cpu_requested))
+        ram_gb = max(min_ram_gb, math.ceil(peak_rss_gb * ram_margin))
+        proposal[block] = {
+            "nb_cpu": nb_cpu,
+            "ram": "{}gb".format(int(ram_gb)),
+            "walltime":
+            format_walltime(
+                max(min_walltime_s, step_duration * walltime_margin)),
+            "nb_tasks": len(block_records)
+        }
+    return proposal
+
+
+def write_resources_file(reference_file: str, proposal: Dict[str, Dict],
+                         output_file: str) -> None:
+    """write a tuned resources file
+
+    Blocks of the reference file without records are kept as is.
+
+    Parameters
+    ----------
+    reference_file :
+        resources file used during the monitored run
+    proposal :
+        output of propose_resources
+    output_file :
+        tuned resources file
+    """
+    from config import Config
+    cfg_resources = Config(reference_file)
+    lines = [
+        "#" * 80, "#       Resources file tuned from observed tasks telemetry",
+        "#" * 80, ""
+    ]
+    for block in cfg_resources.keys():
+        block_cfg = getattr(cfg_resources, block)
+        values = {
+            "name": getattr(block_cfg, "name", block),
+            "nb_cpu": getattr(block_cfg, "nb_cpu", 1),
+            "ram": getattr(block_cfg, "ram", "5gb"),
+            "walltime": getattr(block_cfg, "walltime", "00:10:00")
+        }
+        comment = ""
+        if block in proposal:
+            values["nb_cpu"] = proposal[block]["nb_cpu"]
+            values["ram"] = proposal[block]["ram"]
+            values["walltime"] = proposal[block]["walltime"]
+            comment = " # tuned from {} tasks".format(
+                proposal[block]["nb_tasks"])
+        indent = " " * (len(block) + 2)
+        lines.append("{}:{{{}".format(block, comment))
+        lines.append('{}name : "{}"'.format(indent, values["name"]))
+        lines.append("{}nb_cpu : {}".format(indent, values["nb_cpu"]))
+        lines.append('{}ram : "{}"'.format(indent, values["ram"]))
+        lines.append('{}walltime : "{}"'.format(indent, values["walltime"]))
+        for optional in ["process_min", "process_max"]:
+            if optional in block_cfg:
+                lines.append("{}{} : {}".format(indent, optional,
+                                                getattr(block_cfg, optional)))
+        lines.append("{}}}".format(indent))
+        lines.append("")
+    with open(output_file, "w") as output:
+        output.write("\n".join(lines))
+
+
+if __name__ == "__main__":
+    PARSER = argparse.ArgumentParser(
+        description="propose a tuned HPC resources file from tasks telemetry")
+    PARSER.add_argument("-telemetry",
+                        dest="telemetry",
+                        help="tasks telemetry files (JSON lines)",
+                        nargs="+",
+                        required=True)
+    PARSER.add_argument("-config_ressources",
+                        dest="config_ressources",
+                        help="resources file used during the run",
+                        required=True)
+    PARSER.add_argument("-output",
+                        dest="output",
+                        help="output resources file",
+                        required=True)
+    PARSER.add_argument("-percentile",
+                        dest="percentile",
+                        help="observed values percentile",
+                        type=float,
+                        default=95.0,
+                        required=False)
+    PARSER.add_argument("-ram_margin",
+                        dest="ram_margin",
+                        help="safety margin applied to the RAM percentile",
+                        type=float,
+                        default=1.2,
+                        required=False)
+    PARSER.add_argument("-walltime_margin",
+                        dest="walltime_margin",
+                        help="safety margin applied to the walltime",
+                        type=float,
+                        default=1.5,
+                        required=False)
+    ARGS = PARSER.parse_args()
+    write_resources_file(
+        ARGS.config_ressources,
+        propose_resources(load_records(ARGS.telemetry), ARGS.percentile,
+                          ARGS.ram_margin, ARGS.walltime_margin),
+        ARGS.output)
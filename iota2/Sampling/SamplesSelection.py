@@ -211,6 +211,46 @@ def gen_raster_ref(vec, output_path, masks_name, working_directory):
     return raster_ref, tiles
 
 
+def get_model_parameters(model_name: str,
+                         parameters: Dict[str, Union[str, int, list]],
+                         data_field: str,
+                         random_seed: Optional[int] = None
+                         ) -> Dict[str, Union[str, int, list]]:
+    """
+    get SampleSelection otb's parameters dedicated to a model (considering
+    the 'per_model' strategies)
+
+    Parameters
+    ----------
+    model_name : string
+    parameters : dict
+        argTrain.sampleSelection parameters
+    data_field : string
+        data field
+    random_seed : int
+        random seed
+    """
+    per_model = None
+    # parameters = dict(cfg.getParam('argTrain', 'sampleSelection'))
+    # random_seed = cfg.getParam('chain', 'random_seed')
+    if random_seed is not None:
+        parameters["rand"] = random_seed
+
+    if "per_model" in parameters:
+        per_model = parameters["per_model"]
+        parameters.pop("per_model", None)
+
+    if per_model:
+        for strat in per_model:
+            if str(model_name.split("f")[0]) == str(strat["target_model"]):
+                parameters = dict(strat)
+                parameters.pop("target_model", None)
+
+    # parameters["field"] = (cfg.getParam('chain', 'dataField')).lower()
+    parameters["field"] = data_field.lower()
+    return parameters
+
+
 def get_sample_selection_param(
         model_name: str,
         stats: str,
@@ -241,24 +281,8 @@ def get_sample_selection_param(
     SampleSelection's parameters are define
     `here <http://www.orfeo-toolbox.org/Applications/SampleSelection.html>`_
     """
-    per_model = None
-    # parameters = dict(cfg.getParam('argTrain', 'sampleSelection'))
-    # random_seed = cfg.getParam('chain', 'random_seed')
-    if random_seed is not None:
-        parameters["rand"] = random_seed
-
-    if "per_model" in parameters:
-        per_model = parameters["per_model"]
-        parameters.pop("per_model", None)
-
-    if per_model:
-        for strat in per_model:
-            if str(model_name.split("f")[0]) == str(strat["target_model"]):
-                parameters = dict(strat)
-                parameters.pop("target_model", None)
-
-    # parameters["field"] = (cfg.getParam('chain', 'dataField')).lower()
-    parameters["field"] = data_field.lower()
+    parameters = get_model_parameters(model_name, parameters, data_field,
+                                      random_seed)
     parameters["vec"] = vec
     parameters["instats"] = stats
 
@@ -329,6 +353,305 @@ def split_sel(model_selection, tiles, working_directory, epsg):
     return out_tiles
 
 
+def read_stats(stats: str) -> Tuple[Dict[str, int], Dict[str, int]]:
+    """
+    read a PolygonClassStatistics xml file
+
+    Return
+    ------
+    tuple
+        (samples per class, samples per vector) dictionaries
+    """
+    import xml.etree.ElementTree as ET
+    tree = ET.parse(stats)
+    samples_per_class = {
+        val.attrib["key"]: int(val.attrib["value"])
+        for val in tree.getroot()[0].iter("StatisticMap")
+    }
+    samples_per_vector = {
+        val.attrib["key"]: int(val.attrib["value"])
+        for val in tree.getroot()[1].iter("StatisticMap")
+    }
+    return samples_per_class, samples_per_vector
+
+
+def get_tiles_counts(vec: str, samples_per_vector: Dict[str, int],
+                     data_field: str) -> Dict[str, Dict[str, Dict[str, int]]]:
+    """
+    dispatch polygons pixel count by tiles thanks to the 'tile_o' field
+
+    Parameters
+    ----------
+    vec : string
+        shapeFile containing all polygons dedicated to learn a model
+    samples_per_vector : dict
+        pixel count by polygon's FID (merged statistics)
+    data_field : string
+        data field
+
+    Return
+    ------
+    dict
+        {tile : {"class" : {class : count},
+                 "vector" : {FID in tile's vector : count}}}
+        polygons are numbered in the order they are read
+    """
+    from osgeo import ogr
+    tile_field_name = "tile_o"
+    driver = ogr.GetDriverByName("ESRI Shapefile")
+    data_source = driver.Open(vec, 0)
+    layer = data_source.GetLayer()
+    layer_defn = layer.GetLayerDefn()
+    layer.SetIgnoredFields([
+        layer_defn.GetFieldDefn(ind).GetName()
+        for ind in range(layer_defn.GetFieldCount())
+        if layer_defn.GetFieldDefn(ind).GetName().lower() not in
+        [tile_field_name, data_field.lower()]
+    ] + ["OGR_GEOMETRY"])
+    tiles_counts = {}
+    for feat in layer:
+        tile = feat.GetField(tile_field_name)
+        tile_counts = tiles_counts.setdefault(tile, {
+            "class": {},
+            "vector": {}
+        })
+        count = samples_per_vector.get(str(feat.GetFID()), 0)
+        # features are numbered as they will be in the tile's vector
+        tile_counts["vector"][str(len(tile_counts["vector"]))] = count
+        if count:
+            class_name = str(feat.GetField(data_field))
+            tile_counts["class"][class_name] = tile_counts["class"].get(
+                class_name, 0) + count
+    data_source = None
+    return tiles_counts
+
+
+def largest_remainder(target: int, weights: List[int]) -> List[int]:
+    """
+    dispatch 'target' proportionally to weights, each share being lower
+    or equal to its weight
+    """
+    import numpy as np
+    weights = np.array(weights, dtype=np.float64)
+    if target <= 0 or weights.sum() == 0:
+        return [0] * len(weights)
+    target = min(target, int(weights.sum()))
+    raw = target * weights / weights.sum()
+    shares = np.floor(raw).astype(np.int64)
+    remaining = int(target - shares.sum())
+    if remaining > 0:
+        shares[np.argsort(-(raw - shares), kind="stable")[:remaining]] += 1
+    return shares.tolist()
+
+
+def get_model_quotas(class_counts: Dict[str, int],
+                     parameters: Dict[str, Union[str, int, list]]
+                     ) -> Dict[str, int]:
+    """
+    compute the number of samples by class required by a SampleSelection
+    strategy
+
+    Parameters
+    ----------
+    class_counts : dict
+        available pixels by class
+    parameters : dict
+        SampleSelection parameters
+    """
+    strategy = parameters.get("strategy", "smallest")
+    classes = sorted(class_counts.keys())
+    if strategy == "all":
+        quotas = dict(class_counts)
+    elif strategy == "constant":
+        quotas = {
+            class_name: min(int(parameters["strategy.constant.nb"]),
+                            class_counts[class_name])
+            for class_name in classes
+        }
+    elif strategy == "percent":
+        quotas = {
+            class_name: min(
+                int(0.5 + float(parameters["strategy.percent.p"]) *
+                    class_counts[class_name]), class_counts[class_name])
+            for class_name in classes
+        }
+    elif strategy == "total":
+        quotas = dict(
+            zip(
+                classes,
+                largest_remainder(
+                    int(parameters["strategy.total.v"]),
+                    [class_counts[class_name] for class_name in classes])))
+    elif strategy == "byclass":
+        required = {}
+        with open(parameters["strategy.byclass.in"]) as byclass_file:
+            for line in byclass_file:
+                values = line.replace(",", " ").split()
+                if len(values) >= 2:
+                    required[str(int(values[0]))] = int(values[1])
+        quotas = {
+            class_name: min(required.get(class_name, 0),
+                            class_counts[class_name])
+            for class_name in classes
+        }
+    else:
+        smallest = min(class_counts.values()) if class_counts else 0
+        quotas = {class_name: smallest for class_name in classes}
+    return quotas
+
+
+def get_tiles_quotas(tiles_counts: Dict[str, Dict[str, Dict[str, int]]],
+                     parameters: Dict[str, Union[str, int, list]]
+                     ) -> Dict[str, Dict[str, int]]:
+    """
+    dispatch model's quotas (see get_model_quotas) across tiles
+    proportionally to their number of available pixels
+
+    Return
+    ------
+    dict
+        {tile : {class : number of samples to select}}
+    """
+    tiles = sorted(tiles_counts.keys())
+    class_counts = {}
+    for tile in tiles:
+        for class_name, count in tiles_counts[tile]["class"].items():
+            class_counts[class_name] = class_counts.get(class_name, 0) + count
+    model_quotas = get_model_quotas(class_counts, parameters)
+    tiles_quotas = {tile: {} for tile in tiles}
+    for class_name, quota in model_quotas.items():
+        shares = largest_remainder(quota, [
+            tiles_counts[tile]["class"].get(class_name, 0) for tile in tiles
+        ])
+        for tile, share in zip(tiles, shares):
+            if class_name in tiles_counts[tile]["class"]:
+                tiles_quotas[tile][class_name] = share
+    return tiles_quotas
+
+
+def tile_samples_selection(tile: str, vec: str, tile_counts: Dict[str, Dict],
+                           tile_quotas: Dict[str, int],
+                           parameters: Dict[str, Union[str, int, list]],
+                           masks_name: str, output_path: str,
+                           working_directory: str, runs: int) -> str:
+    """
+    select samples of a model in a tile, against the tile's own mask
+
+    Parameters
+    ----------
+    tile : string
+        tile's name
+    vec : string
+        shapeFile containing all polygons dedicated to learn a model
+    tile_counts : dict
+        pixels count in the tile (see get_tiles_counts)
+    tile_quotas : dict
+        number of samples to select by class
+    parameters : dict
+        SampleSelection parameters
+    masks_name : string
+        name of the tile's common mask
+    output_path : string
+        iota2 output directory
+    working_directory : string
+        path to a working directory
+    runs : int
+        number of random samples
+
+    Return
+    ------
+    string
+        path to the tile's selection
+    """
+    import collections
+    from iota2.Common import OtbAppBank
+    from iota2.Common.Utils import run
+
+    tile_field_name = "tile_o"
+    vec_name = os.path.splitext(os.path.basename(vec))[0]
+    tile_vec_name = "{}_{}".format(tile, vec_name)
+    tile_vec = os.path.join(working_directory, tile_vec_name + ".shp")
+    run(f"ogr2ogr -overwrite -where \"{tile_field_name}='{tile}'\" "
+        f"{tile_vec} {vec}")
+
+    tile_stats = os.path.join(working_directory, tile_vec_name + ".xml")
+    write_xml(
+        collections.OrderedDict(
+            sorted(tile_counts["class"].items(), key=lambda x: int(x[0]))),
+        collections.OrderedDict(tile_counts["vector"].items()), tile_stats)
+    tile_byclass = os.path.join(working_directory, tile_vec_name + ".csv")
+    with open(tile_byclass, "w") as byclass_file:
+        byclass_file.write("".join([
+            "{},{}\n".format(class_name, quota)
+            for class_name, quota in sorted(tile_quotas.items(),
+                                             key=lambda x: int(x[0]))
+        ]))
+
+    mask = fut.FileSearch_AND(os.path.join(output_path, "features", tile),
+                              True, masks_name)[0]
+    tile_parameters = {
+        key: value
+        for key, value in parameters.items() if not key.startswith("strategy")
+    }
+    tile_parameters.update({
+        "in": mask,
+        "vec": tile_vec,
+        "instats": tile_stats,
+        "strategy": "byclass",
+        "strategy.byclass.in": tile_byclass,
+        "out": os.path.join(working_directory,
+                            "{}_selection.sqlite".format(tile_vec_name))
+    })
+    sample_sel_app = OtbAppBank.CreateSampleSelectionApplication(
+        tile_parameters)
+    sample_sel_app.ExecuteAndWriteOutput()
+    update_flags(tile_parameters["out"], runs)
+
+    for ext in [".shp", ".shx", ".dbf", ".prj", ".xml", ".csv"]:
+        if os.path.exists(os.path.join(working_directory,
+                                       tile_vec_name + ext)):
+            os.remove(os.path.join(working_directory, tile_vec_name + ext))
+    return tile_parameters["out"]
+
+
+def samples_selection_by_tiles(model_name: str, merged_stats: str, vec: str,
+                               working_directory: str,
+                               parameters: Dict[str, Union[str, int, list]],
+                               data_field: str, masks_name: str,
+                               output_path: str, runs: int,
+                               random_seed: Optional[int] = None,
+                               nb_workers: Optional[int] = 1,
+                               logger=LOGGER) -> List[str]:
+    """
+    select samples of a model tile by tile, without any merged reference
+    raster. Model's quotas are computed from merged polygons statistics
+    and dispatched across tiles, then tiles are processed in parallel.
+
+    Return
+    ------
+    list
+        selections by tiles
+    """
+    import multiprocessing as mp
+
+    parameters = get_model_parameters(model_name, parameters, data_field,
+                                      random_seed)
+    _, samples_per_vector = read_stats(merged_stats)
+    tiles_counts = get_tiles_counts(vec, samples_per_vector, data_field)
+    tiles_quotas = get_tiles_quotas(tiles_counts, parameters)
+    logger.debug(f"samples by tiles : {print_dict(tiles_quotas)}")
+
+    tiles_args = [(tile, vec, tiles_counts[tile], tiles_quotas[tile],
+                   parameters, masks_name, output_path, working_directory,
+                   runs) for tile in sorted(tiles_counts.keys())]
+    if nb_workers > 1 and len(tiles_args) > 1:
+        with mp.Pool(processes=min(nb_workers, len(tiles_args))) as pool:
+            sel_tiles = pool.starmap(tile_samples_selection, tiles_args)
+    else:
+        sel_tiles = [tile_samples_selection(*args) for args in tiles_args]
+    return sel_tiles
+
+
 def print_dict(dico):
     """
     usage : use to print some dictionnary
@@ -378,6 +701,8 @@ def samples_selection(model: str,
                       parameters: Dict[str, Union[str, int, list]],
                       data_field: str,
                       random_seed: Optional[int] = None,
+                      by_tiles: Optional[bool] = False,
+                      nb_workers: Optional[int] = 1,
                       logger=LOGGER):
     """
     compute sample selection.
@@ -390,6 +715,10 @@ def samples_selection(model: str,
     cfg : ServiceConfigFile object
     working_directory : string
         Path to a working directory
+    by_tiles : bool
+        select samples tile by tile (see samples_selection_by_tiles)
+    nb_workers : int
+        number of tiles processed in parallel if by_tiles is set
     logger : logging object
         root logger
     """
@@ -417,6 +746,17 @@ def samples_selection(model: str,
                                "seed_" + str(seed))
     merge_write_stats(stats, merged_stats)
 
+    if by_tiles:
+        sel_tiles = samples_selection_by_tiles(model_name, merged_stats, model,
+                                               wdir, parameters, data_field,
+                                               masks_name, output_path, runs,
+                                               random_seed, nb_workers, logger)
+        logger.info("sample selection terminated")
+        if working_directory:
+            for sel_tile in sel_tiles:
+                shutil.copy(sel_tile, samples_sel_dir)
+        return
+
     # samples Selection
     sel_parameters, tiles_model = get_sample_selection_param(
         model_name, merged_stats, model, wdir, parameters, data_field,
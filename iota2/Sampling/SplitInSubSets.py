@@ -16,7 +16,7 @@
 
 import logging
 import argparse
-import random
+import numpy as np
 # from osgeo import gdal
 from osgeo import ogr
 # from osgeo import osr
@@ -27,6 +27,194 @@ from iota2.Common import FileUtils as fut
 logger = logging.getLogger(__name__)
 
 
+def read_split_attributes(layer, field, regionField, with_area=False):
+    """
+    read FID, class, region and area (if needed) of every features in a
+    single layer scan
+
+    Parameters
+    ----------
+    layer : OGR layer
+    field : string
+        data field
+    regionField : string
+        region field
+    with_area : bool
+        read geometries to compute features area
+
+    Returns
+    -------
+    tuple(fids, class_labels, regions, areas)
+        where fids is the array of features ID, class_labels and regions
+        arrays of features class and region (None if not set) and areas the
+        array of features area (None if with_area is False)
+    """
+    layer_defn = layer.GetLayerDefn()
+    ignored_fields = [
+        layer_defn.GetFieldDefn(ind).GetName()
+        for ind in range(layer_defn.GetFieldCount())
+        if layer_defn.GetFieldDefn(ind).GetName() not in [field, regionField]
+    ]
+    if not with_area:
+        ignored_fields.append("OGR_GEOMETRY")
+    layer.SetIgnoredFields(ignored_fields)
+    layer.SetAttributeFilter(None)
+    layer.ResetReading()
+    fids = []
+    class_labels = []
+    regions = []
+    areas = []
+    for feat in layer:
+        fids.append(feat.GetFID())
+        class_labels.append(feat.GetField(field))
+        regions.append(feat.GetField(regionField))
+        if with_area:
+            areas.append(feat.GetGeometryRef().GetArea())
+    layer.SetIgnoredFields([])
+    layer.ResetReading()
+    return (np.array(fids, dtype=np.int64),
+            np.array(class_labels, dtype=object),
+            np.array(regions, dtype=object),
+            np.array(areas, dtype=np.float64) if with_area else None)
+
+
+def get_groups(class_labels, regions, classes=None, regions_avail=None):
+    """
+    compute the (region, class) group index of every features
+
+    Parameters
+    ----------
+    class_labels : np.array
+        class of each feature
+    regions : np.array
+        region of each feature
+    classes : list
+        classes to consider, every classes if None
+    regions_avail : list
+        regions to consider, every regions if None
+
+    Returns
+    -------
+    np.array
+        group index of each features, -1 if the feature is not considered
+    """
+    classes = None if classes is None else set(int(cl) for cl in classes)
+    regions_avail = None if regions_avail is None else set(
+        str(region) for region in regions_avail)
+    keys = []
+    for class_label, region in zip(class_labels, regions):
+        if (class_label is None or region is None
+                or (classes is not None and int(class_label) not in classes)
+                or (regions_avail is not None
+                    and str(region) not in regions_avail)):
+            keys.append("")
+        else:
+            keys.append("{}\x00{}".format(region, int(class_label)))
+    unique_keys, groups = np.unique(np.array(keys, dtype=str),
+                                    return_inverse=True)
+    groups = groups.astype(np.int64)
+    if len(unique_keys) and unique_keys[0] == "":
+        # features not considered
+        groups -= 1
+    return groups
+
+
+def rank_in_groups(groups, keys):
+    """
+    rank of each element inside its group, elements of a group are sorted
+    according to keys
+
+    Parameters
+    ----------
+    groups : np.array
+        group index of each element (>= 0)
+    keys : np.array
+        sorting keys
+
+    Returns
+    -------
+    tuple(ranks, counts)
+        where ranks is the rank of each element in its group and counts the
+        number of elements of each group
+    """
+    order = np.lexsort((keys, groups))
+    counts = np.bincount(groups)
+    starts = np.cumsum(counts) - counts
+    ranks = np.empty(len(groups), dtype=np.int64)
+    ranks[order] = np.arange(len(groups)) - np.repeat(starts, counts)
+    return ranks, counts
+
+
+def random_split(groups, ratio, rng):
+    """
+    randomly draw round(ratio * group size) learning elements (at least one)
+    in every groups
+
+    Parameters
+    ----------
+    groups : np.array
+        group index of each element (>= 0)
+    ratio : float
+        ratio number of learning elements / number of elements
+    rng : np.random.RandomState
+        random generator
+
+    Returns
+    -------
+    np.array
+        boolean array, True for learning elements
+    """
+    ranks, counts = rank_in_groups(groups, rng.random_sample(len(groups)))
+    nb_learn = np.maximum(1, np.round(counts * float(ratio)))
+    return ranks < nb_learn[groups]
+
+
+def area_balanced_folds(groups, areas, folds, rng):
+    """
+    split every groups in 'folds' folds of similar total area. Elements of a
+    group are sorted by decreasing area then consecutive blocks of 'folds'
+    elements are randomly dispatched across folds (see splitByArea)
+
+    Parameters
+    ----------
+    groups : np.array
+        group index of each element (>= 0)
+    areas : np.array
+        area of each element
+    folds : int
+        number of folds
+    rng : np.random.RandomState
+        random generator
+
+    Returns
+    -------
+    np.array
+        fold index of each element
+    """
+    area_ranks, _ = rank_in_groups(groups, -areas)
+    blocks = groups * (area_ranks.max() + 1 if len(area_ranks) else 1
+                       ) + area_ranks // folds
+    fold_index, _ = rank_in_groups(
+        np.unique(blocks, return_inverse=True)[1],
+        rng.random_sample(len(groups)))
+    return fold_index
+
+
+def clone_features(layer, fids):
+    """
+    duplicate features, return FIDs of new features
+    """
+    new_fids = []
+    layer.StartTransaction()
+    for fid in fids:
+        feature_clone = layer.GetFeature(int(fid)).Clone()
+        feature_clone.SetFID(ogr.NullFID)
+        layer.CreateFeature(feature_clone)
+        new_fids.append(feature_clone.GetFID())
+    layer.CommitTransaction()
+    return np.array(new_fids, dtype=np.int64)
+
+
 def get_random_poly(layer,
                     field,
                     classes,
@@ -58,51 +246,29 @@ def get_random_poly(layer,
         where sample_id_learn is a set of polygon's ID dedicated to learn models
         where sample_id_valid is a set of polygon's ID dedicated to validate models
     """
-    sample_id_learn = []
-    sample_id_valid = []
-    layer.ResetReading()
-    for region in regions:
-        for cl in classes:
-            listid = []
-            layer.SetAttributeFilter(None)
-            attrib_filter = "{}={} AND {}='{}'".format(field, cl, regionField,
-                                                       region)
-            layer.SetAttributeFilter(attrib_filter)
-            featureCount = float(layer.GetFeatureCount())
-            if featureCount == 1:
-                for feat in layer:
-                    _id = feat.GetFID()
-                    sample_id_learn.append(_id)
-                    feature_clone = feat.Clone()
-                    layer.CreateFeature(feature_clone)
-                    sample_id_valid.append(feature_clone.GetFID())
-                    break
-
-            elif featureCount > 1:
-                polbysel = round(featureCount * float(ratio))
-                if polbysel <= 1:
-                    polbysel = 1
-                for feat in layer:
-                    _id = feat.GetFID()
-                    listid.append(_id)
-                    listid.sort()
-
-                random.seed(random_seed)
-                random_id_learn = random.sample(listid, int(polbysel))
-                sample_id_learn += [fid for fid in random_id_learn]
-                sample_id_valid += [
-                    currentFid for currentFid in listid
-                    if currentFid not in sample_id_learn
-                ]
-
-    sample_id_learn.sort()
-    sample_id_valid.sort()
+    fids, class_labels, region_labels, _ = read_split_attributes(
+        layer, field, regionField)
+    groups = get_groups(class_labels, region_labels, classes, regions)
+    fids = fids[groups >= 0]
+    groups = groups[groups >= 0]
 
-    layer.SetAttributeFilter(None)
-    return set(sample_id_learn), set(sample_id_valid)
+    learn = random_split(groups, ratio, np.random.RandomState(random_seed))
+    single = np.bincount(groups)[groups] == 1 if len(groups) else learn
+    # a polygon alone in its group is used for learning, its copy for
+    # validation
+    clones = clone_features(layer, fids[single])
+    sample_id_learn = set(fids[learn].tolist())
+    sample_id_valid = set(fids[~learn].tolist()) | set(clones.tolist())
+    return sample_id_learn, sample_id_valid
 
 
-def get_CrossValId(layer, dataField, classes, seeds, regionField, regions):
+def get_CrossValId(layer,
+                   dataField,
+                   classes,
+                   seeds,
+                   regionField,
+                   regions,
+                   random_seed=None):
     """
     use to split samples in 'seeds' folds in order to perform cross-validation methods
     
@@ -120,30 +286,59 @@ def get_CrossValId(layer, dataField, classes, seeds, regionField, regions):
         list containing all available regions (as string) in the layer 
     seeds : int
         number of folds
+    random_seed : int
+        random seed
     
     Return
     ------
     list
         a list of size 'seeds' containing FIDs list
     """
-    from iota2.VectorTools import splitByArea
+    fids, class_labels, region_labels, areas = read_split_attributes(
+        layer, dataField, regionField, with_area=True)
+    groups = get_groups(class_labels, region_labels, classes, regions)
+    defined = groups >= 0
+    folds = area_balanced_folds(groups[defined], areas[defined], seeds,
+                                np.random.RandomState(random_seed))
+    return [
+        fids[defined][folds == fold_num].tolist() for fold_num in range(seeds)
+    ]
 
-    id_sets = [[] for i in range(seeds)]
-    layer.ResetReading()
-    for region in regions:
-        for cl in classes:
-            listid = []
-            layer.SetAttributeFilter(None)
-            attrib_filter = "{}={} AND {}='{}'".format(dataField, cl,
-                                                       regionField, region)
-            layer.SetAttributeFilter(attrib_filter)
-            fid_area = [(f.GetFID(), f.GetGeometryRef().GetArea())
-                        for f in layer]
-            region_class_id, _ = splitByArea.splitByArea(fid_area, seeds)
-            for fold_num, fold in enumerate(region_class_id):
-                id_sets[fold_num] += [cFID for cFID, cArea in fold]
+
+def write_seeds_fields(layer, fids, seeds_flags, seed_fields_names):
+    """
+    write every seed fields in a single layer scan and transaction
+
+    Parameters
+    ----------
+    layer : OGR layer
+    fids : np.array
+        features ID
+    seeds_flags : list
+        for each seed, an array of flags (one by feature in fids)
+    seed_fields_names : list
+        name of seed fields
+    """
+    row_from_fid = {fid: row for row, fid in enumerate(fids.tolist())}
+    fields_index = [
+        layer.GetLayerDefn().GetFieldIndex(field_name)
+        for field_name in seed_fields_names
+    ]
     layer.SetAttributeFilter(None)
-    return id_sets
+    layer.ResetReading()
+    layer.StartTransaction()
+    for feat in layer:
+        row = row_from_fid.get(feat.GetFID())
+        if row is None:
+            continue
+        for field_index, flags in zip(fields_index, seeds_flags):
+            flag = flags[row]
+            if flag is None:
+                feat.UnsetField(field_index)
+            else:
+                feat.SetField(field_index, flag)
+        layer.SetFeature(feat)
+    layer.CommitTransaction()
 
 
 def splitInSubSets(vectoFile,
@@ -163,6 +358,9 @@ def splitInSubSets(vectoFile,
     of training and validations samples by adding a new field
     by subsets (seed_X) containing 'learn', 'validation' or 'unused'
 
+    Features are read once, splits of every seeds are drawn by (region, class)
+    groups then written in a single transaction.
+
     Parameters
     ----------
     
@@ -195,63 +393,58 @@ def splitInSubSets(vectoFile,
     source = driver.Open(vectoFile, 1)
     layer = source.GetLayer(0)
 
-    class_avail = fut.getFieldElement(vectoFile,
-                                      driverName=driver_name,
-                                      field=dataField,
-                                      mode="unique",
-                                      elemType="int")
-    region_avail = fut.getFieldElement(vectoFile,
-                                       driverName=driver_name,
-                                       field=regionField,
-                                       mode="unique",
-                                       elemType="str")
     all_fields = fut.get_all_fields_in_shape(vectoFile, driver=driver_name)
+    seed_fields_names = ["seed_" + str(seed) for seed in range(seeds)]
+    for seed_field_name in seed_fields_names:
+        if seed_field_name not in all_fields:
+            layer.CreateField(ogr.FieldDefn(seed_field_name, ogr.OFTString))
 
-    fid_area = [(f.GetFID(), f.GetGeometryRef().GetArea()) for f in layer]
-    fid = [fid_ for fid_, area in fid_area]
-
-    id_learn = []
-    id_val = []
+    fids, class_labels, region_labels, areas = read_split_attributes(
+        layer, dataField, regionField, with_area=crossValidation)
+    groups = get_groups(class_labels, region_labels)
+    defined = groups >= 0
+    seeds_flags = []
     if crossValidation:
-        id_CrossVal = get_CrossValId(layer, dataField, class_avail, seeds,
-                                     regionField, region_avail)
-    for seed in range(seeds):
-        source = driver.Open(vectoFile, 1)
-        layer = source.GetLayer(0)
-
-        seed_field_name = "seed_" + str(seed)
-        seed_field = ogr.FieldDefn(seed_field_name, ogr.OFTString)
-
-        if seed_field_name not in all_fields:
-            layer.CreateField(seed_field)
-        if crossValidation is False:
+        folds = np.full(len(fids), -1, dtype=np.int64)
+        folds[defined] = area_balanced_folds(
+            groups[defined], areas[defined], seeds,
+            np.random.RandomState(random_seed))
+        for seed in range(seeds):
+            learn_flag = validationFlag if seed == seeds - 1 else learningFlag
+            flags = np.full(len(fids), unusedFlag, dtype=object)
+            flags[folds == seed] = learn_flag
+            seeds_flags.append(flags)
+    else:
+        # when the ground truth is split, a polygon alone in its group is
+        # used for learning, its copy for validation
+        single = np.zeros(len(fids), dtype=bool)
+        if splitGroundTruth:
+            single[defined] = np.bincount(
+                groups[defined])[groups[defined]] == 1
+        clones = clone_features(layer, fids[single])
+        fids = np.concatenate((fids, clones))
+        groups = np.concatenate((groups, groups[single]))
+        defined = np.concatenate((defined, np.ones(len(clones), dtype=bool)))
+        is_clone = np.zeros(len(fids), dtype=bool)
+        is_clone[len(fids) - len(clones):] = True
+        for seed in range(seeds):
             random_seed_number = None
             if random_seed is not None:
                 random_seed_number = random_seed + seed
-            id_learn, id_val = get_random_poly(layer, dataField, class_avail,
-                                               ratio, regionField,
-                                               region_avail,
-                                               random_seed_number)
-        else:
-            id_learn = id_CrossVal[seed]
-
-        if splitGroundTruth is False:
-            id_learn = id_learn.union(id_val)
-        for i in fid:
-            flag = None
-            if i in id_learn:
-                flag = learningFlag
-                if seed == seeds - 1 and crossValidation:
-                    flag = validationFlag
-            elif crossValidation:
-                flag = unusedFlag
-            elif i in id_val:
-                flag = validationFlag
-
-            feat = layer.GetFeature(i)
-            feat.SetField(seed_field_name, flag)
-            layer.SetFeature(feat)
-        i = layer = None
+            learn = np.zeros(len(fids), dtype=bool)
+            draw = defined & ~is_clone
+            learn[draw] = random_split(
+                groups[draw], ratio,
+                np.random.RandomState(random_seed_number))
+            flags = np.full(len(fids), None, dtype=object)
+            flags[defined] = validationFlag
+            if splitGroundTruth is False:
+                flags[defined] = learningFlag
+            else:
+                flags[learn] = learningFlag
+            seeds_flags.append(flags)
+    write_seeds_fields(layer, fids, seeds_flags, seed_fields_names)
+    layer = source = None
 
 
 if __name__ == "__main__":
@@ -15,7 +15,7 @@
 import os
 import numpy as np
 import logging
-from typing import List, Dict, Tuple, Optional, Generator, TypeVar
+from typing import List, Dict, Tuple, Optional, Generator, Iterator, TypeVar
 
 LOGGER = logging.getLogger(__name__)
 LOGGER.addHandler(logging.NullHandler())
@@ -87,9 +87,9 @@ def choosable_annual_pixels(classification_raster: str, validity_raster: str,
         mask : numpy.array
             numpy array where non 0 are choosable pixels
         Ox : float
-            x origin
+            x coordinate of the center of the upper left pixel
         Oy : float
-            y origin
+            y coordinate of the center of the upper left pixel
         spx : float
             x spacing
         spy : float
@@ -131,66 +131,66 @@ def choosable_annual_pixels(classification_raster: str, validity_raster: str,
         "exp": "im1b1*(im2b1>=1?1:0)"
     })
     choosable.Execute()
-    oy, ox = choosable.GetImageOrigin("out")
+    ox, oy = choosable.GetImageOrigin("out")
     spx, spy = choosable.GetImageSpacing("out")
     return choosable.GetImageAsNumpyArray("out"), (ox, oy, spx, spy)
 
 
-def move_annual_samples_from_array(samples_position, target_label, dataField,
-                                   samples_number, array, ox, oy, spx, spy,
-                                   tile_origin_field_value, seed_field_value,
-                                   region_field_value):
-    """
-    """
-    import numpy as np
-    import random
-    from osgeo import ogr
-
-    x_coords, y_coords = np.where(array == target_label)
-    #~ y_coords, x_coords = np.where(array==target_label)
-    samples_number = samples_number if len(y_coords) > samples_number else len(
-        y_coords)
-
-    geo_coordinates = []
-    for y_coord, x_coord in zip(y_coords, x_coords):
-        x_geo = (ox + spx) - spx * (x_coord + 1)
-        y_geo = (oy + spy) - spy * (y_coord + 1)
+def annual_samples_coordinates(array: np.ndarray, target_label: int,
+                               samples_number: int, ox: float, oy: float,
+                               spx: float, spy: float,
+                               rng: np.random.RandomState
+                               ) -> Tuple[np.ndarray, np.ndarray]:
+    """randomly pick up pixels of a label and return their geographical
+    coordinates
 
-        geo_coordinates.append((x_geo, y_geo))
-
-    random_coords = random.sample(geo_coordinates, samples_number)
+    Parameters
+    ----------
+    array : np.array
+        2D array of choosable pixels (see choosable_annual_pixels)
+    target_label : int
+        label of pixels to pick up
+    samples_number : int
+        number of pixels to pick up, every pixels are picked up if there
+        are less choosable pixels
+    ox : float
+        x coordinate of the center of the upper left pixel
+    oy : float
+        y coordinate of the center of the upper left pixel
+    spx : float
+        x spacing
+    spy : float
+        y spacing
+    rng : np.random.RandomState
+        random generator
 
-    #seek and destroy samples
-    driver = ogr.GetDriverByName("SQLite")
-    dataSource = driver.Open(samples_position, 1)
-    layer = dataSource.GetLayer()
-    for feature in layer:
-        if feature.GetField(dataField) == target_label:
-            layer.DeleteFeature(feature.GetFID())
-    # add new samples according to random_coords
-    for x_geo, y_geo in random_coords:
-        feature = ogr.Feature(layer.GetLayerDefn())
-        feature.SetField(dataField, int(target_label))
-        feature.SetField(tile_origin_field_value[0],
-                         tile_origin_field_value[1])
-        feature.SetField(seed_field_value[0], seed_field_value[1])
-        feature.SetField(region_field_value[0], region_field_value[1])
-
-        point = ogr.CreateGeometryFromWkt("POINT({} {})".format(y_geo, x_geo))
-        #~ point = ogr.CreateGeometryFromWkt("POINT({} {})".format(y_geo, x_geo))
-        feature.SetGeometry(point)
-        layer.CreateFeature(feature)
-        feature = None
-    dataSource = None
+    Return
+    ------
+    tuple
+        (x coordinates, y coordinates) arrays
+    """
+    candidates = np.flatnonzero(array == target_label)
+    samples_number = min(samples_number, candidates.size)
+    if samples_number == 0:
+        return np.empty(0), np.empty(0)
+    picked = candidates[rng.choice(candidates.size,
+                                   samples_number,
+                                   replace=False)]
+    rows, cols = np.divmod(picked, array.shape[-1])
+    return ox + spx * cols, oy + spy * rows
 
 
 def move_annual_samples_position(samples_position, dataField, annual_labels,
                                  classification_raster, validity_raster,
                                  region_mask, validity_threshold,
                                  tile_origin_field_value, seed_field_value,
-                                 region_field_value):
+                                 region_field_value, random_seed=0):
     """move samples position of labels of interest according to rasters
-    
+
+    samples of annual labels are removed by a single request, then new
+    samples, randomly picked up among choosable pixels, are added in a
+    single transaction
+
     Parameters
     ----------
     samples_position : string
@@ -207,46 +207,83 @@ def move_annual_samples_position(samples_position, dataField, annual_labels,
         path to region mask raster
     validity_threshold : int
         cloud threshold to pick up samples
+    tile_origin_field_value : tuple
+        (field, value) of the tile origin of new samples
+    seed_field_value : tuple
+        (field, value) of the seed of new samples
+    region_field_value : tuple
+        (field, value) of the region of new samples
+    random_seed : int
+        random seed
     """
-    import collections
-    from Common.FileUtils import getFieldElement
+    from osgeo import ogr
 
-    annual_labels = map(int, annual_labels)
-    class_repartition = getFieldElement(samples_position,
-                                        driverName="SQLite",
-                                        field=dataField,
-                                        mode="all",
-                                        elemType="int")
-    class_repartition = collections.Counter(class_repartition)
+    annual_labels = sorted(set(map(int, annual_labels)))
+    if not annual_labels:
+        return
+    labels_sql = ", ".join(map(str, annual_labels))
+
+    driver = ogr.GetDriverByName("SQLite")
+    data_source = driver.Open(samples_position, 1)
+    layer_name = data_source.GetLayer().GetName()
+    class_repartition = {}
+    counts = data_source.ExecuteSQL(
+        'SELECT "{field}", COUNT(*) FROM "{layer}" WHERE "{field}" IN ({labels}) '
+        'GROUP BY "{field}"'.format(field=dataField,
+                                    layer=layer_name,
+                                    labels=labels_sql))
+    for feature in counts:
+        class_repartition[int(feature.GetField(0))] = feature.GetField(1)
+    data_source.ReleaseResultSet(counts)
+    if not class_repartition:
+        data_source = None
+        return
 
     mask_array, (ox, oy, spx,
                  spy) = choosable_annual_pixels(classification_raster,
                                                 validity_raster, region_mask,
                                                 validity_threshold)
-    for annual_label in annual_labels:
-        if annual_label in class_repartition:
-            samples_number = class_repartition[annual_label]
-            move_annual_samples_from_array(samples_position, annual_label,
-                                           dataField, samples_number,
-                                           mask_array, ox, oy, spx, spy,
-                                           tile_origin_field_value,
-                                           seed_field_value,
-                                           region_field_value)
-        else:
-            continue
+    rng = np.random.RandomState(random_seed)
+    new_samples = [(label,
+                    annual_samples_coordinates(mask_array, label,
+                                               samples_number, ox, oy, spx,
+                                               spy, rng))
+                   for label, samples_number in sorted(
+                       class_repartition.items())]
+
+    # seek and destroy samples
+    data_source.ExecuteSQL('DELETE FROM "{}" WHERE "{}" IN ({})'.format(
+        layer_name, dataField, labels_sql))
+    # add new samples
+    layer = data_source.GetLayer()
+    layer_defn = layer.GetLayerDefn()
+    layer.StartTransaction()
+    for label, (x_geo, y_geo) in new_samples:
+        for x_coord, y_coord in zip(x_geo.tolist(), y_geo.tolist()):
+            feature = ogr.Feature(layer_defn)
+            feature.SetField(dataField, label)
+            feature.SetField(tile_origin_field_value[0],
+                             tile_origin_field_value[1])
+            feature.SetField(seed_field_value[0], seed_field_value[1])
+            feature.SetField(region_field_value[0], region_field_value[1])
+            point = ogr.Geometry(ogr.wkbPoint)
+            point.AddPoint_2D(x_coord, y_coord)
+            feature.SetGeometry(point)
+            layer.CreateFeature(feature)
+    layer.CommitTransaction()
+    data_source = layer = None
 
 
 def SP_geo_coordinates_with_value(coordinates: Tuple[y_coords, x_coords],
                                   SP_array: np.ndarray, x_origin: float,
                                   y_origin: float, x_size: float, y_size: float
-                                  ) -> Generator[float, float, float]:
-    """generator
-    convert tabular coordinates to geographical
+                                  ) -> Iterator[Tuple[float, float, float]]:
+    """convert tabular coordinates to geographical
 
     Parameters
     ----------
     coordinates: tuple
-        tuple of coordinates (lists) to convert
+        tuple of coordinates (arrays) to convert
     SP_array: np.array
         numpy array to extract value
     x_origin: float
@@ -260,16 +297,14 @@ def SP_geo_coordinates_with_value(coordinates: Tuple[y_coords, x_coords],
 
     Return
     ------
-    tuple(y_geo_coordinates, x_geo_coordinates, array_value)
+    iterator of tuple(y_geo_coordinates, x_geo_coordinates, array_value)
     """
-    offset_y = y_size / 2.0
-    offset_x = x_size / 2.0
-
-    for y_coord, x_coord in zip(coordinates[0], coordinates[1]):
-        y_geo = y_origin + offset_y + y_size * y_coord
-        x_geo = x_origin + offset_x + x_size * x_coord
-        value = SP_array[y_coord][x_coord]
-        yield (y_geo, x_geo, value)
+    y_coord = np.asarray(coordinates[0], dtype=np.int64)
+    x_coord = np.asarray(coordinates[1], dtype=np.int64)
+    y_geo = y_origin + y_size / 2.0 + y_size * y_coord
+    x_geo = x_origin + x_size / 2.0 + x_size * x_coord
+    return zip(y_geo.tolist(), x_geo.tolist(),
+               SP_array[y_coord, x_coord].tolist())
 
 
 def super_pixels_coordinates(input_vector: str,
@@ -409,10 +444,11 @@ def add_SP_to_ref(reference: str,
     layer = data_source.GetLayer()
 
     feture_defn = layer.GetLayerDefn()
+    layer.StartTransaction()
     for y_coord, x_coord, value in coordinates:
         new_feature = ogr.Feature(feture_defn)
-        wkt = "POINT({} {})".format(x_coord, y_coord)
-        point = ogr.CreateGeometryFromWkt(wkt)
+        point = ogr.Geometry(ogr.wkbPoint)
+        point.AddPoint_2D(x_coord, y_coord)
         new_feature.SetGeometry(point)
         new_feature.SetField(SP_field, int(value))
         new_feature.SetField("seed_{}".format(seed_number), learn_flag)
@@ -420,6 +456,7 @@ def add_SP_to_ref(reference: str,
         new_feature.SetField("tile_o", tile_origin)
         new_feature.SetField(SP_belong_field, 1)
         layer.CreateFeature(new_feature)
+    layer.CommitTransaction()
     data_source = layer = None
 
 
@@ -16,14 +16,12 @@
 
 import argparse
 import os
-import shutil
 from typing import List
 
 from osgeo import gdal
 from osgeo import ogr
 from osgeo import osr
 from osgeo.gdalconst import *
-from iota2.Common import FileUtils as fu
 """
 It's in this script that tile's priority are manage. This priority use tile origin. If you want to change priority, you have to modify
 these functions :
@@ -81,91 +79,47 @@ class Tile(object):
         self.y = yVal
 
 
-def createShape(minX, minY, maxX, maxY, out, name, proj=2154):
+def writeShape(geometry, out, name, proj=2154):
     """
-    create a shape with only one geometry (a rectangle)
-    described by minX,minY,maxX,maxY and save in 'out' as name
+    write a shape with only one geometry in 'out' as name
     """
-    ring = ogr.Geometry(ogr.wkbLinearRing)
-    ring.AddPoint(minX, minY)
-    ring.AddPoint(maxX, minY)
-    ring.AddPoint(maxX, maxY)
-    ring.AddPoint(minX, maxY)
-    ring.AddPoint(minX, minY)
-
-    poly = ogr.Geometry(ogr.wkbPolygon)
-    poly.AddGeometry(ring)
-
-    #-----------------
-    #-- Create output file
-
-    folder = ""
-
     driver = ogr.GetDriverByName("ESRI Shapefile")
+    shape = os.path.join(out, name + ".shp")
+    if os.path.exists(shape):
+        driver.DeleteDataSource(shape)
     try:
-        output = driver.CreateDataSource(out)
+        output = driver.CreateDataSource(shape)
     except ValueError:
-        raise Exception("Could not create output datasource " + out)
+        raise Exception("Could not create output datasource " + shape)
 
     srs = osr.SpatialReference()
-    srs.ImportFromEPSG(proj)
+    srs.ImportFromEPSG(int(proj))
     newLayer = output.CreateLayer(name, geom_type=ogr.wkbPolygon, srs=srs)
     if newLayer is None:
         raise Exception("Could not create output layer")
 
     newLayer.CreateField(ogr.FieldDefn("FID", ogr.OFTInteger))
-    newLayerDef = newLayer.GetLayerDefn()
-    feature = ogr.Feature(newLayerDef)
-    feature.SetGeometry(poly)
-    ring.Destroy()
-    poly.Destroy()
+    feature = ogr.Feature(newLayer.GetLayerDefn())
+    feature.SetGeometry(geometry)
     newLayer.CreateFeature(feature)
 
     output.Destroy()
 
 
-def subtractShape(shape1, shape2, shapeout, nameShp, proj):
+def rectangle(minX, minY, maxX, maxY):
     """
-        shape 1 - shape 2 in shapeout/nameshp.shp
+    rectangle geometry described by minX,minY,maxX,maxY
     """
-    driver = ogr.GetDriverByName("ESRI Shapefile")
-    dataSource1 = driver.Open(shape1, 0)
-    dataSource2 = driver.Open(shape2, 0)
-
-    layer1 = dataSource1.GetLayer()
-    for feature1 in layer1:
-        geom_1 = feature1.GetGeometryRef()
-
-    layer2 = dataSource2.GetLayer()
-    for feature2 in layer2:
-        geom_2 = feature2.GetGeometryRef()
+    ring = ogr.Geometry(ogr.wkbLinearRing)
+    ring.AddPoint(minX, minY)
+    ring.AddPoint(maxX, minY)
+    ring.AddPoint(maxX, maxY)
+    ring.AddPoint(minX, maxY)
+    ring.AddPoint(minX, minY)
 
-    newgeom = geom_1.Difference(geom_2)
     poly = ogr.Geometry(ogr.wkbPolygon)
-
-    #-----------------
-    #-- Create output file
-    try:
-        output = driver.CreateDataSource(shapeout)
-    except ValueError:
-        raise Exception('Could not create output datasource ' + str(shapeout))
-
-    srs = osr.SpatialReference()
-    srs.ImportFromEPSG(proj)
-
-    newLayer = output.CreateLayer(nameShp, geom_type=ogr.wkbPolygon, srs=srs)
-    if newLayer is None:
-        raise Exception("Could not create output layer")
-
-    newLayer.CreateField(ogr.FieldDefn("FID", ogr.OFTInteger))
-    newLayerDef = newLayer.GetLayerDefn()
-    feature = ogr.Feature(newLayerDef)
-    feature.SetGeometry(newgeom)
-    newgeom.Destroy()
-    poly.Destroy()
-    newLayer.CreateFeature(feature)
-
-    output.Destroy()
+    poly.AddGeometry(ring)
+    return poly
 
 
 def getRasterExtent(raster_in):
@@ -197,56 +151,98 @@ def getRasterExtent(raster_in):
     return [minX, maxX, minY, maxY]
 
 
-def createRasterFootprint(tilePath, commonVecMask, proj=2154):
-
-    #outpolygonize = pathOut.replace(".shp","_TMP.shp")
-    #cmd = 'gdal_polygonize.py -mask '+tilePath+' '+tilePath+' -f "ESRI Shapefile" '+outpolygonize
-    #run(cmd)
-
-    fu.keepBiggestArea(tilePath.replace(".tif", ".shp"), commonVecMask)
-    #fu.removeShape(outpolygonize.replace(".shp", ""), [".prj", ".shp", ".dbf", ".shx"])
-    return commonVecMask
+def rasterFootprint(tilePath):
+    """
+        IN :
+            tilePath : tile's common mask, its vectorisation must be next
+                       to it (same name, .shp extension)
+        OUT :
+            the biggest polygon of the vectorised mask (ogr.Geometry)
+    """
+    driver = ogr.GetDriverByName("ESRI Shapefile")
+    dataSource = driver.Open(tilePath.replace(".tif", ".shp"), 0)
+    if dataSource is None:
+        raise Exception("Could not open " + tilePath.replace(".tif", ".shp"))
+    footprint = None
+    for feature in dataSource.GetLayer():
+        geom = feature.GetGeometryRef()
+        if footprint is None or geom.GetArea() > footprint.GetArea():
+            footprint = geom.Clone()
+    return footprint
 
 
-def IsIntersect(shp1, shp2):
+def IsIntersect(geom1, geom2):
     """
         IN :
-            shp1,shp2 : 2 tile's envelope (only one polygon by shapes)
+            geom1,geom2 : 2 tile's envelope (ogr.Geometry)
         OUT :
             intersect : true or false
     """
-    driver = ogr.GetDriverByName("ESRI Shapefile")
-    dataSource1 = driver.Open(shp1, 0)
-    dataSource2 = driver.Open(shp2, 0)
-
-    layer1 = dataSource1.GetLayer()
-    for feature1 in layer1:
-        geom1 = feature1.GetGeometryRef()
-    layer2 = dataSource2.GetLayer()
-    for feature2 in layer2:
-        geom2 = feature2.GetGeometryRef()
-
-    intersection = geom1.Intersection(geom2)
-    if intersection.GetArea() != 0:
-        return True
-    return False
+    return geom1.Intersection(geom2).GetArea() != 0
 
 
-def getShapeExtent(shape):
+def neighbours(envelopes: List[ogr.Geometry]) -> List[List[int]]:
+    """find, for each envelope, the following envelopes of the list
+    whose bounding boxes intersect it
 
-    driver = ogr.GetDriverByName("ESRI Shapefile")
-    dataSource = driver.Open(shape, 0)
-    layer = dataSource.GetLayer()
-    for feature in layer:
-        geom = feature.GetGeometryRef()
-    return geom.GetEnvelope()  #[minX, maxX, minY, maxY]
+    bounding boxes are indexed in a regular grid which cell size is the
+    biggest bounding box, then each envelope is only compared to the
+    envelopes sharing a cell with it.
 
+    Parameters
+    ----------
+    envelopes : list
+        tile's envelopes
 
-def erodeInter(currentTile, NextTile, intersection, buff, proj):
-
+    Return
+    ------
+    list
+        for each envelope, sorted indexes of its following neighbours
+    """
+    bboxes = [envelope.GetEnvelope() for envelope in envelopes]
+    if not bboxes:
+        return []
+    cell_size = max(
+        max(maxX - minX, maxY - minY) for minX, maxX, minY, maxY in bboxes)
+    cell_size = cell_size if cell_size > 0 else 1.0
+    grid = {}
+    cells = []
+    for index, (minX, maxX, minY, maxY) in enumerate(bboxes):
+        bbox_cells = [(col, row)
+                      for col in range(int(minX // cell_size),
+                                       int(maxX // cell_size) + 1)
+                      for row in range(int(minY // cell_size),
+                                       int(maxY // cell_size) + 1)]
+        for cell in bbox_cells:
+            grid.setdefault(cell, []).append(index)
+        cells.append(bbox_cells)
+
+    list_neighbours = []
+    for index, (minX, maxX, minY, maxY) in enumerate(bboxes):
+        candidates = set()
+        for cell in cells[index]:
+            candidates.update(grid[cell])
+        list_neighbours.append(
+            sorted(candidate for candidate in candidates
+                   if candidate > index and bboxes[candidate][0] <= maxX
+                   and bboxes[candidate][1] >= minX
+                   and bboxes[candidate][2] <= maxY
+                   and bboxes[candidate][3] >= minY))
+    return list_neighbours
+
+
+def erodeInter(currentTile, NextTile, intersection, buff):
+    """
+        IN :
+            currentTile, NextTile : Tile objects
+            intersection : intersection of their envelopes (ogr.Geometry)
+            buff : offset
+        OUT :
+            the eroded intersection, None if tiles are diagonal
+    """
     xo, yo = currentTile.getOrigin()
     xn, yn = NextTile.getOrigin()
-    Extent = getShapeExtent(intersection)
+    Extent = intersection.GetEnvelope()  #[minX, maxX, minY, maxY]
 
     if yo == yn and xo != xn:  #left priority
         minX = Extent[0]
@@ -261,15 +257,9 @@ def erodeInter(currentTile, NextTile, intersection, buff, proj):
         maxY = Extent[3]
 
     else:
-        return False
+        return None
 
-    fu.removeShape(intersection.replace(".shp", ""),
-                   [".prj", ".shp", ".dbf", ".shx"])
-    pathFolder = "/".join(
-        intersection.split("/")[0:len(intersection.split("/")) - 1])
-    createShape(minX, minY, maxX, maxY, pathFolder,
-                intersection.split("/")[-1].replace(".shp", ""), proj)
-    return True
+    return rectangle(minX, minY, maxX, maxY)
 
 
 def diag(currentTile, NextTile):
@@ -293,11 +283,14 @@ def priorityKey(item):
     return (-item.getY(), item.getX())  #upper left priority
 
 
-def erodeDiag(currentTile, NextTile, intersection, buff, TMP, proj):
-
+def erodeDiag(currentTile, NextTile, intersection, buff):
+    """
+        update priority envelopes (ogr.Geometry) of diagonal tiles,
+        currentTile is the one with the highest priority
+    """
     xo, yo = currentTile.getOrigin()  #tuile la plus prio
     xn, yn = NextTile.getOrigin()
-    Extent = getShapeExtent(intersection)  #[minX, maxX, minY, maxY]
+    Extent = intersection.GetEnvelope()  #[minX, maxX, minY, maxY]
 
     if yo > yn and xo > xn:
         minX = Extent[1] - buff
@@ -305,117 +298,67 @@ def erodeDiag(currentTile, NextTile, intersection, buff, TMP, proj):
         minY = Extent[2]
         maxY = Extent[3]
 
-        fu.removeShape(intersection.replace(".shp", ""),
-                       [".prj", ".shp", ".dbf", ".shx"])
-        pathFolder = "/".join(
-            intersection.split("/")[0:len(intersection.split("/")) - 1])
-        createShape(minX, minY, maxX, maxY, pathFolder,
-                    intersection.split("/")[-1].replace(".shp", ""), proj)
-
-        tmpName = NextTile.getName() + "_TMP"
-        subtractShape(NextTile.getPriorityEnv(), intersection, TMP, tmpName,
-                      proj)
-
-        fu.removeShape(NextTile.getPriorityEnv().replace(".shp", ""),
-                       [".prj", ".shp", ".dbf", ".shx"])
-        fu.cpShapeFile(TMP+"/"+tmpName.replace(".shp", ""), NextTile.getPriorityEnv().replace(".shp", ""),\
-                               [".prj", ".shp", ".dbf", ".shx"])
-        fu.removeShape(TMP + "/" + tmpName.replace(".shp", ""),
-                       [".prj", ".shp", ".dbf", ".shx"])
-
-        tmpName = currentTile.getName() + "_TMP"
-        subtractShape(currentTile.getPriorityEnv(), NextTile.getPriorityEnv(),
-                      TMP, tmpName, proj)
-
-        fu.removeShape(currentTile.getPriorityEnv().replace(".shp", ""),
-                       [".prj", ".shp", ".dbf", ".shx"])
-        fu.cpShapeFile(TMP+"/"+tmpName.replace(".shp", ""), currentTile.getPriorityEnv().replace(".shp", ""),\
-                               [".prj", ".shp", ".dbf", ".shx"])
-        fu.removeShape(TMP + "/" + tmpName.replace(".shp", ""),
-                       [".prj", ".shp", ".dbf", ".shx"])
+        NextTile.setPriorityEnv(NextTile.getPriorityEnv().Difference(
+            rectangle(minX, minY, maxX, maxY)))
+        currentTile.setPriorityEnv(currentTile.getPriorityEnv().Difference(
+            NextTile.getPriorityEnv()))
 
     if yo > yn and xo < xn:
-
-        tmpName = NextTile.getName() + "_TMP"
-        subtractShape(NextTile.getPriorityEnv(), currentTile.getPriorityEnv(),
-                      TMP, tmpName, proj)
-
-        fu.removeShape(NextTile.getPriorityEnv().replace(".shp", ""),
-                       [".prj", ".shp", ".dbf", ".shx"])
-        fu.cpShapeFile(TMP+"/"+tmpName.replace(".shp", ""), NextTile.getPriorityEnv().replace(".shp", ""),\
-                               [".prj", ".shp", ".dbf", ".shx"])
-        fu.removeShape(TMP + "/" + tmpName.replace(".shp", ""),
-                       [".prj", ".shp", ".dbf", ".shx"])
+        NextTile.setPriorityEnv(NextTile.getPriorityEnv().Difference(
+            currentTile.getPriorityEnv()))
 
 
-def genTileEnvPrio(ObjListTile, out, tmpFile, proj):
-
-    buff = 600  #offset in order to manage nodata in image's border
-
-    ObjListTile.reverse()
-    listSHP = [
-        createRasterFootprint(c_ObjListTile.getPath(),
-                              tmpFile + "/" + c_ObjListTile.getName() + ".shp")
-        for c_ObjListTile in ObjListTile
-    ]
+def computeTileEnvPrio(ObjListTile, buff=600):
+    """
+        IN :
+            ObjListTile : Tile objects sorted by priority (see priorityKey)
+            buff : offset in order to manage nodata in image's border
+        OUT :
+            set envelopes and priority envelopes (ogr.Geometry) of tiles
 
-    for env, currentTile in zip(listSHP, ObjListTile):
-        currentTile.setEnvelope(env)
-        currentTile.setPriorityEnv(env.replace(".shp", "_PRIO.shp"))
-        fu.cpShapeFile(env.replace(".shp", ""),
-                       env.replace(".shp", "") + "_PRIO",
-                       [".prj", ".shp", ".dbf", ".shx"])
-
-    for i in range(len(ObjListTile)):
-        currentTileEnv = ObjListTile[i].getEnvelope()
-        for j in range(1 + i, len(ObjListTile)):
-            NextTileEnv = ObjListTile[j].getEnvelope()
-            if IsIntersect(currentTileEnv, NextTileEnv):
-
-                InterName = ObjListTile[i].getName(
-                ) + "_inter_" + ObjListTile[j].getName()
-                intersection = fu.ClipVectorData(ObjListTile[i].getEnvelope(), ObjListTile[j].getEnvelope(),\
-                                                                 tmpFile, InterName)
-                notDiag = erodeInter(ObjListTile[i], ObjListTile[j],
-                                     intersection, buff, proj)
-                if notDiag:
-                    tmpName = ObjListTile[i].getName() + "_TMP"
-                    subtractShape(ObjListTile[i].getPriorityEnv(),
-                                  intersection, tmpFile, tmpName, proj)
-
-                    fu.removeShape(ObjListTile[i].getPriorityEnv().replace(".shp", ""),\
-                                                       [".prj", ".shp", ".dbf", ".shx"])
-                    fu.cpShapeFile(tmpFile+"/"+tmpName.replace(".shp", ""),\
-                                                       ObjListTile[i].getPriorityEnv().replace(".shp", ""),\
-                                                       [".prj", ".shp", ".dbf", ".shx"])
-                    fu.removeShape(tmpFile + "/" + tmpName.replace(".shp", ""),
-                                   [".prj", ".shp", ".dbf", ".shx"])
-
-    ObjListTile.reverse()
-    for i in range(len(ObjListTile)):
-        currentTileEnv = ObjListTile[i].getEnvelope()
-        for j in range(1 + i, len(ObjListTile)):
-            NextTileEnv = ObjListTile[j].getEnvelope()
-            if IsIntersect(currentTileEnv, NextTileEnv):
+        Envelopes are kept in memory and each tile is only compared to
+        the tiles whose envelope's bounding box intersects its own.
+    """
+    for currentTile in ObjListTile:
+        envelope = rasterFootprint(currentTile.getPath())
+        currentTile.setEnvelope(envelope)
+        currentTile.setPriorityEnv(envelope.Clone())
+
+    lowPriorityFirst = ObjListTile[::-1]
+    envelopes = [tile.getEnvelope() for tile in lowPriorityFirst]
+    for i, list_j in enumerate(neighbours(envelopes)):
+        for j in list_j:
+            if IsIntersect(envelopes[i], envelopes[j]):
+                intersection = erodeInter(
+                    lowPriorityFirst[i], lowPriorityFirst[j],
+                    envelopes[i].Intersection(envelopes[j]), buff)
+                if intersection is not None:
+                    lowPriorityFirst[i].setPriorityEnv(
+                        lowPriorityFirst[i].getPriorityEnv().Difference(
+                            intersection))
+
+    envelopes = [tile.getEnvelope() for tile in ObjListTile]
+    for i, list_j in enumerate(neighbours(envelopes)):
+        for j in list_j:
+            if IsIntersect(envelopes[i], envelopes[j]):
                 if diag(ObjListTile[i], ObjListTile[j]):
-                    InterName = ObjListTile[i].getName(
-                    ) + "_inter_" + ObjListTile[j].getName()
-                    intersection = fu.ClipVectorData(ObjListTile[i].getEnvelope(), ObjListTile[j].getEnvelope(),\
-                                                                         tmpFile, InterName)
-                    erodeDiag(ObjListTile[i], ObjListTile[j], intersection,
-                              buff, tmpFile, proj)
+                    erodeDiag(ObjListTile[i], ObjListTile[j],
+                              envelopes[i].Intersection(envelopes[j]), buff)
                 else:
-                    tmpName = ObjListTile[i].getName() + "_TMP"
-                    subtractShape(ObjListTile[i].getPriorityEnv(), ObjListTile[j].getPriorityEnv(),\
-                                                      tmpFile, tmpName, proj)
+                    ObjListTile[i].setPriorityEnv(
+                        ObjListTile[i].getPriorityEnv().Difference(
+                            ObjListTile[j].getPriorityEnv()))
+    return ObjListTile
 
-                    fu.removeShape(ObjListTile[i].getPriorityEnv().replace(".shp", ""),\
-                                                       [".prj", ".shp", ".dbf", ".shx"])
-                    fu.cpShapeFile(tmpFile+"/"+tmpName.replace(".shp", ""),\
-                                                       ObjListTile[i].getPriorityEnv().replace(".shp", ""),\
-                                                       [".prj", ".shp", ".dbf", ".shx"])
-                    fu.removeShape(tmpFile + "/" + tmpName.replace(".shp", ""),
-                                   [".prj", ".shp", ".dbf", ".shx"])
+
+def genTileEnvPrio(ObjListTile, out, tmpFile, proj):
+    """
+        compute priority envelopes of tiles (see computeTileEnvPrio) and
+        write them in tmpFile as <tile>_PRIO.shp
+    """
+    for currentTile in computeTileEnvPrio(ObjListTile):
+        writeShape(currentTile.getPriorityEnv(), tmpFile,
+                   currentTile.getName() + "_PRIO", proj)
 
 
 def generate_shape_tile(tiles: List[str], pathWd: str, output_path: str,
@@ -429,7 +372,7 @@ def generate_shape_tile(tiles: List[str], pathWd: str, output_path: str,
     pathOut : str
         output directory
     pathWd : str
-        working directory
+        working directory (unused, envelopes are computed in memory)
     output_path : str
         iota2 output directory
     proj : int
@@ -445,10 +388,6 @@ def generate_shape_tile(tiles: List[str], pathWd: str, output_path: str,
         if not os.path.exists(featuresPath + "/" + tile):
             os.mkdir(featuresPath + "/" + tile)
             os.mkdir(featuresPath + "/" + tile + "/tmp")
-    commonDirectory = pathOut + "/commonMasks/"
-    if not os.path.exists(commonDirectory):
-        os.mkdir(commonDirectory)
-
     common = [
         featuresPath + "/" + Ctile + "/tmp/" + cMaskName + ".tif"
         for Ctile in tiles
@@ -459,21 +398,9 @@ def generate_shape_tile(tiles: List[str], pathWd: str, output_path: str,
     ]
     ObjListTile_sort = sorted(ObjListTile, key=priorityKey)
 
-    tmpFile = pathOut + "/TMP"
-
-    if pathWd:
-        tmpFile = pathWd + "/TMP"
-    if not os.path.exists(tmpFile):
-        os.mkdir(tmpFile)
-    genTileEnvPrio(ObjListTile_sort, pathOut, tmpFile, proj)
-    AllPRIO = fu.FileSearch_AND(tmpFile, True, "_PRIO.shp")
-    for prioTile in AllPRIO:
-        tileName = prioTile.split("/")[-1].split("_")[0]
-        fu.cpShapeFile(prioTile.replace(".shp", ""), pathOut + "/" + tileName,
-                       [".prj", ".shp", ".dbf", ".shx"])
-
-    shutil.rmtree(tmpFile)
-    shutil.rmtree(commonDirectory)
+    for currentTile in computeTileEnvPrio(ObjListTile_sort):
+        writeShape(currentTile.getPriorityEnv(), pathOut,
+                   currentTile.getName(), proj)
 
 
 if __name__ == "__main__":
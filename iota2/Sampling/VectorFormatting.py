@@ -527,8 +527,7 @@ def vector_formatting(
         root logger
     """
     from iota2.Common import FileUtils as fut
-    from iota2.VectorTools import spatialOperations as intersect
-    from iota2.VectorTools import ChangeNameField
+    from iota2.VectorTools import TileIntersection as tile_intersection
     from iota2.Sampling import SplitInSubSets as subset
     from iota2.VectorTools.AddField import addField
     # const
@@ -589,63 +588,35 @@ def vector_formatting(
 
     logger.info("launch intersection between tile's envelope and regions")
     tile_region = os.path.join(work_dir, "tileRegion_" + tile_name + ".sqlite")
-    region_tile_intersection = intersect.intersectSqlites(tile_env_vec,
-                                                          region_vec,
-                                                          work_dir,
-                                                          tile_region,
-                                                          epsg,
-                                                          "intersection",
-                                                          [region_field],
-                                                          vectformat='SQLite')
-    if not region_tile_intersection:
+    regions = tile_intersection.tile_regions(tile_env_vec, region_vec,
+                                             region_field)
+    if not regions:
         error_msg = (
             f"there is no intersections between the tile '{tile_name}' "
             f"and the region shape '{region_vec}'")
         logger.critical(error_msg)
         raise Exception(error_msg)
+    tile_intersection.write_tile_regions(regions, region_vec, region_field,
+                                         tile_region, epsg)
 
     region_vector_name = os.path.splitext(os.path.basename(region_vec))[0]
     create_tile_region_masks(tile_region, region_field, tile_name,
                              os.path.join(output_path, "shapeRegion"),
                              region_vector_name, img_ref)
+    os.remove(tile_region)
 
-    logger.info(
-        "launch intersection between tile's envelopeRegion and groundTruth")
-    tile_region_ground_truth = os.path.join(
-        work_dir, "tileRegionGroundTruth_" + tile_name + ".sqlite")
-
-    if intersect.intersectSqlites(tile_region,
-                                  ground_truth_vec,
-                                  work_dir,
-                                  tile_region_ground_truth,
-                                  epsg,
-                                  "intersection",
-                                  [data_field, region_field, "ogc_fid"],
-                                  vectformat='SQLite') is False:
+    logger.info("launch intersection between tile's regions, groundTruth "
+                "and valid areas")
+    # originfid corresponds to the polygon number
+    if not tile_intersection.intersect_ground_truth(
+            regions, region_vec, ground_truth_vec, cloud_vec, output, epsg,
+            data_field, region_field, "originfid", logger):
         warning_msg = (
             f"there si no intersections between the tile "
             f"'{tile_name}' and the ground truth '{ground_truth_vec}'")
         logger.warning(warning_msg)
         return None
 
-    logger.info("remove un-usable samples")
-
-    intersect.intersectSqlites(tile_region_ground_truth,
-                               cloud_vec,
-                               work_dir,
-                               output,
-                               epsg,
-                               "intersection",
-                               [data_field, region_field, "t2_ogc_fid"],
-                               vectformat='SQLite')
-
-    os.remove(tile_region)
-    os.remove(tile_region_ground_truth)
-
-    # rename field t2_ogc_fid to originfig which correspond
-    # to the polygon number
-    ChangeNameField.changeName(output, "t2_ogc_fid", "originfid")
-
     if merge_final_classifications and fusion_merge_all_validation is False:
         maj_vote_sample_tile_name = "{}_majvote.sqlite".format(tile_name)
         maj_vote_sample_tile = os.path.join(wd_maj_vote,
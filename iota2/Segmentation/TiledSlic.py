@@ -0,0 +1,228 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# =========================================================================
+#   Program:   iota2
+#
+#   Copyright (c) CESBIO. All rights reserved.
+#
+#   See LICENSE for details.
+#
+#   This software is distributed WITHOUT ANY WARRANTY; without even
+#   the implied warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR
+#   PURPOSE.  See the above copyright notices for more information.
+#
+# =========================================================================
+"""
+Stitching of a segmentation computed by horizontal strips.
+
+Each strip of rows is segmented independently, with a margin of rows on
+both sides. Only the core rows of strips are kept, their labels are made
+unique, and superpixels cut by a seam are merged when the segmentations of
+both strips agree, i.e. when the two superpixels are each other's largest
+overlap in the band of rows surrounding the seam (both strips segment it
+thanks to margins). Label 0 (no segment) is kept, other labels are
+renumbered from 1 in the order of strips, as a segmentation in one piece.
+"""
+import os
+import logging
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from iota2.Common.UnionFind import find, union
+
+LOGGER = logging.getLogger(__name__)
+
+# (first core row, last core row (excluded), first read row, last read row
+# (excluded))
+Extent = Tuple[int, int, int, int]
+
+
+def strips_extents(y_size: int, nb_strips: int, margin: int) -> List[Extent]:
+    """split rows of a raster in strips of similar heights
+
+    Parameters
+    ----------
+    y_size : int
+        number of rows
+    nb_strips : int
+        number of strips
+    margin : int
+        number of rows read on both sides of a strip
+    """
+    nb_strips = max(1, min(nb_strips, y_size))
+    bounds = np.linspace(0, y_size, nb_strips + 1).round().astype(int)
+    return [(int(start), int(end), max(0, int(start) - margin),
+             min(y_size, int(end) + margin))
+            for start, end in zip(bounds[:-1], bounds[1:])]
+
+
+def best_pairs(first: np.ndarray, second: np.ndarray,
+               counts: np.ndarray) -> set:
+    """for every label of 'first', the pair with the largest count"""
+    order = np.lexsort((second, -counts, first))
+    first, second = first[order], second[order]
+    keep = np.ones(len(first), dtype=bool)
+    keep[1:] = first[1:] != first[:-1]
+    return set(zip(first[keep].tolist(), second[keep].tolist()))
+
+
+def seam_merges(upper: np.ndarray, lower: np.ndarray,
+                seam_row: int) -> List[Tuple[int, int]]:
+    """superpixels cut by a seam to merge
+
+    Parameters
+    ----------
+    upper : np.array
+        labels of the upper strip over a band of rows around the seam
+    lower : np.array
+        labels of the lower strip over the same band of rows
+    seam_row : int
+        first row of the band below the seam
+
+    Return
+    ------
+    list
+        [(upper label, lower label), ...] pairs of labels touching the seam
+        which are each other's largest overlap in the band
+    """
+    if seam_row <= 0 or seam_row >= upper.shape[0]:
+        return []
+    upper_touch = np.unique(upper[seam_row - 1])
+    lower_touch = np.unique(lower[seam_row])
+    valid = (upper != 0) & (lower != 0)
+    upper_labels = upper[valid].astype(np.int64)
+    lower_labels = lower[valid].astype(np.int64)
+    if upper_labels.size == 0:
+        return []
+    nb_lower = int(lower_labels.max()) + 1
+    pairs, counts = np.unique(upper_labels * nb_lower + lower_labels,
+                              return_counts=True)
+    pair_upper, pair_lower = np.divmod(pairs, nb_lower)
+    mutual = best_pairs(pair_upper, pair_lower, counts) & {
+        (up_label, low_label)
+        for low_label, up_label in best_pairs(pair_lower, pair_upper, counts)
+    }
+    upper_touch = set(upper_touch.tolist())
+    lower_touch = set(lower_touch.tolist())
+    return sorted((up_label, low_label) for up_label, low_label in mutual
+                  if up_label in upper_touch and low_label in lower_touch)
+
+
+def read_rows(raster: str, first_row: int, last_row: int) -> np.ndarray:
+    """read rows [first_row, last_row) of the first band of a raster"""
+    from osgeo import gdal
+    raster_ds = gdal.Open(raster)
+    return raster_ds.GetRasterBand(1).ReadAsArray(0, first_row,
+                                                  raster_ds.RasterXSize,
+                                                  last_row - first_row)
+
+
+def stitch_strips(strips: List[str],
+                  extents: List[Extent],
+                  output: str,
+                  block_size: Optional[int] = None,
+                  logger: Optional[logging.Logger] = LOGGER) -> str:
+    """stitch segmentations of strips
+
+    Parameters
+    ----------
+    strips : list
+        segmentation of each strip, over its read rows
+    extents : list
+        extents of strips (see strips_extents)
+    output : str
+        output raster
+    block_size : int
+        number of rows read at once, default to the profile tiles size
+
+    Return
+    ------
+    str
+        output
+    """
+    from osgeo import gdal
+    from iota2.Common.RasterProfile import gdal_creation_options
+    from iota2.Common.RasterProfile import get_output_profile
+
+    if block_size is None:
+        block_size = get_output_profile()["block_size"]
+
+    def core_blocks(index):
+        """blocks of core rows of a strip"""
+        start, end, read_start, _ = extents[index]
+        for row in range(start, end, block_size):
+            rows = min(block_size, end - row)
+            yield row, read_rows(strips[index], row - read_start,
+                                 row - read_start + rows)
+
+    # labels of strips and their offsets
+    strips_labels = []
+    offsets = []
+    offset = 0
+    for index in range(len(strips)):
+        labels = np.empty(0, dtype=np.int64)
+        for _, block in core_blocks(index):
+            labels = np.union1d(labels, np.unique(block[block != 0]))
+        strips_labels.append(labels)
+        offsets.append(offset)
+        if labels.size:
+            offset += int(labels.max())
+
+    # superpixels cut by seams
+    parent = {}
+    for index in range(len(strips) - 1):
+        start, seam, up_read_start, up_read_end = extents[index]
+        _, low_end, low_read_start, _ = extents[index + 1]
+        band_start = max(low_read_start, start)
+        band_end = min(up_read_end, low_end)
+        upper = read_rows(strips[index], band_start - up_read_start,
+                          band_end - up_read_start)
+        lower = read_rows(strips[index + 1], band_start - low_read_start,
+                          band_end - low_read_start)
+        merges = seam_merges(upper, lower, seam - band_start)
+        logger.debug(f"{len(merges)} superpixels merged across seam {seam}")
+        for up_label, low_label in merges:
+            union(parent, up_label + offsets[index],
+                  low_label + offsets[index + 1])
+
+    # final labels
+    strips_roots = [
+        np.array([find(parent, int(label) + offsets[index])
+                  for label in labels],
+                 dtype=np.int64)
+        for index, labels in enumerate(strips_labels)
+    ]
+    all_roots = np.unique(np.concatenate(strips_roots))
+
+    first_ds = gdal.Open(strips[0])
+    x_size = first_ds.RasterXSize
+    y_size = extents[-1][1]
+    if os.path.exists(output):
+        os.remove(output)
+    out_ds = gdal.GetDriverByName("GTiff").Create(
+        output,
+        x_size,
+        y_size,
+        1,
+        gdal.GDT_UInt32,
+        options=gdal_creation_options("UInt32"))
+    # the first strip starts at the first row
+    out_ds.SetGeoTransform(first_ds.GetGeoTransform())
+    out_ds.SetProjection(first_ds.GetProjection())
+    first_ds = None
+    out_band = out_ds.GetRasterBand(1)
+    for index, (labels, roots) in enumerate(zip(strips_labels,
+                                                strips_roots)):
+        final_labels = np.searchsorted(all_roots, roots) + 1
+        for row, block in core_blocks(index):
+            out_block = np.zeros(block.shape, dtype=np.uint32)
+            segments = block != 0
+            out_block[segments] = final_labels[np.searchsorted(
+                labels, block[segments])]
+            out_band.WriteArray(out_block, 0, row)
+    out_ds.FlushCache()
+    out_ds = None
+    logger.info(f"{len(all_roots)} superpixels stitched in {output}")
+    return output
@@ -15,7 +15,7 @@
 # =========================================================================
 import os
 import logging
-from typing import Dict, Union, List, Optional
+from typing import Dict, Union, List, Optional, Tuple
 
 LOGGER = logging.getLogger(__name__)
 LOGGER.addHandler(logging.NullHandler())
@@ -23,15 +23,93 @@ LOGGER.addHandler(logging.NullHandler())
 sensors_params = Dict[str, Union[str, List[str], int]]
 
 
+def slic_tiling(image_size: float, ram: float) -> int:
+    """number of SLIC tiles along x and y, in order to fit in RAM
+
+    Parameters
+    ----------
+    image_size : float
+        image size (bytes)
+    ram : float
+        available ram (Mo)
+    """
+    import math
+    return max(1, int(math.ceil(math.sqrt(image_size /
+                                          (float(ram) * 1024**2)))))
+
+
+def features_stack(tile_name: str, output_path: str,
+                   nb_bands: int) -> Union[str, None]:
+    """features of a tile already written by iota2 if any, and only if they
+    have the expected number of bands (they may have been written without
+    Sentinel-1 features, see sar_optical_post_fusion)
+    """
+    from osgeo import gdal
+    features_raster = os.path.join(output_path, "features", tile_name, "tmp",
+                                   "{}_Features.tif".format(tile_name))
+    if not os.path.exists(features_raster):
+        return None
+    features_ds = gdal.Open(features_raster)
+    if features_ds is None or features_ds.RasterCount != nb_bands:
+        return None
+    return features_raster
+
+
+def slic_strip(features: str,
+               extent: Tuple[int, int, int, int],
+               spw: int,
+               xy_tiles: int,
+               tmp_dir: str,
+               output: str,
+               ram: Optional[int] = 128) -> str:
+    """SLIC segmentation of a strip of rows (with its margins, see
+    TiledSlic.strips_extents) of a features raster
+    """
+    from iota2.Common.FileUtils import ensure_dir
+    from iota2.Common.OtbAppBank import CreateExtractROIApplication
+    from iota2.Common.OtbAppBank import CreateSLICApplication
+    from osgeo import gdal
+
+    _, _, read_start, read_end = extent
+    ensure_dir(tmp_dir)
+    strip = CreateExtractROIApplication({
+        "in": features,
+        "startx": 0,
+        "starty": read_start,
+        "sizex": gdal.Open(features).RasterXSize,
+        "sizey": read_end - read_start,
+        "ram": str(ram)
+    })
+    strip.Execute()
+    slic_seg = CreateSLICApplication({
+        "in": strip,
+        "tmpdir": tmp_dir,
+        "spw": spw,
+        "tiling": "manual",
+        "tiling.manual.ny": xy_tiles,
+        "tiling.manual.nx": xy_tiles,
+        "out": output
+    })
+    slic_seg.ExecuteAndWriteOutput()
+    return output
+
+
 def slicSegmentation(tile_name: str,
                      output_path: str,
                      sensors_parameters: sensors_params,
                      ram: Optional[int] = 128,
                      working_dir: Optional[Union[str, None]] = None,
                      force_spw: Optional[Union[int, None]] = None,
+                     nb_workers: Optional[int] = 1,
                      logger=LOGGER):
     """generate segmentation using SLIC algorithm
 
+    The features of the tile already written by iota2 are segmented if
+    they match the features pipeline, otherwise the pipeline is. When
+    several workers are available, features are segmented by strips of rows
+    processed in parallel (strips are stitched by TiledSlic.stitch_strips),
+    the pipeline is then written once beforehand.
+
     Parameters
     ----------
     tile_name : string
@@ -46,29 +124,27 @@ def slicSegmentation(tile_name: str,
         directory to store temporary data
     force_spw : int
         force segments' spatial width
+    nb_workers : int
+        number of strips segmented in parallel
     logger : logging
         root logger
     """
-    import math
     import shutil
+    import multiprocessing as mp
+    from osgeo import gdal
     from iota2.Common.GenerateFeatures import generate_features
     from iota2.Common.OtbAppBank import CreateSLICApplication
     from iota2.Common.OtbAppBank import getInputParameterOutput
     from iota2.Common.FileUtils import ensure_dir
+    from iota2.Segmentation.TiledSlic import strips_extents
+    from iota2.Segmentation.TiledSlic import stitch_strips
 
     SLIC_NAME = "SLIC_{}.tif".format(tile_name)
 
-    all_features, feat_labels, dep = generate_features(
-        working_dir,
-        tile_name,
-        sar_optical_post_fusion=False,
-        output_path=output_path,
-        sensors_parameters=sensors_parameters,
-        mode="usually")
-    all_features.Execute()
-
-    spx, _ = all_features.GetImageSpacing(
-        getInputParameterOutput(all_features))
+    slic_seg_path = os.path.join(output_path, "features", tile_name, "tmp",
+                                 SLIC_NAME)
+    if os.path.exists(slic_seg_path):
+        return
 
     tmp_dir = working_dir
     if working_dir is None:
@@ -79,30 +155,90 @@ def slicSegmentation(tile_name: str,
 
     ensure_dir(tmp_dir)
 
-    slic_seg_path = os.path.join(output_path, "features", tile_name, "tmp",
-                                 SLIC_NAME)
+    all_features, feat_labels, dep = generate_features(
+        working_dir,
+        tile_name,
+        sar_optical_post_fusion=False,
+        output_path=output_path,
+        sensors_parameters=sensors_parameters,
+        mode="usually")
+    features_out = getInputParameterOutput(all_features)
 
-    features_ram_estimation = all_features.PropagateRequestedRegion(
-        key="out", region=all_features.GetImageRequestedRegion("out"))
+    # features already written by iota2 are segmented instead of the pipeline
+    features_raster = features_stack(tile_name, output_path,
+                                     len(feat_labels))
+    written_features = False
+    if features_raster is not None:
+        logger.info(f"segmenting features already written {features_raster}")
+        features_ds = gdal.Open(features_raster)
+        spx = abs(features_ds.GetGeoTransform()[1])
+        y_size = features_ds.RasterYSize
+        features_size = (features_ds.RasterXSize * y_size *
+                         features_ds.RasterCount *
+                         gdal.GetDataTypeSize(
+                             features_ds.GetRasterBand(1).DataType) // 8)
+        features_ds = None
+        slic_input = features_raster
+    else:
+        all_features.Execute()
+        spx, _ = all_features.GetImageSpacing(features_out)
+        _, y_size = all_features.GetImageSize(features_out)
+        features_size = all_features.PropagateRequestedRegion(
+            key="out", region=all_features.GetImageRequestedRegion("out"))
+        slic_input = all_features
     # increase estimation...
-    features_ram_estimation = features_ram_estimation * 1.5
-    xy_tiles = math.ceil(
-        math.sqrt(float(features_ram_estimation) / (float(ram) * 1024**2)))
-    slic_parameters = {
-        "in": all_features,
-        "tmpdir": tmp_dir,
-        "spw": force_spw if force_spw else int(spx),
-        "tiling": "manual",
-        "tiling.manual.ny": int(xy_tiles),
-        "tiling.manual.nx": int(xy_tiles),
-        "out": slic_seg_path
-    }
-    slic_seg = CreateSLICApplication(slic_parameters)
+    features_size = features_size * 1.5
+    spw = force_spw if force_spw else int(spx)
 
-    if not os.path.exists(slic_seg_path):
+    # strips must be taller than their margins
+    margin = 3 * spw
+    nb_strips = max(1, min(int(nb_workers), y_size // (4 * margin)))
+
+    if nb_strips == 1:
+        slic_parameters = {
+            "in": slic_input,
+            "tmpdir": tmp_dir,
+            "spw": spw,
+            "tiling": "manual",
+            "tiling.manual.ny": slic_tiling(features_size, ram),
+            "tiling.manual.nx": slic_tiling(features_size, ram),
+            "out": slic_seg_path
+        }
+        slic_seg = CreateSLICApplication(slic_parameters)
         logger.info("Processing SLIC segmentation : {}\n\t\t\
                  with parameters : {}".format(tile_name, slic_parameters))
         slic_seg.ExecuteAndWriteOutput()
+    else:
+        # strips are read by several processes : features are written once
+        if features_raster is None:
+            features_raster = os.path.join(
+                tmp_dir, "{}_SLIC_Features.tif".format(tile_name))
+            logger.info(f"writing features to segment {features_raster}")
+            all_features.SetParameterString(features_out, features_raster)
+            all_features.ExecuteAndWriteOutput()
+            written_features = True
+        extents = strips_extents(y_size, nb_strips, margin)
+        strip_ram = float(ram) / nb_strips
+        strips_args = []
+        for index, extent in enumerate(extents):
+            _, _, read_start, read_end = extent
+            strip_size = features_size * (read_end - read_start) / y_size
+            strips_args.append(
+                (features_raster, extent, spw,
+                 slic_tiling(strip_size, strip_ram),
+                 os.path.join(tmp_dir, f"strip_{index}"),
+                 os.path.join(tmp_dir, f"SLIC_{tile_name}_strip_{index}.tif"),
+                 int(strip_ram)))
+        logger.info(f"Processing SLIC segmentation : {tile_name} by "
+                    f"{nb_strips} strips, spw : {spw}")
+        # spawned workers, not forked from a process running OTB pipelines
+        with mp.get_context("spawn").Pool(processes=nb_strips) as pool:
+            strips = pool.starmap(slic_strip, strips_args)
+        stitch_strips(strips, extents, slic_seg_path)
+        for strip in strips:
+            os.remove(strip)
+        if written_features:
+            os.remove(features_raster)
 
     if working_dir is None:
         shutil.rmtree(tmp_dir)
@@ -0,0 +1,318 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# =========================================================================
+#   Program:   iota2
+#
+#   Copyright (c) CESBIO. All rights reserved.
+#
+#   See LICENSE for details.
+#
+#   This software is distributed WITHOUT ANY WARRANTY; without even
+#   the implied warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR
+#   PURPOSE.  See the above copyright notices for more information.
+#
+# =========================================================================
+"""
+Scheduling of dates preprocessing.
+
+Each date is written by its own process (OTB pipelines release their memory
+when the process ends). At most a bounded number of processes run at once,
+sized by the RAM budget of the tile and the number of available cores, the
+RAM budget and the cores being shared between running processes.
+"""
+import os
+import shutil
+import logging
+import multiprocessing as mp
+from multiprocessing.connection import wait
+from typing import Callable, List, Optional, Sequence, Tuple
+
+LOGGER = logging.getLogger(__name__)
+
+# minimum RAM (Mo) given to the pipeline of a date
+MIN_DATE_RAM = 256
+
+
+def preprocessing_workers(nb_dates: int, ram: float,
+                          nb_cpu: Optional[int] = 1) -> Tuple[int, int]:
+    """number of dates processed at once and RAM (Mo) of each of them
+
+    Parameters
+    ----------
+    nb_dates : int
+        number of dates to process
+    ram : float
+        RAM budget (Mo) of the tile
+    nb_cpu : int
+        number of available cores
+    """
+    ram = int(float(ram))
+    nb_workers = max(1, min(int(nb_cpu), nb_dates, ram // MIN_DATE_RAM))
+    return nb_workers, max(1, ram // nb_workers)
+
+
+def processing_path(output: str, working_dir: Optional[str] = None) -> str:
+    """path where an output is written before being moved to its final
+    location : in the working directory if any, or next to the output with
+    a temporary name, so that an interrupted writing never looks like a
+    preprocessed date
+    """
+    name = os.path.basename(output)
+    if working_dir:
+        return os.path.join(working_dir, name)
+    root, extension = os.path.splitext(output)
+    return f"{root}_tmp{extension}"
+
+
+def move_output(output_processing: str, output: str) -> None:
+    """move a written output to its final location"""
+    if output_processing != output:
+        shutil.move(output_processing, output)
+
+
+def valid_raster(raster: str, epsg: int, resolution: Sequence[float]) -> bool:
+    """True if the raster exists, can be opened and has the expected
+    projection and resolution
+    """
+    from iota2.Common.FileUtils import getRasterProjectionEPSG
+    from iota2.Common.FileUtils import getRasterResolution
+
+    if not os.path.exists(raster):
+        return False
+    try:
+        same_proj = int(getRasterProjectionEPSG(raster)) == int(epsg)
+        same_res = tuple(map(abs, getRasterResolution(raster))) == tuple(
+            map(abs, resolution))
+    except Exception:
+        return False
+    return same_proj and same_res
+
+
+def run_task(function: Callable,
+             args: tuple,
+             nb_threads: Optional[int] = None) -> None:
+    """run a task, OTB applications it builds use nb_threads threads"""
+    if nb_threads is not None:
+        os.environ["ITK_GLOBAL_DEFAULT_NUMBER_OF_THREADS"] = str(nb_threads)
+    function(*args)
+
+
+def run_processes(tasks: List[Tuple[str, Callable, tuple]],
+                  nb_workers: Optional[int] = 1,
+                  nb_threads: Optional[int] = None,
+                  logger: Optional[logging.Logger] = LOGGER) -> None:
+    """run tasks, each of them in its own process, at most nb_workers at
+    once
+
+    Parameters
+    ----------
+    tasks : list
+        [(task name, function, arguments), ...]
+    nb_workers : int
+        maximum number of running processes
+    nb_threads : int
+        number of threads of OTB applications in each process, inherited
+        from the parent process if None
+    logger : logging.Logger
+        logger
+    """
+    # processes are forked : functions and arguments are not pickled
+    context = mp.get_context("fork")
+    pending = list(tasks)
+    running = {}
+    failed = []
+    while pending or running:
+        while pending and len(running) < nb_workers:
+            name, function, args = pending.pop(0)
+            logger.debug(f"processing {name}")
+            process = context.Process(target=run_task,
+                                      args=(function, args, nb_threads))
+            process.start()
+            running[process.sentinel] = (name, process)
+        for sentinel in wait(list(running)):
+            name, process = running.pop(sentinel)
+            process.join()
+            if process.exitcode != 0:
+                logger.error(f"processing {name} failed "
+                             f"(exit code {process.exitcode})")
+                failed.append(name)
+    if failed:
+        raise Exception("preprocessing failed for : {}".format(
+            ", ".join(failed)))
+
+
+class DatesWriter():
+    """writing of the dates of optical sensors whose dates are directories
+    of bands and masks (Sentinel-2, Landsat 8)
+
+    Sensors provide the attributes tile_directory, output_preprocess_directory,
+    ref_image, target_proj, working_resolution, data_type,
+    stack_band_position, masks_rules, struct_path_masks, masks_date_suffix
+    and the methods build_stack_date_name, reproject_date_bands and
+    preprocess_date_masks
+    """
+    def date_stack_paths(self, date_dir, out_prepro, working_dir=None,
+                         logger=LOGGER):
+        """
+        output stack of a date and the path where it is written
+        """
+        date_stack_name = self.build_stack_date_name(date_dir)
+        out_stack = os.path.join(date_dir, date_stack_name)
+        if out_prepro:
+            _, date_dir_name = os.path.split(date_dir)
+            out_dir = os.path.join(out_prepro, date_dir_name)
+            if not os.path.exists(out_dir):
+                try:
+                    os.mkdir(out_dir)
+                except OSError:
+                    logger.warning(f"{out_dir} already exists")
+            out_stack = os.path.join(out_dir, date_stack_name)
+        return out_stack, processing_path(out_stack, working_dir)
+
+    def date_masks_paths(self, date_dir, out_prepro, working_dir=None):
+        """
+        input masks of a date, output binary mask and the path where it is
+        written
+        """
+        import glob
+        from iota2.Common.FileUtils import ensure_dir
+
+        # TODO : throw Exception if no masks are found
+        date_mask = []
+        for mask_name, _ in list(self.masks_rules.items()):
+            date_mask.append(
+                glob.glob(
+                    os.path.join(date_dir,
+                                 f"{self.struct_path_masks}{mask_name}"))[0])
+
+        mask_dir = os.path.dirname(date_mask[0])
+        mask_name = os.path.basename(date_mask[0]).replace(
+            list(self.masks_rules.items())[0][0],
+            "{}.tif".format(self.masks_date_suffix))
+        out_mask = os.path.join(mask_dir, mask_name)
+        if out_prepro:
+            out_mask_dir = mask_dir.replace(self.tile_directory, out_prepro)
+            ensure_dir(out_mask_dir, raise_exe=False)
+            out_mask = os.path.join(out_mask_dir, mask_name)
+        return date_mask, out_mask, processing_path(out_mask, working_dir)
+
+    def generate_ref_image(self, date_dir, logger=LOGGER):
+        """
+        tile reference image generation, from the first band of a date
+        """
+        from gdal import Warp
+        from osgeo.gdalconst import GDT_Byte
+        from iota2.Common.FileUtils import ensure_dir
+        from iota2.Common.FileUtils import getRasterProjectionEPSG
+        from iota2.Common.FileUtils import FileSearch_AND
+        from iota2.Common.FileUtils import getRasterResolution
+
+        if os.path.exists(self.ref_image):
+            return
+        base_ref = FileSearch_AND(
+            date_dir, True,
+            "{}_{}.tif".format(self.data_type,
+                               self.stack_band_position[0]))[0]
+        logger.info(
+            f"reference image generation {self.ref_image} from {base_ref}")
+        ensure_dir(os.path.dirname(self.ref_image), raise_exe=False)
+        base_ref_projection = getRasterProjectionEPSG(base_ref)
+        base_ref_res_x, base_ref_res_y = getRasterResolution(base_ref)
+        if self.working_resolution:
+            base_ref_res_x = self.working_resolution[0]
+            base_ref_res_y = self.working_resolution[1]
+        Warp(self.ref_image,
+             base_ref,
+             multithread=True,
+             format="GTiff",
+             xRes=base_ref_res_x,
+             yRes=base_ref_res_y,
+             outputType=GDT_Byte,
+             srcSRS="EPSG:{}".format(base_ref_projection),
+             dstSRS="EPSG:{}".format(self.target_proj))
+
+    def date_outputs_valid(self, date_dir, out_prepro):
+        """
+        True if the stack and the binary mask of a date are already written
+        with the expected projection and resolution
+        """
+        from iota2.Common.FileUtils import getRasterResolution
+
+        resolution = getRasterResolution(self.ref_image)
+        out_stack, _ = self.date_stack_paths(date_dir, out_prepro)
+        _, out_mask, _ = self.date_masks_paths(date_dir, out_prepro)
+        return all(
+            valid_raster(output, self.target_proj, resolution)
+            for output in [out_stack, out_mask])
+
+    def write_date(self,
+                   date_dir,
+                   out_prepro,
+                   working_dir=None,
+                   ram=128,
+                   logger=LOGGER):
+        """
+        write the stack and the binary mask of a date, both are
+        reprojected by the same process
+        """
+        from iota2.Common.FileUtils import getRasterResolution
+        from iota2.Common.OtbAppBank import CreateConcatenateImagesApplication
+
+        resolution = getRasterResolution(self.ref_image)
+        out_stack, out_stack_processing = self.date_stack_paths(
+            date_dir, out_prepro, working_dir)
+        if not valid_raster(out_stack, self.target_proj, resolution):
+            all_reproj = list(
+                self.reproject_date_bands(date_dir, ram).values())
+            for reproj in all_reproj:
+                reproj.Execute()
+            date_stack = CreateConcatenateImagesApplication({
+                "il": all_reproj,
+                "ram": str(ram),
+                "pixType": "int16",
+                "out": out_stack_processing
+            })
+            logger.info(f"writing {out_stack}")
+            date_stack.ExecuteAndWriteOutput()
+            move_output(out_stack_processing, out_stack)
+
+        _, out_mask, out_mask_processing = self.date_masks_paths(
+            date_dir, out_prepro, working_dir)
+        if not valid_raster(out_mask, self.target_proj, resolution):
+            mask_app, _ = self.preprocess_date_masks(date_dir, out_prepro,
+                                                     working_dir, ram)
+            logger.info(f"writing {out_mask}")
+            mask_app.ExecuteAndWriteOutput()
+            move_output(out_mask_processing, out_mask)
+
+    def write_dates(self,
+                    input_dates,
+                    working_dir=None,
+                    ram=128,
+                    nb_cpu=1,
+                    logger=LOGGER):
+        """
+        write dates which are not already preprocessed, dates are
+        processed in parallel according to the RAM budget and the number of
+        available cores, which are shared between running processes
+        """
+        if not input_dates:
+            return
+        # the reference image is shared by every dates
+        self.generate_ref_image(input_dates[0])
+        dates_to_write = [
+            date for date in input_dates if not self.date_outputs_valid(
+                date, self.output_preprocess_directory)
+        ]
+        if not dates_to_write:
+            return
+        nb_workers, date_ram = preprocessing_workers(len(dates_to_write), ram,
+                                                     nb_cpu)
+        logger.info(f"preprocessing {len(dates_to_write)} dates, "
+                    f"{nb_workers} at once with {date_ram} Mo each")
+        run_processes([(date, self.write_date,
+                        (date, self.output_preprocess_directory, working_dir,
+                         date_ram)) for date in dates_to_write],
+                      nb_workers,
+                      nb_threads=max(1, int(nb_cpu) // nb_workers))
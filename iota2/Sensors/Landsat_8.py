@@ -18,6 +18,8 @@ The landsat 8 sensor class
 """
 import logging
 
+from iota2.Sensors.DatesPreprocessing import DatesWriter
+
 # from collections import OrderedDict
 # import multiprocessing as mp
 # import glob
@@ -31,7 +33,7 @@ LOGGER = logging.getLogger(__name__)
 LOGGER.addHandler(logging.NullHandler())
 
 
-class landsat_8():
+class landsat_8(DatesWriter):
     """
     Landsat 8 sensor
     """
@@ -201,120 +203,48 @@ class landsat_8():
         return b2_name.replace(f"{self.data_type}_B2.tif",
                                f"{self.data_type}_{self.suffix}.tif")
 
-    def preprocess_date(self,
-                        date_dir,
-                        out_prepro,
-                        working_dir=None,
-                        ram=128,
-                        logger=LOGGER):
+    def reproject_date_bands(self, date_dir, ram=128):
         """
-        Preprocess each date
+        reproject / resample bands of a date on the reference image
         """
-        import os
-        import shutil
-        from gdal import Warp
-        import multiprocessing as mp
-        from osgeo.gdalconst import GDT_Byte
         from collections import OrderedDict
-        from iota2.Common.FileUtils import ensure_dir
-        from iota2.Common.FileUtils import getRasterProjectionEPSG
         from iota2.Common.FileUtils import FileSearch_AND
-        from iota2.Common.OtbAppBank import CreateConcatenateImagesApplication
         from iota2.Common.OtbAppBank import CreateSuperimposeApplication
-        from iota2.Common.OtbAppBank import executeApp
-        from iota2.Common.FileUtils import getRasterResolution
 
-        # manage directories
-        date_stack_name = self.build_stack_date_name(date_dir)
-        logger.debug(f"preprocessing {date_dir}")
-        out_stack = os.path.join(date_dir, date_stack_name)
-        if out_prepro:
-            _, date_dir_name = os.path.split(date_dir)
-            out_dir = os.path.join(out_prepro, date_dir_name)
-            if not os.path.exists(out_dir):
-                try:
-                    os.mkdir(out_dir)
-                except OSError:
-                    logger.warning(f"{out_dir} already exists")
-            out_stack = os.path.join(out_dir, date_stack_name)
-
-        out_stack_processing = out_stack
-        if working_dir:
-            out_stack_processing = os.path.join(working_dir, date_stack_name)
-
-        # get bands
-        date_bands = [
-            FileSearch_AND(date_dir, True,
-                           "{}_{}.tif".format(self.data_type, bands_name))[0]
-            for bands_name in self.stack_band_position
-        ]
-
-        # tile reference image generation
-        base_ref = date_bands[0]
-        ensure_dir(os.path.dirname(self.ref_image), raise_exe=False)
-        base_ref_projection = getRasterProjectionEPSG(base_ref)
-        base_ref_res_x, base_ref_res_y = getRasterResolution(base_ref)
-        if self.working_resolution:
-            base_ref_res_x = self.working_resolution[0]
-            base_ref_res_y = self.working_resolution[1]
-
-        if not os.path.exists(self.ref_image):
-            logger.info(
-                f"reference image generation {self.ref_image} from {base_ref}")
-            Warp(self.ref_image,
-                 base_ref,
-                 multithread=True,
-                 format="GTiff",
-                 xRes=base_ref_res_x,
-                 yRes=base_ref_res_y,
-                 outputType=GDT_Byte,
-                 srcSRS="EPSG:{}".format(base_ref_projection),
-                 dstSRS="EPSG:{}".format(self.target_proj))
-
-        # reproject / resample
         bands_proj = OrderedDict()
-        all_reproj = []
-        for band, band_name in zip(date_bands, self.stack_band_position):
+        for band_name in self.stack_band_position:
+            band = FileSearch_AND(date_dir, True,
+                                  "{}_{}.tif".format(self.data_type,
+                                                     band_name))[0]
             superimp, _ = CreateSuperimposeApplication({
                 "inr": self.ref_image,
                 "inm": band,
                 "ram": str(ram)
             })
             bands_proj[band_name] = superimp
-            all_reproj.append(superimp)
+        return bands_proj
+
+    def preprocess_date(self,
+                        date_dir,
+                        out_prepro,
+                        working_dir=None,
+                        ram=128,
+                        logger=LOGGER):
+        """
+        preprocess date
 
+        Return
+        ------
+        the reprojected bands (in memory) or, if dates are written, the
+        date's stack path (see write_date)
+        """
+        logger.debug(f"preprocessing {date_dir}")
+        self.generate_ref_image(date_dir)
         if self.write_dates_stack:
-            for reproj in all_reproj:
-                reproj.Execute()
-            date_stack = CreateConcatenateImagesApplication({
-                "il":
-                all_reproj,
-                "ram":
-                str(ram),
-                "pixType":
-                "int16",
-                "out":
-                out_stack_processing
-            })
-            same_proj = False
-            same_res = True
-            if os.path.exists(out_stack):
-                same_proj = int(getRasterProjectionEPSG(out_stack)) == int(
-                    self.target_proj)
-                same_res = tuple(map(
-                    abs,
-                    getRasterResolution(out_stack))) == (base_ref_res_x,
-                                                         abs(base_ref_res_y))
-            if not os.path.exists(
-                    out_stack) or same_proj is False or not same_res:
-                # ~ date_stack.ExecuteAndWriteOutput()
-                multi_proc = mp.Process(target=executeApp, args=[date_stack])
-                multi_proc.start()
-                multi_proc.join()
-                if working_dir:
-                    shutil.copy(out_stack_processing, out_stack)
-                    os.remove(out_stack_processing)
-        return bands_proj if self.write_dates_stack is False else out_stack
+            out_stack, _ = self.date_stack_paths(date_dir, out_prepro,
+                                                 working_dir)
+            return out_stack
+        return self.reproject_date_bands(date_dir, ram)
 
     def preprocess_date_masks(self,
                               date_dir,
@@ -325,42 +255,12 @@ class landsat_8():
         """
         preprocess date mask
         """
-        import os
-        import shutil
-        import glob
-        import multiprocessing as mp
-        from iota2.Common.FileUtils import ensure_dir
         from iota2.Common.OtbAppBank import CreateBandMathApplication
         from iota2.Common.OtbAppBank import CreateSuperimposeApplication
-        from iota2.Common.FileUtils import getRasterProjectionEPSG
-        from iota2.Common.OtbAppBank import executeApp
-        from iota2.Common.FileUtils import getRasterResolution
-
-        # TODO : throw Exception if no masks are found
-        date_mask = []
-        for mask_name, _ in list(self.masks_rules.items()):
-            date_mask.append(
-                glob.glob(
-                    os.path.join(date_dir,
-                                 f"{self.struct_path_masks}{mask_name}"))[0])
-
-        # manage directories
-        mask_dir = os.path.dirname(date_mask[0])
-        logger.debug(f"preprocessing {mask_dir} masks")
-        mask_name = os.path.basename(date_mask[0]).replace(
-            list(self.masks_rules.items())[0][0],
-            "{}.tif".format(self.masks_date_suffix),
-        )
-        out_mask = os.path.join(mask_dir, mask_name)
-        if out_prepro:
-            out_mask_dir = mask_dir.replace(
-                os.path.join(self.l8_data, self.tile_name), out_prepro)
-            ensure_dir(out_mask_dir, raise_exe=False)
-            out_mask = os.path.join(out_mask_dir, mask_name)
 
-        out_mask_processing = out_mask
-        if working_dir:
-            out_mask_processing = os.path.join(working_dir, mask_name)
+        date_mask, _, out_mask_processing = self.date_masks_paths(
+            date_dir, out_prepro, working_dir)
+        logger.debug(f"preprocessing {date_dir} masks")
 
         # build binary mask
         expr = "+".join([f"im{cpt+1}b1" for cpt in range(len(date_mask))])
@@ -382,30 +282,20 @@ class landsat_8():
 
         # needed to travel throught iota2's library
         app_dep = [binary_mask_rule]
-
-        if self.write_dates_stack:
-            same_proj = False
-            same_res = True
-            if os.path.exists(out_mask):
-                same_proj = int(getRasterProjectionEPSG(out_mask)) == int(
-                    self.target_proj)
-                same_res = getRasterResolution(
-                    out_mask) == getRasterResolution(self.ref_image)
-            if not os.path.exists(
-                    out_mask) or same_proj is False or not same_res:
-                # ~ superimp.ExecuteAndWriteOutput()
-                multi_proc = mp.Process(target=executeApp, args=[superimp])
-                multi_proc.start()
-                multi_proc.join()
-                if working_dir:
-                    shutil.copy(out_mask_processing, out_mask)
-                    os.remove(out_mask_processing)
-
         return superimp, app_dep
 
-    def preprocess(self, working_dir=None, ram=128):
+    def preprocess(self, working_dir=None, ram=128, nb_cpu=1):
         """
         preprocess
+
+        Parameters
+        ----------
+        working_dir : str
+            working directory
+        ram : int
+            RAM budget (Mo)
+        nb_cpu : int
+            number of available cores, dates are written in parallel
         """
         import os
         from collections import OrderedDict
@@ -415,6 +305,9 @@ class landsat_8():
         ]
         input_dates = self.sort_dates_directories(input_dates)
 
+        if self.write_dates_stack:
+            self.write_dates(input_dates, working_dir, ram, nb_cpu)
+
         preprocessed_dates = OrderedDict()
         for date in input_dates:
             data_prepro = self.preprocess_date(
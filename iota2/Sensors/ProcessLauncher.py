@@ -19,7 +19,8 @@ def preprocess(tile_name,
                config_path,
                output_path,
                working_directory=None,
-               RAM=128):
+               RAM=128,
+               nb_cpu=1):
     """
     preprocessing input rasters data by tile
     
@@ -35,6 +36,8 @@ def preprocess(tile_name,
         absolute path to a working directory
     RAM [int]
         pipeline's size (Mo)
+    nb_cpu [int]
+        number of available cores
     """
     from iota2.Sensors.Sensors_container import sensors_container
     from iota2.Common.ServiceConfigFile import iota2_parameters
@@ -44,17 +47,155 @@ def preprocess(tile_name,
     remote_sensor_container = sensors_container(tile_name, working_directory,
                                                 output_path,
                                                 **sensors_parameters)
-    remote_sensor_container.sensors_preprocess(available_ram=RAM)
+    remote_sensor_container.sensors_preprocess(available_ram=RAM,
+                                               nb_cpu=nb_cpu)
+
+
+def time_series_masks(remote_sensor_container, RAM=128):
+    """
+    concatenate time series masks of every sensors
+
+    Parameters
+    ----------
+    remote_sensor_container [sensors_container]
+        sensors of a tile
+    RAM [int]
+        pipeline's size (Mo)
+
+    Return
+    ------
+    tuple
+        (otbApplication, number of dates, dependencies)
+    """
+    from iota2.Common.OtbAppBank import CreateConcatenateImagesApplication
+
+    sensors_time_series_masks = remote_sensor_container.get_sensors_time_series_masks(
+        available_ram=RAM)
+    sensors_masks_size = []
+    sensors_masks = []
+    masks_dep = []
+    for sensor_name, (time_series_masks, time_series_dep,
+                      nb_bands) in sensors_time_series_masks:
+        if sensor_name.lower() == "sentinel1":
+            for _, time_series_masks_app in list(time_series_masks.items()):
+                time_series_masks_app.Execute()
+                sensors_masks.append(time_series_masks_app)
+        else:
+            time_series_masks.Execute()
+            sensors_masks.append(time_series_masks)
+        masks_dep.append(time_series_dep)
+        sensors_masks_size.append(nb_bands)
+
+    total_dates = sum(sensors_masks_size)
+    merge_masks = CreateConcatenateImagesApplication({
+        "il": sensors_masks,
+        "ram": str(RAM)
+    })
+    merge_masks.Execute()
+    return merge_masks, total_dates, [sensors_masks, masks_dep]
+
+
+def validity_expression(total_dates, band=1):
+    """
+    BandMath expression counting clear views of the image 'band' of
+    masks (1 : not valid)
+    """
+    return "{}-({})".format(
+        total_dates,
+        "+".join(["im{}b{}".format(band, i + 1) for i in range(total_dates)]))
+
+
+def split_fused_masks(fused_raster,
+                      common_mask_raster,
+                      validity_raster,
+                      validity_pix_type,
+                      footprint_vector,
+                      block_size=None):
+    """
+    write bands of the fused raster (common mask, number of valid dates) to
+    their own rasters and trace the footprint of the common mask, in a
+    single pass
+
+    Parameters
+    ----------
+    fused_raster [string]
+        raster containing the common mask (band 1) and the number of valid
+        dates (band 2)
+    common_mask_raster [string]
+        output common mask, not written if None
+    validity_raster [string]
+        output validity raster
+    validity_pix_type [string]
+        validity pixel type (gdal name)
+    footprint_vector [string]
+        output footprint of the common mask (see MaskFootprint)
+    block_size [int]
+        number of rows read at once, default to the profile tiles size
+    """
+    import numpy as np
+    from osgeo import gdal
+    from iota2.Common import MaskFootprint
+    from iota2.Common.RasterProfile import gdal_creation_options
+    from iota2.Common.RasterProfile import get_output_profile
+
+    if block_size is None:
+        block_size = get_output_profile()["block_size"]
+    fused_ds = gdal.Open(fused_raster)
+    x_size, y_size = fused_ds.RasterXSize, fused_ds.RasterYSize
+
+    outputs = []
+    for band, raster, data_type in [(1, common_mask_raster, "Byte"),
+                                    (2, validity_raster, validity_pix_type)]:
+        if raster is None:
+            continue
+        out_ds = gdal.GetDriverByName("GTiff").Create(
+            raster,
+            x_size,
+            y_size,
+            1,
+            gdal.GetDataTypeByName(data_type),
+            options=gdal_creation_options(data_type))
+        out_ds.SetGeoTransform(fused_ds.GetGeoTransform())
+        out_ds.SetProjection(fused_ds.GetProjection())
+        outputs.append((band, out_ds))
+
+    first = np.full(y_size, -1, dtype=np.int64)
+    last = np.full(y_size, -1, dtype=np.int64)
+    gaps = False
+    for row in range(0, y_size, block_size):
+        rows = min(block_size, y_size - row)
+        block = fused_ds.ReadAsArray(0, row, x_size, rows)
+        first[row:row + rows], last[row:row + rows] = MaskFootprint.row_spans(
+            block[0])
+        gaps = gaps or MaskFootprint.rows_with_gaps(
+            block[0], first[row:row + rows], last[row:row + rows])
+        for band, out_ds in outputs:
+            out_ds.GetRasterBand(1).WriteArray(block[band - 1], 0, row)
+    for _, out_ds in outputs:
+        out_ds.FlushCache()
+    if gaps:
+        MaskFootprint.polygonize_footprint(fused_raster, footprint_vector)
+    else:
+        MaskFootprint.write_footprint(
+            MaskFootprint.footprint_rings(first, last),
+            fused_ds.GetGeoTransform(), fused_ds.GetProjection(),
+            footprint_vector)
+    outputs = fused_ds = None
 
 
 def commonMasks(tile_name,
                 output_path,
                 sensors_parameters,
                 working_directory=None,
-                RAM=128):
+                RAM=128,
+                compute_validity=True):
     """
     compute common mask considering all sensors by tile
 
+    The common mask, the number of valid dates (nbView.tif, see validity)
+    and the footprint of the common mask (vector) are produced in a single
+    pass over dates masks.
+
     Parameters
     ----------
     tile_name [string]
@@ -67,29 +208,59 @@ def commonMasks(tile_name,
         absolute path to a working directory
     RAM [int]
         pipeline's size (Mo)
+    compute_validity [bool]
+        flag to compute the number of valid dates
     """
     import os
     from iota2.Sensors.Sensors_container import sensors_container
-    from iota2.Common.Utils import run
+    from iota2.Common.OtbAppBank import CreateBandMathXApplication
     from iota2.Common.FileUtils import ensure_dir
+    from iota2.Common.MaskFootprint import mask_footprint
 
     # running_parameters = iota2_parameters(config_path)
     # sensors_parameters = running_parameters.get_sensors_parameters(tile_name)
     remote_sensor_container = sensors_container(tile_name, working_directory,
                                                 output_path,
                                                 **sensors_parameters)
-    common_mask, _ = remote_sensor_container.get_common_sensors_footprint(
+    # dependencies are needed to keep OTB's pipelines alive
+    common_mask, common_mask_dep = remote_sensor_container.get_common_sensors_footprint(
         available_ram=RAM)
     common_mask_raster = common_mask.GetParameterValue("out")
+    common_mask_vector = common_mask_raster.replace(".tif", ".shp")
+    ensure_dir(os.path.split(common_mask_raster)[0], raise_exe=False)
 
-    if not os.path.exists(common_mask_raster):
-        ensure_dir(os.path.split(common_mask_raster)[0], raise_exe=False)
-        common_mask.ExecuteAndWriteOutput()
+    features_dir = os.path.join(output_path, "features", tile_name)
+    validity_raster = os.path.join(features_dir, "nbView.tif")
+    if not compute_validity or os.path.exists(validity_raster):
+        if not os.path.exists(common_mask_raster):
+            common_mask.ExecuteAndWriteOutput()
+        mask_footprint(common_mask_raster, common_mask_vector)
+        return
 
-    common_mask_vector = common_mask_raster.replace(".tif", ".shp")
-    common_mask_vector_cmd = "gdal_polygonize.py -f \"ESRI Shapefile\" -mask {} {} {}".format(
-        common_mask_raster, common_mask_raster, common_mask_vector)
-    run(common_mask_vector_cmd)
+    merge_masks, total_dates, masks_dep = time_series_masks(
+        remote_sensor_container, RAM)
+    common_mask.Execute()
+    fused_dir = os.path.split(common_mask_raster)[0]
+    if working_directory:
+        fused_dir = os.path.join(working_directory, tile_name)
+        ensure_dir(fused_dir)
+    fused_raster = os.path.join(fused_dir, "MaskCommunSL_nbView.tif")
+    validity_pix_type = "uint8" if total_dates < 255 else "uint16"
+    fused_masks = CreateBandMathXApplication({
+        "il": [common_mask, merge_masks],
+        "exp":
+        "im1b1;{}".format(validity_expression(total_dates, band=2)),
+        "ram": str(RAM),
+        "pixType": validity_pix_type,
+        "out": fused_raster
+    })
+    fused_masks.ExecuteAndWriteOutput()
+    split_fused_masks(
+        fused_raster, None
+        if os.path.exists(common_mask_raster) else common_mask_raster,
+        validity_raster, "Byte" if validity_pix_type == "uint8" else "UInt16",
+        common_mask_vector)
+    os.remove(fused_raster)
 
 
 def validity(tile_name,
@@ -121,7 +292,6 @@ def validity(tile_name,
     import shutil
     from iota2.Common.ServiceConfigFile import iota2_parameters
     from iota2.Sensors.Sensors_container import sensors_container
-    from iota2.Common.OtbAppBank import CreateConcatenateImagesApplication
     from iota2.Common.OtbAppBank import CreateBandMathApplication
     from iota2.Common.Utils import run
     from iota2.Common.FileUtils import erodeShapeFile
@@ -138,53 +308,33 @@ def validity(tile_name,
         validity_processing = os.path.join(workingDirectory, tile_name,
                                            validity_name)
 
-    running_parameters = iota2_parameters(config_path)
-    sensors_parameters = running_parameters.get_sensors_parameters(tile_name)
-    remote_sensor_container = sensors_container(tile_name, workingDirectory,
-                                                output_path,
-                                                **sensors_parameters)
-
-    sensors_time_series_masks = remote_sensor_container.get_sensors_time_series_masks(
-        available_ram=RAM)
-    sensors_masks_size = []
-    sensors_masks = []
-    for sensor_name, (time_series_masks, time_series_dep,
-                      nb_bands) in sensors_time_series_masks:
-        if sensor_name.lower() == "sentinel1":
-            for _, time_series_masks_app in list(time_series_masks.items()):
-                time_series_masks_app.Execute()
-                sensors_masks.append(time_series_masks_app)
-        else:
-            time_series_masks.Execute()
-            sensors_masks.append(time_series_masks)
-        sensors_masks_size.append(nb_bands)
-
-    total_dates = sum(sensors_masks_size)
-    merge_masks = CreateConcatenateImagesApplication({
-        "il": sensors_masks,
-        "ram": str(RAM)
-    })
-    merge_masks.Execute()
+    # nbView.tif is usually produced with the common mask (see commonMasks)
+    if not os.path.exists(validity_out):
+        running_parameters = iota2_parameters(config_path)
+        sensors_parameters = running_parameters.get_sensors_parameters(
+            tile_name)
+        remote_sensor_container = sensors_container(tile_name,
+                                                    workingDirectory,
+                                                    output_path,
+                                                    **sensors_parameters)
+        merge_masks, total_dates, _ = time_series_masks(
+            remote_sensor_container, RAM)
 
-    validity_app = CreateBandMathApplication({
-        "il":
-        merge_masks,
-        "exp":
-        "{}-({})".format(
-            total_dates,
-            "+".join(["im1b{}".format(i + 1) for i in range(total_dates)])),
-        "ram":
-        str(0.7 * RAM),
-        "pixType":
-        "uint8" if total_dates < 255 else "uint16",
-        "out":
-        validity_processing
-    })
-    if not os.path.exists(os.path.join(features_dir, validity_name)):
+        validity_app = CreateBandMathApplication({
+            "il":
+            merge_masks,
+            "exp":
+            validity_expression(total_dates),
+            "ram":
+            str(0.7 * RAM),
+            "pixType":
+            "uint8" if total_dates < 255 else "uint16",
+            "out":
+            validity_processing
+        })
         validity_app.ExecuteAndWriteOutput()
         if workingDirectory:
-            shutil.copy(validity_processing,
-                        os.path.join(features_dir, validity_name))
+            shutil.copy(validity_processing, validity_out)
     threshold_raster_out = os.path.join(features_dir,
                                         maskOut_name.replace(".shp", ".tif"))
     threshold_vector_out_tmp = os.path.join(
@@ -14,6 +14,7 @@ from osgeo import osr
 from osgeo.gdalconst import *
 
 from Common import OtbAppBank
+from Common import RasterProfile
 from . import S1FileManager
 from . import S1FilteringProcessor
 
@@ -415,7 +416,7 @@ class Sentinel1_PreProcess(object):
                             tmp.append(currentOrtho.GetParameterValue(OtbAppBank.getInputParameterOutput(currentOrtho)))
 
             name = "_".join(name)+".tif"
-            outputImage=os.path.join(self.outputPreProcess,tile,name+"?&writegeom=false")
+            outputImage=RasterProfile.otb_extended_filename(os.path.join(self.outputPreProcess,tile,name), "float")
             concatAppli = OtbAppBank.CreateBandMathApplication({"il": tmp,
                                                                 "exp": "max(im1b1,im2b1)",
                                                                 "ram": str(self.RAMPerProcess),
@@ -452,7 +453,7 @@ class Sentinel1_PreProcess(object):
                                                                  "exp": "max(im1b1,im2b1)",
                                                                  "ram": str(self.RAMPerProcess),
                                                                  "pixType": "uint8",
-                                                                 "out": outputImage+"?&writegeom=false"})
+                                                                 "out": RasterProfile.otb_extended_filename(outputImage, "uint8")})
             allMasks.append((concatAppliM,""))
 
         for currentMask,_ in maskList:
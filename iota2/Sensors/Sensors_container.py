@@ -227,18 +227,22 @@ class sensors_container():
                 paths.append(user_feat["image_directory"])
         return paths
 
-    def sensors_preprocess(self, available_ram=128):
+    def sensors_preprocess(self, available_ram=128, nb_cpu=1):
         """preprocessing every enabled sensors
 
         Parameters
         ----------
         available_ram : int
             RAM, usefull to many OTB's applications.
+        nb_cpu : int
+            number of available cores
         """
         for sensor in self.enabled_sensors:
-            self.sensor_preprocess(sensor, self.working_dir, available_ram)
+            self.sensor_preprocess(sensor, self.working_dir, available_ram,
+                                   nb_cpu)
 
-    def sensor_preprocess(self, sensor, working_dir, available_ram):
+    def sensor_preprocess(self, sensor, working_dir, available_ram,
+                          nb_cpu=1):
         """sensor preprocessing
 
         Parameters
@@ -249,6 +253,9 @@ class sensors_container():
             data
         available_ram : int
             RAM, usefull to many OTB's applications.
+        nb_cpu : int
+            number of available cores, given to sensors able to preprocess
+            dates in parallel
 
         Return
         ------
@@ -257,10 +264,16 @@ class sensors_container():
             nothing is done with it, no object's type are imposed
             but it could change.
         """
+        import inspect
+
         sensor_prepro_app = None
         if "preprocess" in dir(sensor):
+            kwargs = {}
+            if "nb_cpu" in inspect.signature(sensor.preprocess).parameters:
+                kwargs["nb_cpu"] = nb_cpu
             sensor_prepro_app = sensor.preprocess(working_dir=working_dir,
-                                                  ram=available_ram)
+                                                  ram=available_ram,
+                                                  **kwargs)
         return sensor_prepro_app
 
     def sensors_dates(self):
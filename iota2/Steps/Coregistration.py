@@ -93,7 +93,8 @@ class Coregistration(IOTA2Step.Step):
             cfg.getParam('coregistration', 'dateSrc'),
             cfg.getParam('chain', 'listTile'), l5_path, l8_path, s2_path,
             s2_s2c_path, correg_pattern, True,
-            sensors_parameters.get_sensors_parameters(x))
+            sensors_parameters.get_sensors_parameters(x),
+            self.resources["cpu"])
         # return step_function
 
     def step_outputs(self):
@@ -235,6 +235,13 @@ class Step(object):
         #~ print("{}.step_clean Not define".format(self.__class__.__name__))
         pass
 
+    def task_affinity(self, param):
+        """
+        tasks with the same affinity (ie : using the same model) are
+        preferably sent to the same MPI worker. None means no affinity.
+        """
+        return None
+
     @classmethod
     def step_inputs(self):
         return [1, 2]
@@ -28,6 +28,16 @@ class VectorFormatting(IOTA2Step.Step):
 
         # step variables
         self.working_directory = workingDirectory
+        output_path = SCF.serviceConfigFile(self.cfg).getParam(
+            'chain', 'outputPath')
+        self.ground_truth_vec = SCF.serviceConfigFile(self.cfg).getParam(
+            'chain', 'groundTruth')
+        self.region_vec = SCF.serviceConfigFile(self.cfg).getParam(
+            'chain', 'regionPath')
+        if not self.region_vec:
+            self.region_vec = os.path.join(output_path, "MyRegion.shp")
+        # not in formattingVectors whose shapefiles are tiles samples
+        self.index_directory = os.path.join(output_path, "spatialIndex")
 
     def step_description(self):
         """
@@ -42,6 +52,13 @@ class VectorFormatting(IOTA2Step.Step):
         ------
             the return could be and iterable or a callable
         """
+        from iota2.VectorTools.TileIntersection import spatial_index_copy
+        # spatial indexes are built once, before tiles are processed in
+        # parallel
+        spatial_index_copy(self.ground_truth_vec,
+                           os.path.join(self.index_directory, "groundTruth"))
+        spatial_index_copy(self.region_vec,
+                           os.path.join(self.index_directory, "region"))
         tiles = SCF.serviceConfigFile(self.cfg).getParam('chain',
                                                          'listTile').split(" ")
         return tiles
@@ -55,10 +72,12 @@ class VectorFormatting(IOTA2Step.Step):
             must be a lambda function.
         """
         from iota2.Sampling import VectorFormatting as VF
+        from iota2.VectorTools.TileIntersection import indexed_vector
         output_path = SCF.serviceConfigFile(self.cfg).getParam(
             'chain', 'outputPath')
-        ground_truth_vec = SCF.serviceConfigFile(self.cfg).getParam(
-            'chain', 'groundTruth')
+        ground_truth_vec = indexed_vector(
+            self.ground_truth_vec,
+            os.path.join(self.index_directory, "groundTruth"))
         data_field = (SCF.serviceConfigFile(self.cfg).getParam(
             'chain', 'dataField')).lower()
 
@@ -77,14 +96,10 @@ class VectorFormatting(IOTA2Step.Step):
         epsg = int(
             (SCF.serviceConfigFile(self.cfg).getParam('GlobChain',
                                                       'proj')).split(":")[-1])
-        region_vec = SCF.serviceConfigFile(self.cfg).getParam(
-            'chain', 'regionPath')
+        region_vec = indexed_vector(
+            self.region_vec, os.path.join(self.index_directory, "region"))
         region_field = (SCF.serviceConfigFile(self.cfg).getParam(
             'chain', 'regionField')).lower()
-        if not region_vec:
-            region_vec = os.path.join(
-                SCF.serviceConfigFile(self.cfg).getParam(
-                    "chain", "outputPath"), "MyRegion.shp")
 
         merge_final_classifications = SCF.serviceConfigFile(self.cfg).getParam(
             'chain', 'merge_final_classifications')
@@ -48,6 +48,9 @@ class classification(IOTA2Step.Step):
         else:
             self.number_of_chunks = None
 
+        self.fan_out = SCF.serviceConfigFile(self.cfg).getParam(
+            'argClassification', 'enable_fan_out_inference')
+
         # ~ TODO : find a smarted way to determine the attribute self.scikit_tile_split
         self.scikit_tile_split = 50
 
@@ -113,11 +116,56 @@ class classification(IOTA2Step.Step):
                 "targeted_chunk":
                 target_chunk,
                 "ram":
-                param[19]
+                param[19],
+                "model_cache_size":
+                SCF.serviceConfigFile(self.cfg).getParam(
+                    'argClassification', 'model_cache_size'),
+                "proba_type":
+                SCF.serviceConfigFile(self.cfg).getParam(
+                    'argClassification', 'probability_type')
             } for param in parameters
                           for target_chunk in range(self.scikit_tile_split)]
+            if self.fan_out:
+                parameters = self.fan_out_parameters(parameters)
         return parameters
 
+    @staticmethod
+    def fan_out_parameters(parameters):
+        """
+        gather predict parameters of models applied to the same tile's chunk
+        (see skClassifier.predict_fan_out)
+        """
+        models_keys = [
+            "mask", "model", "stat", "out_classif", "out_confidence"
+        ]
+        fan_out = {}
+        for param in parameters:
+            key = (param["tile_name"], "SAR.txt" in param["model"],
+                   param["targeted_chunk"])
+            if key not in fan_out:
+                fan_out[key] = {
+                    name: value
+                    for name, value in param.items()
+                    if name not in models_keys + ["out_proba"]
+                }
+                fan_out[key]["models"] = []
+            fan_out[key]["models"].append(
+                {name: param[name]
+                 for name in models_keys})
+        return list(fan_out.values())
+
+    def task_affinity(self, param):
+        """
+        tasks using the same model are preferably sent to the same worker
+        """
+        if self.enable_autoContext:
+            return (param["model_name"], param["seed_num"])
+        if isinstance(param, dict):
+            if "models" in param:
+                return param["tile_name"]
+            return param["model"]
+        return param[2]
+
     def step_execute(self):
         """
         Return
@@ -161,6 +209,8 @@ class classification(IOTA2Step.Step):
                 self.workingDirectory)
         elif self.enable_autoContext is False and self.use_scikitlearn is True:
             step_function = lambda x: skClassifier.predict(**x)
+            if self.fan_out:
+                step_function = lambda x: skClassifier.predict_fan_out(**x)
 
         return step_function
 
@@ -30,6 +30,12 @@ class classificationsFusion(IOTA2Step.Step):
         self.workingDirectory = workingDirectory
         self.output_path = SCF.serviceConfigFile(self.cfg).getParam(
             'chain', 'outputPath')
+        self.native_fusion = SCF.serviceConfigFile(self.cfg).getParam(
+            'argClassification', 'native_fusion')
+        self.fusion_options = SCF.serviceConfigFile(self.cfg).getParam(
+            'argClassification', 'fusionOptions')
+        self.nomenclature = SCF.serviceConfigFile(self.cfg).getParam(
+            'chain', 'nomenclaturePath')
 
     def step_description(self):
         """
@@ -45,15 +51,22 @@ class classificationsFusion(IOTA2Step.Step):
             the return could be and iterable or a callable
         """
         from iota2.Classification import Fusion as FUS
+        if self.native_fusion:
+            return FUS.fusion_inputs(
+                os.path.join(self.output_path, "classif"),
+                SCF.serviceConfigFile(self.cfg).getParam('chain', 'runs'),
+                SCF.serviceConfigFile(self.cfg).getParam(
+                    'chain', 'listTile').split(" "),
+                SCF.serviceConfigFile(self.cfg).getParam(
+                    'chain', 'regionPath'),
+                SCF.serviceConfigFile(self.cfg).getParam(
+                    'argTrain', 'dempster_shafer_SAR_Opt_fusion'))
         return FUS.fusion(
             os.path.join(self.output_path, "classif"),
             SCF.serviceConfigFile(self.cfg).getParam('chain', 'runs'),
             SCF.serviceConfigFile(self.cfg).getParam('chain',
                                                      'listTile').split(" "),
-            SCF.serviceConfigFile(self.cfg).getParam('argClassification',
-                                                     'fusionOptions'),
-            SCF.serviceConfigFile(self.cfg).getParam('chain',
-                                                     'nomenclaturePath'),
+            self.fusion_options, self.nomenclature,
             SCF.serviceConfigFile(self.cfg).getParam('chain', 'regionPath'),
             SCF.serviceConfigFile(self.cfg).getParam(
                 'argTrain', 'dempster_shafer_SAR_Opt_fusion'), None)
@@ -67,6 +80,26 @@ class classificationsFusion(IOTA2Step.Step):
             must be a lambda function.
         """
         from iota2.MPI import launch_tasks as tLauncher
+        from iota2.Classification import FusionEngine
+        from iota2.Common.FileUtils import getOutputPixType
+
+        if self.native_fusion:
+            fusion_parameters = FusionEngine.parse_fusion_options(
+                self.fusion_options)
+            pix_type = getOutputPixType(self.nomenclature)
+            # the undecided mask is read by the undecision management step
+            step_function = lambda x: FusionEngine.fusion_of_classifications(
+                x[0],
+                x[1],
+                pix_type=pix_type,
+                undecided_path=FusionEngine.fusion_products(x[1])[
+                    "undecided"],
+                votes_path=FusionEngine.fusion_products(x[1])["votes"],
+                confidence_path=FusionEngine.fusion_products(x[1])[
+                    "confidence"],
+                nb_threads=self.resources["cpu"],
+                **fusion_parameters)
+            return step_function
         bash_launcher_function = tLauncher.launchBashCmd
         step_function = lambda x: bash_launcher_function(x)
         return step_function
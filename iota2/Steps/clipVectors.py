@@ -71,20 +71,16 @@ class clipVectors(IOTA2Step.Step):
             return mtr.getListVectToClip(self.outmos, self.clipfield,
                                          self.outfilevect)
         else:
-            params = []
+            # vector is partitioned into every zones in a single pass
+            vector = fut.FileSearch_AND(self.outmos, True, ".shp",
+                                        "hermite")[0]
             if not self.clipvalue:
-                valsfield = vas.getFieldValues(self.clipfile, self.clipfield)
-                for val in valsfield:
-                    params.append([
-                        fut.FileSearch_AND(self.outmos, True, ".shp",
-                                           "hermite")[0], val
-                    ])
+                params = [[
+                    vector,
+                    vas.getFieldValues(self.clipfile, self.clipfield)
+                ]]
             else:
-                params = [
-                    fut.FileSearch_AND(self.outmos, True, ".shp", "hermite"),
-                    self.clipvalue
-                ]
-                print(params)
+                params = [[vector, [self.clipvalue]]]
             return params
 
     def step_execute(self):
@@ -102,13 +98,15 @@ class clipVectors(IOTA2Step.Step):
         if self.workdir:
             tmpdir = self.workdir
 
-        step_function = lambda x: vas.clipVectorfile(tmpdir,
-                                                     x[0],
-                                                     self.clipfile,
-                                                     self.clipfield,
-                                                     x[1],
-                                                     prefix=self.outprefix,
-                                                     outpath=self.outfilevect)
+        step_function = lambda x: vas.clipVectorfile(
+            tmpdir,
+            x[0],
+            self.clipfile,
+            self.clipfield,
+            x[1],
+            prefix=self.outprefix,
+            outpath=self.outfilevect,
+            nbcore=self.resources["cpu"])
 
         return step_function
 
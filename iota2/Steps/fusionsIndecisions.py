@@ -84,7 +84,8 @@ class fusionsIndecisions(IOTA2Step.Step):
             self.output_path, x, self.field_region, self.path_to_img, self.
             shape_region, self.no_label, self.working_directory,
             list(self.features), self.user_feat_path, self.pixtype, self.
-            region_vec, self.patterns, self.sar_opt_fusion)
+            region_vec, self.patterns, self.sar_opt_fusion,
+            self.resources["cpu"])
 
     def step_outputs(self):
         """
@@ -32,6 +32,7 @@ class joinStatistics(IOTA2Step.Step):
         self.outputPath = SCF.serviceConfigFile(self.cfg).getParam('chain', 'outputPath')
         self.outprefix = SCF.serviceConfigFile(self.cfg).getParam('Simplification', 'outprefix')
         self.dozip = SCF.serviceConfigFile(self.cfg).getParam('Simplification', 'dozip')
+        self.nomenclature = SCF.serviceConfigFile(self.cfg).getParam('Simplification', 'nomenclature')
 
     def step_description(self):
         """
@@ -70,7 +71,8 @@ class joinStatistics(IOTA2Step.Step):
         step_function = lambda x: cs.computeStats(outfilevecttojoin,
                                                   x,
                                                   tmpdir,
-                                                  self.dozip)
+                                                  self.dozip,
+                                                  nomenclature=self.nomenclature)
         return step_function
 
     def step_outputs(self):
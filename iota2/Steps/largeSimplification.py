@@ -90,6 +90,7 @@ class largeSimplification(IOTA2Step.Step):
                               'tmp')
         if self.workingDirectory:
             tmpdir = self.workingDirectory
+        nb_workers = self.resources["cpu"]
 
         step_function = lambda x: vas.generalizeVector(tmpdir,
                                                        self.grasslib,
@@ -97,7 +98,8 @@ class largeSimplification(IOTA2Step.Step):
                                                        self.douglas,
                                                        "douglas",
                                                        out=x[1],
-                                                       epsg=self.epsg)
+                                                       epsg=self.epsg,
+                                                       nb_workers=nb_workers)
 
         return step_function
 
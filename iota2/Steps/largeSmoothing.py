@@ -92,6 +92,7 @@ class largeSmoothing(IOTA2Step.Step):
                               'tmp')
         if self.workingDirectory:
             tmpdir = self.workingDirectory
+        nb_workers = self.resources["cpu"]
 
         step_function = lambda x: vas.generalizeVector(tmpdir,
                                                        self.grasslib,
@@ -100,7 +101,8 @@ class largeSmoothing(IOTA2Step.Step):
                                                        "hermite",
                                                        self.mmu,
                                                        out=x[1],
-                                                       epsg=self.epsg)
+                                                       epsg=self.epsg,
+                                                       nb_workers=nb_workers)
 
         return step_function
 
@@ -93,7 +93,13 @@ class largeVectorization(IOTA2Step.Step):
             tmpdir = self.workingDirectory
 
         step_function = lambda x: vas.topologicalPolygonize(
-            tmpdir, self.grasslib, x[0], self.angle, x[1], epsg=self.epsg)
+            tmpdir,
+            self.grasslib,
+            x[0],
+            self.angle,
+            x[1],
+            epsg=self.epsg,
+            nb_workers=self.resources["cpu"])
         return step_function
 
     def step_outputs(self):
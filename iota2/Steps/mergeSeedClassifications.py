@@ -39,6 +39,7 @@ class mergeSeedClassifications(IOTA2Step.Step):
         self.ground_truth = SCF.serviceConfigFile(cfg).getParam('chain', 'groundTruth')
         self.fusionClaAllSamplesVal = SCF.serviceConfigFile(cfg).getParam('chain', 'fusionOfClassificationAllSamplesValidation')
         self.merge_final_classifications_method = SCF.serviceConfigFile(cfg).getParam('chain', 'merge_final_classifications_method')
+        self.native_fusion = SCF.serviceConfigFile(cfg).getParam('argClassification', 'native_fusion')
 
     def step_description(self):
         """
@@ -82,7 +83,9 @@ class mergeSeedClassifications(IOTA2Step.Step):
                                                                     self.keep_runs_results,
                                                                     self.enableCrossValidation,
                                                                     validation_shape,
-                                                                    self.workingDirectory)
+                                                                    self.workingDirectory,
+                                                                    self.native_fusion,
+                                                                    self.resources["cpu"])
         return step_function
 
     def step_outputs(self):
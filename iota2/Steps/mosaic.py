@@ -84,7 +84,8 @@ class mosaic(IOTA2Step.Step):
             x, self.runs, os.path.join(self.output_path, "final"), self.
             workingDirectory, classif_mode, self.output_path,
             ds_fusion_sar_opt, proj, nomenclature_path, output_statistics,
-            spatial_res, enable_proba_map, region_path, self.color_table)
+            spatial_res, enable_proba_map, region_path, self.color_table,
+            self.resources["cpu"])
         return step_function
 
     def step_outputs(self):
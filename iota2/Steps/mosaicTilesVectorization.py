@@ -87,7 +87,9 @@ class mosaicTilesVectorization(IOTA2Step.Step):
         ------
             the return could be and iterable or a callable
         """
-
+        from iota2.VectorTools.TileIntersection import ensure_spatial_index
+        # built once, before tasks read the grid in parallel
+        ensure_spatial_index(self.grid)
         return vf.getFIDSpatialFilter(self.clipfile, self.grid, self.clipfield)
 
     def step_execute(self):
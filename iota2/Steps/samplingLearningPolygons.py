@@ -80,10 +80,21 @@ class samplingLearningPolygons(IOTA2Step.Step):
         parameters = dict(
             SCF.serviceConfigFile(self.cfg).getParam('argTrain',
                                                      'sampleSelection'))
+        by_tiles = SCF.serviceConfigFile(self.cfg).getParam(
+            'argTrain', 'sample_selection_by_tiles')
         masks_name = "MaskCommunSL.tif"
         step_function = lambda x: SamplesSelection.samples_selection(
-            x, self.workingDirectory, output_path, runs, epsg, masks_name,
-            parameters, data_field, random_seed)
+            x,
+            self.workingDirectory,
+            output_path,
+            runs,
+            epsg,
+            masks_name,
+            parameters,
+            data_field,
+            random_seed,
+            by_tiles=by_tiles,
+            nb_workers=self.resources["cpu"])
         return step_function
 
     def step_outputs(self):
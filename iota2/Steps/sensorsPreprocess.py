@@ -61,7 +61,8 @@ class sensorsPreprocess(IOTA2Step.Step):
         """
         from iota2.Sensors import ProcessLauncher
         step_function = lambda x: ProcessLauncher.preprocess(
-            x, self.cfg, self.output_path, self.workingDirectory, self.RAM)
+            x, self.cfg, self.output_path, self.workingDirectory, self.RAM,
+            self.resources["cpu"])
         return step_function
 
     def step_outputs(self):
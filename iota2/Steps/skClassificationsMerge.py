@@ -63,7 +63,8 @@ class ScikitClassificationsMerge(IOTA2Step.Step):
         from iota2.Common.rasterUtils import merge_rasters
         step_function = lambda x: merge_sk_classifications(x,
                                                            self.epsg_code,
-                                                           self.working_directory)
+                                                           self.working_directory,
+                                                           self.resources["cpu"])
         return step_function
 
     def step_clean(self):
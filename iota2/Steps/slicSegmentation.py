@@ -66,8 +66,10 @@ class slicSegmentation(IOTA2Step.Step):
         step_function = lambda x: segmentation.slicSegmentation(
             x,
             SCF.serviceConfigFile(self.cfg).getParam('chain', 'outputPath'),
-            running_parameters.get_sensors_parameters(x), self.RAM, self.
-            workingDirectory)
+            running_parameters.get_sensors_parameters(x),
+            self.RAM,
+            self.workingDirectory,
+            nb_workers=self.resources["cpu"])
         return step_function
 
     def step_outputs(self):
@@ -0,0 +1,592 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# =========================================================================
+#   Program:   iota2
+#
+#   Copyright (c) CESBIO. All rights reserved.
+#
+#   See LICENSE for details.
+#
+#   This software is distributed WITHOUT ANY WARRANTY; without even
+#   the implied warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR
+#   PURPOSE.  See the above copyright notices for more information.
+#
+# =========================================================================
+"""
+Synthetic end-to-end performance benchmarks.
+
+Each scenario fabricates a Sentinel-2 (THEIA format) tile of a given size,
+number of dates and additional user bands, a ground truth made of square
+polygons, then runs the iota2 chain on it. Wall time of the major stages is
+appended to a JSON lines history and compared against a baseline history.
+
+usage :
+
+python -m iota2.Tests.Benchmarks.iota2_benchmarks -output_dir /tmp/bench \\
+    -history /path/to/history.jsonl -baseline /path/to/baseline.jsonl \\
+    -scenarios small_otb small_sklearn
+"""
+import os
+import sys
+import json
+import time
+import shutil
+import socket
+import argparse
+import datetime
+import subprocess
+from typing import Dict, List, Optional
+
+import numpy as np
+
+IOTA2DIR = os.environ.get('IOTA2DIR')
+
+S2_BANDS = ["B2", "B3", "B4", "B5", "B6", "B7", "B8", "B8A", "B11", "B12"]
+# origin of rasters generated by generate_fake_s2_data
+ORIGIN_X = 566377
+ORIGIN_Y = 6284029
+
+# benchmark stages, as lists of iota2 step names
+STAGES = {
+    "feature_generation": [
+        "sensorsPreprocess", "Coregistration", "Sentinel1PreProcess",
+        "CommonMasks", "PixelValidity"
+    ],
+    "segmentation": ["slicSegmentation", "superPixPos", "superPixSplit"],
+    "vector_formatting":
+    ["Envelope", "genRegionVector", "VectorFormatting", "splitSamples"],
+    "sample_selection":
+    ["samplesMerge", "statsSamplesModel", "samplingLearningPolygons"],
+    "sample_extraction": [
+        "samplesByTiles", "samplesExtraction", "samplesByModels",
+        "copySamples", "genSyntheticSamples", "samplesDimReduction"
+    ],
+    "training": ["learnModel"],
+    "classification":
+    ["classiCmd", "classification", "ScikitClassificationsMerge"],
+    "fusion": [
+        "SAROptFusion", "classificationsFusion", "fusionsIndecisions",
+        "mergeSeedClassifications"
+    ],
+    "mosaic": ["mosaic"],
+    "validation": [
+        "confusionSAROpt", "confusionSAROptMerge", "confusionCmd",
+        "compRefGeneration", "confusionGeneration", "confusionSinglePass",
+        "confusionsMerge", "reportGeneration", "additionalStatistics",
+        "additionalStatisticsMerge"
+    ],
+    "regularisation": ["Regularization", "mergeRegularization", "Clump"],
+    "vectorisation": [
+        "Grid", "crownSearch", "crownBuild", "mosaicTilesVectorization",
+        "largeVectorization", "largeSimplification", "largeSmoothing",
+        "clipVectors"
+    ],
+    "zonal_statistics": ["zonalStatistics", "joinStatistics", "prodVectors"]
+}
+
+# scenario : tile size (pixels), number of dates, number of additional
+# user bands, number of polygons, number of classes, classifier
+# ('otb' or 'sklearn') and number of seeds (> 1 triggers seeds fusion)
+SCENARIOS = {
+    "small_otb": {
+        "size": 500,
+        "dates": 3,
+        "extra_bands": 0,
+        "polygons": 100,
+        "classes": 5,
+        "classifier": "otb",
+        "runs": 1
+    },
+    "small_sklearn": {
+        "size": 500,
+        "dates": 3,
+        "extra_bands": 0,
+        "polygons": 100,
+        "classes": 5,
+        "classifier": "sklearn",
+        "runs": 1
+    },
+    "medium_otb_fusion": {
+        "size": 2000,
+        "dates": 12,
+        "extra_bands": 2,
+        "polygons": 1000,
+        "classes": 10,
+        "classifier": "otb",
+        "runs": 2
+    },
+    "medium_sklearn": {
+        "size": 2000,
+        "dates": 12,
+        "extra_bands": 2,
+        "polygons": 1000,
+        "classes": 10,
+        "classifier": "sklearn",
+        "runs": 1
+    },
+    "large_otb_fusion": {
+        "size": 5000,
+        "dates": 24,
+        "extra_bands": 3,
+        "polygons": 10000,
+        "classes": 20,
+        "classifier": "otb",
+        "runs": 2
+    }
+}
+
+
+def class_signatures(classes: List[int], nb_bands: int,
+                     rng: np.random.RandomState) -> Dict[int, np.ndarray]:
+    """draw a reflectance signature by class and band"""
+    return {
+        class_label: rng.randint(100, 4000, size=nb_bands)
+        for class_label in classes
+    }
+
+
+def generate_label_map(size: int, nb_polygons: int, classes: List[int],
+                       rng: np.random.RandomState) -> (np.ndarray, List):
+    """paint random squares in a label map
+
+    Return
+    ------
+    tuple
+        (label map, list of (col, row, width, class) squares)
+    """
+    labels = np.zeros((size, size), dtype=np.uint16)
+    squares = []
+    max_width = max(4, int(size / np.sqrt(nb_polygons) / 2))
+    for _ in range(nb_polygons):
+        width = rng.randint(3, max_width + 1)
+        col = rng.randint(0, size - width)
+        row = rng.randint(0, size - width)
+        class_label = classes[rng.randint(0, len(classes))]
+        labels[row:row + width, col:col + width] = class_label
+        squares.append((col, row, width, class_label))
+    return labels, squares
+
+
+def generate_synthetic_ground_truth(output_vector: str, squares: List,
+                                    res: float, epsg: int,
+                                    data_field: str) -> None:
+    """write squares as an ESRI Shapefile ground truth"""
+    from osgeo import ogr
+    from osgeo import osr
+
+    driver = ogr.GetDriverByName("ESRI Shapefile")
+    if os.path.exists(output_vector):
+        driver.DeleteDataSource(output_vector)
+    data_source = driver.CreateDataSource(output_vector)
+    srs = osr.SpatialReference()
+    srs.ImportFromEPSG(epsg)
+    layer = data_source.CreateLayer(
+        os.path.splitext(os.path.basename(output_vector))[0], srs,
+        ogr.wkbPolygon)
+    layer.CreateField(ogr.FieldDefn(data_field, ogr.OFTInteger))
+    layer.StartTransaction()
+    for col, row, width, class_label in squares:
+        # keep a one pixel margin inside the painted square
+        x_min = ORIGIN_X + (col + 1) * res
+        x_max = ORIGIN_X + (col + width - 1) * res
+        y_max = ORIGIN_Y - (row + 1) * res
+        y_min = ORIGIN_Y - (row + width - 1) * res
+        ring = ogr.Geometry(ogr.wkbLinearRing)
+        for x_coord, y_coord in [(x_min, y_max), (x_max, y_max),
+                                 (x_max, y_min), (x_min, y_min),
+                                 (x_min, y_max)]:
+            ring.AddPoint(x_coord, y_coord)
+        polygon = ogr.Geometry(ogr.wkbPolygon)
+        polygon.AddGeometry(ring)
+        feature = ogr.Feature(layer.GetLayerDefn())
+        feature.SetField(data_field, int(class_label))
+        feature.SetGeometry(polygon)
+        layer.CreateFeature(feature)
+    layer.CommitTransaction()
+    data_source = None
+
+
+def generate_synthetic_s2_tile(root_directory: str,
+                               tile_name: str,
+                               labels: np.ndarray,
+                               nb_dates: int,
+                               rng: np.random.RandomState,
+                               res: Optional[float] = 10.0) -> List[str]:
+    """generate a Sentinel-2 (THEIA format) time series over a label map
+
+    Each class gets a signature by date and band, plus a gaussian noise.
+
+    Return
+    ------
+    list
+        generated dates (YYYYMMDD)
+    """
+    from iota2.Tests.UnitTests.tests_utils.tests_utils_rasters import (
+        generate_fake_s2_data)
+
+    classes = [int(val) for val in np.unique(labels)]
+    first_date = datetime.date(2020, 1, 1)
+    dates = [(first_date + datetime.timedelta(days=int(10 * ind))
+              ).strftime("%Y%m%d") for ind in range(nb_dates)]
+    signatures = {
+        date: class_signatures(classes, len(S2_BANDS), rng)
+        for date in dates
+    }
+
+    def band_values(date, band_num, labels):
+        lut = np.zeros(labels.max() + 1, dtype=np.float32)
+        for class_label, signature in signatures[date].items():
+            lut[class_label] = signature[band_num]
+        band_array = lut[labels] + rng.normal(0, 50, labels.shape)
+        return np.clip(band_array, 0, 10000)
+
+    generate_fake_s2_data(root_directory,
+                          tile_name,
+                          dates,
+                          res=res,
+                          labels=labels,
+                          band_values=band_values)
+    return dates
+
+
+def generate_synthetic_user_features(root_directory: str,
+                                     tile_name: str,
+                                     labels: np.ndarray,
+                                     nb_bands: int,
+                                     rng: np.random.RandomState,
+                                     res: Optional[float] = 10.0
+                                     ) -> List[str]:
+    """generate additional user features rasters
+
+    Return
+    ------
+    list
+        user features patterns
+    """
+    from iota2.Common.FileUtils import ensure_dir
+    from iota2.Tests.UnitTests.tests_utils.tests_utils_rasters import (
+        array_to_raster)
+    tile_dir = os.path.join(root_directory, tile_name)
+    ensure_dir(tile_dir)
+    patterns = []
+    for band_num in range(nb_bands):
+        pattern = f"FEAT{band_num + 1}"
+        array_to_raster(labels * 10 + rng.randint(0, 10, labels.shape),
+                        os.path.join(tile_dir, f"{pattern}.tif"),
+                        pixel_size=res,
+                        origin_x=ORIGIN_X,
+                        origin_y=ORIGIN_Y)
+        patterns.append(pattern)
+    return patterns
+
+
+def prepare_scenario(scenario: Dict,
+                     working_directory: str,
+                     seed: Optional[int] = 0,
+                     grasslib: Optional[str] = None) -> str:
+    """generate synthetic data and the iota2 configuration file of a scenario
+
+    Return
+    ------
+    str
+        configuration file path
+    """
+    from config import Config, Mapping
+    from iota2.Common.FileUtils import ensure_dir
+
+    tile_name = "T31TCJ"
+    data_field = "code"
+    res = 10.0
+    epsg = 2154
+    references = os.path.join(IOTA2DIR, "data", "references")
+    running_references = os.path.join(references, "running_iota2")
+    ensure_dir(working_directory)
+    rng = np.random.RandomState(seed)
+
+    classes = list(range(1, scenario["classes"] + 1))
+    labels, squares = generate_label_map(scenario["size"],
+                                         scenario["polygons"], classes, rng)
+    ground_truth = os.path.join(working_directory, "ground_truth.shp")
+    generate_synthetic_ground_truth(ground_truth, squares, res, epsg,
+                                    data_field)
+    s2_dir = os.path.join(working_directory, "s2_data")
+    generate_synthetic_s2_tile(s2_dir, tile_name, labels, scenario["dates"],
+                               rng, res)
+
+    if scenario["classifier"] == "sklearn":
+        config_ref = os.path.join(running_references, "i2_config_scikit.cfg")
+    else:
+        config_ref = os.path.join(running_references, "i2_config.cfg")
+    config_path = os.path.join(working_directory, "i2_benchmark.cfg")
+    shutil.copy(config_ref, config_path)
+    cfg = Config(open(config_path))
+    cfg.chain.outputPath = os.path.join(working_directory, "outputs")
+    cfg.chain.S2Path = s2_dir
+    cfg.chain.dataField = data_field
+    cfg.chain.listTile = tile_name
+    cfg.chain.groundTruth = ground_truth
+    cfg.chain.nomenclaturePath = os.path.join(running_references,
+                                              "nomenclature.txt")
+    cfg.chain.colorTable = os.path.join(running_references, "color.txt")
+    cfg.chain.runs = scenario["runs"]
+    cfg.chain.random_seed = seed
+    cfg.chain.outputStatistics = True
+    if scenario["runs"] > 1:
+        cfg.chain.merge_final_classifications = True
+    if scenario["extra_bands"]:
+        user_dir = os.path.join(working_directory, "user_features")
+        patterns = generate_synthetic_user_features(user_dir, tile_name,
+                                                    labels,
+                                                    scenario["extra_bands"],
+                                                    rng, res)
+        cfg.chain.userFeatPath = user_dir
+        cfg.addMapping("userFeat", Mapping(), "")
+        cfg.userFeat.arbo = "/*"
+        cfg.userFeat.patterns = ",".join(patterns)
+    if scenario["classifier"] == "sklearn":
+        cfg.scikit_models_parameters.model_type = "RandomForestClassifier"
+        cfg.scikit_models_parameters.random_state = seed
+    if grasslib:
+        cfg.chain.lastStep = "lcstatistics"
+        cfg.addMapping("Simplification", Mapping(), "")
+        cfg.Simplification.umc1 = 10
+        cfg.Simplification.grasslib = grasslib
+        cfg.Simplification.nomenclature = os.path.join(
+            references, "posttreat", "nomenclature.cfg")
+    cfg.save(open(config_path, "w"))
+    return config_path
+
+
+def steps_to_stages(steps_timing: List[Dict]) -> Dict[str, float]:
+    """aggregate steps wall time by benchmark stages"""
+    stage_of_step = {
+        step: stage
+        for stage, steps in STAGES.items() for step in steps
+    }
+    stages = {}
+    for step_timing in steps_timing:
+        stage = stage_of_step.get(step_timing["step"], "other")
+        stages[stage] = stages.get(stage, 0.0) + (step_timing["end"] -
+                                                  step_timing["start"])
+    return stages
+
+
+def git_revision() -> Optional[str]:
+    """return the current iota2 git revision, if available"""
+    try:
+        return subprocess.check_output(["git", "rev-parse", "HEAD"],
+                                       cwd=IOTA2DIR,
+                                       stderr=subprocess.DEVNULL).decode(
+                                           "utf-8").strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_scenario(scenario_name: str,
+                 scenario: Dict,
+                 working_directory: str,
+                 seed: Optional[int] = 0,
+                 grasslib: Optional[str] = None,
+                 mpi_service=None) -> Dict:
+    """run a benchmark scenario and return its record
+
+    'mpi_service' are workers already started by the caller, if any
+    """
+    import iota2.Tests.UnitTests.tests_utils.tests_utils_iota2 as TUI
+
+    if os.path.exists(working_directory):
+        shutil.rmtree(working_directory)
+    start_data = time.time()
+    config_path = prepare_scenario(scenario, working_directory, seed,
+                                   grasslib)
+    data_generation = time.time() - start_data
+    start_chain = time.time()
+    steps_timing = TUI.iota2_test_launcher(config_path,
+                                           raise_on_failure=False,
+                                           mpi_service=mpi_service)
+    return {
+        "scenario": scenario_name,
+        "success": all(step["success"] for step in steps_timing),
+        "parameters": scenario,
+        "date": datetime.datetime.now().isoformat(),
+        "revision": git_revision(),
+        "host": socket.gethostname(),
+        "data_generation": data_generation,
+        "total": time.time() - start_chain,
+        "stages": steps_to_stages(steps_timing),
+        "steps": steps_timing
+    }
+
+
+def append_history(history_file: str, record: Dict) -> None:
+    """append a benchmark record to a JSON lines history"""
+    with open(history_file, "a") as history:
+        history.write(json.dumps(record) + "\n")
+
+
+def load_history(history_file: str) -> List[Dict]:
+    """load a JSON lines benchmark history"""
+    records = []
+    if os.path.exists(history_file):
+        with open(history_file) as history:
+            records = [json.loads(line) for line in history if line.strip()]
+    return records
+
+
+def compare_to_baseline(record: Dict,
+                        baseline_records: List[Dict],
+                        tolerance: Optional[float] = 0.2,
+                        min_delta: Optional[float] = 5.0) -> List[Dict]:
+    """compare stages wall time to the latest baseline of the same scenario
+
+    A stage is a regression if it is slower than the baseline by more than
+    'tolerance' (relative) and 'min_delta' seconds.
+
+    Return
+    ------
+    list
+        one dictionnary by stage {"stage", "baseline", "current", "ratio",
+        "regression"}
+    """
+    baselines = [
+        base for base in baseline_records
+        if base["scenario"] == record["scenario"]
+        and base.get("success", True)
+        and base["parameters"] == record["parameters"]
+    ]
+    if not baselines:
+        return []
+    baseline = baselines[-1]
+    comparison = []
+    stages = dict(record["stages"], total=record["total"])
+    base_stages = dict(baseline["stages"], total=baseline["total"])
+    for stage, current in stages.items():
+        if stage not in base_stages:
+            continue
+        reference = base_stages[stage]
+        ratio = current / reference if reference > 0 else float("inf")
+        comparison.append({
+            "stage":
+            stage,
+            "baseline":
+            reference,
+            "current":
+            current,
+            "ratio":
+            ratio,
+            "regression":
+            current > reference * (1.0 + tolerance)
+            and current - reference > min_delta
+        })
+    return comparison
+
+
+def format_comparison(scenario_name: str, comparison: List[Dict]) -> str:
+    """human readable comparison table"""
+    lines = [f"scenario : {scenario_name}"]
+    if not comparison:
+        lines.append("    no baseline available")
+    for stage in comparison:
+        flag = "REGRESSION" if stage["regression"] else ""
+        lines.append("    {:<20} {:>10.1f} s -> {:>10.1f} s  x{:.2f} {}".format(
+            stage["stage"], stage["baseline"], stage["current"],
+            stage["ratio"], flag))
+    return "\n".join(lines)
+
+
+def launch_benchmarks(scenarios: List[str],
+                      output_dir: str,
+                      history_file: str,
+                      baseline_file: Optional[str] = None,
+                      tolerance: Optional[float] = 0.2,
+                      seed: Optional[int] = 0,
+                      grasslib: Optional[str] = None) -> bool:
+    """run scenarios, store records and compare them to a baseline
+
+    Return
+    ------
+    bool
+        True if every scenarios succeeded without regression
+    """
+    import iota2.Tests.UnitTests.tests_utils.tests_utils_iota2 as TUI
+
+    # workers are started once for every scenarios, under mpirun they
+    # only leave start_workers when they are stopped
+    mpi_service = TUI.MPIService()
+    TUI.start_workers(mpi_service)
+
+    baseline_records = load_history(
+        baseline_file if baseline_file else history_file)
+    no_regression = True
+    try:
+        for scenario_name in scenarios:
+            record = run_scenario(scenario_name, SCENARIOS[scenario_name],
+                                  os.path.join(output_dir, scenario_name),
+                                  seed, grasslib, mpi_service)
+            append_history(history_file, record)
+            if not record["success"]:
+                # other scenarios are still run
+                print(f"scenario : {scenario_name}\n    failed at step "
+                      f"{record['steps'][-1]['step']}")
+                no_regression = False
+                continue
+            comparison = compare_to_baseline(record, baseline_records,
+                                             tolerance)
+            print(format_comparison(scenario_name, comparison))
+            no_regression = no_regression and not any(
+                stage["regression"] for stage in comparison)
+    finally:
+        TUI.stop_workers(mpi_service)
+    return no_regression
+
+
+if __name__ == "__main__":
+    PARSER = argparse.ArgumentParser(
+        description="iota2 synthetic performance benchmarks")
+    PARSER.add_argument("-output_dir",
+                        dest="output_dir",
+                        help="benchmarks working directory",
+                        required=True)
+    PARSER.add_argument("-history",
+                        dest="history",
+                        help="JSON lines file where records are appended",
+                        required=True)
+    PARSER.add_argument("-baseline",
+                        dest="baseline",
+                        help=("JSON lines file containing baseline records, "
+                              "the history is used if not set"),
+                        default=None,
+                        required=False)
+    PARSER.add_argument("-scenarios",
+                        dest="scenarios",
+                        help="scenarios to run",
+                        nargs="+",
+                        choices=list(SCENARIOS.keys()),
+                        default=["small_otb", "small_sklearn"],
+                        required=False)
+    PARSER.add_argument("-tolerance",
+                        dest="tolerance",
+                        help="relative slowdown tolerated",
+                        type=float,
+                        default=0.2,
+                        required=False)
+    PARSER.add_argument("-seed",
+                        dest="seed",
+                        help="random seed of synthetic data",
+                        type=int,
+                        default=0,
+                        required=False)
+    PARSER.add_argument("-grasslib",
+                        dest="grasslib",
+                        help=("GRASS directory, enable vectorisation and "
+                              "zonal statistics stages"),
+                        default=os.environ.get("GRASSDIR"),
+                        required=False)
+    ARGS = PARSER.parse_args()
+    if not IOTA2DIR:
+        raise Exception("IOTA2DIR environment variable must be set")
+    SUCCESS = launch_benchmarks(ARGS.scenarios, ARGS.output_dir, ARGS.history,
+                                ARGS.baseline, ARGS.tolerance, ARGS.seed,
+                                ARGS.grasslib)
+    sys.exit(0 if SUCCESS else 1)
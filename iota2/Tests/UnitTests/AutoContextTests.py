@@ -375,6 +375,40 @@ class iota_testAutoContext(unittest.TestCase):
         values_counter = Counter(raster_values)
         self.assertTrue(len(values_counter) == 0)
 
+    def test_annual_samples_coordinates(self):
+        """check random pixels picked up by annual_samples_coordinates
+        """
+        import numpy as np
+        from iota2.Sampling.SuperPixelsSelection import annual_samples_coordinates
+
+        array = np.zeros((4, 5), dtype=np.int32)
+        array[1, 2] = array[3, 0] = array[3, 4] = 12
+        array[0, 0] = 31
+
+        x_geo, y_geo = annual_samples_coordinates(
+            array, 12, 2, 105.0, 195.0, 10.0, -10.0,
+            np.random.RandomState(0))
+        self.assertEqual(len(x_geo), 2)
+        self.assertEqual(len(set(zip(x_geo, y_geo))), 2)
+        self.assertTrue(
+            set(zip(x_geo, y_geo)) <= {(125.0, 185.0), (105.0, 165.0),
+                                       (145.0, 165.0)})
+        # fixed seed
+        x_geo_2, y_geo_2 = annual_samples_coordinates(
+            array, 12, 2, 105.0, 195.0, 10.0, -10.0,
+            np.random.RandomState(0))
+        self.assertTrue(np.array_equal(x_geo, x_geo_2))
+        self.assertTrue(np.array_equal(y_geo, y_geo_2))
+        # less choosable pixels than samples
+        x_geo, y_geo = annual_samples_coordinates(
+            array, 31, 10, 105.0, 195.0, 10.0, -10.0,
+            np.random.RandomState(0))
+        self.assertEqual(list(zip(x_geo, y_geo)), [(105.0, 195.0)])
+        x_geo, _ = annual_samples_coordinates(array, 41, 10, 105.0, 195.0,
+                                              10.0, -10.0,
+                                              np.random.RandomState(0))
+        self.assertEqual(len(x_geo), 0)
+
     def test_slic(self):
         """non-regression test, check if SLIC could be performed
         """
@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# =========================================================================
+#   Program:   iota2
+#
+#   Copyright (c) CESBIO. All rights reserved.
+#
+#   See LICENSE for details.
+#
+#   This software is distributed WITHOUT ANY WARRANTY; without even
+#   the implied warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR
+#   PURPOSE.  See the above copyright notices for more information.
+#
+# =========================================================================
+"""
+Test of the benchmarks regression tracking
+"""
+import unittest
+
+
+class iota_test_benchmarks(unittest.TestCase):
+    """test benchmarks records comparison"""
+    def test_compare_to_baseline(self):
+        """
+        detect a stage regression
+        """
+        from iota2.Tests.Benchmarks import iota2_benchmarks as bench
+        steps = [{
+            "step": "learnModel",
+            "start": 0.0,
+            "end": 100.0
+        }, {
+            "step": "classification",
+            "start": 100.0,
+            "end": 160.0
+        }, {
+            "step": "classiCmd",
+            "start": 160.0,
+            "end": 170.0
+        }]
+        stages = bench.steps_to_stages(steps)
+        self.assertEqual(stages, {"training": 100.0, "classification": 70.0})
+
+        parameters = bench.SCENARIOS["small_otb"]
+        baseline = {
+            "scenario": "small_otb",
+            "parameters": parameters,
+            "total": 200.0,
+            "stages": {
+                "training": 50.0,
+                "classification": 68.0
+            }
+        }
+        other_scenario = dict(baseline,
+                              scenario="small_sklearn",
+                              stages={"training": 1000.0})
+        record = {
+            "scenario": "small_otb",
+            "parameters": parameters,
+            "total": 170.0,
+            "stages": stages
+        }
+        comparison = bench.compare_to_baseline(record,
+                                               [baseline, other_scenario],
+                                               tolerance=0.2)
+        regressions = {
+            stage["stage"]: stage["regression"]
+            for stage in comparison
+        }
+        self.assertEqual(regressions, {
+            "training": True,
+            "classification": False,
+            "total": False
+        })
+        self.assertEqual(bench.compare_to_baseline(record, [other_scenario]),
+                         [])
+
+    def test_steps_to_stages(self):
+        """
+        steps are timed in their stage
+        """
+        from iota2.Tests.Benchmarks import iota2_benchmarks as bench
+        steps = [{
+            "step": step,
+            "start": 0.0,
+            "end": 10.0
+        } for step in [
+            "slicSegmentation", "confusionSinglePass", "joinStatistics",
+            "IOTA2DirTree"
+        ]]
+        self.assertEqual(
+            bench.steps_to_stages(steps), {
+                "segmentation": 10.0,
+                "validation": 10.0,
+                "zonal_statistics": 10.0,
+                "other": 10.0
+            })
@@ -155,3 +155,163 @@ class iota_testClassifications(unittest.TestCase):
                 is_bands_ok.append(int(ref_val) == int(test_val))
         self.assertTrue(all(is_bands_ok),
                         msg="reordering probability maps failed")
+
+    def test_fan_out_parameters(self):
+        """
+        models applied to the same tile's chunk are gathered in one task
+        """
+        from iota2.Steps.classification import classification
+
+        parameters = []
+        for tile in ["T31TCJ", "T31TDJ"]:
+            for model in ["model_1f1_seed_0.txt", "model_1f2_seed_0.txt"]:
+                for chunk in range(2):
+                    parameters.append({
+                        "mask": f"{tile}_{model}_mask.tif",
+                        "model": model,
+                        "stat": None,
+                        "out_classif": f"{tile}_{model}.tif",
+                        "out_confidence": f"{tile}_{model}_conf.tif",
+                        "out_proba": None,
+                        "tile_name": tile,
+                        "targeted_chunk": chunk,
+                        "ram": 128
+                    })
+        fan_out = classification.fan_out_parameters(parameters)
+
+        self.assertEqual(len(fan_out), 4)
+        for task in fan_out:
+            self.assertEqual(len(task["models"]), 2)
+            self.assertFalse("model" in task)
+            self.assertFalse("out_proba" in task)
+            for model in task["models"]:
+                self.assertTrue(model["mask"].startswith(task["tile_name"]))
+
+    def test_quantized_probabilities(self):
+        """
+        probabilities computed as float32 or quantized integers
+        """
+        from sklearn.ensemble import RandomForestClassifier
+        from iota2.Classification.skClassifier import do_predict
+        from iota2.Classification.skClassifier import probabilities_scale
+
+        features = np.random.RandomState(0).rand(20, 3)
+        labels = (features[:, 0] > 0.5).astype(int) + 1
+        clf = RandomForestClassifier(n_estimators=10, random_state=0)
+        clf.fit(features, labels)
+        image = features.reshape(4, 5, 3)
+
+        proba_float, _ = do_predict(image, clf, batch_size=7)
+        proba_uint8, _ = do_predict(image, clf, dtype="uint8", batch_size=7)
+
+        self.assertEqual(proba_float.dtype, np.float32)
+        self.assertEqual(proba_float.shape, (4, 5, 2))
+        self.assertEqual(proba_uint8.dtype, np.uint8)
+        self.assertEqual(probabilities_scale("uint8"), 255.0)
+        self.assertTrue(
+            np.allclose(proba_uint8 / probabilities_scale("uint8"),
+                        proba_float,
+                        atol=1.0 / 255))
+
+    def test_predict_fan_out(self):
+        """
+        every model is applied to the window of its mask of every chunks
+        """
+        import pickle
+        from osgeo import gdal
+        from config import Config
+        from sklearn.ensemble import RandomForestClassifier
+        from iota2.Common import IOTA2Directory
+        from iota2.Common import ServiceConfigFile as SCF
+        from iota2.Common.FileUtils import FileSearch_AND
+        from iota2.Common.GenerateFeatures import generate_features
+        from iota2.Sensors.Sensors_container import sensors_container
+        from iota2.Classification.skClassifier import predict_fan_out
+
+        tile_name = "T31TCJ"
+        TUR.generate_fake_s2_data(self.test_working_directory, tile_name,
+                                  ["20200101", "20200512"])
+        config_path_test = os.path.join(self.test_working_directory,
+                                        "Config_TEST.cfg")
+        shutil.copy(self.config_test, config_path_test)
+        cfg_test = Config(open(config_path_test))
+        cfg_test.chain.outputPath = self.test_working_directory
+        cfg_test.chain.listTile = tile_name
+        cfg_test.chain.L8Path_old = "None"
+        cfg_test.chain.L8Path = "None"
+        cfg_test.chain.S2Path = self.test_working_directory
+        cfg_test.chain.userFeatPath = "None"
+        cfg_test.chain.check_inputs = False
+        cfg_test.GlobChain.useAdditionalFeatures = False
+        cfg_test.GlobChain.writeOutputs = False
+        cfg_test.save(open(config_path_test, "w"))
+        IOTA2Directory.generate_directories(self.test_working_directory,
+                                            check_inputs=False)
+        sensors_param = SCF.iota2_parameters(
+            config_path_test).get_sensors_parameters(tile_name)
+        sensors = sensors_container(tile_name, None,
+                                    self.test_working_directory,
+                                    **sensors_param)
+        sensors.sensors_preprocess()
+        _, feat_labels, _ = generate_features(None, tile_name, False,
+                                              self.test_working_directory,
+                                              sensors_param)
+
+        # two models, on the left and right halves of the tile
+        band = FileSearch_AND(self.test_working_directory, True,
+                              "FRE_B2.tif")[0]
+        y_size, x_size = rasterToArray(band).shape
+        left = np.zeros((y_size, x_size), dtype=np.uint8)
+        left[:, :x_size // 2] = 1
+        models = []
+        for num, (mask_arr, labels) in enumerate([(left, [1, 2]),
+                                                  (1 - left, [3, 4])]):
+            mask = os.path.join(self.test_working_directory,
+                                f"mask_{num}.tif")
+            TUR.array_to_raster(mask_arr,
+                                mask,
+                                origin_x=566377,
+                                origin_y=6284029)
+            features = np.random.RandomState(num).rand(20, len(feat_labels))
+            clf = RandomForestClassifier(n_estimators=5, random_state=0)
+            clf.fit(features, np.array(labels * 10))
+            model = os.path.join(self.test_working_directory,
+                                 f"model_{num}_seed_0.txt")
+            with open(model, "wb") as model_file:
+                pickle.dump((clf, None), model_file)
+            models.append({
+                "mask": mask,
+                "model": model,
+                "stat": None,
+                "out_classif": os.path.join(self.test_working_directory,
+                                            f"Classif_{num}.tif"),
+                "out_confidence": os.path.join(self.test_working_directory,
+                                               f"Confidence_{num}.tif")
+            })
+
+        predict_fan_out(models, None, tile_name, False,
+                        self.test_working_directory, sensors_param, "uint8",
+                        number_of_chunks=2)
+
+        for model, labels in zip(models, [{1, 2}, {3, 4}]):
+            mask_ds = gdal.Open(model["mask"])
+            mask_gt = mask_ds.GetGeoTransform()
+            chunks = FileSearch_AND(
+                self.test_working_directory, True,
+                os.path.basename(model["out_classif"]).replace(
+                    ".tif", "_SUBREGION_"))
+            self.assertEqual(len(chunks), 2)
+            for chunk in chunks:
+                chunk_ds = gdal.Open(chunk)
+                chunk_gt = chunk_ds.GetGeoTransform()
+                start_x = int(round((chunk_gt[0] - mask_gt[0]) / mask_gt[1]))
+                start_y = int(round((chunk_gt[3] - mask_gt[3]) / mask_gt[5]))
+                chunk_arr = chunk_ds.GetRasterBand(1).ReadAsArray()
+                mask_arr = mask_ds.GetRasterBand(1).ReadAsArray(
+                    start_x, start_y, chunk_ds.RasterXSize,
+                    chunk_ds.RasterYSize)
+                self.assertTrue(
+                    np.array_equal(chunk_arr != 0, mask_arr != 0),
+                    msg=f"{chunk} does not match its mask window")
+                self.assertTrue(
+                    set(np.unique(chunk_arr[chunk_arr != 0])) <= labels)
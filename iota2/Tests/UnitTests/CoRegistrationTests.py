@@ -106,6 +106,33 @@ class iota_testCoRegistration(unittest.TestCase):
         ]
         self.assertTrue(all([ex == out for ex, out in zip(expected, output)]))
 
+    def test_s2_tile_coverage(self):
+        """
+        TEST : coverage computed from the viewing incidence angles grids
+        """
+        detector_1 = ("<Values_List><VALUES>NaN NaN 1.0</VALUES>"
+                      "<VALUES>NaN NaN NaN</VALUES></Values_List>")
+        detector_2 = ("<Values_List><VALUES>2.0 NaN NaN</VALUES>"
+                      "<VALUES>NaN 3.0 NaN</VALUES></Values_List>")
+        metadata = os.path.join(self.test_working_directory,
+                                "SENTINEL2_MTD_ALL.xml")
+        with open(metadata, "w") as xml_file:
+            xml_file.write(
+                '<Band_Viewing_Incidence_Angles_Grids_List band_id="B2">\n'
+                f'{detector_1}\n{detector_2}\n'
+                '</Band_Viewing_Incidence_Angles_Grids_List>\n')
+        CoRegister.get_s2_tile_coverage.cache_clear()
+        coverage = CoRegister.get_s2_tile_coverage(metadata)
+        self.assertAlmostEqual(coverage, 3.0 / 6.0)
+        cache_info = CoRegister.get_s2_tile_coverage.cache_info()
+        # second call must be served by the cache
+        self.assertAlmostEqual(CoRegister.get_s2_tile_coverage(metadata),
+                               coverage)
+        self.assertEqual(CoRegister.get_s2_tile_coverage.cache_info().hits,
+                         cache_info.hits + 1)
+        self.assertEqual(CoRegister.get_s2_tile_coverage.cache_info().misses,
+                         cache_info.misses)
+
     def test_launch_CoRegister(self):
         """
         TEST
@@ -180,7 +207,7 @@ class iota_testCoRegistration(unittest.TestCase):
             cfg.getParam('coregistration', 'dateSrc'),
             cfg.getParam('chain', 'listTile'), None, None,
             cfg.getParam('chain', 'S2Path'), None, None, False,
-            sensors_parameters)
+            sensors_parameters, nb_workers=2)
         # assert
         date_folders = glob.glob(os.path.join(datadir_test, "T38KPE", "*"))
         geoms_files = glob.glob(
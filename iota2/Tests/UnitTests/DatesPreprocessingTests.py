@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# =========================================================================
+#   Program:   iota2
+#
+#   Copyright (c) CESBIO. All rights reserved.
+#
+#   See LICENSE for details.
+#
+#   This software is distributed WITHOUT ANY WARRANTY; without even
+#   the implied warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR
+#   PURPOSE.  See the above copyright notices for more information.
+#
+# =========================================================================
+"""
+Test of the dates preprocessing scheduling
+"""
+import os
+import sys
+import shutil
+import unittest
+
+RM_IF_ALL_OK = True
+IOTA2DIR = os.environ.get('IOTA2DIR')
+
+
+def write_date(output, exit_code=0):
+    """fake date preprocessing"""
+    with open(output, "w") as output_file:
+        output_file.write(str(os.getpid()))
+    sys.exit(exit_code)
+
+
+def write_threads(output):
+    """fake date preprocessing, write the number of OTB threads"""
+    with open(output, "w") as output_file:
+        output_file.write(
+            os.environ.get("ITK_GLOBAL_DEFAULT_NUMBER_OF_THREADS", ""))
+
+
+class iota_test_dates_preprocessing(unittest.TestCase):
+    """test DatesPreprocessing"""
+    @classmethod
+    def setUpClass(cls):
+        cls.group_test_name = "iota_test_dates_preprocessing"
+        cls.iota2_tests_directory = os.path.join(IOTA2DIR, "data",
+                                                 cls.group_test_name)
+        if os.path.exists(cls.iota2_tests_directory):
+            shutil.rmtree(cls.iota2_tests_directory)
+        os.mkdir(cls.iota2_tests_directory)
+
+    @classmethod
+    def tearDownClass(cls):
+        if RM_IF_ALL_OK:
+            shutil.rmtree(cls.iota2_tests_directory)
+
+    def test_preprocessing_workers(self):
+        """number of workers is bounded by dates, RAM and cores"""
+        from iota2.Sensors.DatesPreprocessing import preprocessing_workers
+
+        self.assertEqual(preprocessing_workers(10, 4000, 8), (8, 500))
+        self.assertEqual(preprocessing_workers(10, 1024, 8), (4, 256))
+        self.assertEqual(preprocessing_workers(2, "4000.0", 8), (2, 2000))
+        self.assertEqual(preprocessing_workers(10, 128, 8), (1, 128))
+
+    def test_run_processes(self):
+        """every tasks are run, failures are reported"""
+        from iota2.Sensors.DatesPreprocessing import run_processes
+        from iota2.Sensors.DatesPreprocessing import processing_path
+
+        outputs = [
+            os.path.join(self.iota2_tests_directory, f"date_{date}.txt")
+            for date in range(5)
+        ]
+        run_processes([(output, write_date, (output, ))
+                       for output in outputs], 2)
+        self.assertTrue(all(os.path.exists(output) for output in outputs))
+
+        with self.assertRaises(Exception):
+            run_processes([(outputs[0], write_date, (outputs[0], 1))], 2)
+
+        self.assertEqual(processing_path("/out/date_STACK.tif"),
+                         "/out/date_STACK_tmp.tif")
+        self.assertEqual(processing_path("/out/date_STACK.tif", "/wd"),
+                         "/wd/date_STACK.tif")
+
+    def test_run_processes_threads(self):
+        """OTB threads are set in each process only"""
+        from iota2.Sensors.DatesPreprocessing import run_processes
+
+        output = os.path.join(self.iota2_tests_directory, "threads.txt")
+        threads_env = os.environ.get("ITK_GLOBAL_DEFAULT_NUMBER_OF_THREADS")
+        run_processes([(output, write_threads, (output, ))], 1, nb_threads=3)
+        with open(output) as output_file:
+            self.assertEqual(output_file.read(), "3")
+        self.assertEqual(
+            os.environ.get("ITK_GLOBAL_DEFAULT_NUMBER_OF_THREADS"),
+            threads_env)
@@ -1002,6 +1002,137 @@ class iota_testFusion(unittest.TestCase):
             cfg.getParam('argTrain', 'dempster_shafer_SAR_Opt_fusion'), None)
 
 
+class iota_test_fusion_engine(unittest.TestCase):
+    def test_fuse_labels(self):
+        """test majority voting and dempster-shafer fusion of labels"""
+        from iota2.Classification import FusionEngine
+        labels = np.array([[[1, 1, 0, 2]], [[1, 2, 0, 3]], [[2, 3, 0, 0]]])
+
+        fused, undecided, votes, confidence = FusionEngine.fuse_labels(
+            labels, nodata_label=0, undecided_label=255)
+        self.assertEqual(fused.tolist(), [[1, 255, 0, 255]])
+        self.assertEqual(undecided.tolist(), [[False, True, False, True]])
+        self.assertEqual(votes.tolist(), [[2, 1, 0, 1]])
+        self.assertTrue(
+            np.allclose(confidence, [[2. / 3., 1. / 3., 0., 0.5]]))
+
+        masses = FusionEngine.masses_to_lut([{
+            1: 0.9,
+            2: 0.9,
+            3: 0.9
+        }, {
+            1: 0.5,
+            2: 0.5,
+            3: 0.5
+        }, {
+            1: 0.6,
+            2: 0.6,
+            3: 0.6
+        }])
+        fused, undecided, votes, confidence = FusionEngine.fuse_labels(
+            labels, nodata_label=0, undecided_label=255, masses=masses)
+        self.assertEqual(fused.tolist(), [[1, 1, 0, 2]])
+        self.assertFalse(undecided.any())
+        self.assertEqual(votes.tolist(), [[2, 1, 0, 1]])
+        self.assertTrue(
+            np.allclose(confidence,
+                        [[0.18 / 0.21, 0.18 / 0.23, 0., 0.9]]))
+
+        self.assertEqual(
+            FusionEngine.parse_fusion_options(
+                "-nodatalabel 0 -method majorityvoting -undecidedlabel 254"),
+            {
+                "method": "majorityvoting",
+                "nodata_label": 0,
+                "undecided_label": 254
+            })
+
+    def test_default_fusion_options(self):
+        """undecided pixels are labeled 0 with the default fusion options,
+        as FusionOfClassifications does"""
+        from iota2.Classification import FusionEngine
+        test_dir = os.path.join(iota2_dataTest, "iota_test_fusion_engine")
+        if os.path.exists(test_dir):
+            shutil.rmtree(test_dir)
+        os.mkdir(test_dir)
+
+        classifications = []
+        for index, row in enumerate([[1, 1, 2], [1, 2, 3]]):
+            classification = os.path.join(test_dir,
+                                          "Classif_{}.tif".format(index))
+            raster_ds = gdal.GetDriverByName("GTiff").Create(
+                classification, 3, 1, 1, gdal.GDT_Byte)
+            raster_ds.SetGeoTransform((0, 10, 0, 10, 0, -10))
+            raster_ds.GetRasterBand(1).WriteArray(np.array([row]))
+            raster_ds = None
+            classifications.append(classification)
+        # default argClassification.fusionOptions
+        fusion_parameters = FusionEngine.parse_fusion_options(
+            "-nodatalabel 0 -method majorityvoting")
+        output = os.path.join(test_dir, "FUSION.tif")
+        FusionEngine.fusion_of_classifications(classifications, output,
+                                               **fusion_parameters)
+
+        fused = gdal.Open(output).GetRasterBand(1).ReadAsArray()
+        self.assertEqual(fused.tolist(), [[1, 0, 0]])
+        shutil.rmtree(test_dir)
+
+    def test_resolve_undecided(self):
+        """undecided pixels written by the fusion are replaced by the label
+        of the most confident classification"""
+        from iota2.Classification import FusionEngine
+        test_dir = os.path.join(iota2_dataTest, "iota_test_fusion_engine")
+        if os.path.exists(test_dir):
+            shutil.rmtree(test_dir)
+        os.mkdir(test_dir)
+
+        def write(name, array, data_type):
+            raster = os.path.join(test_dir, name)
+            raster_ds = gdal.GetDriverByName("GTiff").Create(
+                raster, 3, 1, 1, data_type)
+            raster_ds.SetGeoTransform((0, 10, 0, 10, 0, -10))
+            raster_ds.GetRasterBand(1).WriteArray(np.array([array]))
+            raster_ds = None
+            return raster
+
+        classifications = [
+            write("Classif_T31TCJ_model_1_seed_0.tif", [1, 1, 2],
+                  gdal.GDT_Byte),
+            write("Classif_T31TCJ_model_2_seed_0.tif", [1, 2, 3],
+                  gdal.GDT_Byte)
+        ]
+        confidences = [
+            write("T31TCJ_model_1_confidence_seed_0.tif", [0.9, 0.2, 0.5],
+                  gdal.GDT_Float32),
+            write("T31TCJ_model_2_confidence_seed_0.tif", [0.1, 0.8, 0.5],
+                  gdal.GDT_Float32)
+        ]
+        fusion = os.path.join(test_dir, "T31TCJ_FUSION_seed_0.tif")
+        products = FusionEngine.fusion_products(fusion)
+        self.assertEqual(
+            products["undecided"],
+            os.path.join(test_dir, "T31TCJ_UNDECIDED_seed_0.tif"))
+        FusionEngine.fusion_of_classifications(
+            classifications,
+            fusion,
+            undecided_path=products["undecided"],
+            votes_path=products["votes"],
+            confidence_path=products["confidence"])
+        self.assertEqual(
+            gdal.Open(products["undecided"]).ReadAsArray().tolist(),
+            [[0, 1, 1]])
+        self.assertEqual(
+            gdal.Open(products["votes"]).ReadAsArray().tolist(), [[2, 1, 1]])
+
+        output = os.path.join(test_dir, "T31TCJ_FUSION_NODATA_seed0.tif")
+        FusionEngine.resolve_undecided(fusion, products["undecided"],
+                                       classifications, confidences, output)
+        # tie of confidences : label of the first classification
+        self.assertEqual(
+            gdal.Open(output).ReadAsArray().tolist(), [[1, 2, 2]])
+        shutil.rmtree(test_dir)
+
+
 class iota_test_classification_shaping(unittest.TestCase):
     @classmethod
     def setUpClass(self):
@@ -1227,6 +1358,24 @@ class iota_testConfFusion(unittest.TestCase):
         self.assertTrue(filecmp.cmp(File1, referenceFile1))
 
 
+class iota_test_confusion_engine(unittest.TestCase):
+    def test_accumulate_confusion(self):
+        """test the block accumulation of confusion matrices"""
+        from iota2.Validation.ConfusionEngine import accumulate_confusion
+        all_class = [11, 12, 211]
+        lut = np.full(max(all_class) + 1, -1, dtype=np.int64)
+        lut[all_class] = np.arange(len(all_class))
+        conf_mat = np.zeros((3, 3), dtype=np.int64)
+        # -1 : no reference, 0 / 255 : labels not in the nomenclature
+        ref = np.array([[11, 11, 12], [211, -1, 12]])
+        pred = np.array([[11, 12, 12], [11, 11, 255]])
+        accumulate_confusion(conf_mat, ref, pred, lut)
+        accumulate_confusion(conf_mat, ref, pred, lut)
+        self.assertTrue(
+            np.array_equal(conf_mat,
+                           np.array([[2, 2, 0], [0, 2, 0], [2, 0, 0]])))
+
+
 class iota_testServiceLogging(unittest.TestCase):
     @classmethod
     def setUpClass(self):
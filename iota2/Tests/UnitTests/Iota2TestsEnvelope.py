@@ -111,3 +111,28 @@ class iota_testGenerateShapeTile(unittest.TestCase):
                 service_compare_vector_file.testSameShapefiles(
                     reference_shape_file, shape_file))
         shutil.rmtree(features_path)
+
+    def test_neighbours(self):
+        """envelopes are only compared to following envelopes sharing
+        their bounding box
+        """
+        from iota2.Sampling import TileEnvelope as env
+
+        # 3x3 grid of 110 km tiles overlapping by 10 km, read row by row
+        envelopes = [
+            env.rectangle(col * 100000, -row * 100000 - 110000,
+                          col * 100000 + 110000, -row * 100000)
+            for row in range(3) for col in range(3)
+        ]
+        # far away tile
+        envelopes.append(env.rectangle(1e6, 1e6, 1.1e6, 1.1e6))
+        neighbours = env.neighbours(envelopes)
+        self.assertEqual(neighbours[0], [1, 3, 4])
+        self.assertEqual(neighbours[4], [5, 6, 7, 8])
+        self.assertEqual(neighbours[8], [])
+        self.assertEqual(neighbours[9], [])
+        for i, list_j in enumerate(neighbours):
+            for j in range(i + 1, len(envelopes)):
+                self.assertEqual(
+                    j in list_j,
+                    envelopes[i].Intersects(envelopes[j]))
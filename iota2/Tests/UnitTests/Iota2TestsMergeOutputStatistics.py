@@ -122,3 +122,35 @@ class iota2_tests_merge_output_statistics(unittest.TestCase):
                              "Stats_VOK.txt"),
                 os.path.join(self.test_working_directory, "final",
                              "Stats_VOK.txt")))
+
+    def test_merge_tiles_histograms(self):
+        """check block histograms and their numerical merge"""
+        import numpy as np
+        from iota2.Validation import OutStats
+        from iota2.Validation import MergeOutStats
+
+        confidence = np.array([[1, 1, 100], [50, 0, 101], [2.5, 2, 2]])
+        difference = np.array([[1, 2, 4], [3, 1, 1], [1, 7, 2]])
+        histo = OutStats.joint_histogram(confidence, difference, 1, 100, 5)
+        self.assertEqual(histo.sum(), 5)
+        self.assertEqual(histo[1, 0], 1)
+        self.assertEqual(histo[2, 0], 1)
+        self.assertEqual(histo[4, 99], 1)
+        self.assertEqual(histo[3, 49], 1)
+        self.assertEqual(histo[2, 1], 1)
+
+        tiles_stats = []
+        for tile, max_view in [("T31TCJ", 2), ("T31TDJ", 3)]:
+            tile_stats = os.path.join(self.test_working_directory,
+                                      f"{tile}_stats.npz")
+            np.savez(tile_stats,
+                     stats_name=np.array(OutStats.STATS_NAME),
+                     difference=np.ones((2, 4, 100), dtype=np.int64),
+                     difference_bins=np.arange(1, 101),
+                     validity=np.ones(max_view + 1, dtype=np.int64),
+                     validity_bins=np.arange(0, max_view + 1))
+            tiles_stats.append(tile_stats)
+        merged = MergeOutStats.merge_tiles_histograms(tiles_stats)
+        self.assertTrue(np.all(merged["difference"] == 2))
+        self.assertEqual(list(merged["validity"]), [2, 2, 2, 1])
+        self.assertEqual(list(merged["validity_bins"]), [0, 1, 2, 3])
@@ -197,6 +197,29 @@ class iota_test_zonal_stats(unittest.TestCase):
                              "T31TCJ_region_1_seed_0_stats.xml"),
                 test_statistics))
 
+    def test_wide_stats(self):
+        """Test pivot of the statistics table
+        """
+        import numpy as np
+        stats_csv = os.path.join(self.test_working_directory, "stats_0.csv")
+        with open(stats_csv, "w") as csv_file:
+            csv_file.write("0,confidence,mean,,55\n"
+                           "0,validity,mean,,12\n"
+                           "0,validity,std,,1.5\n"
+                           "0,classif,rate,11,0.754\n"
+                           "0,classif,rate,12,0.246\n"
+                           "2,confidence,mean,,80\n"
+                           "2,classif,rate,12,1\n")
+        columns = cs.widestats(stats_csv, [(11, "Ete"), (12, "Hiver")])
+        self.assertEqual(
+            list(columns.keys()),
+            ["idstats", "mconf", "valmean", "valstd", "Ete", "Hiver"])
+        self.assertEqual(columns["idstats"].tolist(), [0, 2])
+        self.assertEqual(columns["mconf"].tolist(), [55, 80])
+        self.assertTrue(np.isnan(columns["valmean"][1]))
+        self.assertEqual(columns["Ete"].tolist(), [0.75, 0])
+        self.assertEqual(columns["Hiver"].tolist(), [0.25, 1])
+
     def test_iota2_statistics(self):
         """Test vector statistics computing
         """
@@ -179,3 +179,104 @@ class iota_testVectSimp(unittest.TestCase):
             shutil.rmtree(self.wd, ignore_errors=True)
         if os.path.exists(self.out):
             shutil.rmtree(self.out, ignore_errors=True)
+
+    def test_partition_vector(self):
+        """vector is clipped with every zones in a single pass"""
+        from osgeo import ogr
+        from osgeo import osr
+
+        def write_shape(name, field, polygons):
+            path = os.path.join(self.test_working_directory, name)
+            data_source = ogr.GetDriverByName(
+                "ESRI Shapefile").CreateDataSource(path)
+            srs = osr.SpatialReference()
+            srs.ImportFromEPSG(2154)
+            layer = data_source.CreateLayer(name.replace(".shp", ""), srs,
+                                            ogr.wkbPolygon)
+            layer.CreateField(ogr.FieldDefn(field, ogr.OFTInteger))
+            for value, (xmin, ymin, xmax, ymax) in polygons:
+                feature = ogr.Feature(layer.GetLayerDefn())
+                feature.SetField(field, value)
+                feature.SetGeometry(
+                    ogr.CreateGeometryFromWkt(
+                        f"POLYGON (({xmin} {ymin}, {xmax} {ymin}, "
+                        f"{xmax} {ymax}, {xmin} {ymax}, {xmin} {ymin}))"))
+                layer.CreateFeature(feature)
+            data_source = None
+            return path
+
+        zones_file = write_shape("zones.shp", "dept",
+                                 [(31, (0, 0, 100, 100)),
+                                  (32, (100, 0, 200, 100)),
+                                  (33, (0, 100, 200, 200))])
+        vector = write_shape("classif.shp", "cat",
+                             [(1, (10, 10, 20, 20)), (2, (90, 10, 110, 20)),
+                              (3, (150, 150, 160, 160))])
+        zones = vas.getZones(zones_file, "dept", [31, 32])
+        self.assertEqual(sorted(zones.keys()), ["31", "32"])
+        self.assertEqual(
+            vas.zonesCandidates(vas.zonesIndex(zones), (90, 110, 10, 20)),
+            {"31", "32"})
+
+        outputs = {
+            value: os.path.join(self.test_working_directory,
+                                "dept_{}.shp".format(value))
+            for value in zones
+        }
+        counts = vas.partitionVector(vector, zones, outputs)
+        self.assertEqual(counts, {"31": 2, "32": 1})
+        data_source = ogr.Open(outputs["32"])
+        feature = data_source.GetLayer().GetNextFeature()
+        self.assertEqual(feature.GetField("cat"), 2)
+        self.assertAlmostEqual(feature.GetGeometryRef().GetArea(), 100)
+
+    def test_tiled_mmu(self):
+        """the minimal mapping unit applies to polygons merged across cells:
+        a polygon crossing a seam with parts smaller than the mmu is kept
+        """
+        import numpy as np
+        from osgeo import gdal
+        from osgeo import ogr
+        from osgeo import osr
+
+        raster = os.path.join(self.test_working_directory, "classif.tif")
+        classif = np.ones((10, 20), dtype=np.uint8)
+        # 800 m² polygon, cut by the vertical seam (column 10) and by the
+        # horizontal seam (row 5) of a 2x2 grid
+        classif[3:7, 9:11] = 2
+        raster_ds = gdal.GetDriverByName("GTiff").Create(
+            raster, 20, 10, 1, gdal.GDT_Byte)
+        raster_ds.SetGeoTransform((600000, 10, 0, 6300100, 0, -10))
+        srs = osr.SpatialReference()
+        srs.ImportFromEPSG(2154)
+        raster_ds.SetProjection(srs.ExportToWkt())
+        raster_ds.GetRasterBand(1).WriteArray(classif)
+        raster_ds = None
+
+        vector = os.path.join(self.test_working_directory, "classif.shp")
+        vas.topologicalPolygonize(self.wd,
+                                  self.grasslib,
+                                  raster,
+                                  False,
+                                  vector,
+                                  nb_workers=2)
+        smoothed = os.path.join(self.test_working_directory,
+                                "classif_mmu.shp")
+        vas.generalizeVector(self.wd,
+                             self.grasslib,
+                             vector,
+                             1,
+                             "douglas",
+                             600,
+                             out=smoothed,
+                             nb_workers=2)
+
+        data_source = ogr.Open(smoothed)
+        areas = [
+            feature.GetGeometryRef().GetArea()
+            for feature in data_source.GetLayer()
+            if feature.GetField("cat") == 2
+        ]
+        data_source = None
+        self.assertEqual(len(areas), 1)
+        self.assertAlmostEqual(areas[0], 800, delta=1)
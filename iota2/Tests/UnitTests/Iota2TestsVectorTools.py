@@ -188,3 +188,120 @@ class iota_testVectortools(unittest.TestCase):
                                         "ESRI Shapefile"),
             "Generated shapefile vector does not fit with shapefile reference file"
         )
+
+    def test_tile_intersection(self):
+        """
+        intersection of a tile's envelope, regions, ground truth and valid
+        areas in a single pass
+        """
+        from osgeo import ogr
+        from osgeo import osr
+        from iota2.VectorTools import TileIntersection
+
+        def write_shape(name, polygons, field=None, field_type=ogr.OFTString):
+            path = os.path.join(self.test_working_directory, name)
+            driver = ogr.GetDriverByName("ESRI Shapefile")
+            data_source = driver.CreateDataSource(path)
+            srs = osr.SpatialReference()
+            srs.ImportFromEPSG(2154)
+            layer = data_source.CreateLayer(name.replace(".shp", ""), srs,
+                                            ogr.wkbPolygon)
+            if field:
+                layer.CreateField(ogr.FieldDefn(field, field_type))
+            for value, (xmin, ymin, xmax, ymax) in polygons:
+                feature = ogr.Feature(layer.GetLayerDefn())
+                if field:
+                    feature.SetField(field, value)
+                feature.SetGeometry(
+                    ogr.CreateGeometryFromWkt(
+                        f"POLYGON (({xmin} {ymin}, {xmax} {ymin}, "
+                        f"{xmax} {ymax}, {xmin} {ymax}, {xmin} {ymin}))"))
+                layer.CreateFeature(feature)
+            data_source = None
+            return path
+
+        envelope = write_shape("envelope.shp", [(None, (0, 0, 100, 100))])
+        region = write_shape("region.shp", [("1", (-50, -50, 50, 150)),
+                                            ("2", (50, -50, 150, 150))],
+                             "region")
+        ground_truth = write_shape("gt.shp",
+                                   [(11, (40, 10, 60, 20)),
+                                    (12, (200, 200, 210, 210)),
+                                    (13, (10, 80, 20, 90))], "code",
+                                   ogr.OFTInteger)
+        cloud = write_shape("cloud.shp", [(1, (0, 0, 100, 50))], "cloud",
+                            ogr.OFTInteger)
+        output = os.path.join(self.test_working_directory, "T31TCJ.shp")
+
+        # inputs are indexed on a copy, never in place
+        index_directory = os.path.join(self.test_working_directory,
+                                       "spatialIndex")
+        indexed_gt = TileIntersection.spatial_index_copy(
+            ground_truth, index_directory)
+        self.assertEqual(indexed_gt, os.path.join(index_directory, "gt.shp"))
+        self.assertEqual(
+            TileIntersection.indexed_vector(ground_truth, index_directory),
+            indexed_gt)
+        self.assertTrue(
+            os.path.exists(os.path.join(index_directory, "gt.qix")))
+        self.assertFalse(
+            os.path.exists(os.path.join(self.test_working_directory,
+                                        "gt.qix")))
+
+        regions = TileIntersection.tile_regions(envelope, region, "region")
+        self.assertEqual(sorted(region for region, _ in regions), ["1", "2"])
+        self.assertTrue(
+            TileIntersection.intersect_ground_truth(regions, region,
+                                                    indexed_gt, cloud,
+                                                    output, 2154, "code",
+                                                    "region"))
+        self.assertFalse(
+            os.path.exists(os.path.join(self.test_working_directory,
+                                        "region.qix")))
+        data_source = ogr.Open(output)
+        features = sorted(
+            (feature.GetField("region"), feature.GetField("code"),
+             feature.GetField("originfid"),
+             round(feature.GetGeometryRef().GetArea()))
+            for feature in data_source.GetLayer())
+        # the third polygon is not in valid areas
+        self.assertEqual(features, [("1", 11, 1, 100), ("2", 11, 1, 100)])
+
+    def test_delete_duplicate_geometries(self):
+        """
+        duplicated geometries are removed in place, the first one is kept
+        """
+        from osgeo import ogr
+        from osgeo import osr
+        from iota2.VectorTools.DeleteDuplicateGeometriesSqlite import (
+            deleteDuplicateGeometriesSqlite)
+
+        database = os.path.join(self.test_working_directory, "gt.sqlite")
+        driver = ogr.GetDriverByName("SQLite")
+        data_source = driver.CreateDataSource(database)
+        srs = osr.SpatialReference()
+        srs.ImportFromEPSG(2154)
+        layer = data_source.CreateLayer("gt", srs, ogr.wkbPolygon)
+        layer.CreateField(ogr.FieldDefn("code", ogr.OFTInteger))
+        for code, wkt in [
+            (1, "POLYGON ((0 0,10 0,10 10,0 10,0 0))"),
+            (2, "POLYGON ((20 0,30 0,30 10,20 10,20 0))"),
+            (3, "POLYGON ((0 0,10 0,10 10,0 10,0 0))"),
+            (4, "POLYGON ((20 0,30 0,30 10,20 10,20 0))"),
+        ]:
+            feature = ogr.Feature(layer.GetLayerDefn())
+            feature.SetField("code", code)
+            feature.SetGeometry(ogr.CreateGeometryFromWkt(wkt))
+            layer.CreateFeature(feature)
+        data_source = None
+
+        _, nb_duplicates = deleteDuplicateGeometriesSqlite(database,
+                                                           do_corrections=False,
+                                                           quiet_mode=True)
+        self.assertEqual(nb_duplicates, 2)
+        output, _ = deleteDuplicateGeometriesSqlite(database, quiet_mode=True)
+        self.assertEqual(output, database)
+        data_source = ogr.Open(database)
+        self.assertEqual(
+            sorted(feature.GetField("code")
+                   for feature in data_source.GetLayer()), [1, 2])
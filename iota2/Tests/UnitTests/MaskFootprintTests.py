@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# =========================================================================
+#   Program:   iota2
+#
+#   Copyright (c) CESBIO. All rights reserved.
+#
+#   See LICENSE for details.
+#
+#   This software is distributed WITHOUT ANY WARRANTY; without even
+#   the implied warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR
+#   PURPOSE.  See the above copyright notices for more information.
+#
+# =========================================================================
+"""
+Test of masks footprints
+"""
+import os
+import shutil
+import unittest
+
+RM_IF_ALL_OK = True
+IOTA2DIR = os.environ.get('IOTA2DIR')
+
+
+class iota_test_mask_footprint(unittest.TestCase):
+    """test MaskFootprint"""
+    @classmethod
+    def setUpClass(cls):
+        cls.group_test_name = "iota_test_mask_footprint"
+        cls.iota2_tests_directory = os.path.join(IOTA2DIR, "data",
+                                                 cls.group_test_name)
+        if os.path.exists(cls.iota2_tests_directory):
+            shutil.rmtree(cls.iota2_tests_directory)
+        os.mkdir(cls.iota2_tests_directory)
+
+    @classmethod
+    def tearDownClass(cls):
+        if RM_IF_ALL_OK:
+            shutil.rmtree(cls.iota2_tests_directory)
+
+    def test_footprint_rings(self):
+        """boundaries of row spans are traced into rings"""
+        import numpy as np
+        from iota2.Common import MaskFootprint
+
+        mask = np.array([[0, 0, 0, 0],
+                         [0, 1, 1, 0],
+                         [1, 1, 1, 0],
+                         [0, 0, 0, 0],
+                         [0, 0, 1, 1]])
+        first, last = MaskFootprint.row_spans(mask)
+        self.assertEqual(first.tolist(), [-1, 1, 0, -1, 2])
+        self.assertEqual(last.tolist(), [-1, 3, 3, -1, 4])
+        rings = MaskFootprint.footprint_rings(first, last)
+        self.assertEqual(rings, [[(3, 1), (3, 3), (0, 3), (0, 2), (1, 2),
+                                  (1, 1), (3, 1)],
+                                 [(4, 4), (4, 5), (2, 5), (2, 4), (4, 4)]])
+
+    def test_mask_footprint(self):
+        """the footprint covers valid pixels"""
+        import numpy as np
+        from osgeo import ogr
+        from iota2.Common import MaskFootprint
+        from iota2.Tests.UnitTests.tests_utils.tests_utils_rasters import (
+            array_to_raster)
+
+        mask = os.path.join(self.iota2_tests_directory, "mask.tif")
+        footprint = os.path.join(self.iota2_tests_directory, "mask.shp")
+        array = np.zeros((10, 10))
+        for row in range(10):
+            array[row, row // 2:10 - row // 3] = 1
+        array_to_raster(array, mask, origin_x=0, origin_y=300)
+        MaskFootprint.mask_footprint(mask, footprint, block_size=3)
+
+        layer = ogr.Open(footprint).GetLayer()
+        self.assertEqual(layer.GetFeatureCount(), 1)
+        geometry = layer.GetNextFeature().GetGeometryRef()
+        self.assertAlmostEqual(geometry.GetArea(), array.sum() * 30 * 30)
+
+    def test_disjoint_spans(self):
+        """spans of consecutive rows which do not overlap give separate
+        valid rings, masks with gaps inside rows are polygonized exactly"""
+        import numpy as np
+        from osgeo import ogr
+        from iota2.Common import MaskFootprint
+        from iota2.Tests.UnitTests.tests_utils.tests_utils_rasters import (
+            array_to_raster)
+
+        mask = np.array([[1, 1, 0, 0, 0],
+                         [0, 0, 0, 1, 1],
+                         [0, 0, 0, 1, 0]])
+        first, last = MaskFootprint.row_spans(mask)
+        self.assertFalse(MaskFootprint.rows_with_gaps(mask, first, last))
+        rings = MaskFootprint.footprint_rings(first, last)
+        self.assertEqual(rings, [[(2, 0), (2, 1), (0, 1), (0, 0), (2, 0)],
+                                 [(5, 1), (5, 2), (4, 2), (4, 3), (3, 3),
+                                  (3, 1), (5, 1)]])
+
+        footprint = os.path.join(self.iota2_tests_directory,
+                                 "disjoint.shp")
+        mask_raster = os.path.join(self.iota2_tests_directory,
+                                   "disjoint.tif")
+        array_to_raster(mask, mask_raster, origin_x=0, origin_y=300)
+        MaskFootprint.mask_footprint(mask_raster, footprint)
+        layer = ogr.Open(footprint).GetLayer()
+        self.assertEqual(layer.GetFeatureCount(), 2)
+        self.assertTrue(
+            all(feature.GetGeometryRef().IsValid() for feature in layer))
+
+        # gaps inside rows
+        mask = np.array([[1, 1, 1, 1, 1],
+                         [1, 0, 0, 0, 1],
+                         [1, 1, 1, 1, 1]])
+        first, last = MaskFootprint.row_spans(mask)
+        self.assertTrue(MaskFootprint.rows_with_gaps(mask, first, last))
+        array_to_raster(mask, mask_raster, origin_x=0, origin_y=300)
+        MaskFootprint.mask_footprint(mask_raster, footprint)
+        layer = ogr.Open(footprint).GetLayer()
+        area = sum(feature.GetGeometryRef().GetArea() for feature in layer)
+        self.assertAlmostEqual(area, mask.sum() * 30 * 30)
@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# =========================================================================
+#   Program:   iota2
+#
+#   Copyright (c) CESBIO. All rights reserved.
+#
+#   See LICENSE for details.
+#
+#   This software is distributed WITHOUT ANY WARRANTY; without even
+#   the implied warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR
+#   PURPOSE.  See the above copyright notices for more information.
+#
+# =========================================================================
+"""
+Test of the models cache
+"""
+import os
+import pickle
+import shutil
+import unittest
+
+RM_IF_ALL_OK = True
+IOTA2DIR = os.environ.get('IOTA2DIR')
+
+
+class iota_test_model_cache(unittest.TestCase):
+    """test ModelCache"""
+    @classmethod
+    def setUpClass(cls):
+        cls.group_test_name = "iota_test_model_cache"
+        cls.iota2_tests_directory = os.path.join(IOTA2DIR, "data",
+                                                 cls.group_test_name)
+        if os.path.exists(cls.iota2_tests_directory):
+            shutil.rmtree(cls.iota2_tests_directory)
+        os.mkdir(cls.iota2_tests_directory)
+
+    @classmethod
+    def tearDownClass(cls):
+        if RM_IF_ALL_OK:
+            shutil.rmtree(cls.iota2_tests_directory)
+
+    def tearDown(self):
+        from iota2.Classification import ModelCache
+        ModelCache.clear_cache()
+
+    def write_model(self, name, model):
+        """pickle a model"""
+        model_path = os.path.join(self.iota2_tests_directory, name)
+        with open(model_path, "wb") as model_file:
+            pickle.dump(model, model_file)
+        return model_path
+
+    def test_model_cache(self):
+        """
+        models are loaded once, re-loaded if modified and evicted (least
+        recently used first) when the budget is reached
+        """
+        from iota2.Classification import ModelCache
+
+        model_1 = self.write_model("model_1.txt", ("rf", [1] * 100000))
+        model_2 = self.write_model("model_2.txt", ("rf", [2] * 100000))
+        model_size = os.path.getsize(model_1)
+
+        first = ModelCache.load_model(model_1)
+        self.assertIs(ModelCache.load_model(model_1), first)
+
+        # model re-trained
+        stat = os.stat(model_1)
+        self.write_model("model_1.txt", ("et", [1] * 100000))
+        os.utime(model_1, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+        self.assertEqual(ModelCache.load_model(model_1)[0], "et")
+        self.assertEqual(ModelCache.cached_models_size(), model_size)
+
+        # only one model fits in the budget
+        budget = (1.5 * model_size) / 1024**2
+        ModelCache.load_model(model_2, budget)
+        self.assertEqual(ModelCache.cached_models_size(),
+                         os.path.getsize(model_2))
+
+        # cache disabled
+        ModelCache.clear_cache()
+        ModelCache.load_model(model_1, 0)
+        self.assertEqual(ModelCache.cached_models_size(), 0)
@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# =========================================================================
+#   Program:   iota2
+#
+#   Copyright (c) CESBIO. All rights reserved.
+#
+#   See LICENSE for details.
+#
+#   This software is distributed WITHOUT ANY WARRANTY; without even
+#   the implied warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR
+#   PURPOSE.  See the above copyright notices for more information.
+#
+# =========================================================================
+"""
+Test of the OTB applications profiling layer
+"""
+import os
+import sys
+import json
+import shutil
+import unittest
+
+IOTA2DIR = os.environ.get('IOTA2DIR')
+RM_IF_ALL_OK = True
+
+
+class iota_test_otb_profiler(unittest.TestCase):
+    """test OtbProfiler"""
+    @classmethod
+    def setUpClass(cls):
+        cls.group_test_name = "iota_test_otb_profiler"
+        cls.iota2_tests_directory = os.path.join(IOTA2DIR, "data",
+                                                 cls.group_test_name)
+        cls.all_tests_ok = []
+        if os.path.exists(cls.iota2_tests_directory):
+            shutil.rmtree(cls.iota2_tests_directory)
+        os.mkdir(cls.iota2_tests_directory)
+
+    @classmethod
+    def tearDownClass(cls):
+        print("{} ended".format(cls.group_test_name))
+        if RM_IF_ALL_OK and all(cls.all_tests_ok):
+            shutil.rmtree(cls.iota2_tests_directory)
+
+    def setUp(self):
+        test_name = self.id().split(".")[-1]
+        self.test_working_directory = os.path.join(self.iota2_tests_directory,
+                                                   test_name)
+        if os.path.exists(self.test_working_directory):
+            shutil.rmtree(self.test_working_directory)
+        os.mkdir(self.test_working_directory)
+
+    def list2reason(self, exc_list):
+        if exc_list and exc_list[-1][0] is self:
+            return exc_list[-1][1]
+
+    def tearDown(self):
+        if sys.version_info > (3, 4, 0):
+            result = self.defaultTestResult()
+            self._feedErrorsToResult(result, self._outcome.errors)
+        else:
+            result = getattr(self, '_outcomeForDoCleanups',
+                             self._resultForDoCleanups)
+        error = self.list2reason(result.errors)
+        failure = self.list2reason(result.failures)
+        ok = not error and not failure
+
+        self.all_tests_ok.append(ok)
+        if ok:
+            shutil.rmtree(self.test_working_directory)
+
+    def test_profile_pipeline(self):
+        """
+        profile a two applications pipeline
+        """
+        import numpy as np
+        import otbApplication as otb
+        from iota2.Common import OtbProfiler
+        from iota2.Common.OtbAppBank import CreateBandMathApplication
+        from iota2.Tests.UnitTests.tests_utils.tests_utils_rasters import (
+            array_to_raster)
+
+        raster = os.path.join(self.test_working_directory, "raster.tif")
+        array_to_raster(np.ones((16, 16)), raster)
+        output = os.path.join(self.test_working_directory, "out.tif")
+
+        def pipeline(_):
+            first = CreateBandMathApplication({"il": raster, "exp": "im1b1"})
+            first.Execute()
+            second = CreateBandMathApplication({
+                "il": [first],
+                "exp": "im1b1*2",
+                "out": output
+            })
+            second.ExecuteAndWriteOutput()
+
+        original_method = otb.Application.ExecuteAndWriteOutput
+        OtbProfiler.run_profiled(pipeline, "T31TCJ",
+                                 self.test_working_directory)
+
+        # OTB methods must be restored
+        self.assertTrue(
+            otb.Application.ExecuteAndWriteOutput is original_method)
+        trace_file = OtbProfiler.profile_file_name(
+            self.test_working_directory, "T31TCJ")
+        self.assertTrue(os.path.exists(trace_file))
+        with open(trace_file) as trace_json:
+            trace = json.load(trace_json)
+        self.assertEqual(len(trace["traceEvents"]), 2)
+        self.assertTrue("estimated_memory_bytes" in trace["traceEvents"][1]
+                        ["args"])
+        pipeline_nodes = trace["otherData"]["pipeline"]
+        self.assertEqual(pipeline_nodes[1]["inputs"],
+                         [pipeline_nodes[0]["uid"]])
@@ -260,3 +260,70 @@ class iota_testSamplesSplits(unittest.TestCase):
             msg=
             "two seeds have the same learning / validation split > random does not work"
         )
+
+    def test_grouped_draws(self):
+        """check vectorized learning / validation and cross-validation draws
+        """
+        import numpy as np
+        from iota2.Sampling.SplitInSubSets import (get_groups, random_split,
+                                                   area_balanced_folds)
+
+        class_labels = np.array([1, 1, 1, 1, 2, 2, 2, None, 1], dtype=object)
+        regions = np.array(["1", "1", "1", "1", "1", "1", "1", "1", "2"],
+                           dtype=object)
+        groups = get_groups(class_labels, regions)
+        self.assertEqual(groups[7], -1)
+        self.assertEqual(len(set(groups[groups >= 0].tolist())), 3)
+
+        defined = groups >= 0
+        learn = random_split(groups[defined], 0.5, np.random.RandomState(1))
+        # 2 learning polygons for the class 1 in region 1, 2 for the class 2
+        # (round(1.5) = 2), the polygon alone in region 2 is a learning one
+        self.assertEqual(learn.tolist().count(True), 5)
+        self.assertTrue(learn[-1])
+        self.assertTrue(
+            np.array_equal(
+                learn,
+                random_split(groups[defined], 0.5, np.random.RandomState(1))))
+
+        areas = np.array([10., 8., 6., 4., 3., 2., 1.])
+        folds = area_balanced_folds(groups[defined][:7], areas, 2,
+                                    np.random.RandomState(0))
+        # each block of 2 polygons (sorted by area) is spread over both folds
+        self.assertNotEqual(folds[0], folds[1])
+        self.assertNotEqual(folds[2], folds[3])
+        self.assertNotEqual(folds[4], folds[5])
+        self.assertEqual(folds[6], 0)
+
+    def test_no_split_ground_truth(self):
+        """without ground truth split, every polygons are used once for
+        learning, polygons alone in their group are not duplicated
+        """
+        from iota2.Sampling.SplitInSubSets import splitInSubSets
+        from iota2.Tests.UnitTests.TestsUtils import random_ground_truth_generator
+        from iota2.Common.FileUtils import getFieldElement
+
+        vector_file = os.path.join(self.test_working_directory,
+                                   "test_no_split.shp")
+        random_ground_truth_generator(vector_file, self.data_field, 23,
+                                      self.region_field)
+        nb_features = len(
+            getFieldElement(vector_file,
+                            driverName="ESRI Shapefile",
+                            field=self.data_field,
+                            mode="all",
+                            elemType="int"))
+        splitInSubSets(vector_file,
+                       self.data_field,
+                       self.region_field,
+                       driver_name="ESRI shapefile",
+                       seeds=2,
+                       splitGroundTruth=False,
+                       random_seed=1)
+        for seed in range(2):
+            flags = getFieldElement(vector_file,
+                                    driverName="ESRI Shapefile",
+                                    field="seed_{}".format(seed),
+                                    mode="all",
+                                    elemType="str")
+            self.assertEqual(flags, ["learn"] * nb_features)
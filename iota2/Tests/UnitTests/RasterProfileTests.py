@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# =========================================================================
+#   Program:   iota2
+#
+#   Copyright (c) CESBIO. All rights reserved.
+#
+#   See LICENSE for details.
+#
+#   This software is distributed WITHOUT ANY WARRANTY; without even
+#   the implied warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR
+#   PURPOSE.  See the above copyright notices for more information.
+#
+# =========================================================================
+"""
+Test of the output rasters profile
+"""
+import os
+import unittest
+
+
+class iota_test_raster_profile(unittest.TestCase):
+    """test RasterProfile"""
+    def setUp(self):
+        from iota2.Common import RasterProfile
+        self.env_profile = os.environ.pop(RasterProfile.PROFILE_ENV, None)
+
+    def tearDown(self):
+        from iota2.Common import RasterProfile
+        os.environ.pop(RasterProfile.PROFILE_ENV, None)
+        if self.env_profile is not None:
+            os.environ[RasterProfile.PROFILE_ENV] = self.env_profile
+
+    def test_output_profile(self):
+        """
+        check creation options of every writers
+        """
+        from iota2.Common import RasterProfile
+
+        self.assertEqual(
+            RasterProfile.gdal_creation_options("Byte"), [
+                "TILED=YES", "BLOCKXSIZE=256", "BLOCKYSIZE=256",
+                "BIGTIFF=IF_SAFER", "COMPRESS=LZW"
+            ])
+        RasterProfile.set_output_profile(compress="deflate", predictor=3)
+        self.assertEqual(
+            RasterProfile.gdal_creation_dict("Float32")["PREDICTOR"], "3")
+        self.assertEqual(
+            RasterProfile.gdal_creation_dict("uint8")["PREDICTOR"], "2")
+        self.assertEqual(RasterProfile.rasterio_profile("float32"), {
+            "tiled": True,
+            "blockxsize": 256,
+            "blockysize": 256,
+            "BIGTIFF": "IF_SAFER",
+            "compress": "deflate",
+            "predictor": 3
+        })
+        extended = RasterProfile.otb_extended_filename(
+            "/out.tif?&gdal:co:COMPRESS=NONE", "uint8")
+        self.assertTrue(extended.startswith("/out.tif?&gdal:co:COMPRESS=NONE"))
+        self.assertEqual(extended.count("COMPRESS"), 1)
+        self.assertTrue(extended.endswith("&writegeom=false"))
+        self.assertTrue("gdal:co:TILED=YES" in extended)
+
+        RasterProfile.set_output_profile(compress="NONE")
+        self.assertFalse(
+            "COMPRESS" in RasterProfile.gdal_creation_dict("Float32"))
+        with self.assertRaises(ValueError):
+            RasterProfile.set_output_profile(block_size=100)
@@ -319,3 +319,92 @@ class iota_testSamplesSelection(unittest.TestCase):
                              selection_test,
                              CmpMode='coordinates')
         self.assertTrue(same, msg="sample selection generation failed")
+
+    def test_tiles_quotas(self):
+        """
+        test the dispatch of model's quotas across tiles
+        """
+        from iota2.Sampling.SamplesSelection import get_tiles_quotas
+        tiles_counts = {
+            "T31TCJ": {
+                "class": {
+                    "11": 30,
+                    "12": 5
+                }
+            },
+            "T31TDJ": {
+                "class": {
+                    "11": 70
+                }
+            }
+        }
+        quotas = get_tiles_quotas(tiles_counts, {
+            "strategy": "constant",
+            "strategy.constant.nb": 10
+        })
+        self.assertEqual(quotas, {
+            "T31TCJ": {
+                "11": 3,
+                "12": 5
+            },
+            "T31TDJ": {
+                "11": 7
+            }
+        })
+        quotas = get_tiles_quotas(tiles_counts, {"strategy": "smallest"})
+        self.assertEqual(quotas["T31TCJ"]["11"] + quotas["T31TDJ"]["11"], 5)
+        quotas = get_tiles_quotas(tiles_counts, {"strategy": "all"})
+        self.assertEqual(quotas["T31TDJ"]["11"], 70)
+
+    def test_samples_selection_by_tiles(self):
+        """
+        test sampling of a shape file tile by tile
+        """
+        from iota2.Sampling.SamplesSelection import samples_selection
+        from iota2.Common import IOTA2Directory
+        from iota2.Common.FileUtils import cpShapeFile
+        from iota2.Common import FileUtils as fut
+
+        output_path = os.path.join(self.test_working_directory,
+                                   "samplesSelTest")
+        IOTA2Directory.generate_directories(output_path, check_inputs=False)
+        shutil.copytree(self.features_ref,
+                        os.path.join(output_path, "features", "T31TCJ"))
+        shutil.copy(
+            self.in_xml,
+            os.path.join(output_path, "samplesSelection",
+                         "T31TCJ_region_1_seed_0_stats.xml"))
+        in_shape = os.path.join(output_path, "samplesSelection",
+                                os.path.basename(self.in_shape))
+        cpShapeFile(self.in_shape.replace(".shp", ""),
+                    in_shape.replace(".shp", ""),
+                    extensions=[".prj", ".shp", ".dbf", ".shx"])
+
+        samples_selection(in_shape,
+                          self.test_working_directory,
+                          output_path,
+                          2,
+                          "EPSG:2154",
+                          "MaskCommunSL.tif", {
+                              "sampler": "random",
+                              "strategy": "all"
+                          },
+                          "code",
+                          by_tiles=True,
+                          nb_workers=2)
+        selection_test = fut.FileSearch_AND(
+            os.path.join(output_path, "samplesSelection"), True,
+            os.path.basename(self.selection_ref))[0]
+        nb_ref = len(
+            fut.getFieldElement(self.selection_ref,
+                                driverName="SQLite",
+                                field="seed_0",
+                                mode="all",
+                                elemType="str"))
+        nb_test = len(
+            fut.getFieldElement(selection_test,
+                                driverName="SQLite",
+                                field="seed_0",
+                                mode="all",
+                                elemType="str"))
+        self.assertEqual(nb_ref, nb_test, msg="sample selection failed")
@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# =========================================================================
+#   Program:   iota2
+#
+#   Copyright (c) CESBIO. All rights reserved.
+#
+#   See LICENSE for details.
+#
+#   This software is distributed WITHOUT ANY WARRANTY; without even
+#   the implied warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR
+#   PURPOSE.  See the above copyright notices for more information.
+#
+# =========================================================================
+"""
+Test of tasks telemetry and resources file tuning
+"""
+import os
+import shutil
+import unittest
+
+IOTA2DIR = os.environ.get('IOTA2DIR')
+
+
+class iota_test_tasks_telemetry(unittest.TestCase):
+    """test tasks_telemetry"""
+    @classmethod
+    def setUpClass(cls):
+        cls.group_test_name = "iota_test_tasks_telemetry"
+        cls.iota2_tests_directory = os.path.join(IOTA2DIR, "data",
+                                                 cls.group_test_name)
+        if os.path.exists(cls.iota2_tests_directory):
+            shutil.rmtree(cls.iota2_tests_directory)
+        os.mkdir(cls.iota2_tests_directory)
+
+    @classmethod
+    def tearDownClass(cls):
+        print("{} ended".format(cls.group_test_name))
+        shutil.rmtree(cls.iota2_tests_directory)
+
+    def test_task_monitor(self):
+        """
+        monitor a task
+        """
+        from iota2.MPI import tasks_telemetry
+        monitor = tasks_telemetry.TaskMonitor("MyStep", "my_block", 2,
+                                              "T31TCJ")
+        monitor.start()
+        data = [float(val) for val in range(1000000)]
+        record = monitor.stop(success=True)
+        self.assertEqual(len(data), 1000000)
+        self.assertEqual(record["resource_block"], "my_block")
+        self.assertEqual(record["parameter"], "T31TCJ")
+        self.assertTrue(record["peak_rss_kb"] > 0)
+        self.assertTrue(record["wall_time_s"] >= 0)
+
+    def test_tune_resources_file(self):
+        """
+        propose a resources file from records
+        """
+        from config import Config
+        from iota2.MPI import tasks_telemetry
+
+        reference = os.path.join(self.iota2_tests_directory, "ref.cfg")
+        with open(reference, "w") as ref_file:
+            ref_file.write('my_block:{\n'
+                           '          name : "my_step"\n'
+                           '          nb_cpu : 8\n'
+                           '          ram : "60gb"\n'
+                           '          walltime : "10:00:00"\n'
+                           '          process_max : 4\n'
+                           '          }\n'
+                           'untouched:{\n'
+                           '          name : "untouched"\n'
+                           '          nb_cpu : 1\n'
+                           '          ram : "5gb"\n'
+                           '          walltime : "00:10:00"\n'
+                           '          }\n')
+        records = [{
+            "resource_block": "my_block",
+            "success": True,
+            "start": 100.0 * ind,
+            "wall_time_s": 3600.0,
+            "cpu_time_s": 3 * 3600.0,
+            "peak_rss_kb": (ind + 1) * 1024 * 1024,
+            "nb_cpu_requested": 8
+        } for ind in range(10)]
+        telemetry_file = os.path.join(self.iota2_tests_directory,
+                                      tasks_telemetry.TELEMETRY_FILE_NAME)
+        tasks_telemetry.append_records(telemetry_file, records)
+        proposal = tasks_telemetry.propose_resources(
+            tasks_telemetry.load_records([telemetry_file]),
+            percentile=100,
+            ram_margin=1.2,
+            walltime_margin=1.0)
+        self.assertEqual(proposal["my_block"]["nb_cpu"], 3)
+        self.assertEqual(proposal["my_block"]["ram"], "12gb")
+        self.assertEqual(proposal["my_block"]["walltime"], "01:15:00")
+
+        tuned = os.path.join(self.iota2_tests_directory, "tuned.cfg")
+        tasks_telemetry.write_resources_file(reference, proposal, tuned)
+        cfg_tuned = Config(tuned)
+        self.assertEqual(cfg_tuned.my_block.ram, "12gb")
+        self.assertEqual(cfg_tuned.my_block.process_max, 4)
+        self.assertEqual(cfg_tuned.untouched.ram, "5gb")
+
+    def test_walltime_over_runs(self):
+        """
+        the walltime covers the longest execution of a step, not the time
+        between two runs
+        """
+        from iota2.MPI import tasks_telemetry
+
+        def run_records(execution_id, run_start, duration):
+            return [{
+                "resource_block": "my_block",
+                "execution_id": execution_id,
+                "success": True,
+                "start": run_start + 100.0 * ind,
+                "wall_time_s": duration,
+                "cpu_time_s": duration,
+                "peak_rss_kb": 1024 * 1024,
+                "nb_cpu_requested": 1
+            } for ind in range(2)]
+
+        # a second run, two days after the first one
+        records = run_records("first", 0.0, 3600.0) + run_records(
+            "second", 2 * 86400.0, 1800.0)
+        telemetry_file = os.path.join(self.iota2_tests_directory,
+                                      "two_runs_telemetry.jsonl")
+        tasks_telemetry.append_records(telemetry_file, records)
+        proposal = tasks_telemetry.propose_resources(
+            tasks_telemetry.load_records([telemetry_file]),
+            percentile=100,
+            walltime_margin=1.0)
+        self.assertEqual(proposal["my_block"]["walltime"], "01:01:40")
+        self.assertEqual(proposal["my_block"]["nb_tasks"], 4)
@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# =========================================================================
+#   Program:   iota2
+#
+#   Copyright (c) CESBIO. All rights reserved.
+#
+#   See LICENSE for details.
+#
+#   This software is distributed WITHOUT ANY WARRANTY; without even
+#   the implied warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR
+#   PURPOSE.  See the above copyright notices for more information.
+#
+# =========================================================================
+"""
+Test of the stitching of segmentations computed by strips
+"""
+import os
+import shutil
+import unittest
+
+import numpy as np
+
+RM_IF_ALL_OK = True
+IOTA2DIR = os.environ.get('IOTA2DIR')
+
+
+class iota_test_tiled_slic(unittest.TestCase):
+    """test TiledSlic"""
+    @classmethod
+    def setUpClass(cls):
+        cls.group_test_name = "iota_test_tiled_slic"
+        cls.iota2_tests_directory = os.path.join(IOTA2DIR, "data",
+                                                 cls.group_test_name)
+        if os.path.exists(cls.iota2_tests_directory):
+            shutil.rmtree(cls.iota2_tests_directory)
+        os.mkdir(cls.iota2_tests_directory)
+
+    @classmethod
+    def tearDownClass(cls):
+        if RM_IF_ALL_OK:
+            shutil.rmtree(cls.iota2_tests_directory)
+
+    def write_labels(self, name, array):
+        """write a labels raster"""
+        from osgeo import gdal
+        raster = os.path.join(self.iota2_tests_directory, name)
+        raster_ds = gdal.GetDriverByName("GTiff").Create(
+            raster, array.shape[1], array.shape[0], 1, gdal.GDT_UInt32)
+        raster_ds.SetGeoTransform((0, 10, 0, 120, 0, -10))
+        raster_ds.GetRasterBand(1).WriteArray(array)
+        raster_ds = None
+        return raster
+
+    def test_strips_extents(self):
+        """strips cover every rows, margins are clipped"""
+        from iota2.Segmentation.TiledSlic import strips_extents
+
+        self.assertEqual(strips_extents(12, 2, 3), [(0, 6, 0, 9),
+                                                    (6, 12, 3, 12)])
+        self.assertEqual(strips_extents(10, 1, 3), [(0, 10, 0, 10)])
+
+    def test_stitch_strips(self):
+        """
+        superpixels cut by a seam are merged when both strips agree, labels
+        are numbered as a segmentation in one piece
+        """
+        from osgeo import gdal
+        from iota2.Segmentation.TiledSlic import strips_extents
+        from iota2.Segmentation.TiledSlic import stitch_strips
+
+        rows, cols = np.indices((12, 6))
+        # superpixels of 4 rows and 3 columns, the seam cuts the second
+        # row of superpixels
+        reference = (rows // 4) * 2 + cols // 3 + 1
+        # a margin (upper left corner) without segment
+        reference[0, 0] = 0
+        extents = strips_extents(12, 2, 3)
+        # labels of independent segmentations differ
+        upper = reference[0:9] + 100
+        upper[reference[0:9] == 0] = 0
+        lower = reference[3:12] * 7
+        strips = [
+            self.write_labels("strip_0.tif", upper),
+            self.write_labels("strip_1.tif", lower)
+        ]
+        output = os.path.join(self.iota2_tests_directory, "SLIC.tif")
+        stitch_strips(strips, extents, output, block_size=4)
+
+        stitched = gdal.Open(output).GetRasterBand(1).ReadAsArray()
+        self.assertTrue(np.array_equal(stitched, reference))
+
+    def test_features_stack(self):
+        """features already written are only used with the expected bands"""
+        from osgeo import gdal
+        from iota2.Segmentation.segmentation import features_stack
+
+        features_dir = os.path.join(self.iota2_tests_directory, "features",
+                                    "T31TCJ", "tmp")
+        os.makedirs(features_dir)
+        features = os.path.join(features_dir, "T31TCJ_Features.tif")
+        features_ds = gdal.GetDriverByName("GTiff").Create(
+            features, 4, 4, 3, gdal.GDT_Float32)
+        features_ds = None
+
+        self.assertEqual(
+            features_stack("T31TCJ", self.iota2_tests_directory, 3),
+            features)
+        self.assertIsNone(
+            features_stack("T31TCJ", self.iota2_tests_directory, 5))
+        self.assertIsNone(
+            features_stack("T31TCK", self.iota2_tests_directory, 3))
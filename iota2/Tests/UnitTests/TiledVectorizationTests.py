@@ -0,0 +1,184 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# =========================================================================
+#   Program:   iota2
+#
+#   Copyright (c) CESBIO. All rights reserved.
+#
+#   See LICENSE for details.
+#
+#   This software is distributed WITHOUT ANY WARRANTY; without even
+#   the implied warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR
+#   PURPOSE.  See the above copyright notices for more information.
+#
+# =========================================================================
+"""
+Test of the merge of vectors computed by cells
+"""
+import os
+import shutil
+import unittest
+
+import numpy as np
+
+RM_IF_ALL_OK = True
+IOTA2DIR = os.environ.get('IOTA2DIR')
+
+
+class iota_test_tiled_vectorization(unittest.TestCase):
+    """test TiledVectorization"""
+    @classmethod
+    def setUpClass(cls):
+        cls.group_test_name = "iota_test_tiled_vectorization"
+        cls.iota2_tests_directory = os.path.join(IOTA2DIR, "data",
+                                                 cls.group_test_name)
+        if os.path.exists(cls.iota2_tests_directory):
+            shutil.rmtree(cls.iota2_tests_directory)
+        os.mkdir(cls.iota2_tests_directory)
+
+    @classmethod
+    def tearDownClass(cls):
+        if RM_IF_ALL_OK:
+            shutil.rmtree(cls.iota2_tests_directory)
+
+    def write_labels(self, name, array):
+        """write a classification raster"""
+        from osgeo import gdal
+        raster = os.path.join(self.iota2_tests_directory, name)
+        raster_ds = gdal.GetDriverByName("GTiff").Create(
+            raster, array.shape[1], array.shape[0], 1, gdal.GDT_Byte)
+        raster_ds.SetGeoTransform((0, 10, 0, 40, 0, -10))
+        raster_ds.GetRasterBand(1).WriteArray(array)
+        raster_ds = None
+        return raster
+
+    def write_cell(self, name, polygons):
+        """write the vector of a cell, polygons : [(wkt, class), ...]"""
+        from osgeo import ogr
+        from iota2.VectorTools.TileIntersection import create_output
+        cell = os.path.join(self.iota2_tests_directory, name)
+        data_source, layer = create_output(
+            cell, 2154, ogr.wkbPolygon, [ogr.FieldDefn("cat", ogr.OFTInteger)])
+        for wkt, value in polygons:
+            feature = ogr.Feature(layer.GetLayerDefn())
+            feature.SetField("cat", value)
+            feature.SetGeometry(ogr.CreateGeometryFromWkt(wkt))
+            layer.CreateFeature(feature)
+        data_source = None
+        return cell
+
+    def test_seam_runs(self):
+        """runs of the same class on both sides of a seam"""
+        from iota2.simplification.TiledVectorization import seamRuns
+
+        first = np.array([1, 1, 2, 2, 0, 3, 3])
+        second = np.array([1, 1, 2, 4, 0, 3, 3])
+        self.assertEqual(seamRuns(first, second), [(0, 2, 1), (2, 3, 2),
+                                                   (5, 7, 3)])
+
+    def test_merge_cells(self):
+        """polygons cut by a seam are merged, others are kept"""
+        from osgeo import ogr
+        from iota2.simplification.TiledVectorization import mergeCells
+        from iota2.simplification.TiledVectorization import seamPoints
+
+        # two cells of 2 columns, class 1 crosses the seam, classes 2 and 3
+        # meet at the seam
+        raster = self.write_labels(
+            "classif.tif",
+            np.array([[1, 1, 1, 1], [1, 1, 1, 1], [2, 2, 3, 3],
+                      [2, 2, 3, 3]]))
+        windows = [[0, 0, 2, 4], [2, 0, 2, 4]]
+        points = seamPoints(raster, windows)
+        self.assertEqual(points, [[0, 1, 20, 30.0, 1]])
+
+        cells = [
+            self.write_cell("cell_0.shp", [
+                ("POLYGON ((0 40,20 40,20 20,0 20,0 40))", 1),
+                ("POLYGON ((0 20,20 20,20 0,0 0,0 20))", 2)
+            ]),
+            self.write_cell("cell_1.shp", [
+                ("POLYGON ((20 40,40 40,40 20,20 20,20 40))", 1),
+                ("POLYGON ((20 20,40 20,40 0,20 0,20 20))", 3)
+            ])
+        ]
+        out = os.path.join(self.iota2_tests_directory, "merged.shp")
+        mergeCells(cells, points, out, 2.5, 2154)
+
+        data_source = ogr.Open(out)
+        layer = data_source.GetLayer()
+        areas = sorted((feature.GetField("cat"),
+                        feature.GetGeometryRef().GetArea())
+                       for feature in layer)
+        self.assertEqual(areas, [(1, 800.0), (2, 400.0), (3, 400.0)])
+        for feature in layer:
+            if feature.GetField("cat") == 1:
+                self.assertEqual(
+                    ogr.GT_Flatten(
+                        feature.GetGeometryRef().GetGeometryType()),
+                    ogr.wkbPolygon)
+        data_source = None
+
+    def test_cell_seams(self):
+        """sides of cells on the raster border are not seams"""
+        from iota2.simplification.TiledVectorization import cellSeams
+
+        windows = [[0, 0, 2, 4], [2, 0, 2, 4]]
+        geotransform = (0, 10, 0, 40, 0, -10)
+        self.assertEqual(cellSeams(windows[0], windows, geotransform),
+                         [((20, 40), (20, 0))])
+        self.assertEqual(cellSeams(windows[1], windows, geotransform),
+                         [((20, 40), (20, 0))])
+
+    def test_cell_minimal_mapping_unit(self):
+        """small polygons of a cell are merged with the neighbour sharing
+        their longest boundary, polygons touching a seam are kept"""
+        from osgeo import ogr
+        from iota2.simplification.TiledVectorization import (
+            cellMinimalMappingUnit)
+
+        cell = self.write_cell("cell_mmu.shp", [
+            ("POLYGON ((0 0,30 0,30 10,0 10,0 0))", 1),
+            ("POLYGON ((30 0,35 0,35 10,30 10,30 0))", 2),
+            ("POLYGON ((35 0,40 0,40 5,35 5,35 0))", 3),
+            ("POLYGON ((35 5,40 5,40 10,35 10,35 5))", 4)
+        ])
+        # the right side of the cell is a seam
+        cellMinimalMappingUnit(cell, 100, [((40, 10), (40, 0))], 2.5, 2154)
+
+        data_source = ogr.Open(cell)
+        areas = sorted((feature.GetField("cat"),
+                        feature.GetGeometryRef().GetArea())
+                       for feature in data_source.GetLayer())
+        data_source = None
+        self.assertEqual(areas, [(1, 350.0), (3, 25.0), (4, 25.0)])
+
+    def test_seam_minimal_mapping_unit(self):
+        """merged polygons touching a seam are removed if they are smaller
+        than the mmu, other polygons are copied"""
+        from osgeo import ogr
+        from iota2.simplification.TiledVectorization import (
+            seamMinimalMappingUnit)
+
+        merged = self.write_cell("merged_mmu.shp", [
+            ("POLYGON ((0 0,18 0,18 10,0 10,0 0))", 1),
+            ("POLYGON ((18 0,22 0,22 10,18 10,18 0))", 2),
+            ("POLYGON ((22 0,40 0,40 10,22 10,22 0))", 3),
+            ("POLYGON ((0 10,10 10,10 11,0 11,0 10))", 4)
+        ])
+        out = os.path.join(self.iota2_tests_directory, "out_mmu.shp")
+        seamMinimalMappingUnit(merged, out, 50, [((20, 20), (20, 0))], 2.5,
+                               2154)
+
+        data_source = ogr.Open(out)
+        areas = sorted((feature.GetField("cat"),
+                        feature.GetGeometryRef().GetArea())
+                       for feature in data_source.GetLayer())
+        data_source = None
+        # class 2 shares 10 m with classes 1 and 3 and is merged with one of
+        # them, class 4 does not touch the seam
+        self.assertEqual(len(areas), 3)
+        self.assertEqual(sum(area for _, area in areas), 410.0)
+        self.assertIn((4, 10.0), areas)
+        self.assertNotIn(2, [value for value, _ in areas])
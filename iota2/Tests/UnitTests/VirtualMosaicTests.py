@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# =========================================================================
+#   Program:   iota2
+#
+#   Copyright (c) CESBIO. All rights reserved.
+#
+#   See LICENSE for details.
+#
+#   This software is distributed WITHOUT ANY WARRANTY; without even
+#   the implied warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR
+#   PURPOSE.  See the above copyright notices for more information.
+#
+# =========================================================================
+"""
+Test of the virtual mosaic
+"""
+import os
+import shutil
+import unittest
+
+RM_IF_ALL_OK = True
+IOTA2DIR = os.environ.get('IOTA2DIR')
+
+
+class iota_test_virtual_mosaic(unittest.TestCase):
+    """test VirtualMosaic"""
+    @classmethod
+    def setUpClass(cls):
+        cls.group_test_name = "iota_test_virtual_mosaic"
+        cls.iota2_tests_directory = os.path.join(IOTA2DIR, "data",
+                                                 cls.group_test_name)
+        if os.path.exists(cls.iota2_tests_directory):
+            shutil.rmtree(cls.iota2_tests_directory)
+        os.mkdir(cls.iota2_tests_directory)
+
+    @classmethod
+    def tearDownClass(cls):
+        if RM_IF_ALL_OK:
+            shutil.rmtree(cls.iota2_tests_directory)
+
+    def test_mosaic_priority(self):
+        """
+        the last raster wins where it is not nodata, as gdal_merge.py -n 0
+        """
+        import numpy as np
+        from osgeo import gdal
+        from iota2.Common import VirtualMosaic
+        from iota2.Tests.UnitTests.tests_utils.tests_utils_rasters import (
+            array_to_raster)
+
+        first = os.path.join(self.iota2_tests_directory, "first.tif")
+        second = os.path.join(self.iota2_tests_directory, "second.tif")
+        vrt = os.path.join(self.iota2_tests_directory, "mosaic.vrt")
+        out = os.path.join(self.iota2_tests_directory, "mosaic.tif")
+        array_to_raster(np.ones((4, 4)), first, origin_x=0, origin_y=120)
+        second_array = np.full((4, 4), 2)
+        second_array[:, 0] = 0
+        array_to_raster(second_array, second, origin_x=60, origin_y=120)
+
+        VirtualMosaic.build_vrt_mosaic([first, second], vrt, (30, -30))
+        VirtualMosaic.materialize_mosaic(vrt,
+                                         out,
+                                         "Byte",
+                                         nb_threads=2,
+                                         block_size=1)
+        mosaic_ds = gdal.Open(out)
+        self.assertEqual(mosaic_ds.GetRasterBand(1).DataType, gdal.GDT_Byte)
+        self.assertIsNone(mosaic_ds.GetRasterBand(1).GetNoDataValue())
+        expected = np.array([[1, 1, 1, 2, 2, 2]] * 4)
+        self.assertTrue(np.array_equal(mosaic_ds.ReadAsArray(), expected))
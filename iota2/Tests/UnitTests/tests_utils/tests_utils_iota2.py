@@ -22,6 +22,7 @@ import datetime
 import dill
 import time
 import numpy as np
+from typing import Dict, List, Optional
 from mpi4py import MPI
 import iota2.Common.ServiceConfigFile as SCF
 from iota2.Common import FileUtils as fut
@@ -252,8 +253,28 @@ def remove_tmp_files(cfg, current_step, chain):
                 shutil.rmtree(dir_to_rm)
 
 
-def iota2_test_launcher(configuration_path: str):
-    """
+def iota2_test_launcher(configuration_path: str,
+                        raise_on_failure: Optional[bool] = True,
+                        mpi_service: Optional[MPIService] = None
+                        ) -> List[Dict]:
+    """launch every iota2 steps of a configuration file, until a step fails
+
+    Parameters
+    ----------
+    configuration_path : str
+        iota2 configuration file
+    raise_on_failure : bool
+        raise an exception if a step fails, else the last executed step is
+        flagged as failed in the returned list
+    mpi_service : MPIService
+        if set, workers are already started and are not stopped at the end,
+        the caller manages them (several chains launched by the same workers)
+
+    Return
+    ------
+    list
+        one dictionnary by executed step : {"step", "group", "nb_tasks",
+        "start", "end", "success"}
     """
     import iota2.Iota2Builder as chain
     from iota2.Common import DebugUtils as du
@@ -282,16 +303,19 @@ def iota2_test_launcher(configuration_path: str):
     if MPIService().rank == 0:
         print(chain_to_process.print_step_summarize(start, end, False))
 
-    # Initialize MPI service
-    mpi_service = MPIService()
+    manage_workers = mpi_service is None
+    if manage_workers:
+        # Initialize MPI service
+        mpi_service = MPIService()
 
-    # Start worker processes
-    start_workers(mpi_service)
+        # Start worker processes
+        start_workers(mpi_service)
     # Remove all existing outputs
     root = cfg.getParam('chain', 'outputPath')
     rm_PathTEST = cfg.getParam("chain", "remove_outputPath")
     start_step = cfg.getParam("chain", "firstStep")
 
+    steps_timing = []
     for step in np.arange(start, end + 1):
 
         if os.path.exists(
@@ -340,8 +364,17 @@ def iota2_test_launcher(configuration_path: str):
         global_log.write(states)
         global_log.close()
 
+        start_step_time = time.time()
         _, step_completed = mpi_schedule(steps[step - 1], params, mpi_service,
                                          logFile, logger_lvl)
+        steps_timing.append({
+            "step": steps[step - 1].step_name,
+            "group": steps[step - 1].step_group,
+            "nb_tasks": len(params),
+            "start": start_step_time,
+            "end": time.time(),
+            "success": step_completed
+        })
         if not step_completed:
             steps[step - 1].step_status = "fail"
             states = chain_to_process.print_step_summarize(key_init,
@@ -373,7 +406,10 @@ def iota2_test_launcher(configuration_path: str):
         if rm_tmp:
             remove_tmp_files(cfg, current_step=step, chain=chain_to_process)
 
-    stop_workers(mpi_service)
+    if manage_workers:
+        stop_workers(mpi_service)
 
-    if not step_completed:
-        sys.exit(-1)
+    if not step_completed and raise_on_failure:
+        raise Exception("iota2 step {} failed".format(
+            steps_timing[-1]["step"]))
+    return steps_timing
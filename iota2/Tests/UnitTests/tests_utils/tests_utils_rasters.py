@@ -18,7 +18,7 @@ This module offers some tools for writing tests
 """
 import os
 import random
-from typing import List, Optional
+from typing import Callable, List, Optional
 import osr
 import gdal
 import numpy as np
@@ -211,7 +211,10 @@ def generate_fake_s2_data(root_directory: str,
                           tile_name: str,
                           dates: List[str],
                           res: Optional[float] = 30.0,
-                          array_name: Optional[str] = "iota2_binary"):
+                          array_name: Optional[str] = "iota2_binary",
+                          labels: Optional[np.ndarray] = None,
+                          band_values: Optional[Callable[
+                              [str, int, np.ndarray], np.ndarray]] = None):
     """
     Parameters
     ----------
@@ -225,6 +228,12 @@ def generate_fake_s2_data(root_directory: str,
         raster's resolution
     array_name : string
         pattern to build rasters
+    labels : np.array
+        if set, array used instead of the 'array_name' one, masks of
+        dates are then clear
+    band_values : callable
+        band_values(date, band index, array) gives values of a band, default
+        to random values proportional to the array
     """
 
     tile_dir = os.path.join(root_directory, tile_name)
@@ -252,38 +261,44 @@ def generate_fake_s2_data(root_directory: str,
                 ("SENTINEL2B_{}-000000-000_L2A"
                  "_{}_D_V1-7_FRE_{}.tif".format(date, tile_name, mask)))
 
-            array_to_raster(fun_array(array_name) * cpt % 2,
+            mask_array = (np.zeros(labels.shape, dtype=np.uint16)
+                          if labels is not None else
+                          fun_array(array_name) * cpt % 2)
+            array_to_raster(mask_array,
                             new_mask,
                             pixel_size=res,
                             origin_x=origin_x,
                             origin_y=origin_y)
-        for band in band_of_interest:
+        for band_num, band in enumerate(band_of_interest):
             new_band = os.path.join(
                 date_dir,
                 ("SENTINEL2B_{}-000000-000_L2A"
                  "_{}_D_V1-7_FRE_{}.tif".format(date, tile_name, band)))
             all_bands.append(new_band)
-            array = fun_array(array_name)
-            random_array = []
-            for y_coordinate in array:
-                y_tmp = []
-                for pix_val in y_coordinate:
-                    y_tmp.append(pix_val * random.random() * 1000)
-                random_array.append(y_tmp)
+            array = fun_array(array_name) if labels is None else labels
+            if band_values is not None:
+                random_array = band_values(date, band_num, array)
+            else:
+                random_array = []
+                for y_coordinate in array:
+                    y_tmp = []
+                    for pix_val in y_coordinate:
+                        y_tmp.append(pix_val * random.random() * 1000)
+                    random_array.append(y_tmp)
 
             array_to_raster(np.array(random_array),
                             new_band,
                             pixel_size=res,
                             origin_x=origin_x,
                             origin_y=origin_y)
-            stack_date = os.path.join(
-                date_dir, ("SENTINEL2B_{}-000000-000_L2A_{}_D_V1-7"
-                           "_FRE_STACK.tif".format(date, tile_name)))
-            stack_app = CreateConcatenateImagesApplication({
-                "il": all_bands,
-                "out": stack_date
-            })
-            stack_app.ExecuteAndWriteOutput()
+        stack_date = os.path.join(
+            date_dir, ("SENTINEL2B_{}-000000-000_L2A_{}_D_V1-7"
+                       "_FRE_STACK.tif".format(date, tile_name)))
+        stack_app = CreateConcatenateImagesApplication({
+            "il": all_bands,
+            "out": stack_date
+        })
+        stack_app.ExecuteAndWriteOutput()
 
 
 def generate_data_tree(directory, mtd_s2st_date, s2st_ext="jp2"):
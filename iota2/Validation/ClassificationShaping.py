@@ -22,12 +22,13 @@ import argparse
 import logging
 import numpy as np
 from osgeo import gdal
-from typing import List
+from typing import List, Optional
 from osgeo.gdalconst import *
 
 from iota2.Common import FileUtils as fu
 from iota2.Common import CreateIndexedColorImage as color
-from iota2.Common.rasterUtils import compress_raster
+from iota2.Common import VirtualMosaic
+from iota2.Common.RasterProfile import build_overviews
 from iota2.Common.FileUtils import getRasterResolution
 
 from iota2.Common.Utils import run
@@ -291,13 +292,38 @@ def genGlobalConfidence(N, pathWd, spatialRes, proj, pathTest, classifMode,
                     os.remove(globalConf)
 
 
-def classification_shaping(path_classif: str, runs: int, path_out: str,
-                           path_wd: str, classif_mode: str, path_test: str,
-                           ds_sar_opt: bool, proj: int, nomenclature_path: str,
+def mosaic_to_product(rasters: List[str], spatial_resolution: List[float],
+                      vrt_path: str, output_path: str, data_type: str,
+                      nb_threads: Optional[int] = 1) -> None:
+    """mosaic tiles to a final product
+
+    the virtual mosaic (vrt_path) is directly written with the output
+    rasters profile, overviews are added if required by the profile.
+    """
+    VirtualMosaic.build_vrt_mosaic(rasters, vrt_path, spatial_resolution)
+    VirtualMosaic.materialize_mosaic(vrt_path,
+                                     output_path,
+                                     data_type,
+                                     nb_threads=nb_threads)
+    os.remove(vrt_path)
+    build_overviews(output_path)
+
+
+def classification_shaping(path_classif: str,
+                           runs: int,
+                           path_out: str,
+                           path_wd: str,
+                           classif_mode: str,
+                           path_test: str,
+                           ds_sar_opt: bool,
+                           proj: int,
+                           nomenclature_path: str,
                            output_statistics: bool,
                            spatial_resolution: List[float],
-                           proba_map_flag: bool, region_shape: str,
-                           color_path: str) -> None:
+                           proba_map_flag: bool,
+                           region_shape: str,
+                           color_path: str,
+                           nb_threads: Optional[int] = 1) -> None:
     """function use to mosaic rasters and to produce final maps
 
     path_classif: str
@@ -329,6 +355,8 @@ def classification_shaping(path_classif: str, runs: int, path_out: str,
         region shapeFile path
     color_path: str
         color table file
+    nb_threads: int
+        number of threads writing mosaics
     """
     if path_wd is None:
         tmp = path_out + "/TMP"
@@ -461,39 +489,26 @@ def classification_shaping(path_classif: str, runs: int, path_out: str,
         assemble_folder = path_test + "/final"
         if path_wd:
             assemble_folder = path_wd
-        classif_mosaic_tmp = "{}/Classif_Seed_{}_tmp.tif".format(
+        classif_mosaic_tmp = "{}/Classif_Seed_{}_tmp.vrt".format(
             assemble_folder, seed)
         classif_mosaic_compress = "{}/Classif_Seed_{}.tif".format(
             assemble_folder, seed)
-        fu.assembleTile_Merge(classification[seed],
-                              target_spatial_resolution,
-                              classif_mosaic_tmp,
-                              "Byte" if pix_type == "uint8" else "Int16",
-                              co={
-                                  "COMPRESS": "LZW",
-                                  "BIGTIFF": "YES"
-                              })
-        compress_raster(classif_mosaic_tmp, classif_mosaic_compress)
-        os.remove(classif_mosaic_tmp)
+        mosaic_to_product(classification[seed], target_spatial_resolution,
+                          classif_mosaic_tmp, classif_mosaic_compress,
+                          "Byte" if pix_type == "uint8" else "Int16",
+                          nb_threads)
         if path_wd:
             shutil.copy(path_wd + "/Classif_Seed_" + str(seed) + ".tif",
                         path_test + "/final")
             os.remove(path_wd + "/Classif_Seed_" + str(seed) + ".tif")
 
         confidence_mosaic_tmp = assemble_folder + "/Confidence_Seed_" + str(
-            seed) + "_tmp.tif"
+            seed) + "_tmp.vrt"
         confidence_mosaic_compress = assemble_folder + "/Confidence_Seed_" + str(
             seed) + ".tif"
-        fu.assembleTile_Merge(confidence[seed],
-                              target_spatial_resolution,
-                              confidence_mosaic_tmp,
-                              "Byte",
-                              co={
-                                  "COMPRESS": "LZW",
-                                  "BIGTIFF": "YES"
-                              })
-        compress_raster(confidence_mosaic_tmp, confidence_mosaic_compress)
-        os.remove(confidence_mosaic_tmp)
+        mosaic_to_product(confidence[seed], target_spatial_resolution,
+                          confidence_mosaic_tmp, confidence_mosaic_compress,
+                          "Byte", nb_threads)
         if path_wd:
             shutil.copy(path_wd + "/Confidence_Seed_" + str(seed) + ".tif",
                         path_test + "/final")
@@ -507,35 +522,20 @@ def classification_shaping(path_classif: str, runs: int, path_out: str,
 
         if proba_map_flag:
             proba_map_mosaic_tmp = os.path.join(
-                assemble_folder, "ProbabilityMap_seed_{}_tmp.tif".format(seed))
+                assemble_folder, "ProbabilityMap_seed_{}_tmp.vrt".format(seed))
             proba_map_mosaic_compress = os.path.join(
                 assemble_folder, "ProbabilityMap_seed_{}.tif".format(seed))
-            fu.assembleTile_Merge(proba_map[seed],
-                                  target_spatial_resolution,
-                                  proba_map_mosaic_tmp,
-                                  "Int16",
-                                  co={
-                                      "COMPRESS": "LZW",
-                                      "BIGTIFF": "YES"
-                                  })
-            compress_raster(proba_map_mosaic_tmp, proba_map_mosaic_compress)
-            os.remove(proba_map_mosaic_tmp)
+            mosaic_to_product(proba_map[seed], target_spatial_resolution,
+                              proba_map_mosaic_tmp, proba_map_mosaic_compress,
+                              "Int16", nb_threads)
             if path_wd:
                 shutil.copy(proba_map_mosaic_compress, path_test + "/final")
                 os.remove(proba_map_mosaic_compress)
 
-    cloud_mosaic_tmp = assemble_folder + "/PixelsValidity_tmp.tif"
+    cloud_mosaic_tmp = assemble_folder + "/PixelsValidity_tmp.vrt"
     cloud_mosaic_compress = assemble_folder + "/PixelsValidity.tif"
-    fu.assembleTile_Merge(cloud[0],
-                          target_spatial_resolution,
-                          cloud_mosaic_tmp,
-                          "Byte",
-                          co={
-                              "COMPRESS": "LZW",
-                              "BIGTIFF": "YES"
-                          })
-    compress_raster(cloud_mosaic_tmp, cloud_mosaic_compress)
-    os.remove(cloud_mosaic_tmp)
+    mosaic_to_product(cloud[0], target_spatial_resolution, cloud_mosaic_tmp,
+                      cloud_mosaic_compress, "Byte", nb_threads)
     if path_wd:
         shutil.copy(path_wd + "/PixelsValidity.tif", path_test + "/final")
         os.remove(path_wd + "/PixelsValidity.tif")
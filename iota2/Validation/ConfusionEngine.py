@@ -0,0 +1,328 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# =========================================================================
+#   Program:   iota2
+#
+#   Copyright (c) CESBIO. All rights reserved.
+#
+#   See LICENSE for details.
+#
+#   This software is distributed WITHOUT ANY WARRANTY; without even
+#   the implied warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR
+#   PURPOSE.  See the above copyright notices for more information.
+#
+# =========================================================================
+"""
+Single pass, multi-seed confusion matrices engine.
+
+Validation polygons of a tile are rasterized by blocks, in memory, on the grid
+of seed classifications. Confusion matrices of every seeds are accumulated in
+the same pass then tiles partial matrices are summed in memory. Reports are
+written as done by ConfusionFusion.confusion_fusion.
+"""
+import os
+import argparse
+import logging
+import multiprocessing as mp
+from logging import Logger
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from iota2.Common import FileUtils as fu
+
+LOGGER = logging.getLogger(__name__)
+
+
+def labels_to_index(labels: np.ndarray, lut: np.ndarray) -> np.ndarray:
+    """convert labels to their index in the class list, -1 if unknown
+
+    Parameters
+    ----------
+    labels : np.array
+        array of labels
+    lut : np.array
+        look-up table, lut[label] is the index of label (-1 if unknown)
+    """
+    labels = labels.astype(np.int64)
+    in_lut = (labels >= 0) & (labels < len(lut))
+    index = np.full(labels.shape, -1, dtype=np.int64)
+    index[in_lut] = lut[labels[in_lut]]
+    return index
+
+
+def accumulate_confusion(conf_mat: np.ndarray, ref: np.ndarray,
+                         pred: np.ndarray, lut: np.ndarray) -> None:
+    """add pixels of a block to a confusion matrix (reference as rows)
+
+    Parameters
+    ----------
+    conf_mat : np.array
+        confusion matrix updated in place
+    ref : np.array
+        reference labels
+    pred : np.array
+        predicted labels
+    lut : np.array
+        look-up table (see labels_to_index)
+    """
+    nb_class = conf_mat.shape[0]
+    ref_index = labels_to_index(ref, lut)
+    pred_index = labels_to_index(pred, lut)
+    valid = (ref_index >= 0) & (pred_index >= 0)
+    conf_mat += np.bincount(ref_index[valid] * nb_class + pred_index[valid],
+                            minlength=nb_class * nb_class).reshape(
+                                nb_class, nb_class)
+
+
+def get_tiles_validation(path_valid: str, runs: int,
+                         enable_cross_validation: bool
+                         ) -> Dict[str, List[Tuple[int, str]]]:
+    """find validation vectors of every tiles and seeds
+
+    Return
+    ------
+    dict
+        {tile : [(seed, validation vector), ...]}
+    """
+    tiles_validation = {}
+    validation_files = fu.FileSearch_AND(path_valid, True, "_val.sqlite")
+    tiles = sorted(
+        set(os.path.basename(valid).split("_")[0]
+            for valid in validation_files))
+    for tile in tiles:
+        tiles_validation[tile] = []
+        for seed in range(runs):
+            seed_val = seed
+            if enable_cross_validation:
+                seed_val = runs - 1
+            if enable_cross_validation and seed == runs - 1:
+                continue
+            val_tile = fu.FileSearch_AND(path_valid, True, tile,
+                                         f"_seed_{seed_val}_val.sqlite")[0]
+            tiles_validation[tile].append((seed, val_tile))
+    return tiles_validation
+
+
+def tile_confusion_matrices(seeds_vectors: List[Tuple[int, str]],
+                            classifications: Dict[int, str], data_field: str,
+                            all_class: List[int],
+                            block_size: Optional[int] = 1024
+                            ) -> Dict[int, np.ndarray]:
+    """compute confusion matrices of every seeds over a tile
+
+    Parameters
+    ----------
+    seeds_vectors : list
+        list of (seed, validation vector) of the tile
+    classifications : dict
+        classification raster by seed, every rasters share the same grid
+    data_field : str
+        data field
+    all_class : list
+        class labels, sorted
+    block_size : int
+        number of rows read at once
+
+    Return
+    ------
+    dict
+        confusion matrix by seed
+    """
+    from osgeo import gdal
+    from osgeo import ogr
+
+    nb_class = len(all_class)
+    lut = np.full(max(all_class) + 1, -1, dtype=np.int64)
+    lut[np.array(all_class, dtype=np.int64)] = np.arange(nb_class)
+
+    classif_ds = {
+        seed: gdal.Open(classifications[seed])
+        for seed, _ in seeds_vectors
+    }
+    first_ds = classif_ds[seeds_vectors[0][0]]
+    origin_x, res_x, _, origin_y, _, res_y = first_ds.GetGeoTransform()
+    raster_x_size = first_ds.RasterXSize
+    raster_y_size = first_ds.RasterYSize
+    projection = first_ds.GetProjection()
+
+    # every vector is opened once, even if shared by seeds (cross-validation)
+    vectors = {}
+    for _, vector in seeds_vectors:
+        if vector not in vectors:
+            data_source = ogr.Open(vector)
+            vectors[vector] = (data_source, data_source.GetLayer(0))
+    extents = [layer.GetExtent() for _, layer in vectors.values()]
+    x_min = min(extent[0] for extent in extents)
+    x_max = max(extent[1] for extent in extents)
+    y_min = min(extent[2] for extent in extents)
+    y_max = max(extent[3] for extent in extents)
+
+    col_start = max(0, int(np.floor((x_min - origin_x) / res_x)))
+    col_end = min(raster_x_size, int(np.ceil((x_max - origin_x) / res_x)))
+    row_start = max(0, int(np.floor((y_max - origin_y) / res_y)))
+    row_end = min(raster_y_size, int(np.ceil((y_min - origin_y) / res_y)))
+
+    conf_mats = {
+        seed: np.zeros((nb_class, nb_class), dtype=np.int64)
+        for seed, _ in seeds_vectors
+    }
+    if col_end <= col_start or row_end <= row_start:
+        return conf_mats
+    x_size = col_end - col_start
+    mem_driver = gdal.GetDriverByName("MEM")
+    for block_row in range(row_start, row_end, block_size):
+        y_size = min(block_size, row_end - block_row)
+        block_origin_x = origin_x + col_start * res_x
+        block_origin_y = origin_y + block_row * res_y
+        references = {}
+        for vector, (_, layer) in vectors.items():
+            ref_ds = mem_driver.Create("", x_size, y_size, 1, gdal.GDT_Int32)
+            ref_ds.SetGeoTransform(
+                [block_origin_x, res_x, 0, block_origin_y, 0, res_y])
+            ref_ds.SetProjection(projection)
+            ref_ds.GetRasterBand(1).Fill(-1)
+            layer.SetSpatialFilterRect(block_origin_x,
+                                       block_origin_y + y_size * res_y,
+                                       block_origin_x + x_size * res_x,
+                                       block_origin_y)
+            gdal.RasterizeLayer(ref_ds, [1],
+                                layer,
+                                options=[f"ATTRIBUTE={data_field}"])
+            layer.SetSpatialFilter(None)
+            references[vector] = ref_ds.ReadAsArray()
+            ref_ds = None
+        for seed, vector in seeds_vectors:
+            pred = classif_ds[seed].GetRasterBand(1).ReadAsArray(
+                col_start, block_row, x_size, y_size)
+            accumulate_confusion(conf_mats[seed], references[vector], pred,
+                                 lut)
+    vectors = classif_ds = None
+    return conf_mats
+
+
+def confusion_matrices(ground_truth: str,
+                       data_field: str,
+                       path_valid: str,
+                       path_classif: str,
+                       output_dir: str,
+                       runs: int,
+                       enable_cross_validation: bool,
+                       crop_mix: bool,
+                       annual_crop: List[str],
+                       annual_crop_label_replacement: int,
+                       nb_workers: Optional[int] = 1,
+                       logger: Optional[Logger] = LOGGER) -> None:
+    """compute confusion matrices and reports of every seeds
+
+    Replace otbcli_ComputeConfusionMatrix commands by tiles and seeds
+    (see GenConfusionMatrix.gen_conf_matrix) and their merge
+    (see ConfusionFusion.confusion_fusion).
+
+    Parameters
+    ----------
+    ground_truth : str
+        input database, use to get all classes
+    data_field : str
+        data field
+    path_valid : str
+        directory containing validation vectors by tiles and seeds
+    path_classif : str
+        directory containing Classif_Seed_*.tif rasters
+    output_dir : str
+        output directory for csv and reports
+    runs : int
+        number of random learning/validation samples-set
+    enable_cross_validation : bool
+        cross validation flag
+    crop_mix : bool
+        inform if cropMix workflow is enable
+    annual_crop : list
+        list of annual labels
+    annual_crop_label_replacement : int
+        replace annual labels by annual_crop_label_replacement
+    nb_workers : int
+        number of tiles processed in parallel
+    """
+    from iota2.Validation.ConfusionFusion import write_seed_results
+
+    data_field = data_field.lower()
+    all_class = sorted(
+        fu.getFieldElement(ground_truth, "ESRI Shapefile", data_field,
+                           "unique"))
+    classifications = {
+        seed: os.path.join(path_classif, f"Classif_Seed_{seed}.tif")
+        for seed in range(runs)
+    }
+    tiles_validation = get_tiles_validation(path_valid, runs,
+                                            enable_cross_validation)
+    tiles_args = [(seeds_vectors, classifications, data_field, all_class)
+                  for _, seeds_vectors in sorted(tiles_validation.items())
+                  if seeds_vectors]
+    logger.info(f"compute confusion matrices over {len(tiles_args)} tiles")
+    if nb_workers > 1 and len(tiles_args) > 1:
+        with mp.Pool(processes=min(nb_workers, len(tiles_args))) as pool:
+            tiles_conf_mats = pool.starmap(tile_confusion_matrices,
+                                           tiles_args)
+    else:
+        tiles_conf_mats = [
+            tile_confusion_matrices(*args) for args in tiles_args
+        ]
+
+    for seed in range(runs):
+        conf_mat = np.zeros((len(all_class), len(all_class)), dtype=np.int64)
+        for tile_conf_mats in tiles_conf_mats:
+            if seed in tile_conf_mats:
+                conf_mat += tile_conf_mats[seed]
+        write_seed_results(conf_mat, list(all_class), seed, output_dir,
+                           output_dir, crop_mix, annual_crop,
+                           annual_crop_label_replacement)
+
+
+if __name__ == "__main__":
+    from iota2.Common.FileUtils import str2bool
+    PARSER = argparse.ArgumentParser(
+        description="compute confusion matrices of every seeds at once")
+    PARSER.add_argument("-ground_truth",
+                        help="path to the entire ground truth",
+                        dest="ground_truth",
+                        required=True)
+    PARSER.add_argument("-data_field",
+                        help="data's field inside the ground truth shape",
+                        dest="data_field",
+                        required=True)
+    PARSER.add_argument("-path_valid",
+                        help="directory containing validation vectors",
+                        dest="path_valid",
+                        required=True)
+    PARSER.add_argument("-path_classif",
+                        help="directory containing classifications",
+                        dest="path_classif",
+                        required=True)
+    PARSER.add_argument("-output_dir",
+                        help="output directory",
+                        dest="output_dir",
+                        required=True)
+    PARSER.add_argument(
+        "-runs",
+        help="number of random learning/validation samples-set",
+        dest="runs",
+        type=int,
+        required=True)
+    PARSER.add_argument("-cross_val",
+                        help="activate cross validation",
+                        dest="cross_val",
+                        type=str2bool,
+                        default=False,
+                        required=False)
+    PARSER.add_argument("-nb_workers",
+                        help="number of tiles processed in parallel",
+                        dest="nb_workers",
+                        type=int,
+                        default=1,
+                        required=False)
+    ARGS = PARSER.parse_args()
+    confusion_matrices(ARGS.ground_truth, ARGS.data_field, ARGS.path_valid,
+                       ARGS.path_classif, ARGS.output_dir, ARGS.runs,
+                       ARGS.cross_val, False, [], 1, ARGS.nb_workers)
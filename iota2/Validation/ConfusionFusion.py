@@ -416,13 +416,11 @@ def confusion_fusion(input_vector: str, data_field: str, csv_out: str,
         replace annual labels by annual_crop_label_replacement
     """
 
+    #Recherche de toute les classes possible
+    all_class = fu.getFieldElement(input_vector, "ESRI Shapefile", data_field,
+                                   "unique")
+    all_class = sorted(all_class)
     for seed in range(runs):
-        #Recherche de toute les classes possible
-        all_class = []
-        all_class = fu.getFieldElement(input_vector, "ESRI Shapefile",
-                                       data_field, "unique")
-        all_class = sorted(all_class)
-
         #Initialisation de la matrice finale
         all_conf = fu.FileSearch_AND(csv_path, True,
                                      "seed_" + str(seed) + ".csv")
@@ -430,34 +428,61 @@ def confusion_fusion(input_vector: str, data_field: str, csv_out: str,
         csv_f = fu.sortByFirstElem(csv)
 
         conf_mat = fu.gen_confusionMatrix(csv_f, all_class)
-        if crop_mix:
-            write_csv(
-                conf_mat, all_class,
-                csv_out + "/MatrixBeforeClassMerge_" + str(seed) + ".csv")
-            conf_mat, all_class = replace_annual_crop_in_conf_mat(
-                conf_mat, all_class, annual_crop,
-                annual_crop_label_replacement)
-            write_csv(conf_mat, all_class,
-                      csv_out + "/Classif_Seed_" + str(seed) + ".csv")
-        else:
-            write_csv(conf_mat, all_class,
-                      csv_out + "/Classif_Seed_" + str(seed) + ".csv")
+        write_seed_results(conf_mat, list(all_class), seed, csv_out, txt_out,
+                           crop_mix, annual_crop, annual_crop_label_replacement)
 
-        nbr_good = conf_mat.trace()
-        nbr_sample = conf_mat.sum()
 
-        if nbr_sample > 1:
-            overall_acc = float(nbr_good) / float(nbr_sample)
-        else:
-            overall_acc = 0.0
-        kappa = compute_kappa(conf_mat)
-        precision = compute_precision_by_class(conf_mat, all_class)
-        recall = compute_recall_by_class(conf_mat, all_class)
-        f_score = compute_fscore_by_class(precision, recall, all_class)
-
-        write_results(
-            f_score, recall, precision, kappa, overall_acc, all_class,
-            txt_out + "/ClassificationResults_seed_" + str(seed) + ".txt")
+def write_seed_results(conf_mat: np.ndarray, all_class: List[int], seed: int,
+                       csv_out: str, txt_out: str, crop_mix: bool,
+                       annual_crop: List[str],
+                       annual_crop_label_replacement: int) -> None:
+    """write the confusion matrix and the report of a seed
+
+    Parameters
+    ----------
+    conf_mat: np.ndarray
+        confusion matrix, reference labels as rows
+    all_class: list
+        sorted class labels
+    seed: int
+        seed number
+    csv_out: str
+        directory which will contains the confusion matrix
+    txt_out: str
+        directory which will contains the report
+    crop_mix: bool
+        inform if cropMix workflow is enable
+    annual_crop: list
+        list of annual labels
+    annual_crop_label_replacement: int
+        replace annual labels by annual_crop_label_replacement
+    """
+    if crop_mix:
+        write_csv(conf_mat, all_class,
+                  csv_out + "/MatrixBeforeClassMerge_" + str(seed) + ".csv")
+        conf_mat, all_class = replace_annual_crop_in_conf_mat(
+            conf_mat, all_class, annual_crop, annual_crop_label_replacement)
+        write_csv(conf_mat, all_class,
+                  csv_out + "/Classif_Seed_" + str(seed) + ".csv")
+    else:
+        write_csv(conf_mat, all_class,
+                  csv_out + "/Classif_Seed_" + str(seed) + ".csv")
+
+    nbr_good = conf_mat.trace()
+    nbr_sample = conf_mat.sum()
+
+    if nbr_sample > 1:
+        overall_acc = float(nbr_good) / float(nbr_sample)
+    else:
+        overall_acc = 0.0
+    kappa = compute_kappa(conf_mat)
+    precision = compute_precision_by_class(conf_mat, all_class)
+    recall = compute_recall_by_class(conf_mat, all_class)
+    f_score = compute_fscore_by_class(precision, recall, all_class)
+
+    write_results(
+        f_score, recall, precision, kappa, overall_acc, all_class,
+        txt_out + "/ClassificationResults_seed_" + str(seed) + ".txt")
 
 
 if __name__ == "__main__":
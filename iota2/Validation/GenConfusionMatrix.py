@@ -19,7 +19,7 @@ import os
 import shutil
 import logging
 from logging import Logger
-from typing import List, Tuple, Optional
+from typing import Iterator, List, Tuple, Optional
 
 from iota2.Common import FileUtils as fu
 
@@ -133,44 +133,40 @@ def compare_ref(shape_ref: str, shape_learn: str, classif: str, diff: str,
     return diff
 
 
-def gen_conf_matrix(path_classif: str, path_valid: str, runs: int,
-                    data_field: str, path_to_cmd_confusion: str, path_wd: str,
-                    path_test: str, spatial_res: int, list_tiles: List[str],
-                    enable_cross_validation: bool) -> List[str]:
+def validation_tiles(path_valid: str) -> List[str]:
     """
     Parameters
     ----------
-    path_classif: string
     path_valid: string
-    runs: int
-    data_field: string
-    path_to_cmd_confusion: string
-    path_wd: string
     Return
     ------
     list(string)
+        tiles containing validation samples, in the order they are found
     """
-    all_cmd = []
-    path_tmp = os.path.join(path_classif, "TMP")
-
-    working_directory = os.path.join(path_classif, "TMP")
-    if path_wd:
-        working_directory = path_wd
-
     all_tiles = []
     validation_files = fu.FileSearch_AND(path_valid, True, "_val.sqlite")
     for valid in validation_files:
         current_tile = valid.split("/")[-1].split("_")[0]
-        try:
-            all_tiles.index(current_tile)
-        except ValueError:
+        if current_tile not in all_tiles:
             all_tiles.append(current_tile)
+    return all_tiles
 
-    if not spatial_res:
-        res_x, res_y = fu.getRasterResolution(
-            os.path.join(path_classif, f"Classif_Seed_0.tif"))
-        spatial_res = (res_x, res_y)
 
+def validation_vectors(path_valid: str, all_tiles: List[str], runs: int,
+                       enable_cross_validation: bool
+                       ) -> Iterator[Tuple[int, str, str, str]]:
+    """
+    Parameters
+    ----------
+    path_valid: string
+    all_tiles: list(string)
+    runs: int
+    enable_cross_validation: bool
+    Return
+    ------
+    iterator
+        (seed, tile, validation vector, learning vector) to compare
+    """
     for seed in range(runs):
         # recherche de tout les shapeFiles par seed, par tuiles pour
         # les fusionner
@@ -186,21 +182,51 @@ def gen_conf_matrix(path_classif: str, path_valid: str, runs: int,
             learn_tile = fu.FileSearch_AND(
                 path_valid, True, tile,
                 "_seed_" + str(seed) + "_learn.sqlite")[0]
-            path_directory = path_tmp
-            cmd = (f'otbcli_ComputeConfusionMatrix -in {path_classif}/"'
-                   f'"Classif_Seed_{seed}.tif -out {path_directory}/'
-                   f'{tile}_seed_{seed}.csv'
-                   f' -ref.vector.field {data_field.lower()} -ref vector '
-                   f'-ref.vector.in {val_tile}')
-            all_cmd.append(cmd)
-            classif = path_tmp + "/" + tile + "_seed_" + str(seed) + ".tif"
-            diff = path_tmp + "/" + tile + "_seed_" + str(
-                seed) + "_CompRef.tif"
-
-            compare_ref(val_tile, learn_tile, classif, diff, working_directory,
-                        path_wd, data_field, spatial_res)
+            yield seed, tile, val_tile, learn_tile
 
-    fu.writeCmds(path_to_cmd_confusion + "/confusion.txt", all_cmd)
+
+def gen_comp_ref(path_classif: str, path_valid: str, runs: int,
+                 data_field: str, path_wd: str, path_test: str,
+                 spatial_res: int, list_tiles: List[str],
+                 enable_cross_validation: bool) -> None:
+    """compare classifications to the validation and learning samples
+
+    produce the CompRef rasters of every tiles and seeds, their mosaics by
+    seed (final/diff_seed_*.tif) and dummy CompRef rasters for the asked
+    tiles without samples
+
+    Parameters
+    ----------
+    path_classif: string
+    path_valid: string
+    runs: int
+    data_field: string
+    path_wd: string
+    path_test: string
+    spatial_res: int
+    list_tiles: string
+    enable_cross_validation: bool
+    """
+    path_tmp = os.path.join(path_classif, "TMP")
+
+    working_directory = os.path.join(path_classif, "TMP")
+    if path_wd:
+        working_directory = path_wd
+
+    all_tiles = validation_tiles(path_valid)
+
+    if not spatial_res:
+        res_x, res_y = fu.getRasterResolution(
+            os.path.join(path_classif, f"Classif_Seed_0.tif"))
+        spatial_res = (res_x, res_y)
+
+    for seed, tile, val_tile, learn_tile in validation_vectors(
+            path_valid, all_tiles, runs, enable_cross_validation):
+        classif = path_tmp + "/" + tile + "_seed_" + str(seed) + ".tif"
+        diff = path_tmp + "/" + tile + "_seed_" + str(seed) + "_CompRef.tif"
+
+        compare_ref(val_tile, learn_tile, classif, diff, working_directory,
+                    path_wd, data_field, spatial_res)
 
     if enable_cross_validation:
         runs = runs - 1
@@ -224,6 +250,46 @@ def gen_conf_matrix(path_classif: str, path_valid: str, runs: int,
     missing_tiles = [elem for elem in tile_asked if elem not in all_tiles]
     create_dummy_rasters(missing_tiles, runs, path_test)
 
+
+def gen_conf_matrix(path_classif: str, path_valid: str, runs: int,
+                    data_field: str, path_to_cmd_confusion: str, path_wd: str,
+                    path_test: str, spatial_res: int, list_tiles: List[str],
+                    enable_cross_validation: bool) -> List[str]:
+    """
+    write confusion matrix commands and produce CompRef rasters
+    (see gen_comp_ref)
+
+    Parameters
+    ----------
+    path_classif: string
+    path_valid: string
+    runs: int
+    data_field: string
+    path_to_cmd_confusion: string
+    path_wd: string
+    Return
+    ------
+    list(string)
+    """
+    all_cmd = []
+    path_tmp = os.path.join(path_classif, "TMP")
+
+    all_tiles = validation_tiles(path_valid)
+    for seed, tile, val_tile, _ in validation_vectors(
+            path_valid, all_tiles, runs, enable_cross_validation):
+        path_directory = path_tmp
+        cmd = (f'otbcli_ComputeConfusionMatrix -in {path_classif}/"'
+               f'"Classif_Seed_{seed}.tif -out {path_directory}/'
+               f'{tile}_seed_{seed}.csv'
+               f' -ref.vector.field {data_field.lower()} -ref vector '
+               f'-ref.vector.in {val_tile}')
+        all_cmd.append(cmd)
+
+    fu.writeCmds(path_to_cmd_confusion + "/confusion.txt", all_cmd)
+
+    gen_comp_ref(path_classif, path_valid, runs, data_field, path_wd,
+                 path_test, spatial_res, list_tiles, enable_cross_validation)
+
     return all_cmd
 
 
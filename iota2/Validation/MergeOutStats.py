@@ -19,7 +19,7 @@ module dedicated to merge tile's statistics
 
 import argparse
 import math
-from typing import List
+from typing import Dict, List
 from config import Config
 from osgeo.gdalconst import *
 import numpy as np
@@ -138,6 +138,126 @@ def compute_mean_std(histo: List[int], bins: List[int]):
     return mean, math.sqrt(var)
 
 
+def merge_tiles_histograms(tiles_stats: List[str]) -> Dict[str, np.ndarray]:
+    """sum histograms of tiles computed by OutStats.out_statistics
+
+    Parameters
+    ----------
+    tiles_stats : list
+        list of numpy archives ({tile}_stats.npz)
+
+    Return
+    ------
+    dict
+        summed histograms and their bins
+    """
+    merged = {}
+    for tile_stats in tiles_stats:
+        with np.load(tile_stats) as stats:
+            if not merged:
+                merged = {key: stats[key] for key in stats.files}
+                continue
+            merged["difference"] = merged["difference"] + stats["difference"]
+            # pixels validity bins may differ if tiles are not processed
+            # from the same PixelsValidity.tif
+            if len(stats["validity"]) > len(merged["validity"]):
+                merged["validity_bins"] = stats["validity_bins"]
+            validity = np.zeros(len(merged["validity_bins"]), dtype=np.int64)
+            validity[:len(merged["validity"])] += merged["validity"]
+            validity[:len(stats["validity"])] += stats["validity"]
+            merged["validity"] = validity
+    return merged
+
+
+def plot_statistics(i2_output_path: str, sum_vok: List[int],
+                    bins_vok: List[int], sum_vnok: List[int],
+                    bins_vnok: List[int], sum_aok: List[int],
+                    bins_aok: List[int], sum_anok: List[int],
+                    bins_anok: List[int], sum_validity: List[int],
+                    bins_validity: List[int]) -> None:
+    """plot and save merged histograms in i2_output_path/final"""
+    mean_vok, std_vok = compute_mean_std(sum_vok, bins_vok)
+    mean_vnok, std_vnok = compute_mean_std(sum_vnok, bins_vnok)
+    plt.plot(bins_vok,
+             sum_vok,
+             label="Valid OK\nmean: " + "{0:.2f}".format(mean_vok) +
+             "\nstd: " + "{0:.2f}".format(std_vok) + "\n",
+             color="green")
+    plt.plot(bins_vnok,
+             sum_vnok,
+             label="Valid NOK\nmean: " + "{0:.2f}".format(mean_vnok) +
+             "\nstd: " + "{0:.2f}".format(std_vnok) + "\n",
+             color="red")
+    plt.ylabel("Nb pix")
+    plt.xlabel("Confidence")
+    lgd = plt.legend(loc="center left",
+                     bbox_to_anchor=(1, 0.8),
+                     numpoints=1)
+    plt.title('Histogram')
+    plt.savefig(i2_output_path + "/final/Stats_VOK_VNOK.png",
+                bbox_extra_artists=(lgd, ),
+                bbox_inches='tight')
+    # We clear the buffer and close the figure
+    plt.clf()
+    plt.close()
+    save_histogram(i2_output_path + "/final/Stats_VNOK.txt", sum_vnok,
+                   bins_vnok)
+    save_histogram(i2_output_path + "/final/Stats_VOK.txt", sum_vok,
+                   bins_vok)
+
+    plt.figure()
+    mean_aok, std_aok = compute_mean_std(sum_aok, bins_aok)
+    mean_anok, std_anok = compute_mean_std(sum_anok, bins_anok)
+    plt.plot(bins_aok,
+             sum_aok,
+             label="Learning OK\nmean: " + "{0:.2f}".format(mean_aok) +
+             "\nstd: " + "{0:.2f}".format(std_aok) + "\n",
+             color="yellow")
+    plt.plot(bins_anok,
+             sum_anok,
+             label="Learning NOK\nmean: " + "{0:.2f}".format(mean_anok) +
+             "\nstd: " + "{0:.2f}".format(std_anok),
+             color="blue")
+    plt.ylabel("Nb pix")
+    plt.xlabel("Confidence")
+    lgd = plt.legend(loc="center left",
+                     bbox_to_anchor=(1, 0.8),
+                     numpoints=1)
+    plt.title('Histogram')
+    plt.savefig(i2_output_path + "/final/Stats_LOK_LNOK.png",
+                bbox_extra_artists=(lgd, ),
+                bbox_inches='tight')
+    # We clear the buffer and close the figure
+    plt.clf()
+    plt.close()
+    save_histogram(i2_output_path + "/final/Stats_LNOK.txt", sum_anok,
+                   bins_anok)
+    save_histogram(i2_output_path + "/final/Stats_LOK.txt", sum_aok,
+                   bins_aok)
+
+    plt.figure()
+    plt.bar(bins_validity,
+            sum_validity,
+            label="pixels validity",
+            color="red",
+            align="center")
+    plt.ylabel("Nb pix")
+    plt.xlabel("Validity")
+    plt.gca().yaxis.grid(True)
+    plt.legend()
+    plt.title('Histogram')
+    plt.xticks(bins_validity, bins_validity)
+    plt.xlim((0, max(bins_validity) + 1))
+    plt.savefig(i2_output_path + "/final/Validity.png",
+                bbox_extra_artists=(lgd, ),
+                bbox_inches='tight')
+    # We clear the buffer and close the figure
+    plt.clf()
+    plt.close()
+    save_histogram(i2_output_path + "/final/Validity.txt", sum_validity,
+                   bins_validity)
+
+
 def merge_output_statistics(i2_output_path: str, runs: int) -> None:
     """merge tile's statistics to a gloable one
 
@@ -148,13 +268,30 @@ def merge_output_statistics(i2_output_path: str, runs: int) -> None:
     runs : int
         nomber of random learning/validation samples-set
     """
-
-    for seed in range(runs):
+    tiles_stats = fu.fileSearchRegEx(i2_output_path +
+                                     "/final/TMP/*_stats.npz")
+    if tiles_stats:
+        merged = merge_tiles_histograms(tiles_stats)
+        stats_name = [str(name) for name in merged["stats_name"]]
+        conf_bins = [int(val) for val in merged["difference_bins"]]
+        bins_validity = [int(val) for val in merged["validity_bins"]]
+        sum_validity = [int(val) for val in merged["validity"]]
+        for seed in range(int(runs)):
+            sums = {
+                name: [int(val) for val in merged["difference"][seed, ind]]
+                for ind, name in enumerate(stats_name)
+            }
+            plot_statistics(i2_output_path, sums["ValidOK"], conf_bins,
+                            sums["ValidNOK"], conf_bins, sums["AppOK"],
+                            conf_bins, sums["AppNOK"], conf_bins,
+                            sum_validity, bins_validity)
+        return
+
+    # statistics stored as text files by previous iota2 versions
+    for seed in range(int(runs)):
         seed_stats = fu.fileSearchRegEx(i2_output_path +
                                         "/final/TMP/*_stats_seed_" +
                                         str(seed) + ".cfg")
-        all_diff_test = Config(open(seed_stats[0])).AllDiffStats
-        all_diff_test = all_diff_test.split(",")
         vok_buff = []
         vnok_buff = []
         aok_buff = []
@@ -173,92 +310,11 @@ def merge_output_statistics(i2_output_path: str, runs: int) -> None:
             anok_buff.append(histo_anok)
             validity_buff.append(histo_validity)
 
-        sum_vok = sum_in_list(vok_buff)
-        sum_vnok = sum_in_list(vnok_buff)
-        sum_aok = sum_in_list(aok_buff)
-        sum_anok = sum_in_list(anok_buff)
-        sum_validity = sum_in_list(validity_buff)
-
-        mean_vok, std_vok = compute_mean_std(sum_vok, bins_vok)
-        mean_vnok, std_vnok = compute_mean_std(sum_vnok, bins_vnok)
-        plt.plot(bins_vok,
-                 sum_vok,
-                 label="Valid OK\nmean: " + "{0:.2f}".format(mean_vok) +
-                 "\nstd: " + "{0:.2f}".format(std_vok) + "\n",
-                 color="green")
-        plt.plot(bins_vnok,
-                 sum_vnok,
-                 label="Valid NOK\nmean: " + "{0:.2f}".format(mean_vnok) +
-                 "\nstd: " + "{0:.2f}".format(std_vnok) + "\n",
-                 color="red")
-        plt.ylabel("Nb pix")
-        plt.xlabel("Confidence")
-        lgd = plt.legend(loc="center left",
-                         bbox_to_anchor=(1, 0.8),
-                         numpoints=1)
-        plt.title('Histogram')
-        plt.savefig(i2_output_path + "/final/Stats_VOK_VNOK.png",
-                    bbox_extra_artists=(lgd, ),
-                    bbox_inches='tight')
-        # We clear the buffer and close the figure
-        plt.clf()
-        plt.close()
-        save_histogram(i2_output_path + "/final/Stats_VNOK.txt", sum_vnok,
-                       bins_vnok)
-        save_histogram(i2_output_path + "/final/Stats_VOK.txt", sum_vok,
-                       bins_vok)
-
-        plt.figure()
-        mean_aok, std_aok = compute_mean_std(sum_aok, bins_aok)
-        mean_anok, std_anok = compute_mean_std(sum_anok, bins_anok)
-        plt.plot(bins_aok,
-                 sum_aok,
-                 label="Learning OK\nmean: " + "{0:.2f}".format(mean_aok) +
-                 "\nstd: " + "{0:.2f}".format(std_aok) + "\n",
-                 color="yellow")
-        plt.plot(bins_anok,
-                 sum_anok,
-                 label="Learning NOK\nmean: " + "{0:.2f}".format(mean_anok) +
-                 "\nstd: " + "{0:.2f}".format(std_anok),
-                 color="blue")
-        plt.ylabel("Nb pix")
-        plt.xlabel("Confidence")
-        lgd = plt.legend(loc="center left",
-                         bbox_to_anchor=(1, 0.8),
-                         numpoints=1)
-        plt.title('Histogram')
-        plt.savefig(i2_output_path + "/final/Stats_LOK_LNOK.png",
-                    bbox_extra_artists=(lgd, ),
-                    bbox_inches='tight')
-        # We clear the buffer and close the figure
-        plt.clf()
-        plt.close()
-        save_histogram(i2_output_path + "/final/Stats_LNOK.txt", sum_anok,
-                       bins_anok)
-        save_histogram(i2_output_path + "/final/Stats_LOK.txt", sum_aok,
-                       bins_aok)
-
-        plt.figure()
-        plt.bar(bins_validity,
-                sum_validity,
-                label="pixels validity",
-                color="red",
-                align="center")
-        plt.ylabel("Nb pix")
-        plt.xlabel("Validity")
-        plt.gca().yaxis.grid(True)
-        plt.legend()
-        plt.title('Histogram')
-        plt.xticks(bins_validity, bins_validity)
-        plt.xlim((0, max(bins_validity) + 1))
-        plt.savefig(i2_output_path + "/final/Validity.png",
-                    bbox_extra_artists=(lgd, ),
-                    bbox_inches='tight')
-        # We clear the buffer and close the figure
-        plt.clf()
-        plt.close()
-        save_histogram(i2_output_path + "/final/Validity.txt", sum_validity,
-                       bins_validity)
+        plot_statistics(i2_output_path, sum_in_list(vok_buff), bins_vok,
+                        sum_in_list(vnok_buff), bins_vnok,
+                        sum_in_list(aok_buff), bins_aok,
+                        sum_in_list(anok_buff), bins_anok,
+                        sum_in_list(validity_buff), bins_validity)
 
 
 if __name__ == "__main__":
@@ -273,6 +329,7 @@ if __name__ == "__main__":
         "-runs",
         dest="runs",
         help="number of random learning/validation samples-set",
+        type=int,
         required=True)
     ARGS = PARSER.parse_args()
 
@@ -20,47 +20,113 @@ well/bad classified) by tiles
 import argparse
 import os
 import sys
+from typing import List, Optional, Tuple
 from osgeo import gdal
-from osgeo.gdalconst import *
-from osgeo import ogr
 import numpy as np
 
+# 1 valid NOK
+# 2 valid OK
+# 3 app NOK
+# 4 app OK
+STATS_NAME = ["ValidNOK", "ValidOK", "AppNOK", "AppOK"]
+CONF_MIN = 1
+CONF_MAX = 100
 
-def raster2array(rasterfn):
-    """get raster as a numpy array"""
-    raster = gdal.Open(rasterfn)
-    band = raster.GetRasterBand(1)
-    return band.ReadAsArray()
 
+def joint_histogram(confidence: np.ndarray, difference: np.ndarray,
+                    conf_min: int, conf_max: int,
+                    nb_diff: int) -> np.ndarray:
+    """compute the confidence x difference histogram of a block
 
-def get_diff_histo(conf_min, conf_max, conf_step, confidence, difference):
-    """compute histrograms"""
-    diff = [[], [], [], [], [], [], []]
-    for current_conf in np.arange(conf_min, conf_max + 1, conf_step):
-        y, x = np.where(confidence == current_conf)
-        if len(y) >= 1:
-            coord = [(current_x, current_y)
-                     for current_x, current_y in zip(x, y)]
-            for current_x, current_y in coord:
-                diff[difference[current_y][current_x]].append(current_conf)
-    return diff
-
-
-def gen_stats_diff(path_to_config_stats, stats_name, histrogram, bins):
-    """write histrogram"""
-    stats = open(path_to_config_stats, "a")
-    stats.write(stats_name + ":\n{\n\thistogram:'" + histrogram +
-                "'\n\tbins:'" + bins + "'\n}\n\n")
-    stats.close()
-
+    Parameters
+    ----------
+    confidence : np.array
+        confidence values, only integer values in [conf_min, conf_max]
+        are counted
+    difference : np.array
+        difference classes, only values in [0, nb_diff[ are counted
+    conf_min : int
+        first confidence bin
+    conf_max : int
+        last confidence bin
+    nb_diff : int
+        number of difference classes
+
+    Return
+    ------
+    np.array
+        histogram of shape (nb_diff, conf_max - conf_min + 1)
+    """
+    nb_conf = conf_max - conf_min + 1
+    conf_index = confidence.astype(np.int64)
+    diff_index = difference.astype(np.int64)
+    valid = ((conf_index == confidence) & (conf_index >= conf_min) &
+             (conf_index <= conf_max) & (diff_index >= 0) &
+             (diff_index < nb_diff))
+    return np.bincount(diff_index[valid] * nb_conf +
+                       (conf_index[valid] - conf_min),
+                       minlength=nb_diff * nb_conf).reshape(nb_diff, nb_conf)
+
+
+def tile_histograms(confidences: List[str],
+                    differences: List[str],
+                    validity: str,
+                    max_view: int,
+                    conf_min: Optional[int] = CONF_MIN,
+                    conf_max: Optional[int] = CONF_MAX,
+                    block_size: Optional[int] = 1024
+                    ) -> Tuple[np.ndarray, np.ndarray]:
+    """compute histograms of every seeds of a tile in a single pass
 
-def histo(array, bins):
-    """compute histogram"""
-    hist = []
-    for current_bin in bins:
-        indexes = np.where(array == current_bin)
-        hist.append(len(indexes[0]))
-    return hist, bins
+    Parameters
+    ----------
+    confidences : list
+        confidence raster by seed
+    differences : list
+        difference raster (with the reference) by seed
+    validity : str
+        pixels validity raster of the tile
+    max_view : int
+        last pixels validity bin
+    conf_min : int
+        first confidence bin
+    conf_max : int
+        last confidence bin
+    block_size : int
+        number of rows read at once
+
+    Return
+    ------
+    tuple
+        (confidence x difference histograms of shape
+         (seeds, len(STATS_NAME) + 1, conf_max - conf_min + 1),
+         pixels validity histogram of shape (max_view + 1))
+    """
+    nb_diff = len(STATS_NAME) + 1
+    nb_conf = conf_max - conf_min + 1
+    conf_bands = [gdal.Open(conf).GetRasterBand(1) for conf in confidences]
+    diff_bands = [gdal.Open(diff).GetRasterBand(1) for diff in differences]
+    validity_band = gdal.Open(validity).GetRasterBand(1)
+    x_size = validity_band.XSize
+    y_size = validity_band.YSize
+
+    diff_histos = np.zeros((len(confidences), nb_diff, nb_conf),
+                           dtype=np.int64)
+    validity_histo = np.zeros(max_view + 1, dtype=np.int64)
+    for block_row in range(0, y_size, block_size):
+        rows = min(block_size, y_size - block_row)
+        validity_block = validity_band.ReadAsArray(0, block_row, x_size,
+                                                   rows).astype(np.int64)
+        validity_block = validity_block[(validity_block >= 0)
+                                        & (validity_block <= max_view)]
+        validity_histo += np.bincount(validity_block, minlength=max_view + 1)
+        for seed, (conf_band,
+                   diff_band) in enumerate(zip(conf_bands, diff_bands)):
+            diff_histos[seed] += joint_histogram(
+                conf_band.ReadAsArray(0, block_row, x_size, rows),
+                diff_band.ReadAsArray(0, block_row, x_size, rows), conf_min,
+                conf_max, nb_diff)
+    return diff_histos, validity_histo
 
 
 def out_statistics(iota2_output_path: str, tile: str, runs: int) -> None:
@@ -68,6 +134,9 @@ def out_statistics(iota2_output_path: str, tile: str, runs: int) -> None:
     compute statistics (histograms of training/validation samples
     well/bad classified) to a given tile
 
+    Histograms of every seeds are saved in
+    final/TMP/{tile}_stats.npz, see MergeOutStats.merge_output_statistics
+
     Parameters
     ----------
     iota2_output_path : str
@@ -77,54 +146,32 @@ def out_statistics(iota2_output_path: str, tile: str, runs: int) -> None:
     runs : int
         number of random learning/validation sample-set
     """
-
-    # 1 valid NOK
-    # 2 valid OK
-    # 3 app NOK
-    # 4 app OK
-    stats_name = ["ValidNOK", "ValidOK", "AppNOK", "AppOK"]
-
-    conf_step = 1
-    conf_min = 1
-    conf_max = 100
     cloud_all_tile = iota2_output_path + "/final/PixelsValidity.tif"
     src_ds = gdal.Open(cloud_all_tile)
     if src_ds is None:
         print('Unable to open %s' % cloud_all_tile)
         sys.exit(1)
-    srcband = src_ds.GetRasterBand(1).ReadAsArray()
-    max_view = np.amax(srcband)
-    cloud = raster2array(iota2_output_path + "/final/TMP/" + tile +
-                         "_Cloud_StatsOK.tif")
-    for seed in range(runs):
-        confidence = raster2array(iota2_output_path + "/final/TMP/" + tile +
-                                  "_GlobalConfidence_seed_" + str(seed) +
-                                  ".tif")
-        difference = raster2array(iota2_output_path + "/final/TMP/" + tile +
-                                  "_seed_" + str(seed) + "_CompRef.tif")
-        diff_histo = get_diff_histo(conf_min, conf_max, conf_step, confidence,
-                                    difference)
-        stats_tile = os.path.join(iota2_output_path, "final", "TMP",
-                                  f"{tile}_stats_seed_f{seed}.cfg")
-        if os.path.exists(stats_tile):
-            os.remove(stats_tile)
-        stats = open(stats_tile, "a")
-        stats.write("AllDiffStats:'" + ", ".join(stats_name) + "'\n")
-        stats.close()
-        for i in range(len(stats_name)):
-            hist, bin_edges = histo(diff_histo[i + 1],
-                                    bins=np.arange(conf_min, conf_max + 1,
-                                                   conf_step))
-            hist_str = " ".join([str(currentVal) for currentVal in hist])
-            bin_edges_str = " ".join(
-                [str(currentVal) for currentVal in bin_edges])
-            gen_stats_diff(stats_tile, stats_name[i], hist_str, bin_edges_str)
-        hist_n_view, bins_n_view = histo(cloud,
-                                         bins=np.arange(0, max_view + 1, 1))
-        hist_str = " ".join([str(currentVal) for currentVal in hist_n_view])
-        bin_edges_str = " ".join(
-            [str(currentVal) for currentVal in bins_n_view])
-        gen_stats_diff(stats_tile, "TileValidity", hist_str, bin_edges_str)
+    max_view = int(src_ds.GetRasterBand(1).ComputeRasterMinMax(False)[1])
+    src_ds = None
+
+    tmp_dir = os.path.join(iota2_output_path, "final", "TMP")
+    confidences = [
+        os.path.join(tmp_dir, f"{tile}_GlobalConfidence_seed_{seed}.tif")
+        for seed in range(int(runs))
+    ]
+    differences = [
+        os.path.join(tmp_dir, f"{tile}_seed_{seed}_CompRef.tif")
+        for seed in range(int(runs))
+    ]
+    diff_histos, validity_histo = tile_histograms(
+        confidences, differences,
+        os.path.join(tmp_dir, f"{tile}_Cloud_StatsOK.tif"), max_view)
+    np.savez(os.path.join(tmp_dir, f"{tile}_stats.npz"),
+             stats_name=np.array(STATS_NAME),
+             difference=diff_histos[:, 1:, :],
+             difference_bins=np.arange(CONF_MIN, CONF_MAX + 1),
+             validity=validity_histo,
+             validity_bins=np.arange(0, max_view + 1))
 
 
 if __name__ == "__main__":
@@ -142,6 +189,7 @@ if __name__ == "__main__":
         "-runs",
         dest="runs",
         help="number of random learning/validation sample-sets",
+        type=int,
         required=True)
     ARGS = PARSER.parse_args()
 
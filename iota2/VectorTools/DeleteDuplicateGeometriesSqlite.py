@@ -3,21 +3,103 @@
 
 import sys
 import os
-import sqlite3 as lite
+import hashlib
 import argparse
 
+from osgeo import ogr
+
+
+def normalized_wkb(geometry):
+    """WKB of a normalized copy of the geometry (little endian, ISO WKB,
+    canonical rings order and starting points when GDAL allows it)
+    """
+    geometry = geometry.Clone()
+    if hasattr(geometry, "Normalize"):
+        geometry.Normalize()
+    return geometry.ExportToIsoWkb(ogr.wkbNDR)
+
+
+def geometry_key(geometry):
+    """key of a geometry : (bounding box, hash of its normalized WKB)
+
+    Return
+    ------
+    tuple
+        (wkb, key)
+    """
+    wkb = normalized_wkb(geometry)
+    return wkb, (geometry.GetEnvelope(), hashlib.blake2b(wkb, digest_size=16).digest())
+
+
+def find_duplicates(vector_file):
+    """stream features once, find features whose geometry is equal to the
+    geometry of a previous feature (lower FID)
+
+    features are indexed by the hash of their normalized WKB bucketed by
+    their bounding box, geometries are only compared on hash collisions
+
+    Return
+    ------
+    list
+        FID of duplicated features
+    """
+    data_source = ogr.Open(vector_file, 0)
+    layer = data_source.GetLayer(0)
+    # confirmations are done through another handle in order to not
+    # disturb the reading of the layer
+    check_source = ogr.Open(vector_file, 0)
+    check_layer = check_source.GetLayer(0)
+
+    first_fid = {}
+    duplicates = []
+    for feature in layer:
+        geometry = feature.GetGeometryRef()
+        if geometry is None:
+            continue
+        wkb, key = geometry_key(geometry)
+        if key not in first_fid:
+            first_fid[key] = feature.GetFID()
+            continue
+        first = check_layer.GetFeature(first_fid[key])
+        if normalized_wkb(first.GetGeometryRef()) == wkb:
+            duplicates.append(feature.GetFID())
+    data_source = check_source = None
+    return duplicates
+
+
+def delete_features(vector_file, fids):
+    """delete features of a vector file (SQLite, GeoPackage or shapefile)
+    in place, in a single transaction
+    """
+    data_source = ogr.Open(vector_file, 1)
+    layer = data_source.GetLayer(0)
+    layer.StartTransaction()
+    for fid in fids:
+        layer.DeleteFeature(fid)
+    layer.CommitTransaction()
+    if data_source.GetDriver().GetName() == "ESRI Shapefile":
+        data_source.ExecuteSQL("REPACK {}".format(layer.GetName()))
+    data_source = None
+
+
 def deleteDuplicateGeometriesSqlite(shapefile, outformat = "ESRI shapefile",
                                     do_corrections=True, output_file=None, quiet_mode=False):
     """Check if a features is duplicates, then if it does it will not be copied in output shapeFile
 
+    Duplicates are found in a single pass over features (see find_duplicates)
+    and removed in place, the first feature (lower FID) is kept.
+
     Parameters
     ----------
     input_shape : string
-        input shapeFile
+        input vector file (shapefile, SQLite or GeoPackage)
+    outformat : string
+        not used, the format is the one of the input file
     do_correction : bool
         flag to remove dupplicates
     output_shape : string
-        output shapeFile, if set to None output_shape = input_shape
+        output vector file (same format as input), if set to None
+        output_shape = input_shape
     quiet_mode : bool
         flag to print information
     Return
@@ -26,68 +108,43 @@ def deleteDuplicateGeometriesSqlite(shapefile, outformat = "ESRI shapefile",
         (output_shape, duplicates_features_number) where duplicates_features_number
         is the number of duplicated features
     """
-    if outformat != "SQlite":
-        tmpnamelyr = "tmp" + os.path.splitext(os.path.basename(shapefile))[0]
-        tmpname = "%s.sqlite"%(tmpnamelyr)
-        outsqlite = os.path.join(os.path.dirname(shapefile), tmpname)
-        os.system("ogr2ogr -f SQLite %s %s -nln tmp"%(outsqlite, shapefile))
-    else:
-        outsqlite = shapefile
-
-    conn = lite.connect(outsqlite)
-    cursor = conn.cursor()
-
-    cursor.execute("select count(*) from tmp")
-    nbfeat0 = cursor.fetchall()
-    
-    cursor.execute("create temporary table to_del (ogc_fid int, geom blob);")
-    cursor.execute("insert into to_del(ogc_fid, geom) select min(ogc_fid), GEOMETRY from tmp group by GEOMETRY having count(*) > 1;")
-    cursor.execute("delete from tmp where exists(select * from to_del where to_del.geom = tmp.GEOMETRY and to_del.ogc_fid <> tmp.ogc_fid);")
-
-    cursor.execute("select count(*) from tmp")
-    nbfeat1 = cursor.fetchall()
-
-    nb_dupplicates = int(nbfeat0[0][0]) - int(nbfeat1[0][0])
+    duplicates = find_duplicates(shapefile)
+    nb_dupplicates = len(duplicates)
 
     if do_corrections:
-        conn.commit()
-
-        if output_file is None and outformat != "SQlite":
-            os.system("rm %s"%(shapefile))
-
-        shapefile = output_file if output_file is not None else shapefile
-        
-        if output_file is None and outformat != "SQlite":
-            os.system("ogr2ogr -f 'ESRI Shapefile' %s %s"%(shapefile, outsqlite))
+        if output_file is not None:
+            data_source = ogr.Open(shapefile, 0)
+            driver = data_source.GetDriver()
+            if os.path.exists(output_file):
+                driver.DeleteDataSource(output_file)
+            driver.CopyDataSource(data_source, output_file)
+            data_source = None
+            shapefile = output_file
 
         if nb_dupplicates != 0:
+            delete_features(shapefile, duplicates)
             if quiet_mode is False:
                 print("Analyse of duplicated features done. %s duplicates found and deleted"%(nb_dupplicates))
         else:
             if quiet_mode is False:
                 print("Analyse of duplicated features done. No duplicates found")
-            
-        cursor = conn = None
-        
-    if outformat != "SQlite":
-        os.remove(outsqlite)
-        
+
     return shapefile, nb_dupplicates
 
 if __name__ == "__main__":
     if len(sys.argv) == 1:
         prog = os.path.basename(sys.argv[0])
-        print('      '+sys.argv[0]+' [options]') 
+        print('      '+sys.argv[0]+' [options]')
         print("     Help : ", prog, " --help")
         print("        or : ", prog, " -h")
-        sys.exit(-1)  
+        sys.exit(-1)
     else:
         usage = "usage: %prog [options] "
         parser = argparse.ArgumentParser(description = "Find geometries duplicates based on sqlite method")
-        
+
         parser.add_argument("-in", dest="inshape", action="store", \
                             help="Input shapefile to analyse", required = True)
-                                  
+
         args = parser.parse_args()
 
         deleteDuplicateGeometriesSqlite(args.inshape)
@@ -0,0 +1,330 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# =========================================================================
+#   Program:   iota2
+#
+#   Copyright (c) CESBIO. All rights reserved.
+#
+#   See LICENSE for details.
+#
+#   This software is distributed WITHOUT ANY WARRANTY; without even
+#   the implied warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR
+#   PURPOSE.  See the above copyright notices for more information.
+#
+# =========================================================================
+"""
+Intersection of a tile's envelope, regions, ground truth and the tile's
+cloud (validity) vector in a single pass.
+
+Inputs are opened read-only and only features intersecting the tile's
+envelope are read, thanks to the spatial index of the inputs. Shapefiles
+without .qix file are copied and indexed once, before tiles are processed
+(see spatial_index_copy). Ground truth features are intersected with the
+tile's regions then with the valid areas of the tile.
+"""
+import os
+import shutil
+import logging
+from typing import List, Optional, Tuple
+
+from osgeo import ogr
+from osgeo import osr
+
+LOGGER = logging.getLogger(__name__)
+
+DRIVERS = {".shp": "ESRI Shapefile", ".sqlite": "SQLite", ".gpkg": "GPKG"}
+
+
+def get_driver_name(vector_file: str) -> str:
+    """OGR driver name according to the file extension"""
+    extension = os.path.splitext(vector_file)[-1].lower()
+    if extension not in DRIVERS:
+        raise ValueError(f"Type of vector file '{vector_file}' not supported")
+    return DRIVERS[extension]
+
+
+def ensure_spatial_index(vector_file: str,
+                         logger: Optional[logging.Logger] = LOGGER) -> None:
+    """build the spatial index (.qix) of a shapefile if it does not exist
+
+    The shapefile is opened in update mode : it must be a file produced by
+    iota2 and the index must be built once, by a single process (in the
+    step_inputs of the step whose tasks read the file for instance).
+    SQLite and GeoPackage files use their own R-tree if any.
+    """
+    if get_driver_name(vector_file) != "ESRI Shapefile":
+        return
+    if os.path.exists(os.path.splitext(vector_file)[0] + ".qix"):
+        return
+    data_source = ogr.Open(vector_file, 1)
+    if data_source is None:
+        logger.warning(f"can't build the spatial index of {vector_file}")
+        return
+    layer_name = data_source.GetLayer(0).GetName()
+    data_source.ExecuteSQL(f'CREATE SPATIAL INDEX ON "{layer_name}"')
+    data_source = None
+
+
+def indexed_vector(vector_file: str, index_directory: str) -> str:
+    """vector file to read in place of an input vector file, see
+    spatial_index_copy
+    """
+    if (get_driver_name(vector_file) != "ESRI Shapefile" or os.path.exists(
+            os.path.splitext(vector_file)[0] + ".qix")):
+        return vector_file
+    return os.path.join(index_directory, os.path.basename(vector_file))
+
+
+def spatial_index_copy(vector_file: str,
+                       index_directory: str,
+                       logger: Optional[logging.Logger] = LOGGER) -> str:
+    """copy a shapefile without spatial index to index_directory and build
+    the spatial index of the copy
+
+    Input files are never opened in update mode. This function must be
+    called once, by a single process, before tasks read the file
+    returned by indexed_vector in parallel.
+
+    Return
+    ------
+    str
+        the vector file to read (the input file if it is not a shapefile
+        or if it already has a spatial index)
+    """
+    indexed = indexed_vector(vector_file, index_directory)
+    if indexed == vector_file or os.path.exists(
+            os.path.splitext(indexed)[0] + ".qix"):
+        return indexed
+    if not os.path.exists(index_directory):
+        os.makedirs(index_directory)
+    name = os.path.splitext(os.path.basename(vector_file))[0]
+    directory = os.path.dirname(os.path.abspath(vector_file))
+    for file_name in os.listdir(directory):
+        if os.path.splitext(file_name)[0] == name:
+            shutil.copy(os.path.join(directory, file_name), index_directory)
+    logger.info(f"build the spatial index of {vector_file} in {indexed}")
+    ensure_spatial_index(indexed, logger)
+    return indexed
+
+
+def open_to_read(vector_file: str) -> Tuple[ogr.DataSource, ogr.Layer]:
+    """open a vector file read-only"""
+    data_source = ogr.GetDriverByName(get_driver_name(vector_file)).Open(
+        vector_file, 0)
+    if data_source is None:
+        raise Exception(f"can't open {vector_file}")
+    return data_source, data_source.GetLayer(0)
+
+
+def geometry_parts(geometry: ogr.Geometry,
+                   dimension: int) -> List[ogr.Geometry]:
+    """simple geometries (polygons, points...) of dimension 'dimension'
+    contained in a geometry
+    """
+    if geometry is None or geometry.IsEmpty():
+        return []
+    if geometry.GetGeometryCount() == 0 or ogr.GT_Flatten(
+            geometry.GetGeometryType()) == ogr.wkbPolygon:
+        if geometry.GetDimension() == dimension:
+            return [geometry.Clone()]
+        return []
+    parts = []
+    for index in range(geometry.GetGeometryCount()):
+        parts += geometry_parts(geometry.GetGeometryRef(index), dimension)
+    return parts
+
+
+def tile_regions(tile_env_vec: str, region_vec: str,
+                 region_field: str) -> List[Tuple[str, ogr.Geometry]]:
+    """intersection between the tile's envelope and regions
+
+    Return
+    ------
+    list
+        [(region, polygon), ...]
+    """
+    _, env_layer = open_to_read(tile_env_vec)
+    envelope = ogr.Geometry(ogr.wkbMultiPolygon)
+    for feature in env_layer:
+        for polygon in geometry_parts(feature.GetGeometryRef(), 2):
+            envelope.AddGeometry(polygon)
+    envelope = envelope.UnionCascaded()
+
+    region_ds, region_layer = open_to_read(region_vec)
+    region_layer.SetSpatialFilter(envelope)
+    regions = []
+    for feature in region_layer:
+        geometry = feature.GetGeometryRef()
+        if geometry is None or not geometry.Intersects(envelope):
+            continue
+        intersection = geometry.Intersection(envelope)
+        if intersection is None or not intersection.IsValid():
+            continue
+        for polygon in geometry_parts(intersection, 2):
+            regions.append((feature.GetField(region_field), polygon))
+    region_ds = None
+    return regions
+
+
+def create_output(output: str, epsg: int, geometry_type: int,
+                  fields: List[ogr.FieldDefn]
+                  ) -> Tuple[ogr.DataSource, ogr.Layer]:
+    """create an output vector file"""
+    driver = ogr.GetDriverByName(get_driver_name(output))
+    if os.path.exists(output):
+        driver.DeleteDataSource(output)
+    data_source = driver.CreateDataSource(output)
+    srs = osr.SpatialReference()
+    srs.ImportFromEPSG(int(epsg))
+    layer = data_source.CreateLayer(
+        os.path.splitext(os.path.basename(output))[0], srs, geometry_type)
+    for field in fields:
+        layer.CreateField(field)
+    return data_source, layer
+
+
+def write_tile_regions(regions: List[Tuple[str, ogr.Geometry]],
+                       region_vec: str, region_field: str, output: str,
+                       epsg: int) -> None:
+    """write the tile's regions (see tile_regions)"""
+    region_ds, region_layer = open_to_read(region_vec)
+    layer_defn = region_layer.GetLayerDefn()
+    field = ogr.FieldDefn(
+        layer_defn.GetFieldDefn(layer_defn.GetFieldIndex(region_field)))
+    field.SetName(region_field.lower())
+    region_ds = None
+    data_source, layer = create_output(output, epsg, ogr.wkbPolygon, [field])
+    layer.StartTransaction()
+    for region, polygon in regions:
+        feature = ogr.Feature(layer.GetLayerDefn())
+        feature.SetField(region_field.lower(), region)
+        feature.SetGeometry(polygon)
+        layer.CreateFeature(feature)
+    layer.CommitTransaction()
+    data_source = None
+
+
+def intersect_ground_truth(regions: List[Tuple[str, ogr.Geometry]],
+                           region_vec: str,
+                           ground_truth_vec: str,
+                           cloud_vec: str,
+                           output: str,
+                           epsg: int,
+                           data_field: str,
+                           region_field: str,
+                           origin_field: Optional[str] = "originfid",
+                           logger: Optional[logging.Logger] = LOGGER) -> bool:
+    """intersection between ground truth features, the tile's regions and
+    the valid areas of the tile (cloud_vec)
+
+    Parameters
+    ----------
+    regions : list
+        tile's regions (see tile_regions)
+    region_vec : str
+        region database, used to get the region field definition
+    ground_truth_vec : str
+        ground truth database
+    cloud_vec : str
+        valid areas of the tile
+    output : str
+        output vector file, its features are simple geometries with the
+        fields data_field, region_field and origin_field
+    epsg : int
+        epsg code
+    data_field : str
+        field containing class labels
+    region_field : str
+        region field
+    origin_field : str
+        output field containing the ground truth feature identifier
+        (ogc_fid of the database, as the ogr2ogr conversion of shapefiles
+        to SQLite)
+    logger : logging.Logger
+        logger
+
+    Return
+    ------
+    bool
+        False if there is no intersection
+    """
+    if not regions:
+        return False
+    tile_area = ogr.Geometry(ogr.wkbMultiPolygon)
+    for _, polygon in regions:
+        tile_area.AddGeometry(polygon)
+    regions = [(region, polygon, polygon.GetEnvelope())
+               for region, polygon in regions]
+
+    gt_ds, gt_layer = open_to_read(ground_truth_vec)
+    cloud_ds, cloud_layer = open_to_read(cloud_vec)
+    # ogr2ogr starts ogc_fid at 1 while converting shapefiles
+    fid_offset = 1 if get_driver_name(
+        ground_truth_vec) == "ESRI Shapefile" else 0
+
+    gt_defn = gt_layer.GetLayerDefn()
+    data_field_defn = ogr.FieldDefn(
+        gt_defn.GetFieldDefn(gt_defn.GetFieldIndex(data_field)))
+    data_field_defn.SetName(data_field.lower())
+    region_ds, region_layer = open_to_read(region_vec)
+    region_defn = region_layer.GetLayerDefn()
+    region_field_defn = ogr.FieldDefn(
+        region_defn.GetFieldDefn(region_defn.GetFieldIndex(region_field)))
+    region_field_defn.SetName(region_field.lower())
+    region_ds = None
+
+    gt_type = ogr.GT_Flatten(gt_layer.GetGeomType())
+    if gt_type in [ogr.wkbPoint, ogr.wkbMultiPoint]:
+        dimension, out_type = 0, ogr.wkbPoint
+    else:
+        dimension, out_type = 2, ogr.wkbPolygon
+    out_ds, out_layer = create_output(
+        output, epsg, out_type, [
+            data_field_defn, region_field_defn,
+            ogr.FieldDefn(origin_field, ogr.OFTInteger)
+        ])
+
+    nb_features = 0
+    out_layer.StartTransaction()
+    gt_layer.SetSpatialFilter(tile_area.UnionCascaded())
+    for gt_feature in gt_layer:
+        gt_geom = gt_feature.GetGeometryRef()
+        if gt_geom is None:
+            continue
+        min_x, max_x, min_y, max_y = gt_geom.GetEnvelope()
+        for region, polygon, (r_min_x, r_max_x, r_min_y,
+                              r_max_y) in regions:
+            if (r_min_x > max_x or r_max_x < min_x or r_min_y > max_y
+                    or r_max_y < min_y):
+                continue
+            if not gt_geom.Intersects(polygon):
+                continue
+            gt_region = gt_geom.Intersection(polygon)
+            if gt_region is None or gt_region.IsEmpty():
+                continue
+            cloud_layer.SetSpatialFilter(gt_region)
+            for cloud_feature in cloud_layer:
+                cloud_geom = cloud_feature.GetGeometryRef()
+                if cloud_geom is None or not gt_region.Intersects(cloud_geom):
+                    continue
+                intersection = gt_region.Intersection(cloud_geom)
+                if intersection is None or not intersection.IsValid():
+                    continue
+                for part in geometry_parts(intersection, dimension):
+                    feature = ogr.Feature(out_layer.GetLayerDefn())
+                    feature.SetField(data_field.lower(),
+                                     gt_feature.GetField(data_field))
+                    feature.SetField(region_field.lower(), region)
+                    feature.SetField(origin_field,
+                                     gt_feature.GetFID() + fid_offset)
+                    feature.SetGeometry(part)
+                    out_layer.CreateFeature(feature)
+                    nb_features += 1
+    out_layer.CommitTransaction()
+    out_ds = gt_ds = cloud_ds = None
+    logger.info(f"{nb_features} features written in {output}")
+    if nb_features == 0:
+        ogr.GetDriverByName(get_driver_name(output)).DeleteDataSource(output)
+        return False
+    return True
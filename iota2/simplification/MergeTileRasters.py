@@ -27,7 +27,6 @@ logger = logging.getLogger(__name__)
 try:
     from iota2.Common import FileUtils as fut
     from iota2.Common import OtbAppBank as oa
-    from iota2.Common import Utils
 except ImportError:
     raise ImportError('Iota2 not well configured / installed')
 
@@ -102,23 +101,23 @@ def getTilesFiles(zone,
                   folder,
                   idTileField,
                   tileNamePrefix,
-                  localenv,
+                  localenv=None,
                   fieldzone="",
                   valuezone="",
                   driver="ESRI Shapefile",
                   debulvl="info",
                   logger=logger):
+    """rasters of tiles intersecting features of the zone file whose
+    fieldzone is valuezone
 
-    for ext in ['.shp', '.dbf', '.shx', '.prj']:
-        shutil.copy(os.path.splitext(zone)[0] + ext, localenv)
-
-    zone = os.path.join(localenv, os.path.basename(zone))
-
+    Tiles are looked up through the spatial index of the tiles file if it
+    exists (it is not built here, tasks run in parallel), zone file is read
+    in place.
+    """
     driver = ogr.GetDriverByName(driver)
     if isinstance(zone, str):
-        try:
-            shape = driver.Open(zone, 0)
-        except:
+        shape = driver.Open(zone, 0)
+        if shape is None:
             raise Exception('%s is not a vector file' % (zone))
 
         lyrZone = shape.GetLayer()
@@ -143,23 +142,22 @@ def getTilesFiles(zone,
     else:
         raise Exception('Field type %s not handled' % (fieldType))
 
-    if lyrZone.GetFeatureCount() != 0:
-        for featZone in lyrZone:
-
-            geomZone = featZone.GetGeometryRef()
-            nbinter = 0
-            # iterate tiles to find intersection
-            for featTile in lyrTiles:
-                geomTile = featTile.GetGeometryRef()
-                nbTile = int(featTile.GetField(idTileField))
-                if geomTile.Intersects(geomZone):
-                    nbinter += 1
-                    tilename = os.path.join(
-                        folder, tileNamePrefix + str(nbTile) + '.tif')
-                    if os.path.exists(tilename):
-                        listFilesTiles.append(tilename)
-                    else:
-                        logger.info('Tile file %s does not exist' % (nbTile))
+    for featZone in lyrZone:
+        geomZone = featZone.GetGeometryRef()
+        # the spatial filter resets the reading of tiles
+        lyrTiles.SetSpatialFilter(geomZone)
+        for featTile in lyrTiles:
+            geomTile = featTile.GetGeometryRef()
+            nbTile = int(featTile.GetField(idTileField))
+            if geomTile.Intersects(geomZone):
+                tilename = os.path.join(
+                    folder, tileNamePrefix + str(nbTile) + '.tif')
+                if tilename in listFilesTiles:
+                    continue
+                if os.path.exists(tilename):
+                    listFilesTiles.append(tilename)
+                else:
+                    logger.info('Tile file %s does not exist' % (nbTile))
 
     return listFilesTiles
 
@@ -395,53 +393,13 @@ def tilesRastersMergeVectSimp(path, tiles, out, grass, mmu, \
 
     # Get clip shafile layer
     if clipfile is not None:
-        for ext in ['.shp', '.dbf', '.shx', '.prj']:
-            shutil.copy(os.path.splitext(clipfile)[0] + ext, localenv)
-
-        clipfile = os.path.join(localenv, os.path.basename(clipfile))
-
-        if vf.getNbFeat(os.path.join(localenv, clipfile)) != 1:
-            clip = os.path.join(localenv, "clip.shp")
-            layer = vf.getFirstLayer(clipfile)
-            fieldType = vf.getFieldType(os.path.join(localenv, clipfile),
-                                        fieldclip)
-
-            if fieldType == str:
-                command = "ogr2ogr -sql \"SELECT * FROM %s WHERE %s = \'%s\'\" %s %s"%(layer, \
-                                                                                       fieldclip, \
-                                                                                       valueclip, \
-                                                                                       clip, \
-                                                                                       clipfile)
-                Utils.run(command)
-            elif fieldType == int or fieldType == float:
-                command = "ogr2ogr -sql \"SELECT * FROM %s WHERE %s = %s\" %s %s"%(layer, \
-                                                                                   fieldclip, \
-                                                                                   valueclip, \
-                                                                                   clip, \
-                                                                                   clipfile)
-                Utils.run(command)
-            else:
-                raise Exception('Field type %s not handled' % (fieldType))
-        else:
-            clip = os.path.join(localenv, clipfile)
-            print(
-                "'%s' shapefile has only one feature which will used to clip data"
-                % (clip))
-
-        # clip
         clipped = os.path.join(localenv, "clipped.shp")
-        command = "ogr2ogr -select cat -clipsrc %s %s %s"%(clip, \
-                                                           clipped, \
-                                                           outvect)
-        Utils.run(command)
+        zones = vas.getZones(clipfile, fieldclip, [valueclip])
+        vas.partitionVector(outvect, zones, {str(valueclip): clipped})
 
         for ext in ['.shp', '.dbf', '.shx', '.prj']:
             if os.path.exists(os.path.splitext(outvect)[0] + ext):
                 os.remove(os.path.splitext(outvect)[0] + ext)
-            if os.path.exists(os.path.splitext(clipfile)[0] + ext):
-                os.remove(os.path.splitext(clipfile)[0] + ext)
-            if os.path.exists(os.path.splitext(clip)[0] + ext):
-                os.remove(os.path.splitext(clip)[0] + ext)
 
     else:
         clipped = os.path.join(localenv, "merge.shp")
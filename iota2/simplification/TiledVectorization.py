@@ -0,0 +1,560 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# =========================================================================
+#   Program:   iota2
+#
+#   Copyright (c) CESBIO. All rights reserved.
+#
+#   See LICENSE for details.
+#
+#   This software is distributed WITHOUT ANY WARRANTY; without even
+#   the implied warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR
+#   PURPOSE.  See the above copyright notices for more information.
+#
+# =========================================================================
+"""
+Vectorization of a raster by cells of a grid (see GridGenerator).
+
+Cells are pixel-aligned windows of the raster, vectorized (and generalized)
+independently. Polygons cut by cell borders (seams) are then merged : pixels
+of the same class facing each other across a seam belong to the same
+polygon of the whole raster, each run of such pixels along a seam gives a
+point (middle of the run, on the seam) shared by the two polygons to merge.
+Seams are straight boundaries between nodes (cells corners are made nodes
+before generalization), they are kept by the topological generalization of
+cells so merged polygons have no gaps. The minimal mapping unit applies to
+polygons of each cell which do not touch a seam, then to merged polygons
+touching a seam (and only them), see removeSmallPolygons.
+
+Cells of a vector are stored in the directory <vector>_cells, described by
+the file cells.json.
+"""
+import os
+import json
+import logging
+
+import numpy as np
+from osgeo import gdal
+from osgeo import ogr
+
+LOGGER = logging.getLogger(__name__)
+
+CELLS_FILE = "cells.json"
+
+
+def cellsDirectory(vector):
+    """directory of the cells of a vector"""
+    return os.path.splitext(vector)[0] + "_cells"
+
+
+def readCells(vector):
+    """description of the cells of a vector, None if the vector was not
+    computed by cells
+    """
+    description = os.path.join(cellsDirectory(vector), CELLS_FILE)
+    if not os.path.exists(description):
+        return None
+    with open(description) as description_file:
+        return json.load(description_file)
+
+
+def writeCells(vector, description):
+    """write the description of the cells of a vector
+
+    description : dict
+        {"raster": raster vectorized, "geotransform": its geotransform,
+         "windows": [[xoff, yoff, xsize, ysize], ...],
+         "cells": [cell vector name or None (no polygons), ...],
+         "points": [[cell a, cell b, x, y, class], ...] (see seamPoints)}
+    """
+    with open(os.path.join(cellsDirectory(vector), CELLS_FILE),
+              "w") as description_file:
+        json.dump(description, description_file)
+
+
+def cellWindows(raster, grid):
+    """pixel windows of the raster covered by cells of a grid
+
+    Return
+    ------
+    list
+        [[xoff, yoff, xsize, ysize], ...], windows of adjacent cells share
+        their borders
+    """
+    raster_ds = gdal.Open(raster)
+    x_size, y_size = raster_ds.RasterXSize, raster_ds.RasterYSize
+    geotransform = raster_ds.GetGeoTransform()
+    raster_ds = None
+
+    def to_col(x_coord):
+        col = int(round((x_coord - geotransform[0]) / geotransform[1]))
+        return min(max(col, 0), x_size)
+
+    def to_row(y_coord):
+        row = int(round((y_coord - geotransform[3]) / geotransform[5]))
+        return min(max(row, 0), y_size)
+
+    grid_ds = ogr.Open(grid)
+    windows = []
+    for feature in grid_ds.GetLayer():
+        min_x, max_x, min_y, max_y = feature.GetGeometryRef().GetEnvelope()
+        col_min, col_max = to_col(min_x), to_col(max_x)
+        row_min, row_max = to_row(max_y), to_row(min_y)
+        if col_max > col_min and row_max > row_min:
+            windows.append(
+                [col_min, row_min, col_max - col_min, row_max - row_min])
+    grid_ds = None
+    return sorted(windows, key=lambda window: (window[1], window[0]))
+
+
+def cellCorners(window, geotransform):
+    """geographical coordinates of the corners of a window"""
+    xoff, yoff, xsize, ysize = window
+    return [(geotransform[0] + col * geotransform[1],
+             geotransform[3] + row * geotransform[5])
+            for col in [xoff, xoff + xsize] for row in [yoff, yoff + ysize]]
+
+
+def seamRuns(first_side, second_side):
+    """runs of equal non null values facing each other across a seam
+
+    Parameters
+    ----------
+    first_side : np.array
+        pixels along one side of the seam
+    second_side : np.array
+        pixels along the other side of the seam
+
+    Return
+    ------
+    list
+        [(first position, last position (excluded), value), ...]
+    """
+    values = np.where((first_side == second_side) & (first_side != 0),
+                      first_side, 0)
+    bounds = np.concatenate(
+        [[0], np.flatnonzero(np.diff(values) != 0) + 1, [len(values)]])
+    return [(int(start), int(end), int(values[start]))
+            for start, end in zip(bounds[:-1], bounds[1:])
+            if values[start] != 0]
+
+
+def seamPoints(raster, windows):
+    """points where polygons of adjacent cells must be merged
+
+    Return
+    ------
+    list
+        [[cell a, cell b, x, y, class], ...]
+    """
+    raster_ds = gdal.Open(raster)
+    band = raster_ds.GetRasterBand(1)
+    geotransform = raster_ds.GetGeoTransform()
+    points = []
+    for cell_a, (a_x, a_y, a_width, a_height) in enumerate(windows):
+        for cell_b, (b_x, b_y, b_width, b_height) in enumerate(windows):
+            if b_x == a_x + a_width:
+                # vertical seam, b is on the right of a
+                first, last = max(a_y, b_y), min(a_y + a_height,
+                                                 b_y + b_height)
+                if last <= first:
+                    continue
+                pixels = band.ReadAsArray(b_x - 1, first, 2, last - first)
+                for start, end, value in seamRuns(pixels[:, 0],
+                                                  pixels[:, 1]):
+                    points.append([
+                        cell_a, cell_b,
+                        geotransform[0] + b_x * geotransform[1],
+                        geotransform[3] +
+                        (first + (start + end) / 2.0) * geotransform[5], value
+                    ])
+            elif b_y == a_y + a_height:
+                # horizontal seam, b is below a
+                first, last = max(a_x, b_x), min(a_x + a_width,
+                                                 b_x + b_width)
+                if last <= first:
+                    continue
+                pixels = band.ReadAsArray(first, b_y - 1, last - first, 2)
+                for start, end, value in seamRuns(pixels[0], pixels[1]):
+                    points.append([
+                        cell_a, cell_b, geotransform[0] +
+                        (first + (start + end) / 2.0) * geotransform[1],
+                        geotransform[3] + b_y * geotransform[5], value
+                    ])
+    raster_ds = None
+    return points
+
+
+def cellSeams(window, windows, geotransform):
+    """sides of a window shared with other cells (seams)
+
+    Return
+    ------
+    list
+        [((x1, y1), (x2, y2)), ...] geographical segments
+    """
+    xoff, yoff, xsize, ysize = window
+    min_col = min(cell[0] for cell in windows)
+    max_col = max(cell[0] + cell[2] for cell in windows)
+    min_row = min(cell[1] for cell in windows)
+    max_row = max(cell[1] + cell[3] for cell in windows)
+
+    def to_coords(col, row):
+        return (geotransform[0] + col * geotransform[1],
+                geotransform[3] + row * geotransform[5])
+
+    seams = []
+    if xoff > min_col:
+        seams.append((to_coords(xoff, yoff), to_coords(xoff, yoff + ysize)))
+    if xoff + xsize < max_col:
+        seams.append((to_coords(xoff + xsize, yoff),
+                      to_coords(xoff + xsize, yoff + ysize)))
+    if yoff > min_row:
+        seams.append((to_coords(xoff, yoff), to_coords(xoff + xsize, yoff)))
+    if yoff + ysize < max_row:
+        seams.append((to_coords(xoff, yoff + ysize),
+                      to_coords(xoff + xsize, yoff + ysize)))
+    return seams
+
+
+def seamGeometry(seam):
+    """line of a seam (see cellSeams)"""
+    line = ogr.Geometry(ogr.wkbLineString)
+    for x_coord, y_coord in seam:
+        line.AddPoint_2D(x_coord, y_coord)
+    return line
+
+
+def touchesSeams(geometry, seams, tolerance):
+    """check if a polygon touches or crosses one of the seams (lines)"""
+    min_x, max_x, min_y, max_y = geometry.GetEnvelope()
+    for seam in seams:
+        s_min_x, s_max_x, s_min_y, s_max_y = seam.GetEnvelope()
+        if (s_min_x > max_x + tolerance or s_max_x < min_x - tolerance
+                or s_min_y > max_y + tolerance
+                or s_max_y < min_y - tolerance):
+            continue
+        if geometry.Distance(seam) <= tolerance:
+            return True
+    return False
+
+
+def removeSmallPolygons(polygons, mmu, candidates):
+    """remove polygons smaller than the minimal mapping unit, as v.clean
+    rmarea : a small polygon is merged with the neighbour sharing its
+    longest boundary. Small polygons without neighbour are kept.
+
+    Parameters
+    ----------
+    polygons : dict
+        {id : [geometry, class]}, updated in place
+    mmu : float
+        minimal mapping unit (area)
+    candidates : iterable
+        ids of polygons which can be removed, their neighbours must be in
+        polygons
+
+    Return
+    ------
+    int
+        number of removed polygons
+    """
+    mmu = float(mmu)
+    # polygons envelopes are indexed in a regular grid
+    cellsize = max(10.0 * mmu**0.5, 1.0)
+    grid = {}
+
+    def index(poly_id):
+        min_x, max_x, min_y, max_y = polygons[poly_id][0].GetEnvelope()
+        for col in range(int(min_x // cellsize), int(max_x // cellsize) + 1):
+            for row in range(int(min_y // cellsize),
+                             int(max_y // cellsize) + 1):
+                grid.setdefault((col, row), set()).add(poly_id)
+
+    def neighbours(poly_id):
+        min_x, max_x, min_y, max_y = polygons[poly_id][0].GetEnvelope()
+        found = set()
+        for col in range(int(min_x // cellsize), int(max_x // cellsize) + 1):
+            for row in range(int(min_y // cellsize),
+                             int(max_y // cellsize) + 1):
+                found |= grid.get((col, row), set())
+        return [
+            other for other in found
+            if other != poly_id and other in polygons
+        ]
+
+    for poly_id in polygons:
+        index(poly_id)
+    small = [
+        poly_id for poly_id in candidates
+        if poly_id in polygons and polygons[poly_id][0].GetArea() < mmu
+    ]
+    removed = 0
+    for poly_id in sorted(small, key=lambda poly: polygons[poly][0].GetArea()):
+        if poly_id not in polygons:
+            continue
+        geometry = polygons[poly_id][0]
+        if geometry.GetArea() >= mmu:
+            continue
+        boundary = geometry.Boundary()
+        best = None
+        for other in neighbours(poly_id):
+            other_geom = polygons[other][0]
+            if not geometry.Intersects(other_geom):
+                continue
+            shared = boundary.Intersection(other_geom.Boundary())
+            length = shared.Length() if shared is not None else 0.0
+            if length > 0 and (best is None or length > best[0]):
+                best = (length, other)
+        if best is None:
+            continue
+        merged = polygons[best[1]][0].Union(geometry)
+        if merged.GetGeometryCount() == 1 and ogr.GT_Flatten(
+                merged.GetGeometryType()) == ogr.wkbMultiPolygon:
+            merged = merged.GetGeometryRef(0).Clone()
+        polygons[best[1]][0] = merged
+        index(best[1])
+        del polygons[poly_id]
+        removed += 1
+    return removed
+
+
+def cellMinimalMappingUnit(vector, mmu, seams, tolerance, epsg, field="cat",
+                           logger=LOGGER):
+    """remove polygons of a cell smaller than the minimal mapping unit,
+    except polygons touching a seam : their area is only known once cells
+    are merged (see seamMinimalMappingUnit)
+
+    Parameters
+    ----------
+    vector : str
+        vector of the cell, rewritten
+    seams : list
+        seams of the cell (see cellSeams)
+    tolerance : float
+        maximum distance between a polygon and a seam it touches
+    """
+    from iota2.VectorTools.TileIntersection import create_output
+    from iota2.VectorTools.TileIntersection import open_to_read
+
+    seams = [seamGeometry(seam) for seam in seams]
+    data_source, layer = open_to_read(vector)
+    polygons = {
+        feature.GetFID():
+        [feature.GetGeometryRef().Clone(),
+         feature.GetField(field)]
+        for feature in layer if feature.GetGeometryRef() is not None
+    }
+    data_source = None
+    candidates = [
+        poly_id for poly_id, (geometry, _) in polygons.items()
+        if not touchesSeams(geometry, seams, tolerance)
+    ]
+    removed = removeSmallPolygons(polygons, mmu, candidates)
+
+    data_source, layer = create_output(vector, epsg, ogr.wkbPolygon,
+                                       [ogr.FieldDefn(field, ogr.OFTInteger)])
+    layer.StartTransaction()
+    for poly_id in sorted(polygons):
+        feature = ogr.Feature(layer.GetLayerDefn())
+        feature.SetField(field, polygons[poly_id][1])
+        feature.SetGeometry(polygons[poly_id][0])
+        layer.CreateFeature(feature)
+    layer.CommitTransaction()
+    data_source = None
+    logger.info("%s polygons smaller than %s removed from %s" %
+                (removed, mmu, vector))
+    return vector
+
+
+def seamMinimalMappingUnit(merged, out, mmu, seams, tolerance, epsg,
+                           field="cat", logger=LOGGER):
+    """remove polygons smaller than the minimal mapping unit among polygons
+    touching a seam, once cells are merged (see mergeCells)
+
+    Only polygons touching a seam and their neighbours are read in memory,
+    other polygons are copied.
+
+    Parameters
+    ----------
+    merged : str
+        merged vector
+    out : str
+        output vector
+    seams : list
+        seams of every cells (see cellSeams)
+    tolerance : float
+        maximum distance between a polygon and a seam it touches
+    """
+    from iota2.VectorTools.TileIntersection import create_output
+    from iota2.VectorTools.TileIntersection import ensure_spatial_index
+    from iota2.VectorTools.TileIntersection import open_to_read
+
+    ensure_spatial_index(merged)
+    data_source, layer = open_to_read(merged)
+    polygons = {}
+    candidates = set()
+    for seam in set(seams):
+        (x_1, y_1), (x_2, y_2) = seam
+        line = seamGeometry(seam)
+        layer.SetSpatialFilterRect(
+            min(x_1, x_2) - tolerance,
+            min(y_1, y_2) - tolerance,
+            max(x_1, x_2) + tolerance,
+            max(y_1, y_2) + tolerance)
+        for feature in layer:
+            geometry = feature.GetGeometryRef()
+            if geometry is None or feature.GetFID() in candidates:
+                continue
+            if geometry.Distance(line) <= tolerance:
+                candidates.add(feature.GetFID())
+                polygons[feature.GetFID()] = [
+                    geometry.Clone(), feature.GetField(field)
+                ]
+    small = [
+        poly_id for poly_id in candidates
+        if polygons[poly_id][0].GetArea() < float(mmu)
+    ]
+    for poly_id in small:
+        min_x, max_x, min_y, max_y = polygons[poly_id][0].GetEnvelope()
+        layer.SetSpatialFilterRect(min_x - tolerance, min_y - tolerance,
+                                   max_x + tolerance, max_y + tolerance)
+        for feature in layer:
+            if (feature.GetFID() not in polygons
+                    and feature.GetGeometryRef() is not None):
+                polygons[feature.GetFID()] = [
+                    feature.GetGeometryRef().Clone(),
+                    feature.GetField(field)
+                ]
+    layer.SetSpatialFilter(None)
+    read = set(polygons)
+    removed = removeSmallPolygons(polygons, mmu, small)
+
+    out_ds, out_layer = create_output(out, epsg, ogr.wkbPolygon,
+                                      [ogr.FieldDefn(field, ogr.OFTInteger)])
+    out_layer.StartTransaction()
+    for feature in layer:
+        fid = feature.GetFID()
+        if fid in read and fid not in polygons:
+            continue
+        geometry = (polygons[fid][0]
+                    if fid in polygons else feature.GetGeometryRef())
+        if geometry is None:
+            continue
+        out_feature = ogr.Feature(out_layer.GetLayerDefn())
+        out_feature.SetField(field, feature.GetField(field))
+        out_feature.SetGeometry(geometry)
+        out_layer.CreateFeature(out_feature)
+    out_layer.CommitTransaction()
+    out_ds = data_source = None
+    logger.info("%s polygons touching seams (%s read) smaller than %s "
+                "removed in %s" % (removed, len(read), mmu, out))
+    return out
+
+
+def locatePolygon(layer, x_coord, y_coord, value, tolerance, field="cat"):
+    """FID of the polygon of class 'value' nearest to a point (at a distance
+    lower than tolerance), None if there is no such polygon
+    """
+    point = ogr.Geometry(ogr.wkbPoint)
+    point.AddPoint_2D(x_coord, y_coord)
+    layer.SetSpatialFilterRect(x_coord - tolerance, y_coord - tolerance,
+                               x_coord + tolerance, y_coord + tolerance)
+    best = None
+    for feature in layer:
+        geometry = feature.GetGeometryRef()
+        if geometry is None or feature.GetField(field) != value:
+            continue
+        distance = geometry.Distance(point)
+        if distance <= tolerance and (best is None or distance < best[0]):
+            best = (distance, feature.GetFID())
+    layer.SetSpatialFilter(None)
+    return None if best is None else best[1]
+
+
+def mergeCells(cells, points, out, tolerance, epsg, field="cat",
+               logger=LOGGER):
+    """merge vectors of cells, polygons meeting at seam points are merged
+
+    Parameters
+    ----------
+    cells : list
+        vector of each cell (None if the cell has no polygons)
+    points : list
+        seam points (see seamPoints)
+    out : str
+        output vector
+    tolerance : float
+        maximum distance between a seam point and polygons to merge
+    epsg : int
+        epsg code of the output
+    field : str
+        class field
+    """
+    from iota2.Common.UnionFind import find
+    from iota2.Common.UnionFind import union
+    from iota2.VectorTools.TileIntersection import create_output
+    from iota2.VectorTools.TileIntersection import geometry_parts
+    from iota2.VectorTools.TileIntersection import open_to_read
+
+    sources = [open_to_read(cell) if cell else (None, None) for cell in cells]
+
+    parent = {}
+    for cell_a, cell_b, x_coord, y_coord, value in points:
+        layer_a, layer_b = sources[cell_a][1], sources[cell_b][1]
+        if layer_a is None or layer_b is None:
+            continue
+        fid_a = locatePolygon(layer_a, x_coord, y_coord, value, tolerance,
+                              field)
+        fid_b = locatePolygon(layer_b, x_coord, y_coord, value, tolerance,
+                              field)
+        if fid_a is not None and fid_b is not None:
+            union(parent, (cell_a, fid_a), (cell_b, fid_b))
+    groups = {}
+    for member in list(parent.keys()):
+        groups.setdefault(find(parent, member), []).append(member)
+    roots = {
+        member: root
+        for root, members in groups.items() for member in members + [root]
+    }
+
+    data_source, layer = create_output(
+        out, epsg, ogr.wkbPolygon, [ogr.FieldDefn(field, ogr.OFTInteger)])
+    layer.StartTransaction()
+
+    def write(geometry, value):
+        feature = ogr.Feature(layer.GetLayerDefn())
+        feature.SetField(field, value)
+        feature.SetGeometry(geometry)
+        layer.CreateFeature(feature)
+
+    merged = {}
+    for cell, (_, cell_layer) in enumerate(sources):
+        if cell_layer is None:
+            continue
+        for feature in cell_layer:
+            geometry = feature.GetGeometryRef()
+            if geometry is None:
+                continue
+            root = roots.get((cell, feature.GetFID()))
+            if root is None:
+                write(geometry, feature.GetField(field))
+                continue
+            parts, _ = merged.setdefault(root,
+                                         ([], feature.GetField(field)))
+            parts += geometry_parts(geometry, 2)
+    for parts, value in merged.values():
+        geometry = ogr.Geometry(ogr.wkbMultiPolygon)
+        for part in parts:
+            geometry.AddGeometry(part)
+        geometry = geometry.UnionCascaded()
+        if geometry.GetGeometryCount() == 1 and ogr.GT_Flatten(
+                geometry.GetGeometryType()) == ogr.wkbMultiPolygon:
+            geometry = geometry.GetGeometryRef(0).Clone()
+        write(geometry, value)
+    layer.CommitTransaction()
+    data_source = sources = None
+    logger.info("%s polygons merged into %s across cells in %s" %
+                (len(roots), len(groups), out))
+    return out
@@ -13,7 +13,6 @@ import logging
 
 logger = logging.getLogger(__name__)
 try:
-    from iota2.Common import Utils
     from iota2.VectorTools import DeleteDuplicateGeometriesSqlite as ddg
     from iota2.VectorTools import checkGeometryAreaThreshField as checkGeom
     from iota2.VectorTools import vector_functions as vf
@@ -99,13 +98,23 @@ def topologicalPolygonize(
         debulvl="info",
         epsg="2154",
         logger=logger,
+        nb_workers=1,
 ):
+    """
+    Vectorization of a raster file with Grass GIS (r.to.vect).
 
+    If several workers are available, the raster is vectorized by cells of
+    a grid in parallel (see tiledPolygonize).
+    """
     timeinit = time.time()
 
     if out == "":
         out = os.path.splitext(raster)[0] + ".shp"
 
+    if nb_workers > 1 and not os.path.exists(out) and os.path.exists(raster):
+        return tiledPolygonize(path, grasslib, raster, angle, out, epsg,
+                               nb_workers, debulvl, logger)
+
     if not os.path.exists(out) and os.path.exists(raster):
         print("Polygonize of raster file %s" % (os.path.basename(raster)))
         logger.info("Polygonize of raster file %s" %
@@ -117,7 +126,7 @@ def topologicalPolygonize(
             shutil.rmtree(localenv)
         os.mkdir(localenv)
 
-        init_grass(localenv, grasslib, debulvl)
+        init_grass(localenv, grasslib, debulvl, epsg)
 
         # classification raster import
         gscript.run_command("r.in.gdal",
@@ -205,13 +214,31 @@ def generalizeVector(
         debulvl="info",
         epsg="2154",
         logger=logger,
+        nodes=None,
+        nb_workers=1,
 ):
+    """
+    Generalization (v.generalize) of a vector file with Grass GIS.
+
+    nodes : list
+        [(x, y), ...] boundaries are broken on these points, which become
+        nodes kept by the generalization
+    nb_workers : int
+        if the vector was computed by cells (see tiledPolygonize), cells are
+        generalized in parallel (see tiledGeneralize)
+    """
+    from iota2.simplification import TiledVectorization as tv
 
     timeinit = time.time()
 
     if out == "":
         out = os.path.splitext(vector)[0] + "_%s.shp" % (method)
 
+    if (nb_workers > 1 and not os.path.exists(out)
+            and tv.readCells(vector) is not None):
+        return tiledGeneralize(path, grasslib, vector, paramgene, method, mmu,
+                               out, epsg, nb_workers, debulvl, logger)
+
     if not os.path.exists(out) and os.path.exists(vector):
         logger.info("Generalize (%s) of vector file %s" %
                     (method, os.path.basename(vector)))
@@ -237,6 +264,15 @@ def generalizeVector(
             overwrite=True,
         )
 
+        if nodes:
+            gscript.run_command(
+                "v.edit",
+                map="%s@datas" % (layer),
+                tool="break",
+                type="boundary",
+                coords=",".join("%s,%s" % (x, y) for x, y in nodes),
+            )
+
         try:
             gscript.run_command(
                 "v.generalize",
@@ -296,6 +332,206 @@ def generalizeVector(
     return out
 
 
+def polygonizeCell(path, grasslib, raster, window, angle, out, epsg,
+                   debulvl="info"):
+    """
+    Vectorization of a window [xoff, yoff, xsize, ysize] of a raster
+
+    Return
+    ------
+    the output vector, None if the window has no polygons
+    """
+    from osgeo import gdal
+
+    cell = os.path.splitext(out)[0] + ".vrt"
+    gdal.Translate(cell, raster, format="VRT", srcWin=window)
+    topologicalPolygonize(path, grasslib, cell, angle, out, debulvl=debulvl,
+                          epsg=epsg)
+    os.remove(cell)
+    return out if os.path.exists(out) else None
+
+
+def tiledPolygonize(path,
+                    grasslib,
+                    raster,
+                    angle,
+                    out,
+                    epsg="2154",
+                    nb_workers=2,
+                    debulvl="info",
+                    logger=logger):
+    """
+    Vectorization of a raster by cells of a grid (GridGenerator), cells
+    are vectorized in parallel then polygons cut by cells borders are merged
+    (see TiledVectorization)
+
+    in :
+        path : directory where do treatments
+        grasslib : install directory of Grass GIS
+        raster : classification raster
+        angle : smooth corners of pixels (45°)
+        out : output vector, cells are kept in the directory <out>_cells
+        epsg : epsg code
+        nb_workers : number of cells vectorized in parallel
+    """
+    import math
+    import multiprocessing as mp
+    from osgeo import gdal
+    from iota2.simplification import GridGenerator as gridg
+    from iota2.simplification import TiledVectorization as tv
+
+    timeinit = time.time()
+    cells_dir = tv.cellsDirectory(out)
+    if os.path.exists(cells_dir):
+        shutil.rmtree(cells_dir)
+    os.mkdir(cells_dir)
+
+    # more cells than workers, to balance the load
+    grid = os.path.join(cells_dir, "grid.shp")
+    gridg.grid_generate(grid, int(math.ceil(math.sqrt(2 * nb_workers))),
+                        int(epsg), raster)
+    windows = tv.cellWindows(raster, grid)
+    name = os.path.splitext(os.path.basename(out))[0]
+    cells_args = [(path, grasslib, raster, window, angle,
+                   os.path.join(cells_dir, "%s_cell_%s.shp" % (name, cell)),
+                   epsg, debulvl) for cell, window in enumerate(windows)]
+    logger.info("Polygonize of raster file %s by %s cells" %
+                (os.path.basename(raster), len(windows)))
+    with mp.Pool(processes=min(nb_workers, len(windows)),
+                 maxtasksperchild=1) as pool:
+        cells = pool.starmap(polygonizeCell, cells_args)
+
+    geotransform = gdal.Open(raster).GetGeoTransform()
+    description = {
+        "raster": raster,
+        "geotransform": list(geotransform),
+        "windows": windows,
+        "cells": [os.path.basename(cell) if cell else None for cell in cells],
+        "points": tv.seamPoints(raster, windows)
+    }
+    tv.writeCells(out, description)
+    tv.mergeCells(cells, description["points"], out,
+                  abs(geotransform[1]) / 4.0, int(epsg))
+
+    logger.info(" ".join([
+        " : ".join(
+            ["Tiled vectorization and merge",
+             str(time.time() - timeinit)]),
+        "seconds",
+    ]))
+    return out
+
+
+def generalizeCell(path, grasslib, vector, paramgene, method, mmu, out, epsg,
+                   nodes, seams, tolerance, debulvl="info"):
+    """
+    Generalization of the vector of a cell, the minimal mapping unit applies
+    to polygons which do not touch the seams of the cell
+
+    Return
+    ------
+    the output vector, None if the cell has no polygons
+    """
+    from iota2.simplification import TiledVectorization as tv
+
+    generalizeVector(path,
+                     grasslib,
+                     vector,
+                     paramgene,
+                     method,
+                     "",
+                     out=out,
+                     debulvl=debulvl,
+                     epsg=epsg,
+                     nodes=nodes)
+    if not os.path.exists(out):
+        return None
+    if mmu != "":
+        tv.cellMinimalMappingUnit(out, mmu, seams, tolerance, int(epsg))
+    return out
+
+
+def tiledGeneralize(path,
+                    grasslib,
+                    vector,
+                    paramgene,
+                    method,
+                    mmu,
+                    out,
+                    epsg="2154",
+                    nb_workers=2,
+                    debulvl="info",
+                    logger=logger):
+    """
+    Generalization of a vector computed by cells (see tiledPolygonize) :
+    cells are generalized in parallel, their corners being kept as nodes,
+    then polygons cut by cells borders are merged. The minimal mapping unit
+    (mmu) applies to polygons of each cell which do not touch a seam, then
+    to merged polygons touching a seam, as for a vector generalized in one
+    piece.
+    """
+    import multiprocessing as mp
+    from iota2.simplification import TiledVectorization as tv
+
+    timeinit = time.time()
+    description = tv.readCells(vector)
+    in_dir = tv.cellsDirectory(vector)
+    cells_dir = tv.cellsDirectory(out)
+    if os.path.exists(cells_dir):
+        shutil.rmtree(cells_dir)
+    os.mkdir(cells_dir)
+
+    name = os.path.splitext(os.path.basename(out))[0]
+    tolerance = abs(description["geotransform"][1]) / 4.0
+    seams = [
+        tv.cellSeams(window, description["windows"],
+                     description["geotransform"])
+        for window in description["windows"]
+    ]
+    cells_args = [
+        (path, grasslib, os.path.join(in_dir, cell), paramgene, method, mmu,
+         os.path.join(cells_dir, "%s_cell_%s.shp" % (name, index)), epsg,
+         tv.cellCorners(window, description["geotransform"]), seams[index],
+         tolerance, debulvl)
+        for index, (cell, window) in enumerate(
+            zip(description["cells"], description["windows"])) if cell
+    ]
+    logger.info("Generalize (%s) of vector file %s by %s cells" %
+                (method, os.path.basename(vector), len(cells_args)))
+    with mp.Pool(processes=max(1, min(nb_workers, len(cells_args))),
+                 maxtasksperchild=1) as pool:
+        generalized = iter(pool.starmap(generalizeCell, cells_args))
+    cells = [next(generalized) if cell else None
+             for cell in description["cells"]]
+
+    description["cells"] = [
+        os.path.basename(cell) if cell else None for cell in cells
+    ]
+    tv.writeCells(out, description)
+    merged = out
+    if mmu != "":
+        merged = os.path.join(cells_dir, "%s_merged.shp" % (name))
+    tv.mergeCells(cells, description["points"], merged, tolerance, int(epsg))
+    if mmu != "":
+        # parts of a polygon cut by a seam are only removed if the merged
+        # polygon is smaller than the mmu
+        tv.seamMinimalMappingUnit(
+            merged, out, mmu, [seam for cell in seams for seam in cell],
+            tolerance, int(epsg))
+        for ext in [".shp", ".dbf", ".shx", ".prj", ".qix"]:
+            if os.path.exists(os.path.splitext(merged)[0] + ext):
+                os.remove(os.path.splitext(merged)[0] + ext)
+
+    logger.info(" ".join([
+        " : ".join([
+            "Tiled generalization (%s) and merge" % (method),
+            str(time.time() - timeinit)
+        ]),
+        "seconds",
+    ]))
+    return out
+
+
 def getFieldValues(shpfile, field):
 
     classes = []
@@ -309,6 +545,165 @@ def getFieldValues(shpfile, field):
     return classes
 
 
+def getZones(clipfile, clipfield, clipvalues):
+    """geometries of zones (union of the features of each value)
+
+    Return
+    ------
+    dict
+        {str(value) : ogr.Geometry}
+    """
+    from osgeo import ogr
+
+    clipvalues = [str(value) for value in clipvalues]
+    zones = {}
+    ds = vf.openToRead(clipfile)
+    layer = ds.GetLayer()
+    for feature in layer:
+        value = str(feature.GetField(clipfield))
+        geom = feature.GetGeometryRef()
+        if value not in clipvalues or geom is None:
+            continue
+        if value in zones:
+            zones[value] = zones[value].Union(geom)
+        else:
+            zones[value] = geom.Clone()
+    for value in clipvalues:
+        if value not in zones:
+            logger.warning("Value %s not found in field %s of %s" %
+                           (value, clipfield, clipfile))
+    return zones
+
+
+def zonesIndex(zones):
+    """index bounding boxes of zones in a regular grid which cell size is
+    the biggest zone bounding box
+
+    Return
+    ------
+    tuple
+        (cell size, {cell : [(value, envelope), ...]})
+    """
+    envelopes = {value: geom.GetEnvelope() for value, geom in zones.items()}
+    cellsize = max([max(maxx - minx, maxy - miny)
+                    for minx, maxx, miny, maxy in envelopes.values()] + [0])
+    cellsize = cellsize if cellsize > 0 else 1.0
+    grid = {}
+    for value, (minx, maxx, miny, maxy) in envelopes.items():
+        for col in range(int(minx // cellsize), int(maxx // cellsize) + 1):
+            for row in range(int(miny // cellsize), int(maxy // cellsize) + 1):
+                grid.setdefault((col, row), []).append(
+                    (value, (minx, maxx, miny, maxy)))
+    return cellsize, grid
+
+
+def zonesCandidates(index, envelope):
+    """values of zones whose bounding box intersects envelope"""
+    cellsize, grid = index
+    minx, maxx, miny, maxy = envelope
+    candidates = set()
+    for col in range(int(minx // cellsize), int(maxx // cellsize) + 1):
+        for row in range(int(miny // cellsize), int(maxy // cellsize) + 1):
+            for value, (zminx, zmaxx, zminy, zmaxy) in grid.get((col, row),
+                                                                []):
+                if (zminx <= maxx and zmaxx >= minx and zminy <= maxy
+                        and zmaxy >= miny):
+                    candidates.add(value)
+    return candidates
+
+
+def partitionVector(vector, zones, outputs, field="cat"):
+    """clip features of vector with every zones, in a single pass over
+    features of vector
+
+    Parameters
+    ----------
+    vector : str
+        input vector file (polygons)
+    zones : dict
+        {value : zone geometry}, see getZones
+    outputs : dict
+        {value : output shapefile}
+    field : str
+        field of vector copied in outputs (as ogr2ogr -select)
+
+    Return
+    ------
+    dict
+        {value : number of features written}
+    """
+    from osgeo import ogr
+    from iota2.VectorTools.TileIntersection import geometry_parts
+
+    driver = ogr.GetDriverByName("ESRI Shapefile")
+    ds = vf.openToRead(vector)
+    layer = ds.GetLayer()
+    layerdefn = layer.GetLayerDefn()
+    fielddefn = layerdefn.GetFieldDefn(layerdefn.GetFieldIndex(field))
+
+    outds = {}
+    outlayers = {}
+    for value in zones:
+        if os.path.exists(outputs[value]):
+            driver.DeleteDataSource(outputs[value])
+        outds[value] = driver.CreateDataSource(outputs[value])
+        outlayers[value] = outds[value].CreateLayer(
+            os.path.splitext(os.path.basename(outputs[value]))[0],
+            layer.GetSpatialRef(), ogr.wkbPolygon)
+        outlayers[value].CreateField(fielddefn)
+        outlayers[value].StartTransaction()
+
+    index = zonesIndex(zones)
+    counts = {value: 0 for value in zones}
+    for feature in layer:
+        geom = feature.GetGeometryRef()
+        if geom is None:
+            continue
+        for value in zonesCandidates(index, geom.GetEnvelope()):
+            zone = zones[value]
+            if not zone.Intersects(geom):
+                continue
+            if zone.Contains(geom):
+                clipped = geom
+            else:
+                parts = geometry_parts(zone.Intersection(geom), 2)
+                if not parts:
+                    continue
+                clipped = parts[0]
+                if len(parts) > 1:
+                    clipped = ogr.Geometry(ogr.wkbMultiPolygon)
+                    for part in parts:
+                        clipped.AddGeometry(part)
+            outfeature = ogr.Feature(outlayers[value].GetLayerDefn())
+            outfeature.SetField(field, feature.GetField(field))
+            outfeature.SetGeometry(clipped)
+            outlayers[value].CreateFeature(outfeature)
+            counts[value] += 1
+
+    for value in zones:
+        outlayers[value].CommitTransaction()
+    outds = outlayers = ds = None
+    return counts
+
+
+def cleanClippedZone(clipped, out):
+    """delete duplicate and invalid geometries of a clipped zone, add its
+    area field (hectare) and copy it to out
+    """
+    # Delete duplicate geometries
+    ddg.deleteDuplicateGeometriesSqlite(clipped)
+
+    # Check geom
+    vf.checkValidGeom(clipped)
+
+    # Add Field Area (hectare)
+    afa.addFieldArea(clipped, 10000)
+
+    for ext in [".shp", ".shx", ".dbf", ".prj"]:
+        shutil.copy(os.path.splitext(clipped)[0] + ext,
+                    os.path.splitext(out)[0] + ext)
+
+
 def clipVectorfile(path,
                    vector,
                    clipfile,
@@ -316,19 +711,34 @@ def clipVectorfile(path,
                    clipvalue="",
                    outpath="",
                    prefix="",
+                   nbcore=1,
                    debulvl="info",
                    logger=logger):
+    """clip vector with zones of clipfile whose clipfield is clipvalue
+
+    clipvalue can be a list of values, vector is then partitioned into
+    every zone outputs (<prefix>_<value>.shp) in a single pass, zones are
+    then cleaned by nbcore processes
+    """
+    import multiprocessing as mp
 
     timeinit = time.time()
 
+    clipvalues = clipvalue if isinstance(clipvalue, list) else [clipvalue]
     if outpath == "":
-        out = os.path.join(os.path.dirname(vector),
-                           "%s_%s.shp" % (prefix, str(clipvalue)))
-    else:
-        out = os.path.join(outpath, "%s_%s.shp" % (prefix, str(clipvalue)))
+        outpath = os.path.dirname(vector)
+    outs = {
+        str(value): os.path.join(outpath, "%s_%s.shp" % (prefix, str(value)))
+        for value in clipvalues
+    }
+    outs = {value: out for value, out in outs.items() if not os.path.exists(out)}
+    if not outs:
+        logger.info("Output vector files '%s' already exist" %
+                    (", ".join(str(value) for value in clipvalues)))
+        return
 
     epsgin = vf.get_vector_proj(vector)
-    if vf.get_vector_proj(clipfile) != epsgin:
+    if clipfile is not None and vf.get_vector_proj(clipfile) != epsgin:
         logger.error(
             "Land cover vector file and clip file projections are different please provide a clip file with same projection as Land cover file (EPSG = %s)"
             % (epsgin))
@@ -343,122 +753,60 @@ def clipVectorfile(path,
             os.path.splitext(tmp)[0] + ext,
             os.path.splitext(vector)[0] + ext)
 
-    if not os.path.exists(out):
-        if clipfile is not None:
-            logger.info("Clip vector file %s with %s (%s == %s)" % (
-                os.path.basename(vector),
-                os.path.basename(clipfile),
-                clipfield,
-                clipvalue,
-            ))
-            print("Clip vector file %s with %s (%s == %s)" % (
-                os.path.basename(vector),
-                os.path.basename(clipfile),
-                clipfield,
-                clipvalue,
-            ))
-
-            # local environnement
-            localenv = os.path.join(path, "tmp%s" % (str(clipvalue)))
-
-            if os.path.exists(localenv):
-                shutil.rmtree(localenv)
-            os.mkdir(localenv)
+    # local environnement
+    localenv = os.path.join(path, "tmp%s" % ("_".join(outs.keys())
+                                             if len(outs) == 1 else "zones"))
+    if os.path.exists(localenv):
+        shutil.rmtree(localenv)
+    os.mkdir(localenv)
 
+    clippeds = {
+        value: os.path.join(localenv, "clipped_%s.shp" % (value))
+        for value in outs
+    }
+    if clipfile is not None:
+        logger.info("Clip vector file %s with %s (%s in %s)" % (
+            os.path.basename(vector),
+            os.path.basename(clipfile),
+            clipfield,
+            ", ".join(outs.keys()),
+        ))
+        zones = getZones(clipfile, clipfield, list(outs.keys()))
+        partitionVector(vector, zones, clippeds)
+        clippeds = {value: clippeds[value] for value in zones}
+    else:
+        for value, clipped in clippeds.items():
             for ext in [".shp", ".dbf", ".shx", ".prj"]:
-                shutil.copy(os.path.splitext(clipfile)[0] + ext, localenv)
-
-            clipfile = os.path.join(localenv, os.path.basename(clipfile))
-
-            if vf.getNbFeat(clipfile) != 1:
-                clip = os.path.join(localenv, "clip.shp")
-                layer = vf.getFirstLayer(clipfile)
-                fieldType = vf.getFieldType(os.path.join(localenv, clipfile),
-                                            clipfield)
-
-                if fieldType == str:
-                    command = (
-                        "ogr2ogr -sql \"SELECT * FROM %s WHERE %s = '%s'\" %s %s"
-                        % (layer, clipfield, clipvalue, clip, clipfile))
-                    Utils.run(command)
-                elif fieldType == int or fieldType == float:
-                    command = 'ogr2ogr -sql "SELECT * FROM %s WHERE %s = %s" %s %s' % (
-                        layer,
-                        clipfield,
-                        clipvalue,
-                        clip,
-                        clipfile,
-                    )
-
-                    Utils.run(command)
-                else:
-                    raise Exception("Field type %s not handled" % (fieldType))
-            else:
-                clip = os.path.join(path, clipfile)
-                logger.info(
-                    "'%s' shapefile has only one feature which will used to clip data"
-                    % (clip))
-
-            # clip
-            clipped = os.path.join(localenv, "clipped.shp")
-
-            command = "ogr2ogr -select cat -clipsrc %s %s %s" % (clip, clipped,
-                                                                 vector)
-
-            Utils.run(command)
-
-        else:
-            clipped = os.path.join(localenv, "merge.shp")
-
-        timeclip = time.time()
-        logger.info(" ".join([
-            " : ".join(["Clip final shapefile",
-                        str(timeclip - timeinit)]),
-            "seconds",
-        ]))
+                shutil.copy(os.path.splitext(vector)[0] + ext,
+                            os.path.splitext(clipped)[0] + ext)
 
-        # Delete duplicate geometries
-        ddg.deleteDuplicateGeometriesSqlite(clipped)
-
-        for ext in [".shp", ".shx", ".dbf", ".prj"]:
-            shutil.copy(
-                os.path.splitext(clipped)[0] + ext,
-                os.path.join(localenv, "clean") + ext,
-            )
-            os.remove(os.path.splitext(clipped)[0] + ext)
-
-        timedupli = time.time()
-        logger.info(" ".join([
-            " : ".join(
-                ["Delete duplicated geometries",
-                 str(timedupli - timeclip)]),
-            "seconds",
-        ]))
-
-        # Check geom
-        vf.checkValidGeom(os.path.join(localenv, "clean.shp"))
-
-        # Add Field Area (hectare)
-        afa.addFieldArea(os.path.join(localenv, "clean.shp"), 10000)
-
-        for ext in [".shp", ".shx", ".dbf", ".prj"]:
-            shutil.copy(os.path.join(localenv, "clean" + ext),
-                        os.path.splitext(out)[0] + ext)
-
-        shutil.rmtree(localenv)
-
-        timeclean = time.time()
-        logger.info(" ".join([
-            " : ".join([
-                "Clean empty geometries and compute areas (ha)",
-                str(timeclean - timedupli),
-            ]),
-            "seconds",
-        ]))
+    timeclip = time.time()
+    logger.info(" ".join([
+        " : ".join(["Clip final shapefile",
+                    str(timeclip - timeinit)]),
+        "seconds",
+    ]))
 
+    zones_args = [(clipped, outs[value])
+                  for value, clipped in clippeds.items()]
+    nb_workers = max(1, min(int(nbcore), len(zones_args)))
+    if nb_workers == 1:
+        for clipped, out in zones_args:
+            cleanClippedZone(clipped, out)
     else:
+        with mp.Pool(processes=nb_workers) as pool:
+            pool.starmap(cleanClippedZone, zones_args)
+
+    shutil.rmtree(localenv)
 
-        logger.info("Output vector file '%s' already exists" % (out))
+    timeclean = time.time()
+    logger.info(" ".join([
+        " : ".join([
+            "Delete duplicated geometries, clean empty geometries and compute areas (ha)",
+            str(timeclean - timeclip),
+        ]),
+        "seconds",
+    ]))
 
 
 def simplification(
@@ -17,31 +17,22 @@
 import os
 import sys
 import argparse
+import shutil
 import time
 import csv
-import sqlite3
+from collections import OrderedDict
 from zipfile import ZipFile
 import logging
 logger = logging.getLogger(__name__)
 
-try:
-    from Common import Utils
-except ImportError:
-    raise ImportError('Iota2 not well configured / installed')
-    
-def importstats(csvstore, sqlite):
+# (code, alias) of classes used when no nomenclature is given
+DEFAULT_CLASSES = [(12, "Hiver"), (11, "Ete"), (31, "Feuillus"),
+                   (32, "Coniferes"), (34, "Pelouse"), (36, "Landes"),
+                   (41, "UrbainDens"), (42, "UrbainDiff"), (43, "ZoneIndCom"),
+                   (44, "Route"), (46, "PlageDune"), (45, "SurfMin"),
+                   (51, "Eau"), (53, "GlaceNeige"), (211, "Prairie"),
+                   (221, "Vergers"), (222, "Vignes")]
 
-    print(sqlite)
-    con = sqlite3.connect(sqlite)
-    cur = con.cursor()
-    cur.execute("CREATE TABLE stats (idstats integer, info text, stat text, class integer, value real);")
-    
-    with open(csvstore, 'r') as f:
-        reader = csv.reader(f)
-        cur = con.cursor()
-        cur.executemany("INSERT INTO stats(idstats, info, stat, class, value) VALUES (?, ?, ?, ?, ?);", reader)        
-        con.commit()
-        con.close()
 
 def getStatsList(path):
 
@@ -54,403 +45,178 @@ def getStatsList(path):
     return listcsv
 
 def manageClassName(nomenclature):
+    """(code, alias) of classes of the last level of a nomenclature file
+    (cfg format), the 255 code (nodata) is ignored
+    """
+    from iota2.simplification import nomenclature as nomenc_tools
 
-    exp2 = exp3 = ""
-    exp = []
-    with open(nomenclature, 'r') as f:
-        for line in f.readlines():
-            line = line.strip().rstrip('\r\n')
-            if int(line.split(":")[1]) != 255:
-                exp.append("COALESCE(CAST(ROUND(out%s.value, %s) AS FLOAT),0) AS %s "%(line.split(":")[1], line.split(":")[1], line.split(":")[2]))
-                exp2 += 'LEFT JOIN (select idstats, value from stats where info = "classif" and class = %s) out%s ON s.idstats = out%s.idstats '%(line.split(":")[1], line.split(":")[1], line.split(":")[1])
-                exp3 += "CAST(%s AS NUMERIC(6,2)) AS %s, "%(line.split(":")[2], line.split(":")[2])
-        
-    return ",".join(exp), exp2, exp3
-
-def pivotstatsdyn(sqlite, nomenclature):
-
-    exp1, exp2, exp3 = manageClassName(nomenclature)
-    
-    con = sqlite3.connect(sqlite)
-    cur = con.cursor()
-    # Pivot statistics table
-    cur.execute('CREATE TABLE statsfinal AS '\
-                'SELECT s.idstats + 1 as idstats, '\
-                'confmean.value as mconf, '\
-                'validmean.value as valmean, '\
-                'validstd.value as valstd, %s'\
-                'FROM '\
-                '(SELECT '\
-                'idstats '\
-                'FROM stats '\
-                'GROUP BY idstats '\
-                'ORDER BY idstats) s ' \
-                'LEFT JOIN '
-                '(select idstats, value from stats where info = "confidence" and stat = "mean") confmean ' \
-                'ON s.idstats = confmean.idstats '\
-                'LEFT JOIN '
-                '(select idstats, value from stats where info = "validity" and stat = "mean") validmean ' \
-                'ON s.idstats = validmean.idstats '\
-                'LEFT JOIN '
-                '(select idstats, value from stats where info = "validity" and stat = "std") validstd ' \
-                'ON s.idstats = validstd.idstats %s'%(exp1, exp2))
-            
-def pivotstats(sqlite):
-
-    con = sqlite3.connect(sqlite)
-    cur = con.cursor()
-    # Pivot statistics table
-    cur.execute('CREATE TABLE statsfinal AS '\
-                'SELECT s.idstats + 1 as idstats, '\
-                'confmean.value as mconf, '\
-                'validmean.value as valmean, '\
-                'validstd.value as valstd, '\
-                'COALESCE(CAST(ROUND(out11.value, 2) AS FLOAT),0) AS Ete, '\
-                'COALESCE(CAST(ROUND(out12.value, 2) AS FLOAT),0) AS Hiver, '\
-                'COALESCE(CAST(ROUND(out31.value, 2) AS FLOAT),0) AS Feuillus, '\
-                'COALESCE(CAST(ROUND(out32.value, 2) AS FLOAT),0) AS Coniferes, '\
-                'COALESCE(CAST(ROUND(out34.value, 2) AS FLOAT),0) AS Pelouse, '\
-                'COALESCE(CAST(ROUND(out36.value, 2) AS FLOAT),0) AS Landes, '\
-                'COALESCE(CAST(ROUND(out41.value, 2) AS FLOAT),0) AS UrbainDens, '\
-                'COALESCE(CAST(ROUND(out42.value, 2) AS FLOAT),0) AS UrbainDiff, '\
-                'COALESCE(CAST(ROUND(out43.value, 2) AS FLOAT),0) AS ZoneIndCom, '\
-                'COALESCE(CAST(ROUND(out44.value, 2) AS FLOAT),0) AS Route, '\
-                'COALESCE(CAST(ROUND(out45.value, 2) AS FLOAT),0) AS SurfMin, '\
-                'COALESCE(CAST(ROUND(out46.value, 2) AS FLOAT),0) AS PlageDune, '\
-                'COALESCE(CAST(ROUND(out51.value, 2) AS FLOAT),0) AS Eau, '\
-                'COALESCE(CAST(ROUND(out53.value, 2) AS FLOAT),0) AS GlaceNeige, '\
-                'COALESCE(CAST(ROUND(out211.value, 2) AS FLOAT),0) AS Prairie, '\
-                'COALESCE(CAST(ROUND(out221.value, 2) AS FLOAT),0) AS Vergers, '\
-                'COALESCE(CAST(ROUND(out222.value, 2) AS FLOAT),0) AS Vignes '\
-                'FROM '\
-                '(SELECT '\
-                'idstats '\
-                'FROM stats '\
-                'GROUP BY idstats '\
-                'ORDER BY idstats) s ' \
-                'LEFT JOIN '
-                '(select idstats, value from stats where info = "confidence" and stat = "mean") confmean ' \
-                'ON s.idstats = confmean.idstats '\
-                'LEFT JOIN '
-                '(select idstats, value from stats where info = "validity" and stat = "mean") validmean ' \
-                'ON s.idstats = validmean.idstats '\
-                'LEFT JOIN '
-                '(select idstats, value from stats where info = "validity" and stat = "std") validstd ' \
-                'ON s.idstats = validstd.idstats '\
-                'LEFT JOIN '
-                '(select idstats, value from stats where info = "classif" and class = 11) out11 '\
-                'ON s.idstats = out11.idstats '\
-                'LEFT JOIN '                   
-                '(select idstats, value from stats where info = "classif" and class = 12) out12 '\
-                'ON s.idstats = out12.idstats '\
-                'LEFT JOIN '
-                '(select idstats, value from stats where info = "classif" and class = 31) out31 '\
-                'ON s.idstats = out31.idstats '\
-                'LEFT JOIN '
-                '(select idstats, value from stats where info = "classif" and class = 32) out32 '\
-                'ON s.idstats = out32.idstats '\
-                'LEFT JOIN '
-                '(select idstats, value from stats where info = "classif" and class = 34) out34 '\
-                'ON s.idstats = out34.idstats '\
-                'LEFT JOIN '
-                '(select idstats, value from stats where info = "classif" and class = 36) out36 '\
-                'ON s.idstats = out36.idstats '\
-                'LEFT JOIN '
-                '(select idstats, value from stats where info = "classif" and class = 41) out41 '\
-                'ON s.idstats = out41.idstats '\
-                'LEFT JOIN '
-                '(select idstats, value from stats where info = "classif" and class = 42) out42 '\
-                'ON s.idstats = out42.idstats '\
-                'LEFT JOIN '                   
-                '(select idstats, value from stats where info = "classif" and class = 43) out43 '\
-                'ON s.idstats = out43.idstats '\
-                'LEFT JOIN '                   
-                '(select idstats, value from stats where info = "classif" and class = 44) out44 '\
-                'ON s.idstats = out44.idstats '\
-                'LEFT JOIN '                   
-                '(select idstats, value from stats where info = "classif" and class = 45) out45 '\
-                'ON s.idstats = out45.idstats '\
-                'LEFT JOIN '                   
-                '(select idstats, value from stats where info = "classif" and class = 46) out46 '\
-                'ON s.idstats = out46.idstats '\
-                'LEFT JOIN '                   
-                '(select idstats, value from stats where info = "classif" and class = 51) out51 '\
-                'ON s.idstats = out51.idstats '\
-                'LEFT JOIN '                   
-                '(select idstats, value from stats where info = "classif" and class = 53) out53 '\
-                'ON s.idstats = out53.idstats '\
-                'LEFT JOIN '                   
-                '(select idstats, value from stats where info = "classif" and class = 211) out211 '\
-                'ON s.idstats = out211.idstats '\
-                'LEFT JOIN '                   
-                '(select idstats, value from stats where info = "classif" and class = 221) out221 '\
-                'ON s.idstats = out221.idstats '\
-                'LEFT JOIN '                   
-                '(select idstats, value from stats where info = "classif" and class = 222) out222 '\
-                'ON s.idstats = out222.idstats ')
-        
-    con.commit()
-    con.close()
-
-def pivotstats23(sqlite):
-
-    con = sqlite3.connect(sqlite)
-    cur = con.cursor()
-    # Pivot statistics table
-    cur.execute('CREATE TABLE statsfinal AS '\
-                'SELECT s.idstats + 1 as idstats, '\
-                'confmean.value as mconf, '\
-                'validmean.value as valmean, '\
-                'validstd.value as valstd, '\
-                'COALESCE(CAST(ROUND(out1.value, 1) AS FLOAT),0) AS UrbainDens, '\
-                'COALESCE(CAST(ROUND(out2.value, 2) AS FLOAT),0) AS UrbainDiff, '\
-                'COALESCE(CAST(ROUND(out3.value, 3) AS FLOAT),0) AS ZoneIndCom, '\
-                'COALESCE(CAST(ROUND(out4.value, 4) AS FLOAT),0) AS Route, '\
-                'COALESCE(CAST(ROUND(out5.value, 5) AS FLOAT),0) AS Colza, '\
-                'COALESCE(CAST(ROUND(out6.value, 6) AS FLOAT),0) AS CerealPail, '\
-                'COALESCE(CAST(ROUND(out7.value, 7) AS FLOAT),0) AS Proteagine, '\
-                'COALESCE(CAST(ROUND(out8.value, 8) AS FLOAT),0) AS Soja, '\
-                'COALESCE(CAST(ROUND(out9.value, 9) AS FLOAT),0) AS Tournesol, '\
-                'COALESCE(CAST(ROUND(out10.value, 10) AS FLOAT),0) AS Mais, '\
-                'COALESCE(CAST(ROUND(out11.value, 11) AS FLOAT),0) AS Riz, '\
-                'COALESCE(CAST(ROUND(out12.value, 12) AS FLOAT),0) AS TuberRacin, '\
-                'COALESCE(CAST(ROUND(out13.value, 13) AS FLOAT),0) AS Prairie, '\
-                'COALESCE(CAST(ROUND(out14.value, 14) AS FLOAT),0) AS Vergers, '\
-                'COALESCE(CAST(ROUND(out15.value, 15) AS FLOAT),0) AS Vignes, '\
-                'COALESCE(CAST(ROUND(out16.value, 16) AS FLOAT),0) AS Feuillus, '\
-                'COALESCE(CAST(ROUND(out17.value, 17) AS FLOAT),0) AS Coniferes, '\
-                'COALESCE(CAST(ROUND(out18.value, 18) AS FLOAT),0) AS Pelouse, '\
-                'COALESCE(CAST(ROUND(out19.value, 19) AS FLOAT),0) AS Landes, '\
-                'COALESCE(CAST(ROUND(out20.value, 20) AS FLOAT),0) AS SurfMin, '\
-                'COALESCE(CAST(ROUND(out21.value, 21) AS FLOAT),0) AS PlageDune, '\
-                'COALESCE(CAST(ROUND(out22.value, 22) AS FLOAT),0) AS GlaceNeige, '\
-                'COALESCE(CAST(ROUND(out23.value, 23) AS FLOAT),0) AS Eau '\
-                'FROM '\
-                '(SELECT '\
-                'idstats '\
-                'FROM stats '\
-                'GROUP BY idstats '\
-                'ORDER BY idstats) s '\
-                'LEFT JOIN '
-                '(select idstats, value from stats where info = "confidence" and stat = "mean") confmean '\
-                'ON s.idstats = confmean.idstats '\
-                'LEFT JOIN '
-                '(select idstats, value from stats where info = "validity" and stat = "mean") validmean '\
-                'ON s.idstats = validmean.idstats '\
-                'LEFT JOIN '
-                '(select idstats, value from stats where info = "validity" and stat = "std") validstd '\
-                'ON s.idstats = validstd.idstats '\
-                'LEFT JOIN ' 
-                '(select idstats, value from stats where info = "classif" and class = 1) out1 '\
-                'ON s.idstats = out1.idstats '\
-                'LEFT JOIN '
-                '(select idstats, value from stats where info = "classif" and class = 2) out2 '\
-                'ON s.idstats = out2.idstats '\
-                'LEFT JOIN '
-                '(select idstats, value from stats where info = "classif" and class = 3) out3 '\
-                'ON s.idstats = out3.idstats '\
-                'LEFT JOIN '
-                '(select idstats, value from stats where info = "classif" and class = 4) out4 '\
-                'ON s.idstats = out4.idstats '\
-                'LEFT JOIN '
-                '(select idstats, value from stats where info = "classif" and class = 5) out5 '\
-                'ON s.idstats = out5.idstats '\
-                'LEFT JOIN '
-                '(select idstats, value from stats where info = "classif" and class = 6) out6 '\
-                'ON s.idstats = out6.idstats '\
-                'LEFT JOIN '
-                '(select idstats, value from stats where info = "classif" and class = 7) out7 '\
-                'ON s.idstats = out7.idstats '\
-                'LEFT JOIN '
-                '(select idstats, value from stats where info = "classif" and class = 8) out8 '\
-                'ON s.idstats = out8.idstats '\
-                'LEFT JOIN '
-                '(select idstats, value from stats where info = "classif" and class = 9) out9 '\
-                'ON s.idstats = out9.idstats '\
-                'LEFT JOIN '
-                '(select idstats, value from stats where info = "classif" and class = 10) out10 '\
-                'ON s.idstats = out10.idstats '\
-                'LEFT JOIN '
-                '(select idstats, value from stats where info = "classif" and class = 11) out11 '\
-                'ON s.idstats = out11.idstats '\
-                'LEFT JOIN '
-                '(select idstats, value from stats where info = "classif" and class = 12) out12 '\
-                'ON s.idstats = out12.idstats '\
-                'LEFT JOIN '
-                '(select idstats, value from stats where info = "classif" and class = 13) out13 '\
-                'ON s.idstats = out13.idstats '\
-                'LEFT JOIN '
-                '(select idstats, value from stats where info = "classif" and class = 14) out14 '\
-                'ON s.idstats = out14.idstats '\
-                'LEFT JOIN '
-                '(select idstats, value from stats where info = "classif" and class = 15) out15 '\
-                'ON s.idstats = out15.idstats '\
-                'LEFT JOIN '
-                '(select idstats, value from stats where info = "classif" and class = 16) out16 '\
-                'ON s.idstats = out16.idstats '\
-                'LEFT JOIN '
-                '(select idstats, value from stats where info = "classif" and class = 17) out17 '\
-                'ON s.idstats = out17.idstats '\
-                'LEFT JOIN '
-                '(select idstats, value from stats where info = "classif" and class = 18) out18 '\
-                'ON s.idstats = out18.idstats '\
-                'LEFT JOIN '
-                '(select idstats, value from stats where info = "classif" and class = 19) out19 '\
-                'ON s.idstats = out19.idstats '\
-                'LEFT JOIN '
-                '(select idstats, value from stats where info = "classif" and class = 20) out20 '\
-                'ON s.idstats = out20.idstats '\
-                'LEFT JOIN '
-                '(select idstats, value from stats where info = "classif" and class = 21) out21 '\
-                'ON s.idstats = out21.idstats '\
-                'LEFT JOIN '
-                '(select idstats, value from stats where info = "classif" and class = 22) out22 '\
-                'ON s.idstats = out22.idstats '\
-                'LEFT JOIN '
-                '(select idstats, value from stats where info = "classif" and class = 23) out23 '\
-                'ON s.idstats = out23.idstats ')
-    
-    con.commit()
-    con.close()
+    if nomenclature is None:
+        return DEFAULT_CLASSES
 
+    nomenc = nomenc_tools.Iota2Nomenclature(nomenclature, 'cfg')
+    desclasses = nomenc.HierarchicalNomenclature.get_level_values(
+        int(nomenc.getLevelNumber() - 1))
+    return sorted([(int(code), str(alias))
+                   for code, _, _, alias in desclasses if int(code) != 255],
+                  key=lambda x: x[0])
 
-def joinShapeStats(shapefile, stats, tmp, outfile):    
-    import sqlite3 as db
-    layer = os.path.splitext(os.path.basename(shapefile))[0]
-    tmpfile = os.path.join(tmp, 'tmp_%s.sqlite'%(layer))
-    Utils.run('ogr2ogr -f SQLite %s %s -nln %s'%(tmpfile, shapefile, layer))
+def widestats(csvstore, classes):
+    """read a long statistics table (idstats, info, stat, class, value) and
+    pivot it in one column by statistic
 
-    database = sqlite3.connect(tmpfile)     
-    cursor = database.cursor()
-    cursor.execute("ATTACH '%s' as db;"%(stats))
-    cursor.execute("create table stats as select * from db.statsfinal;")
+    Return
+    ------
+    OrderedDict
+        columns (numpy arrays) of statistics, one row by idstats :
+        idstats, mconf (confidence mean), valmean, valstd (validity mean and
+        std), then the rate of each class (rounded to 2 decimals, 0 if the
+        class is absent) named by its alias
+    """
+    import numpy as np
 
-    # get shapefile fid colname
-    cursor.execute('select * from %s'%(layer))
-    fieldnames=[f[0] for f in cursor.description]
-    idcolname = fieldnames[0]
-    
-    cursor.execute("CREATE INDEX idx_shp ON %s(%s);"%(layer, idcolname))  
-    cursor.execute("CREATE INDEX idx_stats ON %s(%s);"%('stats', 'idstats'))  
+    ids = []
+    infos = []
+    stats = []
+    codes = []
+    values = []
+    with open(csvstore, 'r') as f:
+        for idstats, info, stat, code, value in csv.reader(f):
+            ids.append(int(idstats))
+            infos.append(info)
+            stats.append(stat)
+            codes.append(int(code) if code.strip() else -1)
+            values.append(float(value) if value.strip() else np.nan)
 
-    cursor.execute("create view datajoin as SELECT * FROM %s LEFT JOIN stats ON %s.%s = stats.idstats;"%(layer, layer, idcolname))
-    
-    database.commit()
-    database.close()
+    ids = np.array(ids, dtype=np.int64)
+    infos = np.array(infos)
+    stats = np.array(stats)
+    codes = np.array(codes, dtype=np.int64)
+    values = np.array(values, dtype=np.float64)
+    uniqids, rows = np.unique(ids, return_inverse=True)
 
-    outfiletmp = os.path.join(tmp, os.path.splitext(os.path.basename(outfile))[0] + '_tmp.shp')
-    Utils.run('ogr2ogr -f "ESRI Shapefile" -sql "select * from datajoin" %s %s -nln %s'%(outfiletmp, tmpfile, layer))
+    def pivot(selection, default):
+        column = np.full(len(uniqids), default, dtype=np.float64)
+        column[rows[selection]] = values[selection]
+        return column
 
-    #exp1, exp2, exp3 = manageClassName(nomenclature)
-    
-    layerout = os.path.splitext(os.path.basename(outfiletmp))[0]
-    '''
-    command = "ogr2ogr -overwrite -q -f 'ESRI Shapefile' -overwrite -sql "\
-              "'SELECT CAST(class AS INTEGER(4)) AS Classe, "\
-              "CAST(valmean AS INTEGER(4)) AS Validmean, "\
-              "CAST(valstd AS NUMERIC(6,2)) AS Validstd, "\
-              "CAST(mconf AS INTEGER(4)) AS Confidence, %s"\
-              "CAST(Area AS NUMERIC(10,2)) AS Aire "\
-              "FROM %s' "\
-              "%s %s"%(exp3, layerout, outfile, outfiletmp)
-    '''
-    command = "ogr2ogr -overwrite -q -f 'ESRI Shapefile' -overwrite -sql "\
-              "'SELECT CAST(class AS INTEGER(4)) AS Classe, "\
-              "CAST(valmean AS INTEGER(4)) AS Validmean, "\
-              "CAST(valstd AS NUMERIC(6,2)) AS Validstd, "\
-              "CAST(mconf AS INTEGER(4)) AS Confidence, "\
-              "CAST(Hiver AS NUMERIC(6,2)) AS Hiver, "\
-              "CAST(Ete AS NUMERIC(6,2)) AS Ete, "\
-              "CAST(Feuillus AS NUMERIC(6,2)) AS Feuillus, "\
-              "CAST(Coniferes AS NUMERIC(6,2)) AS Coniferes, "\
-              "CAST(Pelouse AS NUMERIC(6,2)) AS Pelouse, "\
-              "CAST(Landes AS NUMERIC(6,2)) AS Landes, "\
-              "CAST(UrbainDens AS NUMERIC(6,2)) AS UrbainDens, "\
-              "CAST(UrbainDiff AS NUMERIC(6,2)) AS UrbainDiff, "\
-              "CAST(ZoneIndCom AS NUMERIC(6,2)) AS ZoneIndCom, "\
-              "CAST(Route AS NUMERIC(6,2)) AS Route, "\
-              "CAST(PlageDune AS NUMERIC(6,2)) AS PlageDune, "\
-              "CAST(SurfMin AS NUMERIC(6,2)) AS SurfMin, "\
-              "CAST(Eau AS NUMERIC(6,2)) AS Eau, "\
-              "CAST(GlaceNeige AS NUMERIC(6,2)) AS GlaceNeige, "\
-              "CAST(Prairie AS NUMERIC(6,2)) AS Prairie, "\
-              "CAST(Vergers AS NUMERIC(6,2)) AS Vergers, "\
-              "CAST(Vignes AS NUMERIC(6,2)) AS Vignes, "\
-              "CAST(Area AS NUMERIC(10,2)) AS Aire "\
-              "FROM %s' "\
-              "%s %s"%(layerout, outfile, outfiletmp)
-    '''    
-    command = "ogr2ogr -overwrite -q -f 'ESRI Shapefile' -overwrite -sql "\
-              "'SELECT CAST(class AS INTEGER(4)) AS Classe, "\
-              "CAST(valmean AS INTEGER(4)) AS Validmean, "\
-              "CAST(valstd AS NUMERIC(6,2)) AS Validstd, "\
-              "CAST(mconf AS INTEGER(4)) AS Confidence, "\
-              "CAST(UrbainDens AS NUMERIC(6,2)) AS UrbainDens, "\
-              "CAST(UrbainDiff AS NUMERIC(6,2)) AS UrbainDiff, "\
-              "CAST(ZoneIndCom AS NUMERIC(6,2)) AS ZoneIndCom, "\
-              "CAST(Route AS NUMERIC(6,2)) AS Route, "\
-              "CAST(Colza AS NUMERIC(6,2)) AS Colza, "\
-              "CAST(CerealPail AS NUMERIC(6,2)) AS CerealPail, "\
-              "CAST(Proteagine AS NUMERIC(6,2)) AS Proteagine, "\
-              "CAST(Soja AS NUMERIC(6,2)) AS Soja, "\
-              "CAST(Tournesol AS NUMERIC(6,2)) AS Tournesol, "\
-              "CAST(Mais AS NUMERIC(6,2)) AS Mais, "\
-              "CAST(Riz AS NUMERIC(6,2)) AS Riz, "\
-              "CAST(TuberRacin AS NUMERIC(6,2)) AS TuberRacin, "\
-              "CAST(Prairie AS NUMERIC(6,2)) AS Prairie, "\
-              "CAST(Vergers AS NUMERIC(6,2)) AS Vergers, "\
-              "CAST(Vignes AS NUMERIC(6,2)) AS Vignes, "\
-              "CAST(Feuillus AS NUMERIC(6,2)) AS Feuillus, "\
-              "CAST(Coniferes AS NUMERIC(6,2)) AS Coniferes, "\
-              "CAST(Pelouse AS NUMERIC(6,2)) AS Pelouse, "\
-              "CAST(Landes AS NUMERIC(6,2)) AS Landes, "\
-              "CAST(SurfMin AS NUMERIC(6,2)) AS SurfMin, "\
-              "CAST(PlageDune AS NUMERIC(6,2)) AS PlageDune, "\
-              "CAST(GlaceNeige AS NUMERIC(6,2)) AS GlaceNeige, "\
-              "CAST(Eau AS NUMERIC(6,2)) AS Eau, "\
-              "CAST(Area AS NUMERIC(10,2)) AS Aire "\
-              "FROM %s' "\
-              "%s %s"%(layerout, outfile, outfiletmp)
-    '''
-    Utils.run(command)
-
-    for ext in ['.dbf', '.shp', '.prj', '.shx']:
-        os.remove(os.path.splitext(outfiletmp)[0] + ext)
-        
-    os.remove(stats)
-    os.remove(tmpfile)
-
-def compressShape(shapefile, outzip):
+    columns = OrderedDict()
+    columns["idstats"] = uniqids
+    columns["mconf"] = pivot((infos == "confidence") & (stats == "mean"),
+                             np.nan)
+    columns["valmean"] = pivot((infos == "validity") & (stats == "mean"),
+                               np.nan)
+    columns["valstd"] = pivot((infos == "validity") & (stats == "std"),
+                              np.nan)
+    classif = infos == "classif"
+    for code, alias in classes:
+        columns[alias] = np.round(pivot(classif & (codes == code), 0.0), 2)
+    return columns
+
+def joinShapeStats(shapefile, columns, classes, outfile):
+    """write features of shapefile with their statistics (see widestats)
+    in outfile (ESRI Shapefile or GeoPackage), in a single transaction
+
+    Features are joined to statistics by their FID (idstats). Output fields
+    are Classe, Validmean, Validstd, Confidence, the rate of each class
+    and Aire.
+    """
+    import math
+    import numpy as np
+    from osgeo import ogr
+    from iota2.VectorTools.TileIntersection import get_driver_name
+
+    fields = [("Classe", ogr.OFTInteger, 4, 0),
+              ("Validmean", ogr.OFTInteger, 4, 0),
+              ("Validstd", ogr.OFTReal, 6, 2),
+              ("Confidence", ogr.OFTInteger, 4, 0)]
+    fields += [(alias, ogr.OFTReal, 6, 2) for _, alias in classes]
+    fields += [("Aire", ogr.OFTReal, 10, 2)]
+
+    indata = ogr.Open(shapefile, 0)
+    inlayer = indata.GetLayer()
+    driver = ogr.GetDriverByName(get_driver_name(outfile))
+    if os.path.exists(outfile):
+        driver.DeleteDataSource(outfile)
+    outdata = driver.CreateDataSource(outfile)
+    outlayer = outdata.CreateLayer(
+        os.path.splitext(os.path.basename(outfile))[0],
+        inlayer.GetSpatialRef(), inlayer.GetGeomType())
+    for name, fieldtype, width, precision in fields:
+        fielddefn = ogr.FieldDefn(name, fieldtype)
+        fielddefn.SetWidth(width)
+        fielddefn.SetPrecision(precision)
+        outlayer.CreateField(fielddefn)
 
+    uniqids = columns["idstats"]
+    outputcolumns = {"Validmean": columns["valmean"],
+                     "Validstd": columns["valstd"],
+                     "Confidence": columns["mconf"]}
+    outputcolumns.update({alias: columns[alias] for _, alias in classes})
+
+    outlayer.StartTransaction()
+    for feature in inlayer:
+        outfeature = ogr.Feature(outlayer.GetLayerDefn())
+        outfeature.SetGeometry(feature.GetGeometryRef())
+        outfeature.SetField("Classe", int(feature.GetField("class")))
+        outfeature.SetField("Aire", feature.GetField("Area"))
+        row = np.searchsorted(uniqids, feature.GetFID())
+        if row < len(uniqids) and uniqids[row] == feature.GetFID():
+            for name, column in outputcolumns.items():
+                if math.isnan(column[row]):
+                    continue
+                if name in ["Validmean", "Confidence"]:
+                    outfeature.SetField(name, int(column[row]))
+                else:
+                    outfeature.SetField(name, float(column[row]))
+        outlayer.CreateFeature(outfeature)
+    outlayer.CommitTransaction()
+    outdata = indata = None
+
+def compressShape(vectorfile, outzip):
+
+    if os.path.splitext(vectorfile)[1].lower() == ".shp":
+        exts = ['.shp', '.dbf', '.shx', '.prj']
+    else:
+        exts = [os.path.splitext(vectorfile)[1]]
     with ZipFile(outzip, 'w') as myzip:
-        for ext in ['.shp', '.dbf', '.shx', '.prj']:
-            myzip.write(os.path.splitext(shapefile)[0] + ext, os.path.basename(os.path.splitext(shapefile)[0] + ext))
-        
-#def computeStats(shapefile, csv, nomenclature, tmp, outzip = True, output = ""):
-def computeStats(shapefile, csv, tmp, outzip = True, output = ""):
-    
+        for ext in exts:
+            myzip.write(os.path.splitext(vectorfile)[0] + ext, os.path.basename(os.path.splitext(vectorfile)[0] + ext))
+
+def removeVector(vectorfile):
+
+    if os.path.splitext(vectorfile)[1].lower() == ".shp":
+        exts = ['.shp', '.dbf', '.shx', '.prj', '.cpg']
+    else:
+        exts = [os.path.splitext(vectorfile)[1]]
+    for ext in exts:
+        if os.path.exists(os.path.splitext(vectorfile)[0] + ext):
+            os.remove(os.path.splitext(vectorfile)[0] + ext)
+
+def computeStats(shapefile, csv, tmp, outzip = True, output = "", nomenclature = None):
+    """join statistics (csv) to the shapefile of the same chunk
+
+    output is a shapefile or a GeoPackage, the shapefile is overwritten if
+    output is not given. Statistics columns are the ones of the
+    nomenclature (cfg format) last level, DEFAULT_CLASSES if None
+    """
     idxval = os.path.splitext(csv)[0].split("_")[len(os.path.splitext(csv)[0].split("_")) - 1]
     shapefile = os.path.splitext(shapefile)[0] + str(idxval) + ".shp"
-    output = shapefile
+    if not output:
+        output = shapefile
 
     begintime = time.time()
-    tmpsqlite = os.path.join(tmp, os.path.splitext(os.path.basename(csv))[0] + '.sqlite')
-    if os.path.exists(tmpsqlite):
-        os.remove(tmpsqlite)
-
-    importstats(csv, tmpsqlite)
-    timeimport = time.time()
-    logger.info(" ".join([" : ".join(["Statistics importation in sqlite database", str(round(timeimport - begintime, 2))]), "seconds"]))
-
-    #pivotstats(tmpsqlite, nomenclature)
-    pivotstats(tmpsqlite)
-    
+    classes = manageClassName(nomenclature)
+    columns = widestats(csv, classes)
 
     timepivot = time.time()
-    logger.info(" ".join([" : ".join(["Transpose statistics table", str(round(timepivot - timeimport, 2))]), "seconds"]))
+    logger.info(" ".join([" : ".join(["Transpose statistics table", str(round(timepivot - begintime, 2))]), "seconds"]))
 
-    #joinShapeStats(shapefile, tmpsqlite, tmp, output, nomenclature)
-    joinShapeStats(shapefile, tmpsqlite, tmp, output)    
+    outfiletmp = os.path.join(tmp, os.path.splitext(os.path.basename(output))[0] + '_tmp' + os.path.splitext(output)[1])
+    joinShapeStats(shapefile, columns, classes, outfiletmp)
+    removeVector(output)
+    for ext in ['.shp', '.dbf', '.shx', '.prj', '.cpg', '.gpkg']:
+        if os.path.exists(os.path.splitext(outfiletmp)[0] + ext):
+            shutil.move(os.path.splitext(outfiletmp)[0] + ext, os.path.splitext(output)[0] + ext)
     os.remove(csv)
     
     timejoin = time.time()
@@ -459,8 +225,7 @@ def computeStats(shapefile, csv, tmp, outzip = True, output = ""):
     if outzip:
         outzip = os.path.splitext(output)[0] + '.zip'
         compressShape(output, outzip)
-        for ext in ['.shp', '.dbf', '.shx', '.prj']: 
-            os.remove(os.path.splitext(output)[0] + ext)
+        removeVector(output)
 
         timecompress = time.time()
         logger.info(" ".join([" : ".join(["Compression of vector file ", str(round(timecompress - timejoin, 2))]), "seconds"]))
@@ -480,7 +245,7 @@ if __name__ == "__main__":
         parser.add_argument("-stats", dest="stats", action="store", \
                             help="stats file (csv)", required = True)
         parser.add_argument("-nclture", dest="nclture", action="store", \
-                            help="Nomenclature of the classification - (description:code:alias)")
+                            help="Nomenclature of the classification (cfg format)")
         parser.add_argument("-tmp", dest="tmp", action="store", \
                             help="tmp folder", required = True)
         parser.add_argument("-output", dest="output", action="store", \
@@ -490,8 +255,7 @@ if __name__ == "__main__":
         args = parser.parse_args()
 
         if not os.path.exists(args.output):
-            #computeStats(args.shape, args.stats, args.nclture, args.tmp, args.dozip, args.output)
-            computeStats(args.shape, args.stats, args.tmp, args.dozip, args.output)
+            computeStats(args.shape, args.stats, args.tmp, args.dozip, args.output, args.nclture)
         else:
             print("Output file '%s' already exists, please delete it or change output path"%(args.output))
             sys.exit()
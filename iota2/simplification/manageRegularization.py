@@ -22,6 +22,7 @@ import multiprocessing as mp
 try:
     from Common import FileUtils as fut
     from Common import OtbAppBank
+    from Common import RasterProfile
     from Common.OtbAppBank import executeApp
     from simplification import nomenclature
 except ImportError:
@@ -172,6 +173,7 @@ def maskOTBBandMathOutput(path, raster, exp, ram, output, dstnodata=0):
     p.join()
 
     gdal.Warp(output, outbm, dstNodata=dstnodata, multithread=True, format="GTiff", \
+              creationOptions=RasterProfile.gdal_creation_options("Byte"), \
               warpOptions=[["NUM_THREADS=ALL_CPUS"],["OVERWRITE=TRUE"]])
 
     os.remove(outbm)
@@ -204,7 +206,12 @@ def sieveRasterMemory(raster,
     if os.path.splitext(output)[1] == ".tif":
         outformat = "GTiff"
 
+    creationOptions = []
+    if outformat == "GTiff":
+        creationOptions = RasterProfile.gdal_creation_options("Byte")
+
     sievedRaster = gdal.Warp(output, dst_ds, dstNodata=dstnodata, multithread=True, format=outformat, \
+                             creationOptions=creationOptions, \
                              warpOptions=[["NUM_THREADS=ALL_CPUS"],["OVERWRITE=TRUE"]])
     return sievedRaster
 
@@ -252,6 +259,7 @@ def mergeRegularization(path,
 
             if water:
                 tmprewater = gdal.Warp(outtmp, sieve4, targetAlignedPixels=True, resampleAlg='mode', xRes=resample, yRes=resample, dstNodata=0, multithread=True, format="GTiff", \
+                                  creationOptions=RasterProfile.gdal_creation_options("Byte"), \
                                   warpOptions=[["NUM_THREADS=ALL_CPUS"],["OVERWRITE=TRUE"]])
                 rastToVectRecode(path, outtmp, water, output)
                 os.remove(outtmp)
@@ -259,6 +267,7 @@ def mergeRegularization(path,
 
             else:
                 tmpre = gdal.Warp(output, sieve4, targetAlignedPixels=True, resampleAlg='mode', xRes=resample, yRes=resample, dstNodata=0, multithread=True, format="GTiff", \
+                                  creationOptions=RasterProfile.gdal_creation_options("Byte"), \
                                   warpOptions=[["NUM_THREADS=ALL_CPUS"],["OVERWRITE=TRUE"]])
                 tmpre = sieve4 = None
         else:
@@ -42,6 +42,7 @@ except ImportError:
 try:
     from Common import FileUtils as fu
     from Common import Utils
+    from Common import RasterProfile
 except ImportError:
     raise ImportError('Iota2 not well configured / installed')
 
@@ -170,7 +171,8 @@ def arraytoRaster(array, output, model, driver='GTiff'):
     driver = gdal.GetDriverByName(driver)
     cols = model.RasterXSize
     rows = model.RasterYSize
-    outRaster = driver.Create(output, cols, rows, 1, gdal.GDT_Byte)
+    outRaster = driver.Create(output, cols, rows, 1, gdal.GDT_Byte,
+                              options=RasterProfile.gdal_creation_options("Byte"))
     outRaster.SetGeoTransform((model.GetGeoTransform()[0], \
                                model.GetGeoTransform()[1], 0, \
                                model.GetGeoTransform()[3], 0, \